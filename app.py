@@ -1,20 +1,27 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import os
-import subprocess
-import signal
 import time
-import glob
 import shutil
 import json
-import re
+
+from studio import commands, sweep, telemetry, uploads
+from studio.artifacts import ArtifactCatalog
+from studio.commands import (EXPORT_FORMATS, EXPORT_MANIFEST_NAME, MESH_COMPRESSIONS, MESH_LOD_DIR, NS_SPLAT_NAME,
+                             PRUNED_SPLAT_NAME, SPLAT_FORMATS)
+from studio.config import UPLOAD_DIR, DATA_DIR, OUTPUT_DIR, EXPORT_DIR
+from studio.containers import container_status
+from studio.jobs import JobStore, STATE_EMOJI, SUCCEEDED, RUNNING, QUEUED
+from studio.logs import read_log_tail
+from studio.fileserver import FILESERVER_PORT, download_url, ensure_fileserver, fileserver_token, project_zip_url
+from studio.worker import ensure_worker, format_seconds
 
 # ==========================================
 # Configuration
 # ==========================================
-UPLOAD_DIR = "/workspace/data/uploads"
-DATA_DIR = "/workspace/data/nerfstudio"
-OUTPUT_DIR = "/workspace/outputs"
-EXPORT_DIR = "/workspace/exports"
+# Seconds between job status refreshes in the UI (time-based, independent of
+# how fast a job prints; the worker writes progress at most once a second)
+JOB_REFRESH_SECONDS = 0.5
 
 # Nerfstudio model categories
 NERFSTUDIO_MODELS = {
@@ -44,15 +51,6 @@ NERFSTUDIO_MODELS = {
     },
 }
 
-# Export formats
-EXPORT_FORMATS = {
-    "gaussian-splat": "Gaussian Splat (.ply) - SuperSplat対応",
-    "pointcloud": "点群 (.ply)",
-    "poisson": "Poissonメッシュ (.ply)",
-    "marching-cubes": "Marching Cubesメッシュ (.ply)",
-    "tsdf": "TSDFメッシュ (.ply)",
-}
-
 # Ensure directories exist
 for d in [UPLOAD_DIR, DATA_DIR, OUTPUT_DIR, EXPORT_DIR]:
     os.makedirs(d, exist_ok=True)
@@ -62,200 +60,384 @@ st.set_page_config(layout="wide", page_title="3DGS Studio", page_icon="🎥")
 # ==========================================
 # Session State
 # ==========================================
-if "process" not in st.session_state:
-    st.session_state.process = None
-if "logs" not in st.session_state:
-    st.session_state.logs = []
-if "pid" not in st.session_state:
-    st.session_state.pid = None
+if "active_jobs" not in st.session_state:
+    st.session_state.active_jobs = {}
+if "celebrated_jobs" not in st.session_state:
+    st.session_state.celebrated_jobs = set()
 if "current_project" not in st.session_state:
     st.session_state.current_project = ""
 
 # ==========================================
 # Helper Functions
 # ==========================================
-def run_command(command, log_placeholder, progress_bar=None, progress_config=None):
-    """Run a command and capture output with optional progress bar.
-    
-    progress_config: dict with keys:
-        - 'type': 'steps' | 'iterations' | 'pattern'
-        - 'total_steps': int (for 'steps' type)
-        - 'step_patterns': list of str (for 'steps' type - regex patterns that advance the step)
-        - 'total_iterations': int (for 'iterations' type)
-        - 'iteration_pattern': str (regex with group(1) as current iteration)
-        - 'pattern': str (regex with group(1) as numerator, group(2) as denominator)
+@st.cache_resource
+def get_job_store():
+    """Job queue shared by all browser sessions."""
+    return JobStore()
+
+
+@st.cache_resource
+def get_artifact_catalog():
+    """Index of PLY/OBJ/GLB/config/checkpoint files, filled by the worker as jobs finish."""
+    catalog = ArtifactCatalog()
+    if catalog.is_empty():
+        catalog.rescan()  # first start: pick up what is already on disk
+    return catalog
+
+
+job_store = get_job_store()
+artifact_catalog = get_artifact_catalog()
+ensure_worker()  # also picks up jobs queued while no worker was running
+ensure_fileserver()  # large uploads go there instead of through Streamlit
+
+
+def submit_job(kind, steps, project, title, output_dir=None, resource="cpu", locks=()):
+    """Queue a job for the background worker and remember it for this page.
+
+    `resource` is the scheduler profile (model name, "sugar", "2dgs", ...)
+    that declares how much GPU memory the job needs.
     """
-    st.session_state.logs = []
-    current_step = 0
-
-    if st.session_state.process:
-        try:
-            os.kill(st.session_state.pid, signal.SIGTERM)
-        except (ProcessLookupError, OSError):
-            pass
-        st.session_state.process = None
-
-    process = subprocess.Popen(
-        command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        universal_newlines=True
-    )
-
-    st.session_state.process = process
-    st.session_state.pid = process.pid
-
-    while True:
-        output = process.stdout.readline()
-        if output == '' and process.poll() is not None:
-            break
-        if output:
-            line = output.strip()
-            st.session_state.logs.append(line)
-            if len(st.session_state.logs) > 1000:
-                st.session_state.logs.pop(0)
-
-            # Update progress bar if configured
-            if progress_bar and progress_config:
-                ptype = progress_config.get('type', '')
-                try:
-                    if ptype == 'steps':
-                        for i, pat in enumerate(progress_config.get('step_patterns', [])):
-                            if re.search(pat, line, re.IGNORECASE):
-                                current_step = max(current_step, i + 1)
-                                total = progress_config.get('total_steps', len(progress_config['step_patterns']))
-                                progress_bar.progress(min(current_step / total, 1.0),
-                                    text=f"ステップ {current_step}/{total}: {line[:80]}")
-                                break
-
-                    elif ptype == 'iterations':
-                        pat = progress_config.get('iteration_pattern', '')
-                        m = re.search(pat, line)
-                        if m:
-                            current_iter = int(m.group(1))
-                            total_iter = progress_config.get('total_iterations', 30000)
-                            progress_bar.progress(min(current_iter / total_iter, 1.0),
-                                text=f"イテレーション {current_iter:,}/{total_iter:,}")
-
-                    elif ptype == 'pattern':
-                        pat = progress_config.get('pattern', '')
-                        m = re.search(pat, line)
-                        if m:
-                            num = int(m.group(1))
-                            den = int(m.group(2))
-                            if den > 0:
-                                progress_bar.progress(min(num / den, 1.0),
-                                    text=f"{num}/{den}")
-                except (ValueError, IndexError, AttributeError):
-                    pass
-
-            # Update log display
-            if len(st.session_state.logs) % 2 == 0 or len(st.session_state.logs) < 20:
-                log_str = "\n".join(st.session_state.logs[-50:])
-                log_placeholder.code(log_str)
-
-    # Mark complete
-    if progress_bar:
-        progress_bar.progress(1.0, text="✅ 完了")
-
-    return process.poll()
-
-
-def run_docker_command(container, command):
-    """Run a command in a specific Docker container via docker compose exec."""
-    full_cmd = ["docker", "compose", "exec", "-T", container] + command
-    return full_cmd
-
-
-def stop_process():
-    """Stop the current running process."""
-    if st.session_state.process:
-        st.session_state.process.terminate()
-        st.session_state.process = None
+    job_id = job_store.submit(kind, steps, project=project, title=title,
+                              output_dir=output_dir, resource=resource, locks=locks)
+    st.session_state.active_jobs[kind] = job_id
+    return job_id
+
+
+def stop_job(kind, project=None):
+    """Cancel the active job of a page."""
+    job_id = st.session_state.active_jobs.get(kind)
+    if not job_id and project:
+        latest = job_store.list(limit=1, project=project, kind=kind, states=[QUEUED, RUNNING])
+        job_id = latest[0]["id"] if latest else None
+    if job_id:
+        job_store.request_cancel(job_id)
         st.error("プロセスを停止しました")
 
 
-def check_container_status(container_name):
-    """Check if a Docker container is running."""
-    try:
-        result = subprocess.run(
-            ["docker", "inspect", "-f", "{{.State.Running}}", container_name],
-            capture_output=True, text=True, timeout=5
-        )
-        return result.stdout.strip() == "true"
-    except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
-        return False
+@st.fragment(run_every=JOB_REFRESH_SECONDS)
+def show_job(kind, project=None, success_message=None, on_success=None):
+    """Show status, progress and log tail of the active job of a page.
 
+    Polls the job queue instead of blocking on the process, so reruns and
+    closed tabs don't lose the job. Without a job from this session, the
+    latest job of `kind` for `project` is shown. `on_success(job)` renders
+    extra output (e.g. download buttons) once the job has succeeded.
+    """
+    job_id = st.session_state.active_jobs.get(kind)
+    if job_id:
+        job = job_store.get(job_id)
+    else:
+        latest = job_store.list(limit=1, project=project, kind=kind) if project else []
+        job = latest[0] if latest else None
+    if job is None:
+        return
+    job_id = job["id"]
+
+    st.markdown(f"{STATE_EMOJI.get(job['state'], '')} **{job['title']}** — `{job['id']}` ({job['state']})")
+    if job["gpu"] is not None:
+        st.caption(f"🎮 GPU {job['gpu']} (予約VRAM {job['vram_mb']:,} MB)")
+    st.progress(min(job["progress"] or 0.0, 1.0), text=job["progress_text"] or "待機中...")
+
+    metrics = job["metrics"]
+    if job["state"] == RUNNING and metrics and metrics.get("event") != "done":
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("ステージ", metrics.get("stage", "-"))
+        col2.metric("速度", f"{metrics['it_per_s']:.1f} it/s" if metrics.get("it_per_s") is not None else "-")
+        col3.metric("ステージ残り", format_seconds(metrics["eta"]) if metrics.get("eta") is not None else "-")
+        col4.metric("GPUメモリ", f"{metrics['gpu_mem_mb']:,} MB" if metrics.get("gpu_mem_mb") is not None else "-")
+
+    if job["state"] in (QUEUED, RUNNING):
+        if st.button("⏹️ ジョブ停止", key=f"cancel_{kind}_{job_id}"):
+            job_store.request_cancel(job_id)
+    elif job["state"] == SUCCEEDED:
+        if success_message:
+            st.success(success_message)
+            celebrate_once(job)
+        if on_success:
+            on_success(job)
+    else:
+        if job["error"]:
+            st.error(f"❌ {job['error']}")
+
+    if job["step_times"]:
+        with st.expander("⏱️ ステージ別所要時間"):
+            st.table([
+                {"ステージ": t["label"], "時間": format_seconds(t["seconds"]), "キャッシュ": "♻️" if t["cached"] else ""}
+                for t in job["step_times"]
+            ])
+    if job["state"] not in (QUEUED, RUNNING):
+        show_telemetry(job)
+
+    st.code("\n".join(read_log_tail(job["log_path"], max_lines=50)))
+
+
+def show_telemetry(job):
+    """Resource report of a finished job: step / stage Gantt, peak memory, it/s and the sampled time series."""
+    report = telemetry.load_report(job)
+    if not report or not report["steps"]:
+        return
+
+    def mb(value):
+        return f"{value:,.0f} MB" if value is not None else "-"
+
+    with st.expander("📊 リソース使用状況"):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("合計時間", format_seconds(report["seconds"]))
+        col2.metric("最大メモリ (RAM)", mb(report["rss_mb_peak"]))
+        col3.metric("最大GPUメモリ", mb(report["gpu_mem_mb_peak"]))
+
+        bars = []
+        for step in report["steps"]:
+            bars.append({"名前": step["label"], "種類": "ステップ", "開始": step["start"] * 1000, "終了": step["end"] * 1000})
+            for stage in step["stages"]:
+                bars.append({"名前": f"{step['label']} / {stage['name']}", "種類": "ステージ",
+                             "開始": stage["start"] * 1000, "終了": stage["end"] * 1000})
+        st.vega_lite_chart({
+            "data": {"values": bars},
+            "mark": "bar",
+            "encoding": {
+                "y": {"field": "名前", "type": "nominal", "sort": None, "title": None},
+                "x": {"field": "開始", "type": "temporal", "title": None},
+                "x2": {"field": "終了"},
+                "color": {"field": "種類", "type": "nominal", "title": None},
+            },
+        }, use_container_width=True)
+
+        st.table([{
+            "ステップ": step["label"],
+            "時間": format_seconds(step["seconds"]),
+            "CPU平均": f"{step['cpu_mean']:.0f}%" if step.get("cpu_mean") is not None else "-",
+            "最大RAM": mb(step["rss_mb_peak"]),
+            "読込/書込": f"{step['read_mb'] or 0:,.0f} / {step['write_mb'] or 0:,.0f} MB",
+            "GPU使用率": f"{step['gpu_util_mean']:.0f}%" if step.get("gpu_util_mean") is not None else "-",
+            "最大GPUメモリ": mb(step["gpu_mem_mb_peak"]),
+        } for step in report["steps"]])
+        stages = [(step, stage) for step in report["steps"] for stage in step["stages"]]
+        if stages:
+            st.table([{
+                "ステージ": f"{step['label']} / {stage['name']}",
+                "時間": format_seconds(stage["seconds"]),
+                "イテレーション": f"{stage['iterations']:,}",
+                "速度": f"{stage['it_per_s']:.1f} it/s" if stage["it_per_s"] is not None else "-",
+                "最大GPUメモリ": mb(stage["gpu_mem_peak_mb"]),
+            } for step, stage in stages])
+
+        samples_path = telemetry.telemetry_paths(job)[0]
+        series = [{"時刻": sample["t"] * 1000, "指標": name, "MB": sample[key]}
+                  for sample in telemetry.read_samples(samples_path)
+                  for key, name in (("rss_mb", "RAM"), ("gpu_mem_mb", "GPUメモリ")) if sample.get(key) is not None]
+        if series:
+            st.vega_lite_chart({
+                "data": {"values": series},
+                "mark": "line",
+                "encoding": {
+                    "x": {"field": "時刻", "type": "temporal", "title": None},
+                    "y": {"field": "MB", "type": "quantitative"},
+                    "color": {"field": "指標", "type": "nominal", "title": None},
+                },
+            }, use_container_width=True)
+        st.caption(f"{report['interval']:g}秒ごとのサンプル: `{samples_path}`")
+
+
+def celebrate_once(job):
+    """Show balloons the first time a job submitted in this session succeeds."""
+    if job["id"] in st.session_state.active_jobs.values() and job["id"] not in st.session_state.celebrated_jobs:
+        st.session_state.celebrated_jobs.add(job["id"])
+        st.balloons()
 
-def check_image_exists(container_name):
-    """Check if a Docker image for a container exists (by checking if container was ever created)."""
-    try:
-        result = subprocess.run(
-            ["docker", "inspect", "-f", "{{.Image}}", container_name],
-            capture_output=True, text=True, timeout=5
-        )
-        return result.returncode == 0 and bool(result.stdout.strip())
-    except Exception:
-        return False
+
+def check_container_status(container_name):
+    """Check if a Docker container is running (cached, see studio.containers)."""
+    return container_status.running(container_name)
 
 
 def get_container_status_emoji(container_name):
-    """Get status emoji for a container."""
-    if check_container_status(container_name):
-        return "🟢"  # Running
-    elif check_image_exists(container_name):
-        return "🟡"  # Built but not running
-    else:
-        return "🔴"  # Not installed
+    """Get status emoji for a container: 🟢 running, 🟡 created but stopped, 🔴 not created."""
+    return container_status.emoji(container_name)
 
 
-def get_video_duration(video_path):
-    """Get video duration in seconds using ffprobe."""
-    try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-             "-of", "default=noprint_wrappers=1:nokey=1", video_path],
-            capture_output=True, text=True, timeout=10
-        )
-        return float(result.stdout.strip())
-    except Exception:
-        return 30.0  # fallback to 30 seconds
+def job_artifacts(job, kinds):
+    """Artifacts of `kinds` in a finished job's output directory."""
+    rows = artifact_catalog.find(kinds=kinds, under=job["output_dir"])
+    if not rows and os.path.isdir(job["output_dir"]):
+        artifact_catalog.index_dir(job["output_dir"])  # job from before the catalog existed
+        rows = artifact_catalog.find(kinds=kinds, under=job["output_dir"])
+    return rows
 
 
-def find_ply_files(directory):
-    """Find all PLY files recursively."""
-    return glob.glob(os.path.join(directory, "**", "*.ply"), recursive=True)
+def browser_host():
+    """Host name the browser used for the Web UI (the file server listens on the same host)."""
+    return st.context.headers.get("Host", "localhost").rsplit(":", 1)[0]
 
 
-def find_glb_files(directory):
-    """Find all GLB files recursively."""
-    return glob.glob(os.path.join(directory, "**", "*.glb"), recursive=True)
+def download_link(path, label, size=None):
+    """Link to a file on the file server (streamed with range support, nothing is loaded here)."""
+    size = os.path.getsize(path) if size is None else size
+    url = download_url(path, browser_host())
+    if url:
+        st.link_button(f"{label} ({size / (1024 * 1024):.1f} MB)", url)
+    else:
+        st.caption(f"{path} ({size / (1024 * 1024):.1f} MB)")
+
+
+def show_export_files(job):
+    """List exported PLY/.splat files of a finished export job with download buttons."""
+    ply_files = job_artifacts(job, ["ply", "splat", "glb"])
+    if ply_files:
+        st.success(f"✅ エクスポート完了: {job['output_dir']}")
+        show_export_manifest(job["output_dir"])
+        show_prune_report(job["output_dir"])
+        show_compress_report(job["output_dir"])
+        show_lod_index(job["output_dir"])
+        # LOD tiles are fetched by the viewer through the index, not one by one
+        lod_dir = os.path.join(job["output_dir"], "lod") + os.sep
+        ply_files = [a for a in ply_files if not a["path"].startswith(lod_dir)]
+        for artifact in ply_files:
+            file_name = os.path.basename(artifact["path"])
+            download_link(artifact["path"], f"⬇️ {file_name} をダウンロード", artifact["size"])
+    else:
+        st.warning("PLYファイルが見つかりませんでした")
+
+
+def mesh_lod_options(key):
+    """Checkbox + compression choice for the mesh LOD step; returns the compression or None."""
+    if not st.checkbox("📉 メッシュLOD GLBを生成", value=True, key=f"mesh_lod_{key}",
+                       help="溶接・二次誤差簡略化で複数LODに減らし、圧縮GLB (PlayCanvas用) を mesh_lod/ に出力します"):
+        return None
+    return st.selectbox("メッシュ圧縮", list(MESH_COMPRESSIONS), format_func=lambda x: MESH_COMPRESSIONS[x],
+                        key=f"mesh_compression_{key}")
+
+
+def show_mesh_lods(output_dir):
+    """Levels written by scripts/mesh_lod.py, with download links."""
+    report_path = os.path.join(output_dir, MESH_LOD_DIR, "report.json")
+    if not os.path.exists(report_path):
+        return
+    with open(report_path) as f:
+        report = json.load(f)
+    st.markdown(f"**メッシュLOD** — 元メッシュ {report['faces']:,} 面 / {report['source_mb']:.1f} MB "
+                f"({report['compression']}, {report['seconds']:.0f}秒)")
+    st.table([
+        {"LOD": level["level"], "面数": f"{level['faces']:,}", "サイズ": f"{level['mb']:.1f} MB",
+         "時間": f"{level['seconds']:.1f}s"}
+        for level in report["levels"]
+    ])
+    for level in report["levels"]:
+        download_link(os.path.join(output_dir, MESH_LOD_DIR, level["file"]), f"⬇️ {level['file']}")
 
 
-def find_obj_files(directory):
-    """Find all OBJ files recursively."""
-    return glob.glob(os.path.join(directory, "**", "*.obj"), recursive=True)
+def show_mesh_lod_section(output_dir, project, framework):
+    """Mesh LODs of a SuGaR / 2DGS output, with a button to (re)build them."""
+    st.markdown("---")
+    show_mesh_lods(output_dir)
+    compression = mesh_lod_options(f"export_{framework}")
+    # One job kind per framework: both tabs render at once, so they need their own jobs and widget keys
+    kind = f"mesh_lod_{framework.lower()}"
+    if compression and st.button("📉 メッシュLODを生成", key=f"mesh_lod_button_{framework}"):
+        steps = commands.mesh_lod_steps(output_dir, compression=compression)
+        submit_job(kind, steps, project, f"メッシュLOD: {framework}", os.path.join(output_dir, MESH_LOD_DIR))
+    show_job(kind, project)
+
+
+def show_lod_index(output_dir):
+    """Levels of the LOD tiles written by scripts/splat_lod.py, with a link to index.json."""
+    index_path = os.path.join(output_dir, "lod", "index.json")
+    if not os.path.exists(index_path):
+        return
+    with open(index_path) as f:
+        index = json.load(f)
+    st.markdown("**LODタイル**")
+    st.table([
+        {"レベル": level["level"], "Splat数": f"{level['points']:,}", "タイル数": len(level["tiles"]),
+         "サイズ": f"{level['bytes'] / (1024 * 1024):.1f} MB", "幾何誤差": f"{level['geometric_error']:.3g}"}
+        for level in index["levels"]
+    ])
+    url = download_url(index_path, browser_host())
+    if url:
+        st.caption(f"ビューアー用インデックス: {url} (タイルは同じディレクトリから相対パスで取得)")
+
+
+def show_prune_report(output_dir):
+    """Counts removed by scripts/prune_splat.py, if the export was pruned."""
+    report_path = os.path.join(output_dir, os.path.splitext(PRUNED_SPLAT_NAME)[0] + ".json")
+    if not os.path.exists(report_path):
+        return
+    with open(report_path) as f:
+        report = json.load(f)
+    removed = "、".join(f"{name} {count:,}" for name, count in report["removed"].items())
+    st.markdown(f"**削減結果** — {report['points_in']:,} → {report['points_out']:,} splats "
+                f"({report['input_mb']:.1f} → {report['output_mb']:.1f} MB, -{report['reduction']:.0%}) / 削除: {removed}")
+
+
+def show_compress_report(output_dir):
+    """Size / quality table written by scripts/compress_splat.py, if the export was compressed."""
+    for name in (PRUNED_SPLAT_NAME, NS_SPLAT_NAME):
+        report_path = os.path.join(output_dir, os.path.splitext(name)[0] + ".compress.json")
+        if os.path.exists(report_path):
+            break
+    else:
+        return
+    with open(report_path) as f:
+        report = json.load(f)
+    st.markdown(f"**圧縮結果** — 元PLY {report['input_mb']:.1f} MB / {report['points']:,} splats")
+    st.table([
+        {
+            "形式": entry["format"],
+            "サイズ": f"{entry['mb']:.1f} MB",
+            "圧縮率": f"{entry['ratio']:.1f}x",
+            "SH次数": entry["sh_degree"],
+            "色PSNR": f"{entry['color_psnr']:.1f} dB" if entry["color_psnr"] is not None else "劣化なし",
+            "位置誤差": f"{entry['position_rel'] * 100:.3f}%",
+            "回転誤差": f"{entry['rotation_deg']:.2f}°",
+        }
+        for entry in report["outputs"]
+    ])
 
 
-def convert_ply_to_glb(ply_path, glb_path):
-    """Convert PLY to GLB using trimesh."""
+def show_export_manifest(output_dir):
+    """Per-format table of manifest.json written by the export service."""
+    manifest_path = os.path.join(output_dir, EXPORT_MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    step = f"step {manifest['step']:,}, " if manifest.get("step") is not None else ""
+    st.markdown(f"**エクスポート内訳** — {step}合計 {manifest['seconds']:.0f}秒 (チェックポイント読み込み1回)")
+    st.table([
+        {
+            "形式": export_format,
+            "ファイル": ", ".join(os.path.basename(path) for path in result.get("files", [])) or "-",
+            "GPU": f"{result['seconds']:.1f}s" if "seconds" in result else "-",
+            "CPU (並列)": f"{result['cpu_seconds']:.1f}s" if "cpu_seconds" in result else "-",
+            "状態": f"❌ {result['error']}" if "error" in result else "✅",
+        }
+        for export_format, result in manifest["formats"].items()
+    ])
+
+
+@st.fragment(run_every=JOB_REFRESH_SECONDS)
+def show_sweep(sweep_dir):
+    """Results table of a hyperparameter sweep (studio.sweep), refreshed while it runs."""
     try:
-        import trimesh
-        mesh = trimesh.load(ply_path)
-        if isinstance(mesh, trimesh.Scene):
-            mesh.export(glb_path, file_type='glb')
-        elif isinstance(mesh, trimesh.PointCloud):
-            scene = trimesh.Scene()
-            scene.add_geometry(mesh)
-            scene.export(glb_path, file_type='glb')
-        else:
-            mesh.export(glb_path, file_type='glb')
-        return True
-    except Exception as e:
-        st.error(f"GLB変換エラー: {e}")
-        return False
+        current = sweep.Sweep(sweep_dir, job_store)
+    except (OSError, ValueError):
+        return
+    spec, summary = current.spec, current.summary()
+    state = {"running": "🔄 実行中", "finished": "✅ 完了", "stopped": "⏹️ 停止"}.get(current.state["state"], "")
+    st.markdown(f"**{current.state['id']}** {state} — {summary['trials']}試行, "
+                f"rung {' → '.join(f'{r:,}' for r in current.rungs)} it, 指標 {spec['metric']}")
+    st.caption(f"学習量: 全試行をフル学習した場合の {summary['fraction']:.0%} "
+               f"({summary['iterations']:,} / {summary['full_iterations']:,} it), GPU {summary['gpu_hours']:.2f} 時間")
+    st.dataframe(current.results(), hide_index=True, use_container_width=True)
+    if current.state["state"] == "running" and st.button("⏹️ スイープ停止", key=f"stop_{current.state['id']}"):
+        sweep.request_stop(sweep_dir)
+
+
+def show_glb_download(job):
+    """Download button for the output of a finished GLB conversion job."""
+    glb_path = job["steps"][-1]["expects"][0]
+    st.success(f"✅ 変換完了: {glb_path}")
+    download_link(glb_path, "⬇️ GLBをダウンロード")
 
 
 # ==========================================
@@ -288,6 +470,15 @@ st.sidebar.markdown(f"{sg_status} **SuGaR** (メッシュ抽出)")
 st.sidebar.markdown(f"{dgs_status} **2DGS** (高品質レンダリング)")
 st.sidebar.caption("🟢 Running  🟡 Built (停止中)  🔴 未ビルド")
 
+# Job queue status
+st.sidebar.markdown("---")
+st.sidebar.markdown("### ジョブキュー")
+job_counts = job_store.counts()
+st.sidebar.markdown(f"🔄 実行中: {job_counts.get(RUNNING, 0)}　⏳ 待機中: {job_counts.get(QUEUED, 0)}")
+with st.sidebar.expander("最近のジョブ"):
+    for recent in job_store.list(limit=10):
+        st.markdown(f"{STATE_EMOJI.get(recent['state'], '')} `{recent['id']}` {recent['project']} — {recent['title']}")
+
 
 # ==========================================
 # Page 1: Upload Data
@@ -295,32 +486,57 @@ st.sidebar.caption("🟢 Running  🟡 Built (停止中)  🔴 未ビルド")
 if page == "1. 📂 データアップロード":
     st.header("📂 データアップロード")
 
-    project_name = st.text_input("プロジェクト名 (スペースなし)", value="my_project")
+    project_name = st.text_input("プロジェクト名", value="my_project")
     if project_name:
         st.session_state.current_project = project_name
 
-    upload_type = st.radio("データタイプ", ["動画 (.mp4)", "画像 (複数ファイル)"])
+    upload_type = st.radio("データタイプ", [
+        "動画 (.mp4)", "画像 (複数ファイル)", "大容量アップロード (チャンク・再開可能)", "サーバー上のパス / ZIPから取り込み"
+    ])
+
+    try:
+        uploads.check_name(project_name)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        st.stop()
 
     if upload_type == "動画 (.mp4)":
         uploaded_file = st.file_uploader("動画をアップロード", type=["mp4", "mov", "avi"])
+        st.caption("💡 数GBの動画は「大容量アップロード」を使ってください")
         if uploaded_file and project_name:
-            save_path = os.path.join(UPLOAD_DIR, f"{project_name}.mp4")
-            with open(save_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+            save_path = uploads.video_path(project_name)
+            uploads.save_stream(uploaded_file, save_path)
             st.success(f"✅ 保存先: {save_path}")
             st.video(save_path)
-    else:
+    elif upload_type == "画像 (複数ファイル)":
         uploaded_files = st.file_uploader(
             "画像をアップロード", type=["jpg", "png", "jpeg"],
             accept_multiple_files=True
         )
         if uploaded_files and project_name:
-            save_dir = os.path.join(UPLOAD_DIR, project_name)
-            os.makedirs(save_dir, exist_ok=True)
-            for uploaded_file in uploaded_files:
-                with open(os.path.join(save_dir, uploaded_file.name), "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-            st.success(f"✅ {len(uploaded_files)} 枚を保存: {save_dir}")
+            save_dir = uploads.images_dir(project_name)
+            count = uploads.save_files([(f.name, f) for f in uploaded_files], save_dir)
+            st.success(f"✅ {count} 枚を保存: {save_dir}")
+    elif upload_type == "大容量アップロード (チャンク・再開可能)":
+        st.info("動画 / ZIP / 画像を8MBずつ送信します。途中で切れても同じファイルを選び直すと続きから再開します。")
+        with open(os.path.join(os.path.dirname(uploads.__file__), "templates", "uploader.html")) as f:
+            uploader_html = f.read()
+        uploader_html = uploader_html.replace("__PROJECT__", json.dumps(project_name))
+        uploader_html = uploader_html.replace("__PORT__", str(FILESERVER_PORT))
+        uploader_html = uploader_html.replace("__TOKEN__", json.dumps(fileserver_token()))
+        components.html(uploader_html, height=260)
+        st.caption(f"ファイルサーバー: ポート {FILESERVER_PORT} (docker-compose.yml で公開)")
+    else:
+        st.info("サーバー (コンテナ) 上の動画・画像フォルダはコピーせずリンクします。ZIPは画像を展開します。")
+        server_path = st.text_input("パス", placeholder="/workspace/data/raw/drone_001.zip")
+        copy_input = st.checkbox("リンクではなくコピーする", value=False)
+        if st.button("📥 取り込み") and server_path:
+            try:
+                with st.spinner("取り込み中..."):
+                    input_path, data_type = uploads.import_input(server_path, project_name, copy=copy_input)
+                st.success(f"✅ {data_type}: {input_path}")
+            except (OSError, ValueError) as e:
+                st.error(f"❌ 取り込みに失敗しました: {e}")
 
 
 # ==========================================
@@ -353,114 +569,43 @@ elif page == "2. ⚙️ データ前処理":
         )
 
         num_frames = st.number_input("フレーム数 (動画の場合)", value=300, min_value=10)
+        sharp_frames = st.checkbox(
+            "🔍 ブレの少ないフレームを選別 (GLOMAP・動画)", value=True,
+            help="一定区間ごとに最もシャープなフレームを選びます (ラプラシアン分散)。オフにすると等間隔で抽出します"
+        )
+        use_cache = st.checkbox(
+            "♻️ ステージキャッシュを使う", value=True,
+            help="入力と設定が同じステージ (フレーム抽出・特徴抽出・マッチング・Mapper) は前回の結果を再利用します"
+        )
+
+        matcher_options = list(commands.MATCHERS)
+        if "GLOMAP" not in sfm_engine:
+            matcher_options = ["auto", *commands.NS_MATCHING_METHODS]
+        matcher = st.selectbox(
+            "🔗 マッチング方式", matcher_options, format_func=lambda m: commands.MATCHERS[m],
+            help="全ペアマッチングはフレーム数の2乗で遅くなります。動画はシーケンシャルが高速です"
+        )
+        if matcher == "auto":
+            num_images = num_frames if data_type == "video" else commands.count_images(input_path)
+            st.caption(f"→ {commands.MATCHERS[commands.choose_matcher(data_type, num_images)]}")
 
         if "GLOMAP" in sfm_engine:
             st.info("💡 GLOMAPパイプライン: 特徴抽出 → マッチング → GLOMAP Mapper")
 
             if st.button("🚀 前処理開始 (GLOMAP)"):
-                progress_bar = st.progress(0, text="準備中...")
-                log_area = st.empty()
-
-                # Step 1: Extract frames from video (if video)
-                if data_type == "video":
-                    progress_bar.progress(0.05, text="Step 1/5: フレーム抽出...")
-                    os.makedirs(os.path.join(output_path, "images"), exist_ok=True)
-                    duration = get_video_duration(input_path)
-                    extract_fps = max(num_frames / duration, 1)
-                    ffmpeg_cmd = [
-                        "ffmpeg", "-i", input_path,
-                        "-vf", f"fps={extract_fps:.4f}",
-                        "-q:v", "1",
-                        os.path.join(output_path, "images", "frame_%05d.jpg")
-                    ]
-                    run_command(ffmpeg_cmd, log_area)
-
-                images_dir = os.path.join(output_path, "images") if data_type == "video" else input_path
-                db_path = os.path.join(output_path, "database.db")
-                sparse_path = os.path.join(output_path, "sparse")
-                os.makedirs(sparse_path, exist_ok=True)
-
-                # Step 2: Feature extraction
-                progress_bar.progress(0.2, text="Step 2/5: COLMAP特徴抽出...")
-                cmd_feat = [
-                    "colmap", "feature_extractor",
-                    "--image_path", images_dir,
-                    "--database_path", db_path
-                ]
-                ret = run_command(cmd_feat, log_area)
-                if ret != 0:
-                    st.error("❌ 特徴抽出に失敗しました")
-                    st.stop()
-
-                # Step 3: Matching
-                progress_bar.progress(0.4, text="Step 3/5: COLMAPマッチング...")
-                cmd_match = [
-                    "colmap", "exhaustive_matcher",
-                    "--database_path", db_path
-                ]
-                ret = run_command(cmd_match, log_area)
-                if ret != 0:
-                    st.error("❌ マッチングに失敗しました")
-                    st.stop()
-
-                # Step 4: GLOMAP Mapper
-                progress_bar.progress(0.6, text="Step 4/5: GLOMAP Mapper (グローバルSfM)...")
-                cmd_glomap = [
-                    "glomap", "mapper",
-                    "--database_path", db_path,
-                    "--image_path", images_dir,
-                    "--output_path", sparse_path
-                ]
-                ret = run_command(cmd_glomap, log_area)
-                if ret != 0:
-                    st.error("❌ GLOMAP Mapperに失敗しました")
-                    st.stop()
-
-                # Step 5: Convert to nerfstudio format
-                progress_bar.progress(0.8, text="Step 5/5: Nerfstudio形式に変換...")
-                cmd_convert = [
-                    "ns-process-data", "images",
-                    "--data", images_dir,
-                    "--output-dir", output_path,
-                    "--skip-colmap",
-                    "--colmap-model-path", os.path.join(sparse_path, "0"),
-                ]
-                ret = run_command(cmd_convert, log_area)
-
-                progress_bar.progress(1.0, text="✅ 完了")
-                transforms_file = os.path.join(output_path, "transforms.json")
-                if ret == 0 and os.path.exists(transforms_file):
-                    st.success("✅ GLOMAP前処理完了！")
-                    st.balloons()
-                else:
-                    st.error("❌ 前処理に失敗しました")
+                steps = commands.glomap_preprocess_steps(input_path, data_type, output_path, num_frames,
+                                                         use_cache=use_cache, matcher=matcher,
+                                                         sharp_frames=sharp_frames)
+                submit_job("preprocess", steps, project_name, "GLOMAP前処理", output_path, resource="colmap")
         else:
             # Standard COLMAP via ns-process-data
             if st.button("🚀 前処理開始 (COLMAP)"):
-                progress_bar = st.progress(0, text="COLMAP処理中...")
-                progress_config = {
-                    'type': 'steps',
-                    'total_steps': 4,
-                    'step_patterns': [
-                        r'(?:extracting|feature)',
-                        r'(?:matching|exhaustive)',
-                        r'(?:mapper|triangulat|reconstruct)',
-                        r'(?:undistort|export|transform)',
-                    ]
-                }
-                cmd = ["ns-process-data", data_type, "--data", input_path, "--output-dir", output_path]
-                if data_type == "video":
-                    cmd.extend(["--num-frames-target", str(num_frames)])
-                st.write(f"実行: `{' '.join(cmd)}`")
-                log_area = st.empty()
-                ret = run_command(cmd, log_area, progress_bar, progress_config)
-
-                transforms_file = os.path.join(output_path, "transforms.json")
-                if ret == 0 and os.path.exists(transforms_file):
-                    st.success("✅ 前処理完了！")
-                    st.balloons()
-                else:
-                    st.error("❌ 前処理に失敗しました")
+                steps = commands.colmap_preprocess_steps(input_path, data_type, output_path, num_frames,
+                                                         use_cache=use_cache, matcher=matcher)
+                st.write(f"実行: `{' '.join(steps[0]['cmd'])}`")
+                submit_job("preprocess", steps, project_name, "COLMAP前処理", output_path, resource="colmap")
+
+        show_job("preprocess", project_name, success_message="✅ 前処理完了！")
 
 
 # ==========================================
@@ -505,55 +650,81 @@ elif page == "3. 🏋️ トレーニング":
         for category, models in NERFSTUDIO_MODELS.items():
             all_models.update(models)
 
-        category = st.selectbox("カテゴリ", list(NERFSTUDIO_MODELS.keys()))
-        models_in_cat = NERFSTUDIO_MODELS[category]
-        model_type = st.selectbox(
-            "モデル",
-            list(models_in_cat.keys()),
-            format_func=lambda x: f"{x} — {models_in_cat[x]}"
-        )
+        # Earlier runs can be continued (more iterations) or fine-tuned on updated data instead of starting over
+        ns_runs = commands.ns_runs(project_name)
+        start_mode = st.radio("開始方法", ["new", "continue", "finetune"], horizontal=True,
+                              format_func=lambda m: {"new": "🆕 新規", "continue": "⏩ 続きから学習",
+                                                     "finetune": "🔁 更新データで微調整"}[m],
+                              help="続きから学習: 同じ実行に追加イテレーション分だけ学習します。"
+                                   "微調整: 画像を追加した後など、既存の実行の重みから新しい実行を始めます")
+
+        if start_mode == "new":
+            category = st.selectbox("カテゴリ", list(NERFSTUDIO_MODELS.keys()))
+            models_in_cat = NERFSTUDIO_MODELS[category]
+            model_type = st.selectbox(
+                "モデル",
+                list(models_in_cat.keys()),
+                format_func=lambda x: f"{x} — {models_in_cat[x]}"
+            )
+            source_config = None
+        elif not ns_runs:
+            st.info("チェックポイントのある実行がありません。まず新規にトレーニングしてください")
+            model_type = source_config = None
+        else:
+            source_config = st.selectbox(
+                "継続元の実行", ns_runs,
+                format_func=lambda x: f"{os.path.relpath(os.path.dirname(x), os.path.join(OUTPUT_DIR, project_name))} "
+                                      f"(step {commands.ns_checkpoint_step(os.path.dirname(x)):,})")
+            model_type = os.path.basename(os.path.dirname(os.path.dirname(source_config)))
+            if start_mode == "continue" and os.path.getmtime(transforms_file) > os.path.getmtime(source_config):
+                st.warning("⚠️ transforms.json がこの実行より新しいです。データを更新した場合は「更新データで微調整」を使ってください")
 
         # Advanced options
         with st.expander("⚙️ 詳細設定"):
-            max_iterations = st.number_input("最大イテレーション", value=30000, min_value=1000, step=1000)
+            if start_mode == "new":
+                max_iterations = st.number_input("最大イテレーション", value=30000, min_value=1000, step=1000)
+            elif start_mode == "continue":
+                max_iterations = st.number_input("追加イテレーション", value=20000, min_value=1000, step=1000,
+                                                 help="チェックポイントのstepから続けて学習します")
+            else:
+                max_iterations = st.number_input("微調整イテレーション", value=10000, min_value=1000, step=1000,
+                                                 help="学習率スケジュールとdensificationは最初からやり直します")
             viewer_enabled = st.checkbox("Viewer有効化", value=True)
 
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("🚀 トレーニング開始"):
-                timestamp = time.strftime("%Y-%m-%d_%H%M%S")
-                cmd = [
-                    "ns-train", model_type,
-                    "--data", data_path,
-                    "--viewer.quit-on-train-completion", "False",
-                    "--viewer.websocket-port", "7007",
-                    "--viewer.websocket-host", "0.0.0.0",
-                    "--project-name", project_name,
-                    "--timestamp", timestamp,
-                    "--max-num-iterations", str(max_iterations),
-                ]
-                if viewer_enabled:
-                    cmd.extend(["--vis", "viewer"])
+            if st.button("🚀 トレーニング開始", disabled=model_type is None):
+                if start_mode == "continue":
+                    timestamp = os.path.basename(os.path.dirname(source_config))
+                    steps = commands.ns_continue_steps(source_config, data_path, max_iterations, viewer_enabled)
+                    title = f"Nerfstudio {model_type} (続き)"
                 else:
-                    cmd.extend(["--vis", "tensorboard"])
+                    timestamp = time.strftime("%Y-%m-%d_%H%M%S")
+                    if start_mode == "finetune":
+                        steps = commands.ns_finetune_steps(source_config, data_path, project_name, max_iterations,
+                                                           viewer_enabled, timestamp)
+                        title = f"Nerfstudio {model_type} (微調整)"
+                    else:
+                        steps = commands.ns_train_steps(model_type, data_path, project_name, max_iterations,
+                                                        viewer_enabled, timestamp)
+                        title = f"Nerfstudio {model_type}"
 
-                st.write(f"実行: `{' '.join(cmd)}`")
+                st.write(f"実行: `{' '.join(steps[-1]['cmd'])}`")
                 st.info("🔄 トレーニング中... ログは下に表示されます")
                 if viewer_enabled:
                     st.info("🖥️ Viewer: http://localhost:7007")
 
-                progress_bar = st.progress(0, text="トレーニング開始...")
-                progress_config = {
-                    'type': 'iterations',
-                    'iteration_pattern': r'(?:Step|step|Iter).*?(\d+).*?/.*?(\d+)',
-                    'total_iterations': max_iterations,
-                }
-                log_area = st.empty()
-                run_command(cmd, log_area, progress_bar, progress_config)
+                # Only one run can serve the viewer on the exposed port
+                locks = ["viewer:7007"] if viewer_enabled else []
+                submit_job("train", steps, project_name, title,
+                           commands.ns_run_dir(project_name, model_type, timestamp),
+                           resource=model_type, locks=locks)
 
         with col2:
             if st.button("⏹️ トレーニング停止"):
-                stop_process()
+                stop_job("train", project_name)
+
+        show_job("train", project_name, success_message="✅ トレーニング完了！")
 
         # Viewer iframe
         if st.checkbox("Viewerを表示", value=True):
@@ -564,6 +735,46 @@ elif page == "3. 🏋️ トレーニング":
             except Exception:
                 st.warning("Viewerが読み込めません。トレーニングを開始してください。")
 
+        # Hyperparameter sweep: many short trials, only the best ones are trained further (studio.sweep)
+        with st.expander("🔬 ハイパーパラメータ探索 (successive halving)"):
+            st.markdown("各試行をまず短く学習して `ns-eval` で評価し、上位 1/η だけを次の段階 (rung) へ続けて学習します。"
+                        "下位の試行はその時点で打ち切るため、全試行をフル学習するより少ないGPU時間で済みます")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                sweep_search = st.radio("探索方法", ["grid", "random"],
+                                        format_func=lambda x: {"grid": "グリッド (全組み合わせ)", "random": "ランダム"}[x])
+                sweep_trials = st.number_input("試行数 (ランダム)", value=16, min_value=2, step=1)
+            with col2:
+                sweep_iterations = st.number_input("最大イテレーション", value=30000, min_value=1000, step=1000,
+                                                   key="sweep_iterations")
+                sweep_min_iterations = st.number_input("最初のrungのイテレーション (上限)", value=3000, min_value=500,
+                                                       step=500)
+            with col3:
+                sweep_eta = st.number_input("η (各rungで残す割合 1/η)", value=3, min_value=2, max_value=8)
+                sweep_metric = st.selectbox("評価指標", list(sweep.METRICS))
+                sweep_parallel = st.number_input("同時に実行する試行", value=2, min_value=1, max_value=8)
+            sweep_space = st.text_area(
+                "探索空間 (JSON)", height=160,
+                value=json.dumps({"model": ["splatfacto"], "densify_grad_thresh": [0.0002, 0.0004, 0.0008],
+                                  "sh_degree": [1, 3], "downscale": [1, 2]}, indent=2),
+                help="キー: model, downscale, " + ", ".join(sweep.PARAM_FLAGS) + ", または ns-train のフラグ "
+                     "(--pipeline...)。ランダム探索では {\"min\": .., \"max\": .., \"log\": true} の範囲も指定できます")
+            if st.button("🔬 スイープ開始"):
+                try:
+                    sweep_dir = sweep.start_sweep({
+                        "project": project_name, "search": sweep_search, "trials": sweep_trials,
+                        "iterations": sweep_iterations, "min_iterations": sweep_min_iterations, "eta": sweep_eta,
+                        "metric": sweep_metric, "parallel": sweep_parallel, "space": json.loads(sweep_space),
+                    })
+                    st.success(f"✅ スイープを開始しました: {sweep_dir}")
+                except (ValueError, OSError) as e:
+                    st.error(f"❌ スイープを開始できません: {e}")
+
+            sweep_dirs = sweep.list_sweeps(project_name)
+            if sweep_dirs:
+                selected_sweep = st.selectbox("スイープ結果", sweep_dirs, format_func=os.path.basename)
+                show_sweep(selected_sweep)
+
     # ------------------------------------------
     # SuGaR Training
     # ------------------------------------------
@@ -578,9 +789,24 @@ elif page == "3. 🏋️ トレーニング":
         > ⏱️ 所要時間: 約15-30分 (RTX 4070)
         """)
 
+        # Finished splatfacto runs can replace the 3DGS pre-training
+        splatfacto_configs = [row["path"] for row in artifact_catalog.find(kinds="config", project=project_name,
+                                                                           root="outputs")
+                              if row["framework"].startswith("splatfacto")]
+        sugar_init_config = st.selectbox(
+            "3DGSモデル", [None, *splatfacto_configs],
+            format_func=lambda x: "SuGaR内で事前学習" if x is None else f"splatfacto: {os.path.relpath(x, OUTPUT_DIR)}",
+            help="学習済みのsplatfactoを選ぶと、そのGaussianをエクスポートして手順1 (3DGS事前学習) を省略します")
+
         with st.expander("⚙️ 詳細設定"):
             gs_iterations = st.number_input("3DGS事前学習イテレーション", value=7000, min_value=1000, step=1000)
             refine_iterations = st.number_input("精密化イテレーション", value=15000, min_value=5000, step=5000)
+            sugar_from_stage = st.selectbox(
+                "再実行", [None, *commands.SUGAR_STAGES],
+                format_func=lambda s: {None: "完了済みステージをスキップ (再開)", "gs": "3DGS事前学習から",
+                                       "coarse": "メッシュ抽出から", "refine": "精密化から"}[s],
+                help="stages.json に記録された完了済みステージは同じ設定なら再利用されます")
+            sugar_mesh_compression = mesh_lod_options("sugar")
 
         col1, col2 = st.columns(2)
         with col1:
@@ -590,34 +816,19 @@ elif page == "3. 🏋️ トレーニング":
                     st.info("💡 ホストで実行: `scripts\\start.bat build-sugar` → `docker compose --profile sugar up -d`")
                     st.stop()
                 output_path = os.path.join(OUTPUT_DIR, project_name, "sugar")
-                cmd = [
-                    "docker", "exec", "sugar",
-                    "python3", "/workspace/scripts/sugar_train.py",
-                    "--data", data_path,
-                    "--output", output_path,
-                    "--gs-iterations", str(gs_iterations),
-                    "--refinement-iterations", str(refine_iterations),
-                ]
-                st.write(f"実行: `{' '.join(cmd)}`")
+                steps = commands.sugar_train_steps(data_path, output_path, gs_iterations, refine_iterations,
+                                                   sugar_from_stage, sugar_init_config)
+                st.write(f"実行: `{' '.join(steps[-1]['cmd'])}`")
+                if sugar_mesh_compression:
+                    steps += commands.mesh_lod_steps(output_path, compression=sugar_mesh_compression)
                 st.info("SuGaRコンテナで実行中...")
-                progress_bar = st.progress(0, text="SuGaRパイプライン開始...")
-                progress_config = {
-                    'type': 'steps',
-                    'total_steps': 5,
-                    'step_patterns': [
-                        r'(?:pre.?train|3dgs.*train|gaussian.*train)',
-                        r'(?:coarse|mesh.*extract)',
-                        r'(?:refin|refinement)',
-                        r'(?:export|saving|output)',
-                        r'(?:done|complete|finish)',
-                    ]
-                }
-                log_area = st.empty()
-                run_command(cmd, log_area, progress_bar, progress_config)
+                submit_job("train", steps, project_name, "SuGaR", output_path, resource="sugar")
 
         with col2:
             if st.button("⏹️ 停止"):
-                stop_process()
+                stop_job("train", project_name)
+
+        show_job("train", project_name, success_message="✅ SuGaRパイプライン完了！")
 
     # ------------------------------------------
     # 2DGS Training
@@ -627,8 +838,7 @@ elif page == "3. 🏋️ トレーニング":
         st.markdown("""
         **2DGSパイプライン:**
         1. 2D Gaussian Splatting 学習
-        2. 深度マップレンダリング
-        3. TSDFメッシュ抽出
+        2. 深度マップレンダリング + TSDFメッシュ抽出 (ストリーミング融合)
 
         > ⏱️ 所要時間: 約20-40分 (RTX 4070)
         """)
@@ -637,6 +847,10 @@ elif page == "3. 🏋️ トレーニング":
             dgs_iterations = st.number_input("トレーニングイテレーション", value=30000, min_value=5000, step=5000)
             depth_ratio = st.slider("深度比率", 0.0, 1.0, 0.0)
             lambda_normal = st.slider("法線一貫性重み", 0.0, 0.5, 0.05)
+            dgs_fusion = st.radio("TSDF融合", ["stream", "two-pass"], horizontal=True,
+                                  help="stream: 1視点ずつレンダリングして疎ボクセルに統合 (省メモリ) / "
+                                       "two-pass: 2DGS標準の render.py → TSDF")
+            dgs_mesh_compression = mesh_lod_options("2dgs")
 
         col1, col2 = st.columns(2)
         with col1:
@@ -646,29 +860,19 @@ elif page == "3. 🏋️ トレーニング":
                     st.info("💡 ホストで実行: `scripts\\start.bat build-2dgs` → `docker compose --profile 2dgs up -d`")
                     st.stop()
                 output_path = os.path.join(OUTPUT_DIR, project_name, "2dgs")
-                cmd = [
-                    "docker", "exec", "2dgs",
-                    "python3", "/workspace/scripts/2dgs_train.py",
-                    "--data", data_path,
-                    "--output", output_path,
-                    "--iterations", str(dgs_iterations),
-                    "--depth-ratio", str(depth_ratio),
-                    "--lambda-normal", str(lambda_normal),
-                ]
-                st.write(f"実行: `{' '.join(cmd)}`")
+                steps = commands.dgs_train_steps(data_path, output_path, dgs_iterations, depth_ratio, lambda_normal,
+                                                 dgs_fusion)
+                if dgs_mesh_compression:
+                    steps += commands.mesh_lod_steps(output_path, compression=dgs_mesh_compression)
+                st.write(f"実行: `{' '.join(steps[0]['cmd'])}`")
                 st.info("2DGSコンテナで実行中...")
-                progress_bar = st.progress(0, text="2DGSトレーニング開始...")
-                progress_config = {
-                    'type': 'iterations',
-                    'iteration_pattern': r'(?:iteration|iter|step)\s*(\d+)',
-                    'total_iterations': dgs_iterations,
-                }
-                log_area = st.empty()
-                run_command(cmd, log_area, progress_bar, progress_config)
+                submit_job("train", steps, project_name, "2DGS", output_path, resource="2dgs")
 
         with col2:
             if st.button("⏹️ 停止 "):
-                stop_process()
+                stop_job("train", project_name)
+
+        show_job("train", project_name, success_message="✅ 2DGSパイプライン完了！")
 
 
 # ==========================================
@@ -688,6 +892,15 @@ elif page == "4. 📦 エクスポート":
 
     default_idx = projects.index(st.session_state.current_project) if st.session_state.current_project in projects else 0
     selected_project = st.selectbox("プロジェクト選択", projects, index=default_idx)
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 ファイル一覧を再スキャン", help="ジョブ以外で追加・削除したファイルを反映します"):
+            with st.spinner("outputs/ と exports/ をスキャン中..."):
+                count = artifact_catalog.rescan()
+            st.toast(f"{count} ファイルを登録しました")
+    with col2:
+        st.link_button("🗜️ プロジェクト出力をZIPでダウンロード", project_zip_url(selected_project, browser_host()),
+                       help=f"outputs/{selected_project} をその場でZIPにしながら送信します")
 
     # ==========================================
     # Tab layout for different export types
@@ -705,44 +918,75 @@ elif page == "4. 📦 エクスポート":
     with tab_ns:
         st.subheader("Nerfstudio エクスポート")
 
-        # Find config files
-        base_path = os.path.join(OUTPUT_DIR, selected_project)
-        configs = glob.glob(os.path.join(base_path, "**", "config.yml"), recursive=True)
-        configs.sort(key=os.path.getmtime, reverse=True)
+        # Config files of the project's runs, newest first
+        configs = artifact_catalog.paths(kinds="config", project=selected_project, root="outputs")
 
         if configs:
             config_path = st.selectbox("チェックポイント", configs, key="ns_config")
-            export_format = st.selectbox(
+            export_formats = st.multiselect(
                 "エクスポート形式",
                 list(EXPORT_FORMATS.keys()),
-                format_func=lambda x: EXPORT_FORMATS[x]
+                default=["gaussian-splat"],
+                format_func=lambda x: EXPORT_FORMATS[x],
+                help="選んだ形式はすべて1つのジョブでチェックポイントを1回だけ読み込んで出力します"
+            )
+            export_glb = st.checkbox(
+                "🧊 GLBも出力", value=False,
+                help="出力したPLYをすべてGLBに変換します (CPUで並列実行)"
             )
 
-            if st.button("📦 Nerfstudioエクスポート"):
+            splat_formats, splat_sh_degree, splat_lod, splat_prune = [], None, False, False
+            if "gaussian-splat" in export_formats:
+                splat_prune = st.checkbox(
+                    "✂️ 不要なGaussianを削減", value=False,
+                    help="ほぼ透明・極小・どの学習カメラにも写らないGaussianを削除し、重複を統合します (CPUのみ)"
+                )
+                if splat_prune:
+                    prune_col1, prune_col2, prune_col3 = st.columns(3)
+                    prune_min_opacity = prune_col1.number_input("最小不透明度", value=0.005, min_value=0.0,
+                                                                max_value=0.5, step=0.005, format="%.3f")
+                    prune_min_views = prune_col2.number_input("最小カメラ数", value=1, min_value=0, max_value=20)
+                    prune_dedupe = prune_col3.checkbox("重複を統合", value=True)
+                splat_formats = st.multiselect(
+                    "軽量形式も出力", list(SPLAT_FORMATS), default=["compressed-ply"],
+                    format_func=lambda x: SPLAT_FORMATS[x],
+                    help="量子化・Morton順ソートしたファイルを追加で書き出し、サイズと画質 (色PSNR) を比較表示します"
+                )
+                splat_lod = st.checkbox(
+                    "🧱 LOD・タイル分割 (ストリーミング用)", value=False,
+                    help="八分木でタイル分割し、統合で間引いた粗いレベルと index.json を lod/ に書き出します"
+                )
+                if splat_formats or splat_lod:
+                    splat_sh_degree = st.select_slider(
+                        "SH次数 (視点依存の色)", options=[0, 1, 2, 3], value=3,
+                        help="次数を下げるとファイルが大幅に小さくなります (0 = 視点に依存しない色のみ)"
+                    )
+
+            if st.button("📦 Nerfstudioエクスポート", disabled=not export_formats):
                 output_name = f"{selected_project}_ns_{int(time.time())}"
                 export_out_dir = os.path.join(EXPORT_DIR, output_name)
-                cmd = ["ns-export", export_format, "--load-config", config_path, "--output-dir", export_out_dir]
-                st.write(f"実行: `{' '.join(cmd)}`")
-                log_area = st.empty()
-                run_command(cmd, log_area)
-
-                ply_files = find_ply_files(export_out_dir)
-                if ply_files:
-                    st.success(f"✅ エクスポート完了: {export_out_dir}")
-                    for ply in ply_files:
-                        file_name = os.path.basename(ply)
-                        file_size = os.path.getsize(ply) / (1024 * 1024)
-                        st.write(f"📄 {file_name} ({file_size:.1f} MB)")
-                        with open(ply, "rb") as f:
-                            st.download_button(
-                                label=f"⬇️ {file_name} をダウンロード",
-                                data=f,
-                                file_name=file_name,
-                                mime="application/octet-stream",
-                                key=f"dl_{file_name}"
-                            )
-                else:
-                    st.warning("PLYファイルが見つかりませんでした")
+                steps = commands.ns_export_steps(export_formats, config_path, export_out_dir, export_glb)
+                splat_path = os.path.join(export_out_dir, NS_SPLAT_NAME)
+                if splat_prune:
+                    pruned_path = os.path.join(export_out_dir, PRUNED_SPLAT_NAME)
+                    # Training cameras for the visibility test, in the frame ns-export writes splats in
+                    cameras = os.path.join(DATA_DIR, selected_project, "transforms.json")
+                    dataparser = os.path.join(os.path.dirname(config_path), "dataparser_transforms.json")
+                    steps += commands.splat_prune_steps(
+                        splat_path, pruned_path, cameras if os.path.exists(cameras) else None,
+                        dataparser if os.path.exists(dataparser) else None,
+                        prune_min_opacity, prune_min_views, 0.0005 if prune_dedupe else None)
+                    splat_path = pruned_path
+                if splat_formats:
+                    steps += commands.splat_compress_steps(splat_path, export_out_dir, splat_formats, splat_sh_degree)
+                if splat_lod:
+                    steps += commands.splat_lod_steps(splat_path, os.path.join(export_out_dir, "lod"),
+                                                      sh_degree=splat_sh_degree)
+                st.write(f"実行: `{' '.join(steps[0]['cmd'])}`")
+                submit_job("export", steps, selected_project, f"Nerfstudio {', '.join(export_formats)}", export_out_dir,
+                           resource="ns-export")
+
+            show_job("export", selected_project, on_success=show_export_files)
         else:
             st.warning("トレーニング済みチェックポイントがありません")
 
@@ -754,26 +998,16 @@ elif page == "4. 📦 エクスポート":
         sugar_path = os.path.join(OUTPUT_DIR, selected_project, "sugar")
 
         if os.path.exists(sugar_path):
-            ply_files = find_ply_files(sugar_path)
-            obj_files = find_obj_files(sugar_path)
-            all_files = ply_files + obj_files
+            all_files = artifact_catalog.find(kinds=["ply", "obj"], project=selected_project, framework="sugar")
 
             if all_files:
                 st.success(f"✅ {len(all_files)} ファイルが見つかりました")
-                for filepath in all_files:
-                    file_name = os.path.basename(filepath)
-                    file_size = os.path.getsize(filepath) / (1024 * 1024)
-                    st.write(f"📄 {file_name} ({file_size:.1f} MB)")
-                    with open(filepath, "rb") as f:
-                        st.download_button(
-                            label=f"⬇️ {file_name}",
-                            data=f,
-                            file_name=file_name,
-                            mime="application/octet-stream",
-                            key=f"sugar_dl_{file_name}"
-                        )
+                for artifact in all_files:
+                    file_name = os.path.basename(artifact["path"])
+                    download_link(artifact["path"], f"⬇️ {file_name}", artifact["size"])
             else:
                 st.info("SuGaRの出力ファイルがまだありません")
+            show_mesh_lod_section(sugar_path, selected_project, "SuGaR")
         else:
             st.info("SuGaRトレーニングが実行されていません")
 
@@ -785,23 +1019,15 @@ elif page == "4. 📦 エクスポート":
         dgs_path = os.path.join(OUTPUT_DIR, selected_project, "2dgs")
 
         if os.path.exists(dgs_path):
-            ply_files = find_ply_files(dgs_path)
+            ply_files = artifact_catalog.find(kinds="ply", project=selected_project, framework="2dgs")
             if ply_files:
                 st.success(f"✅ {len(ply_files)} ファイルが見つかりました")
-                for filepath in ply_files:
-                    file_name = os.path.basename(filepath)
-                    file_size = os.path.getsize(filepath) / (1024 * 1024)
-                    st.write(f"📄 {file_name} ({file_size:.1f} MB)")
-                    with open(filepath, "rb") as f:
-                        st.download_button(
-                            label=f"⬇️ {file_name}",
-                            data=f,
-                            file_name=file_name,
-                            mime="application/octet-stream",
-                            key=f"2dgs_dl_{file_name}"
-                        )
+                for artifact in ply_files:
+                    file_name = os.path.basename(artifact["path"])
+                    download_link(artifact["path"], f"⬇️ {file_name}", artifact["size"])
             else:
                 st.info("2DGSの出力ファイルがまだありません")
+            show_mesh_lod_section(dgs_path, selected_project, "2DGS")
         else:
             st.info("2DGSトレーニングが実行されていません")
 
@@ -813,25 +1039,17 @@ elif page == "4. 📦 エクスポート":
         st.markdown("PLYメッシュをGLBに変換します。GLBはPlayCanvasやWebブラウザで表示可能です。")
 
         # Find all exported PLY files
-        all_plys = find_ply_files(EXPORT_DIR) + find_ply_files(OUTPUT_DIR)
+        all_plys = artifact_catalog.paths(kinds="ply", root="exports") + artifact_catalog.paths(kinds="ply", root="outputs")
 
         if all_plys:
             selected_ply = st.selectbox("変換するPLYファイル", all_plys)
             if st.button("🔄 GLBに変換"):
                 glb_path = selected_ply.rsplit('.', 1)[0] + ".glb"
-                with st.spinner("変換中..."):
-                    if convert_ply_to_glb(selected_ply, glb_path):
-                        glb_size = os.path.getsize(glb_path) / (1024 * 1024)
-                        st.success(f"✅ 変換完了: {glb_path} ({glb_size:.1f} MB)")
-                        with open(glb_path, "rb") as f:
-                            st.download_button(
-                                label="⬇️ GLBをダウンロード",
-                                data=f,
-                                file_name=os.path.basename(glb_path),
-                                mime="model/gltf-binary"
-                            )
-                    else:
-                        st.error("変換に失敗しました")
+                steps = commands.glb_convert_steps(selected_ply, glb_path)
+                submit_job("convert", steps, selected_project, f"GLB変換: {os.path.basename(selected_ply)}",
+                           os.path.dirname(glb_path))
+
+            show_job("convert", selected_project, on_success=show_glb_download)
         else:
             st.info("エクスポート済みのPLYファイルがありません")
 
@@ -860,4 +1078,9 @@ elif page == "4. 📦 エクスポート":
 # ==========================================
 st.markdown("---")
 with st.expander("📋 プロセスログ", expanded=False):
-    st.code("\n".join(st.session_state.logs))
+    if st.session_state.active_jobs:
+        log_kind = st.selectbox("ジョブ", list(st.session_state.active_jobs.keys()), key="log_job_kind")
+        log_job = job_store.get(st.session_state.active_jobs[log_kind])
+        if log_job:
+            st.caption(log_job["log_path"])
+            st.code("\n".join(read_log_tail(log_job["log_path"], max_lines=1000, max_bytes=1024 * 1024)))
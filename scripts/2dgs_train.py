@@ -4,9 +4,13 @@
 Runs inside the 2DGS Docker container.
 Pipeline: Train 2DGS → Extract mesh → Export PLY
 
+The mesh is fused by stream_tsdf.py (views rendered and integrated one at a
+time into a sparse block volume); --fusion two-pass runs 2DGS's render.py
+and TSDF script instead.
+
 Usage:
   python3 2dgs_train.py --data /workspace/data/nerfstudio/<project> \
-                        --output /workspace/outputs/<project>/2dgs
+                        --output /workspace/outputs/<project>/2dgs [--fusion two-pass]
 """
 
 import argparse
@@ -14,24 +18,24 @@ import os
 import sys
 import subprocess
 
+from progress_events import ProgressReporter, stream_output
+
 
-def run_cmd(cmd, desc=""):
-    """Run a command and stream output."""
+def run_cmd(cmd, desc="", reporter=None, iteration_pattern=None, total=None):
+    """Run a command and stream output (progress bars become progress events)."""
     print(f"\n{'='*60}")
     print(f"[2DGS] {desc}")
     print(f"Command: {' '.join(cmd)}")
-    print(f"{'='*60}\n")
+    print(f"{'='*60}\n", flush=True)
 
     process = subprocess.Popen(
         cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-        text=True, bufsize=1
+        env=dict(os.environ, PYTHONUNBUFFERED="1"),
     )
-    for line in process.stdout:
-        print(line, end='')
-    process.wait()
+    returncode = stream_output(process, reporter, iteration_pattern, total)
 
-    if process.returncode != 0:
-        print(f"\n[ERROR] Command failed with return code {process.returncode}")
+    if returncode != 0:
+        print(f"\n[ERROR] Command failed with return code {returncode}")
         return False
     return True
 
@@ -73,6 +77,10 @@ def main():
                         help="Depth ratio for regularization (default: 0.0)")
     parser.add_argument("--lambda-normal", type=float, default=0.05,
                         help="Normal consistency loss weight (default: 0.05)")
+    parser.add_argument("--fusion", choices=["stream", "two-pass"], default="stream",
+                        help="stream: stream_tsdf.py, two-pass: render.py + TSDF script (default: stream)")
+    parser.add_argument("--mesh-res", type=int, default=1024,
+                        help="TSDF voxels across the scene depth (default: 1024)")
     args = parser.parse_args()
 
     dgs_dir = "/opt/2dgs"
@@ -84,6 +92,11 @@ def main():
 
     os.makedirs(args.output, exist_ok=True)
     model_output = os.path.join(args.output, "model")
+    # Weights: share of the total run time each stage usually takes
+    if args.fusion == "stream":
+        reporter = ProgressReporter([("2DGS Training", 0.85), ("Streaming TSDF Fusion", 0.15)])
+    else:
+        reporter = ProgressReporter([("2DGS Training", 0.85), ("Rendering", 0.1), ("TSDF Mesh Extraction", 0.05)])
 
     # Step 1: 2DGS Training
     print("\n" + "="*60)
@@ -98,7 +111,9 @@ def main():
         "--depth_ratio", str(args.depth_ratio),
         "--lambda_normal", str(args.lambda_normal),
     ]
-    if not run_cmd(train_cmd, "2DGS Training"):
+    reporter.start_stage(0)
+    if not run_cmd(train_cmd, "2DGS Training", reporter):
+        reporter.finish(ok=False)
         sys.exit(1)
 
     # Step 2: Mesh Extraction (TSDF Fusion)
@@ -106,25 +121,43 @@ def main():
     print("[2DGS Pipeline] Step 2/2: Mesh Extraction (TSDF)")
     print("="*60)
 
-    render_cmd = [
-        "python3", os.path.join(dgs_dir, "render.py"),
-        "-s", scene_path,
-        "-m", model_output,
-        "--depth_ratio", str(args.depth_ratio),
-    ]
-    if not run_cmd(render_cmd, "Rendering depth maps"):
-        print("[WARNING] Rendering had issues.")
-
-    # TSDF mesh extraction
     mesh_output = os.path.join(args.output, "mesh")
     os.makedirs(mesh_output, exist_ok=True)
 
-    tsdf_cmd = [
-        "python3", os.path.join(dgs_dir, "scripts", "tsdf_fusion.py" if os.path.exists(os.path.join(dgs_dir, "scripts", "tsdf_fusion.py")) else "extract_mesh.py"),
-        "-m", model_output,
-        "-o", mesh_output,
-    ]
-    run_cmd(tsdf_cmd, "TSDF Mesh Extraction")
+    if args.fusion == "stream":
+        # Renders and integrates one view at a time: memory bounded by the surface, nothing written per view
+        fusion_cmd = [
+            "python3", os.path.join(os.path.dirname(os.path.abspath(__file__)), "stream_tsdf.py"),
+            "--model-dir", model_output,
+            "--output-dir", mesh_output,
+            "--depth-ratio", str(args.depth_ratio),
+            "--mesh-res", str(args.mesh_res),
+        ]
+        reporter.start_stage(1)
+        if not run_cmd(fusion_cmd, "Streaming TSDF Fusion", reporter):
+            reporter.finish(ok=False)
+            sys.exit(1)
+        reporter.finish()
+    else:
+        render_cmd = [
+            "python3", os.path.join(dgs_dir, "render.py"),
+            "-s", scene_path,
+            "-m", model_output,
+            "--depth_ratio", str(args.depth_ratio),
+        ]
+        reporter.start_stage(1)
+        if not run_cmd(render_cmd, "Rendering depth maps", reporter):
+            print("[WARNING] Rendering had issues.")
+
+        # TSDF mesh extraction
+        tsdf_cmd = [
+            "python3", os.path.join(dgs_dir, "scripts", "tsdf_fusion.py" if os.path.exists(os.path.join(dgs_dir, "scripts", "tsdf_fusion.py")) else "extract_mesh.py"),
+            "-m", model_output,
+            "-o", mesh_output,
+        ]
+        reporter.start_stage(2)
+        run_cmd(tsdf_cmd, "TSDF Mesh Extraction", reporter)
+        reporter.finish()
 
     # Summary
     print("\n" + "="*60)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+PLY→GLB Benchmark
+Runs convert_ply_to_glb.py with each engine in its own process and reports
+wall time, throughput and peak memory (max RSS of the child process).
+
+Without --input, a synthetic Gaussian splat PLY is generated (random
+values, same layout as a 3DGS / splatfacto export).
+
+Usage:
+  python3 bench_ply_to_glb.py --input splat.ply [--engines native trimesh] [--quantize]
+  python3 bench_ply_to_glb.py --synthetic 1000000 [--sh-degree 3] [--json result.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from ply_io import PlyFile
+
+CONVERTER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "convert_ply_to_glb.py")
+
+
+def write_synthetic_splat(path, count, sh_degree=3, seed=0):
+    """Random Gaussian splat PLY with `count` points (written in blocks)."""
+    rest = 3 * ((sh_degree + 1) ** 2 - 1)
+    names = (["x", "y", "z", "nx", "ny", "nz", "f_dc_0", "f_dc_1", "f_dc_2"]
+             + [f"f_rest_{i}" for i in range(rest)]
+             + ["opacity", "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"])
+    dtype = np.dtype([(name, "<f4") for name in names])
+    rng = np.random.default_rng(seed)
+    header = (f"ply\nformat binary_little_endian 1.0\nelement vertex {count}\n"
+              + "".join(f"property float {name}\n" for name in names) + "end_header\n")
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        for start in range(0, count, 1 << 18):
+            n = min(1 << 18, count - start)
+            block = np.zeros(n, dtype=dtype)
+            for name in names:
+                block[name] = rng.normal(size=n)
+            block["scale_0"] = block["scale_1"] = block["scale_2"] = rng.normal(-4.0, 0.5, size=n)
+            f.write(block.tobytes())
+
+
+def run_engine(engine, input_path, output_path, extra_args):
+    """(seconds, peak RSS in MB, exit code) of one conversion."""
+    cmd = [sys.executable, CONVERTER, "--input", input_path, "--output", output_path, "--engine", engine]
+    started = time.perf_counter()
+    process = subprocess.Popen(cmd + extra_args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        print(process.stderr.read().decode(errors="replace"), file=sys.stderr)
+    process.stderr.close()
+    return seconds, usage.ru_maxrss / 1024, process.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PLY→GLB Benchmark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="PLY file to convert")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Generate a Gaussian splat with N points")
+    parser.add_argument("--sh-degree", type=int, default=3, choices=[0, 1, 2, 3],
+                        help="SH degree of the synthetic splat (default: 3)")
+    parser.add_argument("--engines", nargs="+", default=["native", "trimesh"], choices=["native", "trimesh"])
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per engine (best time is reported)")
+    parser.add_argument("--quantize", action="store_true", help="Pass --quantize to the native engine")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_glb_") as tmp:
+        input_path = args.input
+        if args.synthetic:
+            input_path = os.path.join(tmp, "synthetic.ply")
+            print(f"[Bench] Writing synthetic splat: {args.synthetic:,} points, SH degree {args.sh_degree}")
+            write_synthetic_splat(input_path, args.synthetic, args.sh_degree)
+        if not os.path.exists(input_path):
+            print(f"[ERROR] Input file not found: {input_path}")
+            sys.exit(1)
+        points = PlyFile(input_path).vertices().shape[0]
+        input_mb = os.path.getsize(input_path) / (1024 * 1024)
+        print(f"[Bench] Input: {input_path} ({points:,} points, {input_mb:.1f} MB)")
+
+        results = []
+        for engine in args.engines:
+            output_path = os.path.join(tmp, f"{engine}.glb")
+            extra = ["--quantize"] if args.quantize and engine == "native" else []
+            runs = [run_engine(engine, input_path, output_path, extra) for _ in range(args.repeat)]
+            if any(code != 0 for _, _, code in runs):
+                print(f"[Bench] {engine}: failed")
+                results.append({"engine": engine, "ok": False})
+                continue
+            seconds = min(s for s, _, _ in runs)
+            results.append({
+                "engine": engine, "ok": True, "seconds": round(seconds, 3),
+                "points_per_s": round(points / seconds), "input_mb_per_s": round(input_mb / seconds, 1),
+                "peak_rss_mb": round(max(rss for _, rss, _ in runs), 1),
+                "output_mb": round(os.path.getsize(output_path) / (1024 * 1024), 1),
+            })
+
+    print(f"\n{'engine':<10}{'time':>10}{'points/s':>14}{'MB/s':>10}{'peak RSS':>12}{'output':>10}")
+    for r in results:
+        if r["ok"]:
+            print(f"{r['engine']:<10}{r['seconds']:>9.2f}s{r['points_per_s']:>14,}{r['input_mb_per_s']:>10.1f}"
+                  f"{r['peak_rss_mb']:>9.0f} MB{r['output_mb']:>7.1f} MB")
+        else:
+            print(f"{r['engine']:<10}{'failed':>10}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"input": input_path, "points": points, "input_mb": round(input_mb, 1), "results": results},
+                      f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+TSDF Fusion Benchmark
+Compares the two ways of meshing rendered views, each in its own process:
+
+  two-pass  like 2DGS render.py + TSDF: every view is rendered and written to
+            disk first, then all of them are loaded and integrated
+            (Open3D ScalableTSDFVolume when installed, else BlockTSDF)
+  stream    stream_tsdf.py: views are rendered into a bounded queue and
+            integrated one at a time into the sparse block volume
+
+The scene is an analytic sphere (radius 1) seen by cameras on a ring, so the
+mesh error is the distance of its vertices to the sphere. Reports wall
+time, peak memory (max RSS of the child), bytes written and mesh error.
+
+Usage:
+  python3 bench_tsdf.py [--views 200] [--width 1280 --height 960] [--voxel 0.004] [--workers 8]
+  python3 bench_tsdf.py --modes stream --json result.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from ply_io import PlyFile
+from stream_tsdf import View, fuse_views
+
+SPHERE_RADIUS = 1.0
+CAMERA_DISTANCE = 3.0
+
+
+# ------------------------------------------
+# Synthetic scene
+# ------------------------------------------
+def look_at(eye):
+    """World-to-camera matrix (OpenCV axes) of a camera at `eye` looking at the origin."""
+    forward = -eye / np.linalg.norm(eye)
+    right = np.cross(forward, [0.0, 0.0, 1.0])
+    right /= np.linalg.norm(right)
+    rotation = np.stack([right, np.cross(forward, right), forward])
+    world_to_camera = np.eye(4)
+    world_to_camera[:3, :3] = rotation
+    world_to_camera[:3, 3] = -rotation @ eye
+    return world_to_camera
+
+
+def sphere_views(count, width, height):
+    """Yields View tuples of the sphere from cameras circling it at varying heights."""
+    focal = 0.9 * width
+    K = np.array([[focal, 0.0, width / 2], [0.0, focal, height / 2], [0.0, 0.0, 1.0]])
+    u, v = np.meshgrid(np.arange(width), np.arange(height))
+    rays = np.stack([(u - K[0, 2]) / focal, (v - K[1, 2]) / focal, np.ones((height, width))], axis=-1)
+    for i in range(count):
+        angle = 2 * np.pi * i / count
+        eye = CAMERA_DISTANCE * np.array([np.cos(angle), np.sin(angle), 0.6 * np.sin(3 * angle)])
+        world_to_camera = look_at(eye)
+        directions = rays @ world_to_camera[:3, :3]  # camera rays in world axes (z component 1 in camera)
+        a = (directions ** 2).sum(-1)
+        b = 2 * directions @ eye
+        disc = b * b - 4 * a * (eye @ eye - SPHERE_RADIUS ** 2)
+        # Ray parameter of the first hit = camera-space depth, since rays have z = 1
+        depth = np.where(disc > 0, (-b - np.sqrt(np.maximum(disc, 0))) / (2 * a), 0.0)
+        normals = (eye + directions * depth[..., None]) / SPHERE_RADIUS
+        rgb = np.where(depth[..., None] > 0, (normals * 0.5 + 0.5) * 255, 0).astype(np.uint8)
+        yield View(rgb, depth.astype(np.float32), K, world_to_camera)
+
+
+def read_vertices(path):
+    vertices = PlyFile(path).vertices()
+    return np.stack([vertices["x"], vertices["y"], vertices["z"]], axis=1)
+
+
+def mesh_error(vertices):
+    """(mean, max) distance of mesh vertices to the sphere."""
+    if not len(vertices):
+        return None, None
+    error = np.abs(np.linalg.norm(vertices, axis=1) - SPHERE_RADIUS)
+    return float(error.mean()), float(error.max())
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+# ------------------------------------------
+# Modes (run in the child process)
+# ------------------------------------------
+def run_two_pass(args, work_dir):
+    render_dir = os.path.join(work_dir, "renders")
+    os.makedirs(render_dir, exist_ok=True)
+    t0 = time.perf_counter()
+    for i, view in enumerate(sphere_views(args.views, args.width, args.height)):
+        np.savez(os.path.join(render_dir, f"{i:05d}.npz"), rgb=view.rgb, depth=view.depth, K=view.K,
+                 world_to_camera=view.world_to_camera)
+    render_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    views = []
+    for name in sorted(os.listdir(render_dir)):
+        with np.load(os.path.join(render_dir, name)) as data:
+            views.append(View(data["rgb"], data["depth"], data["K"], data["world_to_camera"]))
+    try:
+        import open3d as o3d
+    except ImportError:
+        o3d = None
+    mesh_dir = os.path.join(work_dir, "mesh")
+    if o3d is None:
+        report = fuse_views(views, mesh_dir, args.voxel, 5 * args.voxel, 2 * CAMERA_DISTANCE, len(views),
+                            args.workers)
+        vertices = read_vertices(os.path.join(mesh_dir, "fuse.ply"))
+        engine = "BlockTSDF"
+    else:
+        volume = o3d.pipelines.integration.ScalableTSDFVolume(
+            voxel_length=args.voxel, sdf_trunc=5 * args.voxel,
+            color_type=o3d.pipelines.integration.TSDFVolumeColorType.RGB8)
+        for view in views:
+            rgbd = o3d.geometry.RGBDImage.create_from_color_and_depth(
+                o3d.geometry.Image(np.ascontiguousarray(view.rgb)), o3d.geometry.Image(view.depth),
+                depth_scale=1.0, depth_trunc=2 * CAMERA_DISTANCE, convert_rgb_to_intensity=False)
+            intrinsic = o3d.camera.PinholeCameraIntrinsic(args.width, args.height, view.K[0, 0], view.K[1, 1],
+                                                          view.K[0, 2], view.K[1, 2])
+            volume.integrate(rgbd, intrinsic, view.world_to_camera)
+        mesh = volume.extract_triangle_mesh()
+        os.makedirs(mesh_dir, exist_ok=True)
+        o3d.io.write_triangle_mesh(os.path.join(mesh_dir, "fuse.ply"), mesh)
+        vertices = np.asarray(mesh.vertices)
+        report = {"faces": len(mesh.triangles)}
+        engine = "Open3D"
+    return {"engine": engine, "render_seconds": round(render_seconds, 2),
+            "fusion_seconds": round(time.perf_counter() - t0, 2), "faces": report["faces"],
+            "error": mesh_error(vertices)}
+
+
+def run_stream(args, work_dir):
+    mesh_dir = os.path.join(work_dir, "mesh")
+    report = fuse_views(sphere_views(args.views, args.width, args.height), mesh_dir, args.voxel, 5 * args.voxel,
+                        2 * CAMERA_DISTANCE, args.views, args.workers, args.queue)
+    vertices = read_vertices(os.path.join(mesh_dir, "fuse.ply"))
+    return {"engine": "BlockTSDF", "blocks": report["blocks"], "volume_mb": report["volume_mb"],
+            "fusion_seconds": report["fusion_seconds"] + report["extract_seconds"], "faces": report["faces"],
+            "error": mesh_error(vertices)}
+
+
+MODES = {"two-pass": run_two_pass, "stream": run_stream}
+
+
+def run_mode(mode, args, work_dir):
+    """Result dict of one mode, run as `bench_tsdf.py --run <mode>` in a child process."""
+    cmd = [sys.executable, os.path.abspath(__file__), "--run", mode, "--work-dir", work_dir,
+           "--views", str(args.views), "--width", str(args.width), "--height", str(args.height),
+           "--voxel", str(args.voxel), "--queue", str(args.queue)]
+    if args.workers:
+        cmd += ["--workers", str(args.workers)]
+    # Files instead of pipes: the child's progress output must not block it while we wait
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        started = time.perf_counter()
+        process = subprocess.Popen(cmd, stdout=out, stderr=err)
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        err.seek(0)
+        stdout, stderr = out.read().decode(errors="replace"), err.read().decode(errors="replace")
+    if process.returncode != 0:
+        print(stderr, file=sys.stderr)
+        return {"mode": mode, "ok": False}
+    result = json.loads(stdout.strip().splitlines()[-1])
+    return {"mode": mode, "ok": True, "seconds": round(seconds, 2), "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+            "written_mb": round(directory_bytes(work_dir) / (1024 * 1024), 1), **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TSDF Fusion Benchmark")
+    parser.add_argument("--modes", nargs="+", default=["two-pass", "stream"], choices=list(MODES))
+    parser.add_argument("--views", type=int, default=200, help="Rendered views (default: 200)")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--voxel", type=float, default=0.004, help="Voxel size (sphere radius 1)")
+    parser.add_argument("--workers", type=int, help="Integration threads of BlockTSDF (default: CPU count)")
+    parser.add_argument("--queue", type=int, default=4, help="Stream mode: views buffered ahead of the fusion")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--run", choices=list(MODES), help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        # Child process: progress to stderr, the result as the last stdout line
+        sys.stdout, stdout = sys.stderr, sys.stdout
+        result = MODES[args.run](args, args.work_dir)
+        print(json.dumps(result), file=stdout)
+        return
+
+    print(f"[Bench] Sphere: {args.views} views of {args.width}x{args.height}, voxel {args.voxel}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_tsdf_") as tmp:
+        for mode in args.modes:
+            print(f"[Bench] {mode} ...", flush=True)
+            results.append(run_mode(mode, args, os.path.join(tmp, mode)))
+
+    print(f"\n{'mode':<10}{'engine':<11}{'time':>9}{'peak RSS':>12}{'written':>11}{'faces':>12}"
+          f"{'mean err':>11}{'max err':>10}")
+    for r in results:
+        if r["ok"]:
+            mean, worst = r["error"]
+            print(f"{r['mode']:<10}{r['engine']:<11}{r['seconds']:>8.1f}s{r['peak_rss_mb']:>9.0f} MB"
+                  f"{r['written_mb']:>8.1f} MB{r['faces']:>12,}{mean:>11.5f}{worst:>10.5f}")
+        else:
+            print(f"{r['mode']:<10}{'failed':>10}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"views": args.views, "width": args.width, "height": args.height, "voxel": args.voxel,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
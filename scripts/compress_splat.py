@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Gaussian Splat Compressor
+Converts a Gaussian splat PLY (splatfacto `gaussian-splat` export, 3DGS
+point_cloud.ply) into compact formats for web viewers:
+
+  compressed-ply  <name>.compressed.ply — PlayCanvas / SuperSplat compressed
+                  PLY: chunks of 256 splats with per-chunk bounds, 11/10/11-bit
+                  positions and log scales, 2+10+10+10-bit rotations
+                  (smallest three), 8-bit RGBA and 8-bit SH. ~4x smaller
+                  without SH, ~6x with SH 3.
+  splat           <name>.splat — 32 bytes per splat (float positions and
+                  scales, 8-bit RGBA and rotation), no SH. Streamed by most
+                  WebGL splat viewers.
+  ply             <name>.sh<d>.ply — the standard float PLY, SH truncated only.
+
+Splats are sorted in Morton (Z-curve) order first, so neighbours in the file
+are neighbours in space: the compressed PLY chunks get tight bounds, and a
+viewer that renders while downloading fills in the scene region by region.
+--sh-degree drops higher order SH (view-dependent color), which is most of
+the size of a 3DGS PLY.
+
+The quality of every output is measured against the input and written to
+<name>.compress.json together with the sizes:
+  color_psnr      PSNR of the view-dependent color averaged over all view
+                  directions (exact: the SH basis is orthonormal), weighted
+                  by opacity — includes the loss from dropped SH bands
+  position_rel    position RMSE relative to the scene extent
+  log_scale_rmse, rotation_deg, alpha_rmse  per-attribute errors
+
+Usage:
+  python3 compress_splat.py --input splat.ply --output-dir exports/p_ns_123
+  python3 compress_splat.py --input splat.ply --formats compressed-ply splat --sh-degree 1 --order importance
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from ply_io import SH_C0, PlyError, Splat, logit, read_splat, sigmoid, write_splat_ply
+
+FORMATS = ("compressed-ply", "splat", "ply")
+CHUNK_SIZE = 256
+# Morton code resolution per axis and the extent percentiles it spans (floaters are clamped)
+MORTON_BITS = 10
+MORTON_PERCENTILES = (1.0, 99.0)
+# Compressed PLY log scale range and SH range (as in SuperSplat)
+SCALE_CLAMP = 20.0
+SH_RANGE = 8.0
+
+
+# ------------------------------------------
+# Ordering
+# ------------------------------------------
+def _spread_bits(v):
+    """Insert two zero bits between the low 10 bits of each value."""
+    v = v.astype(np.uint32) & 0x3FF
+    v = (v | (v << 16)) & 0x030000FF
+    v = (v | (v << 8)) & 0x0300F00F
+    v = (v | (v << 4)) & 0x030C30C3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+
+def morton_order(xyz):
+    """Permutation sorting points along a Z-order curve."""
+    lo, hi = np.percentile(xyz, MORTON_PERCENTILES, axis=0)
+    cells = (1 << MORTON_BITS) - 1
+    q = np.clip((xyz - lo) / np.maximum(hi - lo, 1e-12) * cells, 0, cells)
+    codes = _spread_bits(q[:, 0]) | (_spread_bits(q[:, 1]) << 1) | (_spread_bits(q[:, 2]) << 2)
+    return np.argsort(codes, kind="stable")
+
+
+def importance_order(splat):
+    """Permutation putting large, opaque splats first (best for progressive loading)."""
+    importance = np.exp(splat.scale.sum(axis=1)) * sigmoid(splat.opacity)
+    return np.argsort(-importance, kind="stable")
+
+
+# ------------------------------------------
+# Quantization helpers
+# ------------------------------------------
+def _unorm(values, bits):
+    top = (1 << bits) - 1
+    return np.clip(np.floor(values * top + 0.5), 0, top).astype(np.uint32)
+
+
+def _from_unorm(q, bits):
+    return q.astype(np.float32) / ((1 << bits) - 1)
+
+
+def _chunk_bounds(values):
+    """Per-chunk min / max of (N, C) values (the last chunk may be partial)."""
+    n = len(values)
+    chunks = -(-n // CHUNK_SIZE)
+    padded = np.empty((chunks * CHUNK_SIZE, values.shape[1]), dtype=np.float32)
+    padded[:n] = values
+    padded[n:] = values[-1]
+    blocks = padded.reshape(chunks, CHUNK_SIZE, -1)
+    return blocks.min(axis=1), blocks.max(axis=1)
+
+
+def _normalize_in_chunks(values, lo, hi):
+    chunk = np.arange(len(values)) // CHUNK_SIZE
+    span = hi - lo
+    span[span == 0] = 1.0
+    return (values - lo[chunk]) / span[chunk]
+
+
+def _denormalize_in_chunks(values, lo, hi):
+    chunk = np.arange(len(values)) // CHUNK_SIZE
+    return values * (hi - lo)[chunk] + lo[chunk]
+
+
+def _pack_111011(values):
+    return (_unorm(values[:, 0], 11) << 21) | (_unorm(values[:, 1], 10) << 11) | _unorm(values[:, 2], 11)
+
+
+def _unpack_111011(packed):
+    return np.stack([_from_unorm(packed >> 21, 11), _from_unorm((packed >> 11) & 0x3FF, 10),
+                     _from_unorm(packed & 0x7FF, 11)], axis=1)
+
+
+def _pack_rotation(q):
+    """Smallest three: 2 bits for the index of the largest component, 10 bits for each other one."""
+    largest = np.abs(q).argmax(axis=1)
+    q = q * np.where(q[np.arange(len(q)), largest] < 0, -1.0, 1.0)[:, None]
+    norm = np.sqrt(2.0) * 0.5
+    packed = largest.astype(np.uint32)
+    for slot in range(3):
+        # the three components other than the largest, in order
+        index = slot + (slot >= largest)
+        packed = (packed << 10) | _unorm(q[np.arange(len(q)), index] * norm + 0.5, 10)
+    return packed
+
+
+def _unpack_rotation(packed):
+    largest = packed >> 30
+    norm = 1.0 / (np.sqrt(2.0) * 0.5)
+    others = np.stack([(_from_unorm((packed >> shift) & 0x3FF, 10) - 0.5) * norm for shift in (20, 10, 0)], axis=1)
+    q = np.empty((len(packed), 4), dtype=np.float32)
+    q[np.arange(len(q)), largest] = np.sqrt(np.maximum(1.0 - (others ** 2).sum(axis=1), 0.0))
+    for slot in range(3):
+        q[np.arange(len(q)), slot + (slot >= largest)] = others[:, slot]
+    return q
+
+
+def _base_color(f_dc):
+    return 0.5 + SH_C0 * f_dc
+
+
+def _f_dc_from_color(color):
+    return (color - 0.5) / SH_C0
+
+
+# ------------------------------------------
+# Encoders: each writes the file and returns the splat as a viewer decodes it
+# ------------------------------------------
+def write_compressed_ply(path, splat):
+    n = len(splat)
+    xyz_lo, xyz_hi = _chunk_bounds(splat.xyz)
+    scale = np.clip(splat.scale, -SCALE_CLAMP, SCALE_CLAMP)
+    scale_lo, scale_hi = _chunk_bounds(scale)
+    color = _base_color(splat.f_dc)
+    color_lo, color_hi = _chunk_bounds(color)
+
+    position = _pack_111011(_normalize_in_chunks(splat.xyz, xyz_lo, xyz_hi))
+    packed_scale = _pack_111011(_normalize_in_chunks(scale, scale_lo, scale_hi))
+    rgb = _normalize_in_chunks(color, color_lo, color_hi)
+    alpha = sigmoid(splat.opacity)
+    packed_color = ((_unorm(rgb[:, 0], 8) << 24) | (_unorm(rgb[:, 1], 8) << 16) | (_unorm(rgb[:, 2], 8) << 8)
+                    | _unorm(alpha, 8))
+    rotation = _pack_rotation(splat.normalized_rotations())
+
+    k = splat.f_rest.shape[2]
+    sh = np.clip(np.trunc((splat.f_rest.reshape(n, -1) / SH_RANGE + 0.5) * 256), 0, 255).astype(np.uint8)
+
+    chunk_names = ["min_x", "min_y", "min_z", "max_x", "max_y", "max_z",
+                   "min_scale_x", "min_scale_y", "min_scale_z", "max_scale_x", "max_scale_y", "max_scale_z",
+                   "min_r", "min_g", "min_b", "max_r", "max_g", "max_b"]
+    header = ["ply", "format binary_little_endian 1.0", f"element chunk {len(xyz_lo)}"]
+    header += [f"property float {name}" for name in chunk_names]
+    header += [f"element vertex {n}", "property uint packed_position", "property uint packed_rotation",
+               "property uint packed_scale", "property uint packed_color"]
+    if k:
+        header += [f"element sh {n}"] + [f"property uchar f_rest_{i}" for i in range(3 * k)]
+    header.append("end_header")
+
+    chunks = np.hstack([xyz_lo, xyz_hi, scale_lo, scale_hi, color_lo, color_hi]).astype("<f4")
+    vertices = np.stack([position, rotation, packed_scale, packed_color], axis=1).astype("<u4")
+    with open(path, "wb") as f:
+        f.write(("\n".join(header) + "\n").encode("ascii"))
+        f.write(chunks.tobytes())
+        f.write(vertices.tobytes())
+        if k:
+            f.write(sh.tobytes())
+
+    # Decode the way PlayCanvas does
+    rgba = np.stack([(packed_color >> s) & 0xFF for s in (24, 16, 8, 0)], axis=1).astype(np.float32) / 255.0
+    sh_q = sh.astype(np.float32)
+    sh_decoded = np.where(sh == 0, 0.0, (sh_q + 0.5) / 256.0)
+    return Splat(
+        _denormalize_in_chunks(_unpack_111011(position), xyz_lo, xyz_hi),
+        _f_dc_from_color(_denormalize_in_chunks(rgba[:, :3], color_lo, color_hi)),
+        ((sh_decoded - 0.5) * SH_RANGE).reshape(n, 3, k).astype(np.float32),
+        logit(rgba[:, 3]),
+        _denormalize_in_chunks(_unpack_111011(packed_scale), scale_lo, scale_hi),
+        _unpack_rotation(rotation),
+    )
+
+
+def write_dot_splat(path, splat):
+    """antimatter15 .splat: position f32×3, scale f32×3 (linear), RGBA u8×4, rotation u8×4 (w, x, y, z)."""
+    n = len(splat)
+    color = np.clip(_base_color(splat.f_dc), 0.0, 1.0)
+    rgba = np.hstack([color, sigmoid(splat.opacity)[:, None]])
+    rgba_q = np.clip(np.round(rgba * 255.0), 0, 255).astype(np.uint8)
+    rot_q = np.clip(np.round(splat.normalized_rotations() * 128.0 + 128.0), 0, 255).astype(np.uint8)
+
+    record = np.dtype([("xyz", "<f4", (3,)), ("scale", "<f4", (3,)), ("rgba", "u1", (4,)), ("rot", "u1", (4,))])
+    out = np.empty(n, dtype=record)
+    out["xyz"] = splat.xyz
+    out["scale"] = np.exp(splat.scale)
+    out["rgba"] = rgba_q
+    out["rot"] = rot_q
+    out.tofile(path)
+
+    rgba_d = rgba_q.astype(np.float32) / 255.0
+    return Splat(
+        splat.xyz,
+        _f_dc_from_color(rgba_d[:, :3]),
+        np.zeros((n, 3, 0), dtype=np.float32),
+        logit(rgba_d[:, 3]),
+        np.log(np.maximum(out["scale"], 1e-30)),
+        (rot_q.astype(np.float32) - 128.0) / 128.0,
+    )
+
+
+def write_ply(path, splat):
+    write_splat_ply(path, splat)
+    return splat
+
+
+ENCODERS = {
+    "compressed-ply": (write_compressed_ply, ".compressed.ply"),
+    "splat": (write_dot_splat, ".splat"),
+    "ply": (write_ply, ".ply"),
+}
+
+
+# ------------------------------------------
+# Quality report
+# ------------------------------------------
+def _rmse(a, b):
+    return float(np.sqrt(np.mean((np.asarray(a, np.float64) - b) ** 2))) if np.size(a) else 0.0
+
+
+def quality(reference, decoded):
+    """Errors of a decoded splat against the reference (same point order)."""
+    weight = sigmoid(reference.opacity).astype(np.float64)
+    weight /= max(weight.sum(), 1e-12)
+
+    # Mean over view directions of the squared color error: sum of squared
+    # coefficient errors / 4π, since every real SH basis function has mean square 1/4π
+    k = decoded.f_rest.shape[2]
+    sq = ((reference.f_dc - decoded.f_dc) ** 2).sum(axis=1, dtype=np.float64)
+    sq += ((reference.f_rest[:, :, :k] - decoded.f_rest) ** 2).sum(axis=(1, 2), dtype=np.float64)
+    sq += (reference.f_rest[:, :, k:] ** 2).sum(axis=(1, 2), dtype=np.float64)
+    mse = float((weight * sq).sum()) / (4.0 * np.pi) / 3.0
+
+    lo, hi = np.percentile(reference.xyz, MORTON_PERCENTILES, axis=0)
+    position_rmse = _rmse(reference.xyz, decoded.xyz)
+    q_ref = reference.normalized_rotations()
+    q_dec = decoded.normalized_rotations()
+    dot = np.clip(np.abs((q_ref * q_dec).sum(axis=1)), 0.0, 1.0)
+    return {
+        "color_psnr": round(10.0 * np.log10(1.0 / mse), 2) if mse > 0 else None,
+        "position_rmse": float(f"{position_rmse:.4g}"),
+        "position_rel": float(f"{position_rmse / max(float(np.linalg.norm(hi - lo)), 1e-12):.4g}"),
+        "log_scale_rmse": round(_rmse(reference.scale, decoded.scale), 5),
+        "rotation_deg": round(float(np.degrees(2.0 * np.arccos(dot)).mean()), 4),
+        "alpha_rmse": round(_rmse(sigmoid(reference.opacity), sigmoid(decoded.opacity)), 5),
+    }
+
+
+def compress(input_path, output_dir, formats=("compressed-ply",), sh_degree=None, order="morton"):
+    """Write every format of `formats` and return the report (also saved as <name>.compress.json)."""
+    started = time.perf_counter()
+    splat = read_splat(input_path)
+    if not len(splat):
+        raise PlyError(f"{input_path}: no splats")
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    print(f"[Compress] {input_path}: {len(splat):,} splats, SH degree {splat.sh_degree}")
+
+    if order == "morton":
+        splat = splat.take(morton_order(splat.xyz))
+    elif order == "importance":
+        splat = splat.take(importance_order(splat))
+    degree = splat.sh_degree if sh_degree is None else min(sh_degree, splat.sh_degree)
+    truncated = splat.with_sh_degree(degree)
+    print(f"[Compress] Loaded and sorted ({order}) in {time.perf_counter() - started:.1f}s")
+
+    input_bytes = os.path.getsize(input_path)
+    report = {"input": input_path, "points": len(splat), "input_mb": round(input_bytes / (1024 * 1024), 2),
+              "sh_degree": splat.sh_degree, "order": order, "outputs": []}
+    for fmt in formats:
+        encode, suffix = ENCODERS[fmt]
+        if fmt == "ply":
+            suffix = f".sh{degree}.ply"
+        path = os.path.join(output_dir, name + suffix)
+        t0 = time.perf_counter()
+        decoded = encode(path, truncated)
+        seconds = time.perf_counter() - t0
+        size = os.path.getsize(path)
+        entry = {"format": fmt, "path": path, "mb": round(size / (1024 * 1024), 2),
+                 "ratio": round(input_bytes / size, 2), "sh_degree": decoded.sh_degree,
+                 "seconds": round(seconds, 2), **quality(splat, decoded)}
+        report["outputs"].append(entry)
+        psnr = f"{entry['color_psnr']:.1f} dB" if entry["color_psnr"] is not None else "lossless"
+        print(f"[Compress] {fmt}: {entry['mb']:.1f} MB ({entry['ratio']:.1f}x), color PSNR {psnr}, "
+              f"position error {entry['position_rel'] * 100:.3f}% → {path}")
+
+    report_path = os.path.join(output_dir, name + ".compress.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[Compress] Report: {report_path} ({time.perf_counter() - started:.1f}s total)")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gaussian Splat Compressor")
+    parser.add_argument("--input", required=True, help="Gaussian splat PLY")
+    parser.add_argument("--output-dir", help="Output directory (default: next to the input)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["compressed-ply"])
+    parser.add_argument("--sh-degree", type=int, choices=[0, 1, 2, 3],
+                        help="Keep spherical harmonics up to this degree (default: all)")
+    parser.add_argument("--order", choices=["morton", "importance", "none"], default="morton",
+                        help="morton: spatial locality (default), importance: large opaque splats first")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"[ERROR] Input file not found: {args.input}")
+        sys.exit(1)
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.input))
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        compress(args.input, output_dir, args.formats, args.sh_degree, args.order)
+    except PlyError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
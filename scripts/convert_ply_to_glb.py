@@ -1,24 +1,282 @@
 #!/usr/bin/env python3
 """
 PLY to GLB Converter
-Converts PLY mesh files to GLB format using trimesh.
+Converts PLY meshes, point clouds and Gaussian splats to GLB.
+
+The native engine (default) memory-maps binary PLYs (ply_io.py) and
+writes the GLB buffers block by block, so memory stays flat however many
+points there are. Gaussian splats become a POINTS primitive whose COLOR_0
+is the base color (SH DC) with the opacity as alpha, plus the splat
+attributes in the style of the (draft) KHR_gaussian_splatting extension:
+  KHR_gaussian_splatting:SCALE            VEC3, linear scale (exp of the PLY value)
+  KHR_gaussian_splatting:ROTATION         VEC4, unit quaternion (x, y, z, w)
+  KHR_gaussian_splatting:SH_DEGREE_l_COEF_n  VEC3, higher order SH (RGB)
+Viewers without the extension still show the colored points.
+
+--quantize stores positions as int16 (KHR_mesh_quantization, dequantized
+by the node transform), normals as int8 and rotations as normalized int16.
+The trimesh engine (the previous implementation) is still available and is
+used automatically for PLYs the native reader doesn't handle.
 
 Usage:
   python3 convert_ply_to_glb.py --input file.ply --output file.glb
+                                [--quantize] [--sh-degree 0-3] [--no-splat-attributes]
+                                [--engine native|trimesh]
 """
 
 import argparse
+import json
 import os
+import struct
 import sys
 
-try:
-    import trimesh
-except ImportError:
-    print("[ERROR] trimesh not installed. Run: pip install trimesh pyglet")
-    sys.exit(1)
+import numpy as np
+
+from ply_io import SH_C0, PlyError, PlyFile, sigmoid, stack
+
+# Rows converted per block when writing buffers
+BLOCK_ROWS = 1 << 20
+
+# glTF component types
+BYTE, UNSIGNED_BYTE, SHORT, UNSIGNED_SHORT, UNSIGNED_INT, FLOAT = 5120, 5121, 5122, 5123, 5125, 5126
+ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER = 34962, 34963
+POINTS, TRIANGLES = 0, 4
+
+SPLAT_EXTENSION = "KHR_gaussian_splatting"
+QUANTIZATION_EXTENSION = "KHR_mesh_quantization"
+
+
+def _pad4(n):
+    return (n + 3) & ~3
+
+
+class GlbWriter:
+    """Collects buffer views / accessors and streams them into a GLB file.
+
+    Views are added with their byte length and a function that yields the
+    bytes block by block, so no buffer is ever held in memory as a whole.
+    """
+
+    def __init__(self):
+        self.gltf = {"asset": {"version": "2.0", "generator": "3DGS Studio convert_ply_to_glb.py"},
+                     "buffers": [{"byteLength": 0}], "bufferViews": [], "accessors": []}
+        self._length = 0
+        self._producers = []
+
+    def add_view(self, byte_length, produce, target=None, byte_stride=None):
+        view = {"buffer": 0, "byteOffset": self._length, "byteLength": byte_length}
+        if target:
+            view["target"] = target
+        if byte_stride:
+            view["byteStride"] = byte_stride
+        self.gltf["bufferViews"].append(view)
+        self._producers.append((byte_length, produce))
+        self._length += _pad4(byte_length)
+        return len(self.gltf["bufferViews"]) - 1
+
+    def add_accessor(self, count, rows, component_type, accessor_type, target=ARRAY_BUFFER,
+                     normalized=False, minmax=None, stride=None):
+        """Accessor over a new view; `rows(start, stop)` returns the data of those elements as an array."""
+        def produce():
+            for start in range(0, count, BLOCK_ROWS):
+                yield np.ascontiguousarray(rows(start, min(start + BLOCK_ROWS, count))).tobytes()
+
+        sample = rows(0, min(1, count))
+        view = self.add_view(count * (sample.nbytes // max(len(sample), 1)), produce, target, stride)
+        accessor = {"bufferView": view, "componentType": component_type, "count": count, "type": accessor_type}
+        if normalized:
+            accessor["normalized"] = True
+        if minmax is not None:
+            accessor["min"], accessor["max"] = [float(x) for x in minmax[0]], [float(x) for x in minmax[1]]
+            if component_type != FLOAT:
+                accessor["min"], accessor["max"] = [int(x) for x in minmax[0]], [int(x) for x in minmax[1]]
+        self.gltf["accessors"].append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    def write(self, path):
+        self.gltf["buffers"][0]["byteLength"] = self._length
+        json_bytes = json.dumps(self.gltf, separators=(",", ":")).encode()
+        json_bytes += b" " * (_pad4(len(json_bytes)) - len(json_bytes))
+        total = 12 + 8 + len(json_bytes) + 8 + self._length
+        with open(path, "wb") as f:
+            f.write(struct.pack("<III", 0x46546C67, 2, total))
+            f.write(struct.pack("<II", len(json_bytes), 0x4E4F534A))
+            f.write(json_bytes)
+            f.write(struct.pack("<II", self._length, 0x004E4942))
+            for byte_length, produce in self._producers:
+                written = 0
+                for block in produce():
+                    f.write(block)
+                    written += len(block)
+                if written != byte_length:
+                    raise RuntimeError(f"buffer view wrote {written} bytes, expected {byte_length}")
+                f.write(b"\0" * (_pad4(byte_length) - byte_length))
+
+
+def _bounds(vertices, names):
+    lo = np.full(len(names), np.inf)
+    hi = np.full(len(names), -np.inf)
+    for start in range(0, len(vertices), BLOCK_ROWS):
+        block = stack(vertices, names, np.float64, start, start + BLOCK_ROWS)
+        lo = np.minimum(lo, block.min(axis=0))
+        hi = np.maximum(hi, block.max(axis=0))
+    return lo, hi
+
+
+def _to_unorm8(values):
+    return np.clip(np.round(values * 255.0), 0, 255).astype(np.uint8)
+
+
+def _color_rows(ply, vertices):
+    """rows(start, stop) → RGBA uint8, or None if the PLY has no colors."""
+    names = set(ply.property_names())
+    if ply.is_gaussian_splat:
+        def rows(start, stop):
+            rgb = 0.5 + SH_C0 * stack(vertices, ["f_dc_0", "f_dc_1", "f_dc_2"], start=start, stop=stop)
+            alpha = sigmoid(stack(vertices, ["opacity"], start=start, stop=stop))
+            return _to_unorm8(np.hstack([rgb, alpha]))
+        return rows
+    if not {"red", "green", "blue"} <= names:
+        return None
+    channels = ["red", "green", "blue"] + (["alpha"] if "alpha" in names else [])
+    scale = 1.0 if vertices.dtype["red"].kind == "f" else 1.0 / 255.0
+
+    def rows(start, stop):
+        rgba = np.ones((min(stop, len(vertices)) - start, 4), dtype=np.float32)
+        rgba[:, :len(channels)] = stack(vertices, channels, start=start, stop=stop) * scale
+        return _to_unorm8(rgba)
+    return rows
+
+
+def convert_native(input_path, output_path, quantize=False, sh_degree=None, splat_attributes=True):
+    """Convert a binary PLY with NumPy; raises PlyError for layouts it doesn't handle."""
+    ply = PlyFile(input_path)
+    if not ply.binary and ply.face_count:
+        raise PlyError("ASCII PLY meshes are not supported by the native engine")
+    vertices = ply.vertices()
+    count = len(vertices)
+    if count == 0:
+        raise PlyError("PLY has no vertices")
+    names = set(ply.property_names())
+    faces = ply.faces()
+    splat = ply.is_gaussian_splat and faces is None
+
+    writer = GlbWriter()
+    attributes = {}
+    node = {"mesh": 0}
+    xyz = ["x", "y", "z"]
+    lo, hi = _bounds(vertices, xyz)
+
+    if quantize:
+        # int16 positions around the bounding box center; uniform scale keeps normals/rotations valid
+        center = (lo + hi) / 2.0
+        step = max(float((hi - lo).max()) / 2.0 / 32767.0, 1e-12)
+        node["translation"] = [float(c) for c in center]
+        node["scale"] = [step] * 3
+
+        def positions(start, stop):
+            q = np.zeros((min(stop, count) - start, 4), dtype=np.int16)  # padded to 8 bytes per vertex
+            q[:, :3] = np.round((stack(vertices, xyz, np.float64, start, stop) - center) / step)
+            return q
+        qlo, qhi = np.round((lo - center) / step), np.round((hi - center) / step)
+        attributes["POSITION"] = writer.add_accessor(count, positions, SHORT, "VEC3", minmax=(qlo, qhi), stride=8)
+    else:
+        step = 1.0
+        attributes["POSITION"] = writer.add_accessor(
+            count, lambda a, b: stack(vertices, xyz, start=a, stop=b), FLOAT, "VEC3", minmax=(lo, hi))
+
+    colors = _color_rows(ply, vertices)
+    if colors is not None:
+        attributes["COLOR_0"] = writer.add_accessor(count, colors, UNSIGNED_BYTE, "VEC4", normalized=True)
+
+    if faces is not None and {"nx", "ny", "nz"} <= names:
+        if quantize:
+            def normals(start, stop):
+                n = np.zeros((min(stop, count) - start, 4), dtype=np.int8)
+                n[:, :3] = np.round(np.clip(stack(vertices, ["nx", "ny", "nz"], start=start, stop=stop), -1, 1) * 127)
+                return n
+            attributes["NORMAL"] = writer.add_accessor(count, normals, BYTE, "VEC3", normalized=True, stride=4)
+        else:
+            attributes["NORMAL"] = writer.add_accessor(
+                count, lambda a, b: stack(vertices, ["nx", "ny", "nz"], start=a, stop=b), FLOAT, "VEC3")
+
+    primitive = {"attributes": attributes, "mode": TRIANGLES if faces is not None else POINTS}
+    extensions_used = []
+
+    if splat and splat_attributes:
+        def scales(start, stop):
+            return np.exp(stack(vertices, ["scale_0", "scale_1", "scale_2"], start=start, stop=stop)) / step
+        attributes[f"{SPLAT_EXTENSION}:SCALE"] = writer.add_accessor(count, scales, FLOAT, "VEC3")
+
+        def rotations(start, stop):
+            q = stack(vertices, ["rot_1", "rot_2", "rot_3", "rot_0"], start=start, stop=stop)  # PLY stores w first
+            q /= np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+            return np.round(q * 32767).astype(np.int16) if quantize else q
+        attributes[f"{SPLAT_EXTENSION}:ROTATION"] = writer.add_accessor(
+            count, rotations, SHORT if quantize else FLOAT, "VEC4", normalized=quantize)
+
+        degree = ply.sh_degree() if sh_degree is None else min(sh_degree, ply.sh_degree())
+        per_channel = (ply.sh_degree() + 1) ** 2 - 1
+        for l in range(1, degree + 1):
+            for n in range(2 * l + 1):
+                k = l * l - 1 + n
+                coef = [f"f_rest_{c * per_channel + k}" for c in range(3)]
+                attributes[f"{SPLAT_EXTENSION}:SH_DEGREE_{l}_COEF_{n}"] = writer.add_accessor(
+                    count, lambda a, b, coef=coef: stack(vertices, coef, start=a, stop=b), FLOAT, "VEC3")
+        primitive["extensions"] = {SPLAT_EXTENSION: {}}
+        extensions_used.append(SPLAT_EXTENSION)
+
+    if faces is not None:
+        index_type, index_dtype = ((UNSIGNED_SHORT, np.uint16) if count < 65536 else (UNSIGNED_INT, np.uint32))
+        flat = faces.reshape(-1)
+        primitive["indices"] = writer.add_accessor(
+            len(flat), lambda a, b: flat[a:b].astype(index_dtype), index_type, "SCALAR", target=ELEMENT_ARRAY_BUFFER)
+
+    if quantize:
+        extensions_used.append(QUANTIZATION_EXTENSION)
+        writer.gltf["extensionsRequired"] = [QUANTIZATION_EXTENSION]
+    if extensions_used:
+        writer.gltf["extensionsUsed"] = extensions_used
+    writer.gltf["meshes"] = [{"primitives": [primitive]}]
+    writer.gltf["nodes"] = [node]
+    writer.gltf["scenes"] = [{"nodes": [0]}]
+    writer.gltf["scene"] = 0
+    writer.write(output_path)
+
+    kind = "Gaussian splat" if splat else ("mesh" if faces is not None else "point cloud")
+    detail = f", {len(faces):,} faces" if faces is not None else ""
+    print(f"[INFO] Input {kind}: {count:,} vertices{detail}")
+    return True
+
+
+def convert_with_trimesh(input_path, output_path):
+    """Previous implementation: load with trimesh and export (drops splat attributes)."""
+    try:
+        import trimesh
+    except ImportError:
+        print("[ERROR] trimesh not installed. Run: pip install trimesh pyglet")
+        return False
+
+    mesh = trimesh.load(input_path)
+
+    if isinstance(mesh, trimesh.PointCloud):
+        print("[INFO] Input is a point cloud, not a mesh.")
+        print("[INFO] Converting point cloud to GLB with vertex colors...")
+        # For point clouds, create a simple scene
+        scene = trimesh.Scene()
+        scene.add_geometry(mesh)
+        scene.export(output_path, file_type='glb')
+    elif isinstance(mesh, trimesh.Scene):
+        print(f"[INFO] Input is a scene with {len(mesh.geometry)} geometries")
+        mesh.export(output_path, file_type='glb')
+    else:
+        print(f"[INFO] Input mesh: {len(mesh.vertices)} vertices, {len(mesh.faces)} faces")
+        mesh.export(output_path, file_type='glb')
+    return True
 
 
-def convert_ply_to_glb(input_path, output_path):
+def convert_ply_to_glb(input_path, output_path, engine="native", quantize=False, sh_degree=None,
+                       splat_attributes=True):
     """Convert PLY file to GLB format."""
     print(f"[Converter] Loading: {input_path}")
 
@@ -27,22 +285,16 @@ def convert_ply_to_glb(input_path, output_path):
         return False
 
     try:
-        # Load the PLY file
-        mesh = trimesh.load(input_path)
-
-        if isinstance(mesh, trimesh.PointCloud):
-            print("[INFO] Input is a point cloud, not a mesh.")
-            print("[INFO] Converting point cloud to GLB with vertex colors...")
-            # For point clouds, create a simple scene
-            scene = trimesh.Scene()
-            scene.add_geometry(mesh)
-            scene.export(output_path, file_type='glb')
-        elif isinstance(mesh, trimesh.Scene):
-            print(f"[INFO] Input is a scene with {len(mesh.geometry)} geometries")
-            mesh.export(output_path, file_type='glb')
+        if engine == "native":
+            try:
+                success = convert_native(input_path, output_path, quantize, sh_degree, splat_attributes)
+            except PlyError as e:
+                print(f"[INFO] Native reader can't handle this file ({e}), using trimesh")
+                success = convert_with_trimesh(input_path, output_path)
         else:
-            print(f"[INFO] Input mesh: {len(mesh.vertices)} vertices, {len(mesh.faces)} faces")
-            mesh.export(output_path, file_type='glb')
+            success = convert_with_trimesh(input_path, output_path)
+        if not success:
+            return False
 
         output_size = os.path.getsize(output_path) / (1024 * 1024)
         print(f"[Converter] Success! Output: {output_path} ({output_size:.1f} MB)")
@@ -57,6 +309,14 @@ def main():
     parser = argparse.ArgumentParser(description="PLY to GLB Converter")
     parser.add_argument("--input", required=True, help="Input PLY file path")
     parser.add_argument("--output", required=True, help="Output GLB file path")
+    parser.add_argument("--engine", choices=["native", "trimesh"], default="native",
+                        help="native: NumPy/memmap (default), trimesh: previous implementation")
+    parser.add_argument("--quantize", action="store_true",
+                        help="int16 positions / int8 normals (KHR_mesh_quantization)")
+    parser.add_argument("--sh-degree", type=int, choices=[0, 1, 2, 3],
+                        help="Keep spherical harmonics up to this degree (default: all)")
+    parser.add_argument("--no-splat-attributes", action="store_true",
+                        help="Gaussian splats: write colored points only")
     args = parser.parse_args()
 
     # Auto-generate output path if only directory is specified
@@ -66,7 +326,8 @@ def main():
 
     os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
 
-    success = convert_ply_to_glb(args.input, args.output)
+    success = convert_ply_to_glb(args.input, args.output, args.engine, args.quantize, args.sh_degree,
+                                 not args.no_splat_attributes)
     sys.exit(0 if success else 1)
 
 
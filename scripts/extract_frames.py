@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Frame Extractor
+Decodes a video in parallel time segments (optionally on the GPU via
+ffmpeg -hwaccel cuda), keeps the sharpest frame of each window so the
+output hits the frame count target, and writes images/ together with the
+downscaled images_2/4/8 pyramid in the same pass.
+
+Sharpness is the variance of the Laplacian of a downscaled grayscale frame;
+blurry frames (motion blur, focus hunting) score low.
+
+Usage:
+  python3 extract_frames.py --input video.mp4 --output /workspace/data/nerfstudio/my_project --num-frames 300
+  python3 extract_frames.py ... --workers 8 --hwaccel none --uniform
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    print("[ERROR] opencv-python and numpy are required. Run: pip install opencv-python numpy")
+    sys.exit(1)
+
+# Width frames are scored at (full-resolution Laplacians are slow and no more useful)
+SCORE_WIDTH = 640
+
+
+def probe_video(path):
+    """Return (width, height, fps, frame_count) of the first video stream."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "stream=width,height,avg_frame_rate,nb_frames,duration:stream_tags=rotate"
+                          ":stream_side_data=rotation:format=duration",
+         "-of", "json", path],
+        capture_output=True, text=True, timeout=30
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.strip()}")
+    info = json.loads(result.stdout)
+    stream = info["streams"][0]
+    width, height = int(stream["width"]), int(stream["height"])
+
+    num, _, den = stream.get("avg_frame_rate", "0/1").partition("/")
+    fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+    if fps <= 0:
+        raise RuntimeError("could not determine the frame rate")
+
+    frame_count = int(stream.get("nb_frames") or 0)
+    if frame_count <= 0:
+        duration = float(stream.get("duration") or info.get("format", {}).get("duration") or 0)
+        if duration <= 0:
+            raise RuntimeError("could not determine the video length")
+        frame_count = int(duration * fps)
+
+    # ffmpeg applies the rotation of phone videos while decoding
+    rotation = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    if rotation is not None and abs(int(float(rotation))) % 180 == 90:
+        width, height = height, width
+    return width, height, fps, frame_count
+
+
+def hwaccel_works(path, hwaccel):
+    """True if ffmpeg can decode the first frame with this hwaccel."""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-hwaccel", hwaccel, "-i", path, "-frames:v", "1", "-f", "null", "-"],
+            capture_output=True, timeout=60
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return False
+    return result.returncode == 0
+
+
+def sharpness(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if gray.shape[1] > SCORE_WIDTH:
+        scale = SCORE_WIDTH / gray.shape[1]
+        gray = cv2.resize(gray, (SCORE_WIDTH, int(gray.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def write_frame(frame, output_dir, index, downscales, quality):
+    name = f"frame_{index + 1:05d}.jpg"
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    cv2.imwrite(os.path.join(output_dir, "images", name), frame, params)
+    height, width = frame.shape[:2]
+    for level in range(1, downscales + 1):
+        factor = 2 ** level
+        small = cv2.resize(frame, (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+        cv2.imwrite(os.path.join(output_dir, f"images_{factor}", name), small, params)
+
+
+def extract_segment(task):
+    """Decode one run of consecutive windows and write the best frame of each.
+
+    Returns a list of (window_index, score) for the frames written.
+    """
+    path, output_dir, windows, (width, height, fps), hwaccel, uniform, downscales, quality = task
+    first_frame = windows[0][1]
+    frame_count = windows[-1][2] - first_frame
+    cmd = ["ffmpeg", "-v", "error"]
+    if hwaccel:
+        cmd.extend(["-hwaccel", hwaccel])
+    cmd.extend(["-ss", f"{first_frame / fps:.6f}", "-i", path, "-frames:v", str(frame_count),
+                "-f", "rawvideo", "-pix_fmt", "bgr24", "-"])
+    frame_size = width * height * 3
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=frame_size)
+
+    written = []
+    position = first_frame
+    try:
+        for window_index, start, end in windows:
+            best, best_score = None, -1.0
+            while position < end:
+                data = process.stdout.read(frame_size)
+                if len(data) < frame_size:
+                    break  # end of stream (frame counts from ffprobe can be estimates)
+                frame = np.frombuffer(data, np.uint8).reshape(height, width, 3)
+                position += 1
+                if uniform:
+                    if best is None:
+                        best, best_score = frame.copy(), 0.0
+                    continue
+                score = sharpness(frame)
+                if score > best_score:
+                    best, best_score = frame.copy(), score
+            if best is None:
+                break
+            write_frame(best, output_dir, window_index, downscales, quality)
+            written.append((window_index, best_score))
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+    return written
+
+
+def make_windows(frame_count, num_frames):
+    """Split [0, frame_count) into num_frames windows of (index, start, end)."""
+    if frame_count < 1:
+        raise ValueError("the video has no frames")
+    if num_frames < 1:
+        raise ValueError(f"--num-frames must be at least 1 (got {num_frames})")
+    num_frames = min(num_frames, frame_count)
+    bounds = [round(i * frame_count / num_frames) for i in range(num_frames + 1)]
+    return [(i, bounds[i], bounds[i + 1]) for i in range(num_frames)]
+
+
+def prepare_output(output_dir, downscales):
+    for level in range(0, downscales + 1):
+        folder = os.path.join(output_dir, "images" if level == 0 else f"images_{2 ** level}")
+        os.makedirs(folder, exist_ok=True)
+        for old in glob.glob(os.path.join(folder, "frame_*.jpg")):
+            os.remove(old)
+
+
+def extract_frames(path, output_dir, num_frames, workers, hwaccel, uniform, downscales, quality):
+    width, height, fps, frame_count = probe_video(path)
+    print(f"[Frames] Input: {path} ({width}x{height}, {fps:.2f} fps, {frame_count} frames)")
+
+    if hwaccel == "auto":
+        hwaccel = "cuda" if shutil.which("nvidia-smi") and hwaccel_works(path, "cuda") else None
+    elif hwaccel == "none":
+        hwaccel = None
+    elif not hwaccel_works(path, hwaccel):
+        print(f"[WARN] -hwaccel {hwaccel} does not work here, decoding on the CPU")
+        hwaccel = None
+    print(f"[Frames] Decoding: {hwaccel or 'cpu'}, workers: {workers}, "
+          f"selection: {'uniform' if uniform else 'sharpest per window'}")
+
+    windows = make_windows(frame_count, num_frames)
+    # Several segments per worker keeps all workers busy until the end and gives finer progress
+    num_segments = min(len(windows), workers * 4)
+    bounds = [round(i * len(windows) / num_segments) for i in range(num_segments + 1)]
+    tasks = [
+        (path, output_dir, windows[bounds[i]:bounds[i + 1]], (width, height, fps), hwaccel, uniform,
+         downscales, quality)
+        for i in range(num_segments) if bounds[i + 1] > bounds[i]
+    ]
+
+    prepare_output(output_dir, downscales)
+    start = time.time()
+    results = []
+    with Pool(workers) as pool:
+        for written in pool.imap_unordered(extract_segment, tasks):
+            results.extend(written)
+            print(f"[Frames] {len(results)}/{len(windows)} frames", flush=True)
+
+    if not results:
+        raise RuntimeError("no frames could be decoded")
+    print(f"[Frames] Wrote {len(results)} frames (+{downscales} downscales) in {time.time() - start:.1f}s")
+    if not uniform:
+        scores = np.array([score for _, score in results])
+        print(f"[Frames] Sharpness: min {scores.min():.1f}, median {np.median(scores):.1f}, max {scores.max():.1f}")
+    return len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel Frame Extractor")
+    parser.add_argument("--input", required=True, help="Input video path")
+    parser.add_argument("--output", required=True, help="Output directory (images/ and images_N/ are created)")
+    parser.add_argument("--num-frames", type=int, default=300, help="Target number of frames (default: 300)")
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 8),
+                        help="Parallel decoding processes (default: CPU count, max 8)")
+    parser.add_argument("--hwaccel", default="auto",
+                        help="ffmpeg hwaccel for decoding: auto | cuda | none | <ffmpeg name> (default: auto)")
+    parser.add_argument("--uniform", action="store_true",
+                        help="Take the first frame of each window instead of the sharpest")
+    parser.add_argument("--downscales", type=int, default=3,
+                        help="Number of images_2/4/8... levels to write (default: 3)")
+    parser.add_argument("--quality", type=int, default=95, help="JPEG quality (default: 95)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"[ERROR] Input video not found: {args.input}")
+        sys.exit(1)
+    if args.num_frames < 1:
+        print(f"[ERROR] --num-frames must be at least 1 (got {args.num_frames})")
+        sys.exit(1)
+    try:
+        extract_frames(args.input, args.output, args.num_frames, max(args.workers, 1), args.hwaccel,
+                       args.uniform, args.downscales, args.quality)
+    except (RuntimeError, ValueError, KeyError, IndexError, subprocess.TimeoutExpired) as e:
+        print(f"[ERROR] Frame extraction failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
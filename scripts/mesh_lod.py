@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Mesh LOD Builder
+Turns the raw SuGaR / 2DGS meshes (millions of faces, hundreds of MB of PLY
+or OBJ) into compressed GLBs at several levels of detail for PlayCanvas:
+
+  1. the source mesh becomes a float GLB (PLY through convert_ply_to_glb.py's
+     native engine, textured OBJ directly through gltfpack)
+  2. for lod0 (full resolution) and every --targets face count below it,
+     gltfpack welds vertices, runs quadric simplification to the target
+     (keeping UV seams and borders; --aggressive lets it collapse topology),
+     quantizes attributes and writes meshopt-compressed buffers
+     (EXT_meshopt_compression) and, with --texture ktx2, Basis Universal
+     textures limited to --max-texture >> level pixels
+  3. with --compression draco, gltf-transform re-encodes the simplified
+     meshes with Draco (KHR_draco_mesh_compression) instead
+
+Face / vertex counts, sizes and timings go to <output-dir>/report.json.
+gltfpack: https://github.com/zeux/meshoptimizer (installed in the nerfstudio
+image); gltf-transform (Draco only): npm install -g @gltf-transform/cli.
+
+Usage:
+  python3 mesh_lod.py --input /workspace/outputs/<project>/sugar [--targets 1000000 200000 50000]
+  python3 mesh_lod.py --input mesh.ply --output-dir mesh_lod --compression draco --texture keep
+"""
+
+import argparse
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import time
+
+from convert_ply_to_glb import convert_native
+from ply_io import PlyError, PlyFile
+
+GLTFPACK = os.environ.get("GLTFPACK", "gltfpack")
+GLTF_TRANSFORM = os.environ.get("GLTF_TRANSFORM", "gltf-transform")
+OUTPUT_NAME = "mesh_lod"
+TRIANGLES = 4
+
+
+def find_mesh(directory):
+    """Most likely final mesh under a SuGaR / 2DGS output directory.
+
+    Textured OBJs (SuGaR refined) beat PLYs, post-processed meshes
+    (2DGS fuse_post.ply) beat raw ones, newer beats older. PLYs without
+    faces (Gaussian point clouds) are skipped.
+    """
+    candidates = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if d != OUTPUT_NAME]
+        for name in files:
+            path = os.path.join(root, name)
+            ext = os.path.splitext(name)[1].lower()
+            if ext == ".ply":
+                try:
+                    if PlyFile(path).face_count == 0:
+                        continue
+                except (OSError, PlyError):
+                    continue
+            elif ext != ".obj":
+                continue
+            candidates.append(((ext == ".obj", "post" in name, os.path.getmtime(path)), path))
+    return max(candidates)[1] if candidates else None
+
+
+def glb_stats(path):
+    """(faces, vertices) of the triangle primitives of a GLB, from its JSON chunk."""
+    with open(path, "rb") as f:
+        _, _, _, json_length, _ = struct.unpack("<IIIII", f.read(20))
+        gltf = json.loads(f.read(json_length))
+    accessors = gltf.get("accessors", [])
+    faces = vertices = 0
+    for mesh in gltf.get("meshes", []):
+        for primitive in mesh["primitives"]:
+            if primitive.get("mode", TRIANGLES) != TRIANGLES:
+                continue
+            count = accessors[primitive["attributes"]["POSITION"]]["count"]
+            vertices += count
+            faces += (accessors[primitive["indices"]]["count"] if "indices" in primitive else count) // 3
+    return faces, vertices
+
+
+def run_tool(cmd):
+    print(f"[MeshLOD] {' '.join(cmd)}", flush=True)
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(cmd[0])} failed: {(result.stderr or result.stdout).strip()}")
+
+
+def build_lods(source, output_dir, targets=(1000000, 200000, 50000), compression="meshopt", texture="ktx2",
+               max_texture=4096, aggressive=False):
+    """Write lod<i>.glb for full resolution and each smaller target; returns the report."""
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, "source.glb")
+    t0 = time.perf_counter()
+    if source.lower().endswith(".ply"):
+        convert_native(source, base)
+    else:
+        run_tool([GLTFPACK, "-i", source, "-o", base, "-noq"])
+    faces_in, vertices_in = glb_stats(base)
+    print(f"[MeshLOD] Source: {source} ({faces_in:,} faces, {vertices_in:,} vertices) "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+    ratios = [1.0] + [target / faces_in for target in sorted(targets, reverse=True) if target < faces_in]
+    report = {"source": source, "source_mb": round(os.path.getsize(source) / (1024 * 1024), 2),
+              "faces": faces_in, "vertices": vertices_in, "compression": compression, "texture": texture,
+              "levels": []}
+    for level, ratio in enumerate(ratios):
+        path = os.path.join(output_dir, f"lod{level}.glb")
+        t0 = time.perf_counter()
+        cmd = [GLTFPACK, "-i", base, "-o", path]
+        if ratio < 1.0:
+            cmd.extend(["-si", f"{ratio:.6f}"] + (["-sa"] if aggressive else []))
+        if compression == "meshopt":
+            cmd.append("-cc")
+        elif compression == "draco":
+            cmd.append("-noq")  # Draco quantizes itself and needs float input
+        if texture == "ktx2":
+            cmd.extend(["-tc", "-tl", str(max(max_texture >> level, 256))])
+        run_tool(cmd)
+        if compression == "draco":
+            run_tool([GLTF_TRANSFORM, "draco", path, path])
+        faces, vertices = glb_stats(path)
+        entry = {"level": level, "file": os.path.basename(path), "target_ratio": round(ratio, 6), "faces": faces,
+                 "vertices": vertices, "mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+                 "seconds": round(time.perf_counter() - t0, 2)}
+        report["levels"].append(entry)
+        print(f"[MeshLOD] lod{level}: {faces:,} faces, {entry['mb']:.1f} MB ({entry['seconds']:.1f}s)")
+
+    os.remove(base)
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    with open(os.path.join(output_dir, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[MeshLOD] Done: {len(ratios)} levels in {report['seconds']:.1f}s → {output_dir}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesh LOD Builder")
+    parser.add_argument("--input", required=True, help="Mesh (PLY/OBJ) or a SuGaR / 2DGS output directory")
+    parser.add_argument("--output-dir", help=f"Output directory (default: <input dir>/{OUTPUT_NAME})")
+    parser.add_argument("--targets", type=int, nargs="+", default=[1000000, 200000, 50000],
+                        help="Face counts of the reduced levels (lod0 is always full resolution)")
+    parser.add_argument("--compression", choices=["meshopt", "draco", "none"], default="meshopt")
+    parser.add_argument("--texture", choices=["ktx2", "keep"], default="ktx2",
+                        help="ktx2: Basis Universal textures, keep: original images")
+    parser.add_argument("--max-texture", type=int, default=4096, help="Texture size limit of lod0 (halved per level)")
+    parser.add_argument("--aggressive", action="store_true", help="Allow simplification to ignore topology")
+    args = parser.parse_args()
+
+    source = find_mesh(args.input) if os.path.isdir(args.input) else args.input
+    if not source or not os.path.exists(source):
+        print(f"[ERROR] No mesh found: {args.input}")
+        sys.exit(1)
+    tools = [GLTFPACK] + ([GLTF_TRANSFORM] if args.compression == "draco" else [])
+    missing = [tool for tool in tools if not shutil.which(tool)]
+    if missing:
+        print(f"[ERROR] {', '.join(missing)} not found (gltfpack: meshoptimizer releases, "
+              "gltf-transform: npm install -g @gltf-transform/cli)")
+        sys.exit(1)
+    output_dir = args.output_dir or os.path.join(
+        args.input if os.path.isdir(args.input) else os.path.dirname(os.path.abspath(args.input)), OUTPUT_NAME)
+    try:
+        build_lods(source, output_dir, args.targets, args.compression, args.texture, args.max_texture,
+                   args.aggressive)
+    except (PlyError, RuntimeError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
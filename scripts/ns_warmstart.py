@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Nerfstudio Warm Start
+Turns the latest checkpoint of a finished nerfstudio run into the starting
+point of a new run on an updated dataset (e.g. after adding images). The
+checkpoint is written as <output-dir>/step-000000000.ckpt, so
+`ns-train --load-dir <output-dir>` picks it up:
+
+  - per-image parameters (appearance embeddings, camera pose adjustments,
+    bilateral grids) are re-indexed by image file name: the run's dataparser
+    is re-run on the transforms.json it trained on (the copy in its run
+    directory, see commands.ns_train_steps) to learn which image each row
+    belongs to. Kept images keep their rows, new images start from the mean
+    row (pose adjustments from none); when the old images can't be listed,
+    every image starts over
+  - the dataparser of the run is re-run on the new data; when its
+    normalization (orientation / center / scale) moved, Gaussian models are
+    transformed into the new frame (centers, rotations, log-scales, SH)
+  - the step counter and optimizer / scheduler state start over, so
+    learning-rate schedules and densification run again for the new images
+
+Both runs must share the COLMAP world frame (images registered into the same
+reconstruction); NeRF fields cannot be moved between frames and only get a
+warning when the normalization changed.
+
+Usage:
+  python3 ns_warmstart.py --load-config outputs/<project>/splatfacto/<ts>/config.yml \\
+                          --data data/nerfstudio/<project> --output-dir outputs/<project>/splatfacto/<new-ts>/nerfstudio_models
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import yaml
+
+from splat_lod import matrix_to_quaternion, quaternion_to_matrix
+from splatfacto_to_3dgs import sh_rotation
+
+WARMSTART_CKPT = "step-000000000.ckpt"
+# transforms.json copied into the run directory when the run started
+DATA_SNAPSHOT = "transforms.json"
+# Suffixes of pipeline parameters with one row per training image
+PER_IMAGE_PARAMS = ("embedding_appearance.embedding.weight", "camera_optimizer.pose_adjustment", "bil_grids.grids")
+# Gaussian parameters of splatfacto (nerfstudio >= 1.0)
+GAUSS_PREFIX = "_model.gauss_params."
+# Frames closer than this are treated as unchanged
+FRAME_TOLERANCE = 1e-6
+
+
+# ------------------------------------------
+# Checkpoint and frames
+# ------------------------------------------
+def latest_checkpoint(checkpoint_dir):
+    """Path and step of the newest step-<N>.ckpt (the one ns-train --load-dir would load)."""
+    steps = sorted(int(name[name.find("-") + 1:name.find(".")])
+                   for name in os.listdir(checkpoint_dir) if name.startswith("step-") and name.endswith(".ckpt"))
+    if not steps:
+        raise FileNotFoundError(f"{checkpoint_dir}: no checkpoints")
+    return os.path.join(checkpoint_dir, f"step-{steps[-1]:09d}.ckpt"), steps[-1]
+
+
+def frame_matrix(transform, scale):
+    """4x4 similarity of a dataparser transform (3x4) and scale."""
+    matrix = np.eye(4)
+    matrix[:3, :] = np.asarray(transform, dtype=np.float64)
+    return np.diag([scale, scale, scale, 1.0]) @ matrix
+
+
+def new_dataparser_outputs(config, data):
+    """Train split of the run's dataparser on the new data."""
+    dataparser = copy.deepcopy(config.pipeline.datamanager.dataparser)
+    dataparser.data = Path(data)
+    return dataparser.setup().get_dataparser_outputs(split="train")
+
+
+def data_dir(data):
+    """Directory the image paths of a dataset (directory or transforms .json) are relative to."""
+    data = Path(data)
+    return data.parent if data.suffix == ".json" else data
+
+
+def image_names(outputs, data):
+    """Training image paths relative to their dataset, in row order of the per-image parameters."""
+    return [os.path.relpath(path, data_dir(data)) for path in outputs.image_filenames]
+
+
+def old_image_names(config, run_dir):
+    """Training images of the finished run in row order, or None when they can't be listed.
+
+    The dataparser runs on the run's own copy of transforms.json (the data may
+    have been updated in place since), placed next to the current one for the
+    duration so image paths and downscaled image folders resolve as before.
+    Runs without a copy fall back to the data as it is now.
+    """
+    dataparser = copy.deepcopy(config.pipeline.datamanager.dataparser)
+    data = dataparser.data
+    snapshot = os.path.join(run_dir, DATA_SNAPSHOT)
+    try:
+        if not os.path.exists(snapshot):
+            return image_names(dataparser.setup().get_dataparser_outputs(split="train"), data)
+        with tempfile.NamedTemporaryFile("w", suffix=".json", prefix=".warmstart-", dir=data_dir(data)) as f:
+            with open(snapshot) as src:
+                f.write(src.read())
+            f.flush()
+            dataparser.data = Path(f.name)
+            return image_names(dataparser.setup().get_dataparser_outputs(split="train"), data)
+    except Exception as e:  # e.g. images removed since, or the data moved away
+        print(f"[WarmStart] ⚠️ Could not list the training images of the run: {e}")
+        return None
+
+
+# ------------------------------------------
+# Adapting the pipeline state
+# ------------------------------------------
+def remap_per_image(state, old_names, new_names):
+    """Re-index per-image parameters from the old training images to the new ones by name.
+
+    Returns {name: (old rows, new rows, reused rows)}. Parameters whose row
+    count doesn't match old_names (or without old_names) reuse no rows.
+    """
+    remapped = {}
+    for name, value in list(state.items()):
+        if not name.endswith(PER_IMAGE_PARAMS):
+            continue
+        rows = value.shape[0]
+        index = {image: i for i, image in enumerate(old_names)} if old_names and len(old_names) == rows else {}
+        sources = [index.get(image) for image in new_names]
+        if sources == list(range(rows)):
+            continue  # same images in the same order
+        # New cameras start without a pose correction; new appearance codes / grids at the average
+        if name.endswith("pose_adjustment"):
+            fill = torch.zeros_like(value[0])
+        else:
+            fill = value.mean(dim=0)
+        state[name] = torch.stack([value[i] if i is not None else fill for i in sources]) if sources \
+            else value[:0].clone()
+        remapped[name] = (rows, len(new_names), sum(i is not None for i in sources))
+    return remapped
+
+
+def transform_gaussians(state, matrix):
+    """Move splatfacto's Gaussians by a similarity (4x4, uniform scale)."""
+    linear = matrix[:3, :3]
+    scale = np.cbrt(np.linalg.det(linear))
+    rotation = linear / scale
+    means = state[GAUSS_PREFIX + "means"]
+    dtype, device = means.dtype, means.device
+    state[GAUSS_PREFIX + "means"] = torch.from_numpy(
+        means.double().cpu().numpy() @ linear.T + matrix[:3, 3]).to(dtype=dtype, device=device)
+    state[GAUSS_PREFIX + "scales"] = state[GAUSS_PREFIX + "scales"] + float(np.log(scale))
+    quats = state[GAUSS_PREFIX + "quats"]  # (w, x, y, z)
+    state[GAUSS_PREFIX + "quats"] = torch.from_numpy(matrix_to_quaternion(
+        rotation @ quaternion_to_matrix(quats.double().cpu().numpy()))).to(dtype=quats.dtype, device=quats.device)
+    rest = state.get(GAUSS_PREFIX + "features_rest")
+    if rest is not None and rest.shape[1]:
+        # (N, K, 3): the SH rotation is block diagonal per band, so its leading block fits lower degrees
+        k = rest.shape[1]
+        sh = torch.from_numpy(sh_rotation(rotation)[:k, :k]).to(dtype=rest.dtype, device=rest.device)
+        state[GAUSS_PREFIX + "features_rest"] = torch.einsum("ij,njc->nic", sh, rest)
+
+
+# ------------------------------------------
+# Warm start
+# ------------------------------------------
+def warm_start(config_path, data, output_dir):
+    started = time.perf_counter()
+    config = yaml.load(Path(config_path).read_text(), Loader=yaml.Loader)
+    run_dir = os.path.dirname(os.path.abspath(config_path))
+    checkpoint_path, step = latest_checkpoint(os.path.join(run_dir, "nerfstudio_models"))
+    print(f"[WarmStart] {checkpoint_path} (step {step})")
+    loaded = torch.load(checkpoint_path, map_location="cpu", weights_only=False)
+    state = loaded["pipeline"]
+
+    old_names = old_image_names(config, run_dir)
+    outputs = new_dataparser_outputs(config, data)
+    new_names = image_names(outputs, data)
+    num_images = len(new_names)
+    for name, (rows, new_rows, reused) in remap_per_image(state, old_names, new_names).items():
+        print(f"[WarmStart] {name}: {rows} → {new_rows} images ({reused} kept by file name)")
+        if old_names is None or len(old_names) != rows:
+            print(f"[WarmStart] ⚠️ {name}: the run's training images are unknown, every image starts over")
+
+    with open(os.path.join(run_dir, "dataparser_transforms.json")) as f:
+        old = json.load(f)
+    old_frame = frame_matrix(old["transform"], float(old.get("scale", 1.0)))
+    new_frame = frame_matrix(outputs.dataparser_transform.cpu().numpy(), float(outputs.dataparser_scale))
+    to_new = new_frame @ np.linalg.inv(old_frame)
+    if np.abs(to_new - np.eye(4)).max() > FRAME_TOLERANCE:
+        if GAUSS_PREFIX + "means" in state:
+            transform_gaussians(state, to_new)
+            print(f"[WarmStart] Moved {len(state[GAUSS_PREFIX + 'means']):,} Gaussians into the new dataparser frame")
+        else:
+            print("[WarmStart] ⚠️ The dataparser normalization changed; the field is kept in the old frame "
+                  "and has to be re-fitted by the fine-tuning")
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, WARMSTART_CKPT)
+    # Trainer resumes at step + 1 and loads only the optimizers present; the grad scaler state must stay
+    torch.save({"step": 0, "pipeline": state, "optimizers": {}, "scalers": loaded.get("scalers", {})}, output_path)
+    print(f"[WarmStart] {num_images} training images, written in {time.perf_counter() - started:.1f}s → {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nerfstudio Warm Start")
+    parser.add_argument("--load-config", required=True, help="config.yml of the finished run")
+    parser.add_argument("--data", required=True, help="Updated dataset (transforms.json directory)")
+    parser.add_argument("--output-dir", required=True, help="Checkpoint directory passed to ns-train --load-dir")
+    args = parser.parse_args()
+
+    try:
+        warm_start(args.load_config, args.data, args.output_dir)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"[WarmStart] ❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+PLY I/O
+Reads PLY files without parsing them into Python objects: the header is
+parsed by hand and the vertex table of a binary little-endian file is
+memory-mapped as a NumPy structured array, so a multi-million-point
+Gaussian splat costs no more RAM than the columns that are actually used.
+Shared by the export tools in this directory (convert_ply_to_glb.py,
+compress_splat.py, ...), which also use the Splat column container and
+read_splat / write_splat_ply for Gaussian splats and write_mesh_ply for
+meshes.
+
+Gaussian splat PLYs (3DGS / splatfacto exports) are recognized by their
+properties: x y z, f_dc_0..2, f_rest_*, opacity, scale_0..2, rot_0..3.
+
+Usage (prints the header summary):
+  python3 ply_io.py file.ply
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+FORMATS = {"binary_little_endian": "<", "binary_big_endian": ">", "ascii": None}
+
+SPLAT_PROPERTIES = ("f_dc_0", "opacity", "scale_0", "rot_0")
+# 0th order spherical harmonic: color = 0.5 + SH_C0 * f_dc
+SH_C0 = 0.28209479177387814
+
+
+class PlyError(ValueError):
+    pass
+
+
+class PlyElement:
+    """One element of the header: name, count and properties [(name, type) or (name, (count type, item type))]."""
+
+    def __init__(self, name, count):
+        self.name = name
+        self.count = count
+        self.properties = []
+
+    def has_lists(self):
+        return any(isinstance(t, tuple) for _, t in self.properties)
+
+    def dtype(self, endian="<"):
+        return np.dtype([(name, endian + PLY_TYPES[t]) for name, t in self.properties])
+
+
+class PlyFile:
+    """A parsed PLY: header info plus lazily read element data."""
+
+    def __init__(self, path):
+        self.path = path
+        self.elements = []
+        self.comments = []
+        with open(path, "rb") as f:
+            if f.readline().strip() != b"ply":
+                raise PlyError(f"{path}: not a PLY file")
+            while True:
+                line = f.readline()
+                if not line:
+                    raise PlyError(f"{path}: header has no end_header")
+                words = line.decode("ascii", errors="replace").split()
+                if not words:
+                    continue
+                if words[0] == "format":
+                    if words[1] not in FORMATS:
+                        raise PlyError(f"{path}: unknown format {words[1]}")
+                    self.format = words[1]
+                elif words[0] == "comment":
+                    self.comments.append(line.decode("ascii", errors="replace")[8:].rstrip())
+                elif words[0] == "element":
+                    self.elements.append(PlyElement(words[1], int(words[2])))
+                elif words[0] == "property":
+                    if words[1] == "list":
+                        self.elements[-1].properties.append((words[4], (words[2], words[3])))
+                    else:
+                        self.elements[-1].properties.append((words[2], words[1]))
+                elif words[0] == "end_header":
+                    self.data_offset = f.tell()
+                    break
+        self._vertex = None
+
+    @property
+    def binary(self):
+        return self.format != "ascii"
+
+    @property
+    def endian(self):
+        return FORMATS[self.format]
+
+    def element(self, name):
+        for element in self.elements:
+            if element.name == name:
+                return element
+        return None
+
+    def property_names(self, element="vertex"):
+        el = self.element(element)
+        return [name for name, _ in el.properties] if el else []
+
+    @property
+    def is_gaussian_splat(self):
+        names = set(self.property_names())
+        return all(p in names for p in SPLAT_PROPERTIES)
+
+    @property
+    def face_count(self):
+        face = self.element("face")
+        return face.count if face else 0
+
+    def vertices(self):
+        """Vertex table as a structured array (memory-mapped for binary files)."""
+        if self._vertex is not None:
+            return self._vertex
+        if not self.elements or self.elements[0].name != "vertex":
+            raise PlyError(f"{self.path}: vertex must be the first element")
+        vertex = self.elements[0]
+        if vertex.has_lists():
+            raise PlyError(f"{self.path}: list properties in vertex element are not supported")
+        if self.binary:
+            self._vertex = np.memmap(self.path, dtype=vertex.dtype(self.endian), mode="r",
+                                     offset=self.data_offset, shape=(vertex.count,))
+        else:
+            with open(self.path, "rb") as f:
+                f.seek(self.data_offset)
+                table = np.loadtxt(f, max_rows=vertex.count, ndmin=2)
+            self._vertex = np.rec.fromarrays(table.T[:len(vertex.properties)], dtype=vertex.dtype("="))
+        return self._vertex
+
+    def faces(self):
+        """Triangle indices (N, 3) uint32; polygons are fanned into triangles. None without faces."""
+        face = self.element("face")
+        if face is None or face.count == 0:
+            return None
+        if not self.binary or self.elements.index(face) != 1 or len(face.properties) != 1:
+            raise PlyError(f"{self.path}: only binary PLYs with a single face list after the vertices are supported")
+        count_type, item_type = face.properties[0][1]
+        offset = self.data_offset + self.vertices().nbytes
+        e = self.endian
+        # Fast path: every face is a triangle → fixed-size records
+        tri = np.dtype([("n", e + PLY_TYPES[count_type]), ("v", e + PLY_TYPES[item_type], (3,))])
+        records = np.memmap(self.path, dtype=tri, mode="r", offset=offset, shape=(face.count,))
+        if records.size and (records["n"] == 3).all():
+            return records["v"].astype(np.uint32)
+        return self._polygon_faces(offset, face.count, np.dtype(e + PLY_TYPES[count_type]),
+                                   np.dtype(e + PLY_TYPES[item_type]))
+
+    def _polygon_faces(self, offset, count, count_dtype, item_dtype):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        pos = 0
+        triangles = []
+        for _ in range(count):
+            n = int(np.frombuffer(data, count_dtype, 1, pos)[0])
+            pos += count_dtype.itemsize
+            idx = np.frombuffer(data, item_dtype, n, pos)
+            pos += n * item_dtype.itemsize
+            for k in range(1, n - 1):
+                triangles.append((idx[0], idx[k], idx[k + 1]))
+        return np.asarray(triangles, dtype=np.uint32).reshape(-1, 3)
+
+    def sh_degree(self):
+        """Spherical harmonics degree of a splat (from the number of f_rest_* properties)."""
+        rest = sum(1 for name in self.property_names() if name.startswith("f_rest_"))
+        degree = 0
+        while 3 * ((degree + 2) ** 2 - 1) <= rest:
+            degree += 1
+        return degree
+
+
+def stack(table, names, dtype=np.float32, start=0, stop=None):
+    """Columns of a structured array (or a row range of it) as a (N, len(names)) array."""
+    rows = table[start:stop]
+    out = np.empty((len(rows), len(names)), dtype=dtype)
+    for i, name in enumerate(names):
+        out[:, i] = rows[name]
+    return out
+
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def logit(p, eps=1e-6):
+    p = np.clip(p, eps, 1.0 - eps)
+    return np.log(p / (1.0 - p))
+
+
+def sh_coefficients(degree):
+    """Higher order SH coefficients per color channel for a degree (f_rest_* = 3 × this)."""
+    return (degree + 1) ** 2 - 1
+
+
+class Splat:
+    """Gaussian splat columns in the 3DGS PLY conventions (all float32).
+
+    xyz (N, 3), f_dc (N, 3), f_rest (N, 3, K) channel-major like the PLY,
+    opacity (N,) as logit, scale (N, 3) as log, rot (N, 4) as w, x, y, z.
+    """
+
+    FIELDS = ("xyz", "f_dc", "f_rest", "opacity", "scale", "rot")
+
+    def __init__(self, xyz, f_dc, f_rest, opacity, scale, rot):
+        self.xyz = xyz
+        self.f_dc = f_dc
+        self.f_rest = f_rest
+        self.opacity = opacity
+        self.scale = scale
+        self.rot = rot
+
+    def __len__(self):
+        return len(self.xyz)
+
+    @property
+    def sh_degree(self):
+        degree = 0
+        while sh_coefficients(degree + 1) <= self.f_rest.shape[2]:
+            degree += 1
+        return degree
+
+    def take(self, index):
+        """Subset / reordering of the points (index array or boolean mask)."""
+        return Splat(*(getattr(self, name)[index] for name in self.FIELDS))
+
+    def with_sh_degree(self, degree):
+        """Copy truncated to `degree` (no-op if it is already that low)."""
+        k = sh_coefficients(min(degree, self.sh_degree))
+        return Splat(self.xyz, self.f_dc, self.f_rest[:, :, :k], self.opacity, self.scale, self.rot)
+
+    def normalized_rotations(self):
+        return self.rot / np.maximum(np.linalg.norm(self.rot, axis=1, keepdims=True), 1e-12)
+
+
+def read_splat(path):
+    """Load the Gaussian splat columns of a PLY into memory."""
+    ply = PlyFile(path)
+    if not ply.is_gaussian_splat:
+        raise PlyError(f"{path}: not a Gaussian splat PLY (needs f_dc_*, opacity, scale_*, rot_*)")
+    vertices = ply.vertices()
+    k = sh_coefficients(ply.sh_degree())
+    f_rest = stack(vertices, [f"f_rest_{i}" for i in range(3 * k)]).reshape(len(vertices), 3, k)
+    return Splat(
+        stack(vertices, ["x", "y", "z"]),
+        stack(vertices, ["f_dc_0", "f_dc_1", "f_dc_2"]),
+        f_rest,
+        stack(vertices, ["opacity"])[:, 0],
+        stack(vertices, ["scale_0", "scale_1", "scale_2"]),
+        stack(vertices, ["rot_0", "rot_1", "rot_2", "rot_3"]),
+    )
+
+
+def write_splat_ply(path, splat, block_rows=1 << 18):
+    """Write a splat as a standard binary 3DGS PLY (readable by SuperSplat, PlayCanvas, 3DGS tools)."""
+    k = splat.f_rest.shape[2]
+    names = (["x", "y", "z", "f_dc_0", "f_dc_1", "f_dc_2"] + [f"f_rest_{i}" for i in range(3 * k)]
+             + ["opacity", "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"])
+    header = (f"ply\nformat binary_little_endian 1.0\nelement vertex {len(splat)}\n"
+              + "".join(f"property float {name}\n" for name in names) + "end_header\n")
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        for start in range(0, len(splat), block_rows):
+            part = splat.take(slice(start, start + block_rows))
+            block = np.hstack([part.xyz, part.f_dc, part.f_rest.reshape(len(part), -1), part.opacity[:, None],
+                               part.scale, part.rot]).astype("<f4")
+            f.write(block.tobytes())
+
+
+def write_mesh_ply(path, vertices, faces, colors=None):
+    """Write a triangle mesh as binary PLY (float x y z, optional uchar red green blue, int vertex_indices)."""
+    fields = [("x", "<f4"), ("y", "<f4"), ("z", "<f4")]
+    if colors is not None:
+        fields += [("red", "u1"), ("green", "u1"), ("blue", "u1")]
+    table = np.empty(len(vertices), dtype=fields)
+    table["x"], table["y"], table["z"] = np.asarray(vertices, dtype=np.float32).T
+    if colors is not None:
+        table["red"], table["green"], table["blue"] = np.asarray(colors, dtype=np.uint8).T
+    face_table = np.empty(len(faces), dtype=[("n", "u1"), ("v", "<i4", (3,))])
+    face_table["n"] = 3
+    face_table["v"] = faces
+    types = {"<f4": "float", "u1": "uchar"}
+    header = (f"ply\nformat binary_little_endian 1.0\nelement vertex {len(vertices)}\n"
+              + "".join(f"property {types[t]} {name}\n" for name, t in fields)
+              + f"element face {len(faces)}\nproperty list uchar int vertex_indices\nend_header\n")
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        f.write(table.tobytes())
+        f.write(face_table.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PLY header summary")
+    parser.add_argument("input", help="PLY file")
+    args = parser.parse_args()
+    try:
+        ply = PlyFile(args.input)
+    except (OSError, PlyError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    print(f"[PLY] {args.input}: {ply.format}")
+    for element in ply.elements:
+        print(f"  {element.name}: {element.count:,} ({', '.join(name for name, _ in element.properties)})")
+    if ply.is_gaussian_splat:
+        print(f"  Gaussian splat, SH degree {ply.sh_degree()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Progress Events
+Machine-readable progress for the training wrapper scripts (sugar_train.py,
+2dgs_train.py). Events are appended as JSON lines to the file named by
+STUDIO_PROGRESS_FILE, which the 3DGS Studio worker sets for each job step;
+without it, nothing is written and the scripts behave as before.
+
+Event fields:
+  t           unix time
+  event       "stage" | "progress" | "done"
+  stage       stage name, stage_index (0-based), stages (count)
+  iteration   current iteration of the stage, total: iterations of the stage
+  progress    overall fraction 0..1 (stages weighted by their expected duration)
+  elapsed     seconds since the stage started
+  it_per_s    iterations per second (recent window)
+  eta         seconds left in the stage
+  gpu_mem_mb  GPU memory in use on the job's device
+  ok          ("done" only) whether the pipeline succeeded
+
+stream_output() also takes the tqdm progress bars of the wrapped tools apart
+(they redraw with carriage returns) and prints them only every few seconds,
+so the job log doesn't grow with every redraw.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import deque
+
+# "Training progress:  35%|███▌      | 2450/7000 [01:23<02:35, 29.2it/s, Loss=0.05]"
+TQDM_PATTERN = re.compile(r"(\d+)/(\d+) \[")
+
+GPU_QUERY_INTERVAL = 5.0
+EMIT_INTERVAL = 1.0
+ECHO_INTERVAL = 10.0
+
+
+class ProgressReporter:
+    """Writes progress events for a pipeline of weighted stages."""
+
+    def __init__(self, stages, path=None):
+        total_weight = sum(weight for _, weight in stages) or 1.0
+        self.stages = [(name, weight / total_weight) for name, weight in stages]
+        self.path = path if path is not None else os.environ.get("STUDIO_PROGRESS_FILE")
+        self.index = -1
+        self._stage_start = time.time()
+        self._last_emit = 0.0
+        self._samples = deque(maxlen=30)
+        self._gpu_mem = None
+        self._gpu_checked = 0.0
+
+    def _emit(self, **fields):
+        if not self.path:
+            return
+        event = {"t": round(time.time(), 3), **fields}
+        try:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(event) + "\n")
+        except OSError:
+            self.path = None  # don't fail the pipeline over progress reporting
+
+    def _done_weight(self):
+        return sum(weight for _, weight in self.stages[:max(self.index, 0)])
+
+    def start_stage(self, index):
+        self.index = index
+        self._stage_start = time.time()
+        self._samples.clear()
+        name = self.stages[index][0]
+        self._emit(event="stage", stage=name, stage_index=index, stages=len(self.stages),
+                   progress=round(self._done_weight(), 4), gpu_mem_mb=self.gpu_memory_mb())
+
+    def update(self, iteration, total, force=False):
+        """Report an iteration of the current stage (throttled to EMIT_INTERVAL)."""
+        now = time.time()
+        self._samples.append((now, iteration))
+        if not force and now - self._last_emit < EMIT_INTERVAL:
+            return
+        self._last_emit = now
+        rate = None
+        if len(self._samples) > 1:
+            (t0, i0), (t1, i1) = self._samples[0], self._samples[-1]
+            if t1 > t0 and i1 >= i0:
+                rate = (i1 - i0) / (t1 - t0)
+        eta = (total - iteration) / rate if rate else None
+        name, weight = self.stages[self.index]
+        fraction = min(iteration / total, 1.0) if total else 0.0
+        self._emit(event="progress", stage=name, stage_index=self.index, stages=len(self.stages),
+                   iteration=iteration, total=total, progress=round(self._done_weight() + weight * fraction, 4),
+                   elapsed=round(now - self._stage_start, 1),
+                   it_per_s=round(rate, 2) if rate is not None else None,
+                   eta=round(eta) if eta is not None else None, gpu_mem_mb=self.gpu_memory_mb())
+
+    def finish(self, ok=True):
+        self._emit(event="done", ok=ok, progress=1.0 if ok else round(self._done_weight(), 4))
+
+    def gpu_memory_mb(self):
+        """Used memory of the (first) visible GPU, queried at most every GPU_QUERY_INTERVAL s."""
+        now = time.time()
+        if now - self._gpu_checked < GPU_QUERY_INTERVAL:
+            return self._gpu_mem
+        self._gpu_checked = now
+        cmd = ["nvidia-smi", "--query-gpu=memory.used", "--format=csv,noheader,nounits"]
+        visible = os.environ.get("CUDA_VISIBLE_DEVICES", "").split(",")[0].strip()
+        if visible:
+            cmd.extend(["-i", visible])
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+            self._gpu_mem = int(float(result.stdout.strip().splitlines()[0]))
+        except (OSError, subprocess.TimeoutExpired, ValueError, IndexError):
+            self._gpu_mem = None
+        return self._gpu_mem
+
+
+def _finish_bar(bar, reporter):
+    print(bar, flush=True)
+    if reporter is not None:
+        m = TQDM_PATTERN.search(bar)
+        reporter.update(int(m.group(1)), int(m.group(2)), force=True)
+
+
+def stream_output(process, reporter=None, iteration_pattern=None, total=None):
+    """Echo a process's output and turn tqdm bars into progress events.
+
+    Tools that print plain lines instead of a bar can be followed with
+    `iteration_pattern` (group 1 = iteration) and the stage's `total`.
+    Progress bar redraws are printed at most every ECHO_INTERVAL seconds;
+    everything else is printed as it comes. Returns the exit code.
+    """
+    last_echo = 0.0
+    pending = b""
+    bar = None
+    while True:
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            break
+        pending += chunk
+        *records, pending = re.split(rb"[\r\n]", pending)
+        for record in records:
+            text = record.decode("utf-8", errors="replace")
+            if not text.strip():
+                continue
+            m = TQDM_PATTERN.search(text)
+            if m is None:
+                if bar is not None:
+                    _finish_bar(bar, reporter)  # final state of the bar before it
+                    bar = None
+                print(text, flush=True)
+                if reporter is not None and iteration_pattern is not None and total:
+                    it = iteration_pattern.search(text)
+                    if it:
+                        reporter.update(int(it.group(1)), total)
+                continue
+            bar = text
+            if reporter is not None:
+                reporter.update(int(m.group(1)), int(m.group(2)))
+            now = time.time()
+            if now - last_echo >= ECHO_INTERVAL:
+                last_echo = now
+                print(text, flush=True)
+                bar = None
+    if pending.strip():
+        print(pending.decode("utf-8", errors="replace"), flush=True)
+    if bar is not None:
+        _finish_bar(bar, reporter)
+    sys.stdout.flush()
+    return process.wait()
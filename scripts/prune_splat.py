@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Gaussian Splat Pruner
+Removes splats that cost file size and render time without contributing to
+the image, on the CPU with vectorized NumPy over the PLY vertex columns:
+
+  opacity     sigmoid(opacity) below --min-opacity (invisible after 8-bit color)
+  scale       largest axis below --min-scale (or above --max-scale), relative
+              to the scene extent
+  visibility  centers seen (in front of the camera and inside the image) by
+              fewer than --min-views training cameras — floaters outside every
+              frustum. Needs --cameras: a nerfstudio transforms.json (plus the
+              run's dataparser_transforms.json, whose frame ns-export writes
+              splats in) or a 3DGS cameras.json.
+  duplicates  splats in the same cell of a spatial hash with --dedupe-voxel
+              edge (relative to the extent) are merged into one Gaussian
+              (the moment-matching merge of splat_lod.py)
+
+Writes <name>.pruned.ply and <name>.pruned.json with the count removed by
+each criterion and the size reduction.
+
+Usage:
+  python3 prune_splat.py --input splat.ply [--output out.ply] [--min-opacity 0.005]
+                         [--cameras data/nerfstudio/p/transforms.json --dataparser-transforms run/dataparser_transforms.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from ply_io import PlyError, read_splat, sigmoid, write_splat_ply
+from splat_lod import merge_groups
+
+# Extent = this percentile range of the centers (floaters don't count)
+EXTENT_PERCENTILES = (1.0, 99.0)
+# Points tested per camera at once
+VISIBILITY_BLOCK = 1 << 20
+
+
+# ------------------------------------------
+# Cameras
+# ------------------------------------------
+def load_cameras(path, dataparser_transforms=None):
+    """[(world_to_camera 4x4 in OpenCV convention, fx, fy, cx, cy, width, height)]."""
+    with open(path) as f:
+        data = json.load(f)
+    cameras = []
+    if isinstance(data, list):
+        # 3DGS cameras.json: camera-to-world rotation / position, OpenCV convention
+        for cam in data:
+            c2w = np.eye(4)
+            c2w[:3, :3] = np.asarray(cam["rotation"])
+            c2w[:3, 3] = cam["position"]
+            cameras.append((np.linalg.inv(c2w), cam["fx"], cam["fy"], cam["width"] / 2, cam["height"] / 2,
+                            cam["width"], cam["height"]))
+        return cameras
+
+    # nerfstudio transforms.json: camera-to-world, OpenGL convention (y up, looking down -z)
+    transform = np.eye(4)
+    scale = 1.0
+    if dataparser_transforms:
+        with open(dataparser_transforms) as f:
+            dataparser = json.load(f)
+        transform[:3, :] = np.asarray(dataparser["transform"])
+        scale = float(dataparser.get("scale", 1.0))
+    flip = np.diag([1.0, -1.0, -1.0, 1.0])
+    for frame in data["frames"]:
+        intrinsics = {key: frame.get(key, data.get(key)) for key in ("fl_x", "fl_y", "cx", "cy", "w", "h")}
+        c2w = transform @ np.asarray(frame["transform_matrix"], dtype=np.float64)
+        c2w[:3, 3] *= scale
+        w2c = np.linalg.inv(c2w @ flip)
+        cameras.append((w2c, intrinsics["fl_x"], intrinsics["fl_y"], intrinsics["cx"], intrinsics["cy"],
+                        intrinsics["w"], intrinsics["h"]))
+    return cameras
+
+
+def view_counts(xyz, cameras):
+    """Number of cameras that see each center (in front and inside the image)."""
+    counts = np.zeros(len(xyz), dtype=np.int32)
+    for start in range(0, len(xyz), VISIBILITY_BLOCK):
+        points = xyz[start:start + VISIBILITY_BLOCK].astype(np.float32)
+        for w2c, fx, fy, cx, cy, width, height in cameras:
+            rotation = w2c[:3, :3].astype(np.float32)
+            local = points @ rotation.T + w2c[:3, 3].astype(np.float32)
+            z = local[:, 2]
+            in_front = z > 1e-3
+            z = np.where(in_front, z, 1.0)
+            u = local[:, 0] / z * fx + cx
+            v = local[:, 1] / z * fy + cy
+            counts[start:start + len(points)] += in_front & (u >= 0) & (u < width) & (v >= 0) & (v < height)
+    return counts
+
+
+# ------------------------------------------
+# Pruning
+# ------------------------------------------
+def dedupe(splat, voxel):
+    """Merge splats that share a spatial hash cell of edge `voxel`. Returns (splat, number removed)."""
+    cells = np.floor(splat.xyz / voxel).astype(np.int64)
+    _, group, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    group = group.reshape(-1)
+    if counts.max(initial=0) <= 1:
+        return splat, 0
+    shared = counts[group] > 1
+    order = np.flatnonzero(shared)[np.argsort(group[shared], kind="stable")]
+    keys = group[order]
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    merged = merge_groups(splat.take(order), starts)
+    single = splat.take(~shared)
+    fields = [np.concatenate([getattr(single, name), getattr(merged, name)]) for name in single.FIELDS]
+    return type(splat)(*fields), int(shared.sum() - len(starts))
+
+
+def prune(input_path, output_path, min_opacity=0.005, min_scale=1e-5, max_scale=None, cameras=None,
+          dataparser_transforms=None, min_views=1, dedupe_voxel=None):
+    """Write the pruned splat and return the report (also saved next to it as .json)."""
+    started = time.perf_counter()
+    splat = read_splat(input_path)
+    total = len(splat)
+    if not total:
+        raise PlyError(f"{input_path}: no splats")
+    print(f"[Prune] {input_path}: {total:,} splats")
+
+    lo, hi = np.percentile(splat.xyz, EXTENT_PERCENTILES, axis=0)
+    extent = max(float(np.linalg.norm(hi - lo)), 1e-9)
+    removed = {}
+
+    def apply(name, keep):
+        nonlocal splat
+        removed[name] = int(len(keep) - keep.sum())
+        splat = splat.take(keep)
+        print(f"[Prune] {name}: -{removed[name]:,}")
+
+    apply("opacity", sigmoid(splat.opacity) >= min_opacity)
+    largest = np.exp(splat.scale.max(axis=1)) / extent
+    keep = largest >= min_scale
+    if max_scale is not None:
+        keep &= largest <= max_scale
+    apply("scale", keep)
+    if cameras:
+        camera_list = load_cameras(cameras, dataparser_transforms)
+        apply("visibility", view_counts(splat.xyz, camera_list) >= min_views)
+    if dedupe_voxel:
+        splat, removed["duplicates"] = dedupe(splat, dedupe_voxel * extent)
+        print(f"[Prune] duplicates: -{removed['duplicates']:,}")
+
+    write_splat_ply(output_path, splat)
+    input_bytes, output_bytes = os.path.getsize(input_path), os.path.getsize(output_path)
+    report = {
+        "input": input_path, "output": output_path, "points_in": total, "points_out": len(splat),
+        "removed": removed, "input_mb": round(input_bytes / (1024 * 1024), 2),
+        "output_mb": round(output_bytes / (1024 * 1024), 2),
+        "reduction": round(1 - output_bytes / input_bytes, 4), "seconds": round(time.perf_counter() - started, 2),
+        "settings": {"min_opacity": min_opacity, "min_scale": min_scale, "max_scale": max_scale,
+                     "cameras": cameras, "min_views": min_views, "dedupe_voxel": dedupe_voxel},
+    }
+    report_path = os.path.splitext(output_path)[0] + ".json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[Prune] {total:,} → {len(splat):,} splats ({len(splat) / total:.1%}), "
+          f"{report['input_mb']:.1f} → {report['output_mb']:.1f} MB in {report['seconds']:.1f}s → {output_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gaussian Splat Pruner")
+    parser.add_argument("--input", required=True, help="Gaussian splat PLY")
+    parser.add_argument("--output", help="Output PLY (default: <input>.pruned.ply)")
+    parser.add_argument("--min-opacity", type=float, default=0.005, help="Minimum opacity after sigmoid")
+    parser.add_argument("--min-scale", type=float, default=1e-5,
+                        help="Minimum largest axis, relative to the scene extent")
+    parser.add_argument("--max-scale", type=float, help="Maximum largest axis, relative to the scene extent")
+    parser.add_argument("--cameras", help="transforms.json (nerfstudio) or cameras.json (3DGS) for visibility")
+    parser.add_argument("--dataparser-transforms",
+                        help="dataparser_transforms.json of the nerfstudio run (maps transforms.json cameras)")
+    parser.add_argument("--min-views", type=int, default=1, help="Minimum number of cameras seeing a splat")
+    parser.add_argument("--dedupe-voxel", type=float,
+                        help="Merge splats sharing a hash cell of this edge, relative to the extent (e.g. 0.0005)")
+    args = parser.parse_args()
+
+    for path in (args.input, args.cameras, args.dataparser_transforms):
+        if path and not os.path.exists(path):
+            print(f"[ERROR] File not found: {path}")
+            sys.exit(1)
+    output = args.output or os.path.splitext(args.input)[0] + ".pruned.ply"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    try:
+        prune(args.input, output, args.min_opacity, args.min_scale, args.max_scale, args.cameras,
+              args.dataparser_transforms, args.min_views, args.dedupe_voxel)
+    except (PlyError, KeyError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
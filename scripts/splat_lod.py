@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Gaussian Splat LOD Builder
+Splits a Gaussian splat PLY into octree tiles at several levels of detail
+and writes a JSON index, so a viewer can stream the coarse levels first and
+refine tile by tile instead of downloading and sorting every splat.
+
+  level 0   the input splats
+  level n   level n-1 merged in octree voxels: each voxel's splats become one
+            Gaussian (opacity × projected-area weighted mean position and
+            color, moment-matched covariance, opacity preserving the covered
+            area); merged splats that end up nearly transparent are dropped.
+            The voxel size is the smallest power-of-two octree cell that
+            cuts the count to --lod-ratio of the previous level.
+
+Every level is tiled with the same octree (splitting nodes above
+--tile-points), so coarse levels come in fewer, larger tiles. index.json
+lists per level the geometric error (voxel size; 0 for level 0) and per tile
+the octree node (octal octant path), bounds of the splat centers, count and
+file, in the style of 3D Tiles:
+  <output>/index.json, <output>/lod<n>/r<path>.compressed.ply
+
+Usage:
+  python3 splat_lod.py --input splat.ply [--output splat_lod] [--levels 4] [--tile-points 65536]
+                       [--format compressed-ply|ply|splat] [--sh-degree 0-3]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from compress_splat import ENCODERS, FORMATS
+from ply_io import PlyError, Splat, logit, read_splat, sigmoid
+
+# Octree depth of the Morton codes (3 bits per level, fits in uint64)
+OCTREE_DEPTH = 20
+# Merged splats below this opacity are dropped (invisible after 8-bit quantization)
+MIN_ALPHA = 1.0 / 255.0
+MAX_ALPHA = 0.99
+# Rows merged per batch (bounds the temporary covariance arrays)
+MERGE_BATCH_ROWS = 1 << 19
+
+
+# ------------------------------------------
+# Octree
+# ------------------------------------------
+def _spread_bits(v):
+    """Insert two zero bits between the low 21 bits of each value."""
+    v = v.astype(np.uint64) & np.uint64(0x1FFFFF)
+    for shift, mask in ((32, 0x1F00000000FFFF), (16, 0x1F0000FF0000FF), (8, 0x100F00F00F00F00F),
+                        (4, 0x10C30C30C30C30C3), (2, 0x1249249249249249)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+class Octree:
+    """Cube around the splat centers; codes() gives each point the Morton code of its cell at OCTREE_DEPTH."""
+
+    def __init__(self, xyz):
+        lo, hi = xyz.min(axis=0).astype(np.float64), xyz.max(axis=0).astype(np.float64)
+        self.size = max(float((hi - lo).max()), 1e-9) * (1 + 1e-6)
+        self.origin = (lo + hi) / 2.0 - self.size / 2.0
+
+    def codes(self, xyz):
+        cells = (1 << OCTREE_DEPTH) - 1
+        q = np.clip((xyz - self.origin) / self.size * (1 << OCTREE_DEPTH), 0, cells)
+        x, y, z = (_spread_bits(q[:, axis]) for axis in range(3))
+        return x | (y << np.uint64(1)) | (z << np.uint64(2))
+
+    def cell_size(self, depth):
+        return self.size / (1 << depth)
+
+
+def tile_ranges(codes, max_points, max_depth=OCTREE_DEPTH):
+    """Split sorted codes into octree nodes of at most max_points: [(depth, prefix, start, stop)]."""
+    tiles = []
+    stack = [(0, 0, 0, len(codes))]
+    while stack:
+        depth, prefix, start, stop = stack.pop()
+        if stop - start <= max_points or depth == max_depth:
+            tiles.append((depth, prefix, start, stop))
+            continue
+        shift = 3 * (OCTREE_DEPTH - depth - 1)
+        edges = np.array([((prefix << 3) + c) << shift for c in range(9)], dtype=np.uint64)
+        bounds = np.searchsorted(codes[start:stop], edges[:8]).tolist() + [stop - start]
+        for c in reversed(range(8)):
+            if bounds[c] < bounds[c + 1]:
+                stack.append((depth + 1, (prefix << 3) + c, start + bounds[c], start + bounds[c + 1]))
+    return sorted(tiles, key=lambda t: t[2])
+
+
+def node_name(depth, prefix):
+    """Octant path of a node: one octal digit per level below the root."""
+    return "r" + (format(prefix, f"0{depth}o") if depth else "")
+
+
+# ------------------------------------------
+# Merging
+# ------------------------------------------
+def quaternion_to_matrix(q):
+    w, x, y, z = (q / np.linalg.norm(q, axis=1, keepdims=True)).T
+    return np.stack([
+        1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y),
+        2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x),
+        2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y),
+    ], axis=1).reshape(-1, 3, 3)
+
+
+def matrix_to_quaternion(m):
+    """Rotation matrices → unit quaternions (w, x, y, z), using the largest component for stability."""
+    d0, d1, d2 = m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]
+    squares = np.stack([1 + d0 + d1 + d2, 1 + d0 - d1 - d2, 1 - d0 + d1 - d2, 1 - d0 - d1 + d2], axis=1) / 4
+    largest = squares.argmax(axis=1)
+    r = np.sqrt(np.maximum(squares[np.arange(len(m)), largest], 1e-12))
+    a, b, c = m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0], m[:, 1, 0] - m[:, 0, 1]
+    e, f, g = m[:, 0, 1] + m[:, 1, 0], m[:, 0, 2] + m[:, 2, 0], m[:, 1, 2] + m[:, 2, 1]
+    candidates = np.stack([
+        np.stack([r, a / (4 * r), b / (4 * r), c / (4 * r)], axis=1),
+        np.stack([a / (4 * r), r, e / (4 * r), f / (4 * r)], axis=1),
+        np.stack([b / (4 * r), e / (4 * r), r, g / (4 * r)], axis=1),
+        np.stack([c / (4 * r), f / (4 * r), g / (4 * r), r], axis=1),
+    ], axis=1)
+    return candidates[np.arange(len(m)), largest]
+
+
+def merge_groups(splat, starts):
+    """Merge contiguous groups of splats (group i = rows starts[i]:starts[i+1]) into one Gaussian each."""
+    alpha = sigmoid(splat.opacity.astype(np.float64))
+    scale = np.exp(splat.scale.astype(np.float64))
+    area = np.prod(scale, axis=1) ** (2.0 / 3.0)  # projected area up to a constant
+    weight = alpha * area + 1e-30
+
+    def wsum(values):
+        return np.add.reduceat(values * weight.reshape(-1, *([1] * (values.ndim - 1))), starts, axis=0)
+
+    total = np.add.reduceat(weight, starts)
+    norm = total.reshape(-1, 1)
+    xyz = wsum(splat.xyz.astype(np.float64)) / norm
+
+    # Moment matching: Σ = Σ w (R S² Rᵀ + d dᵀ) / Σ w with d the offset from the merged mean
+    rotation = quaternion_to_matrix(splat.rot.astype(np.float64))
+    cov = rotation @ (scale[:, :, None] ** 2 * np.swapaxes(rotation, 1, 2))
+    group = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(splat))))
+    offset = splat.xyz - xyz[group]
+    cov += offset[:, :, None] * offset[:, None, :]
+    cov = wsum(cov) / total[:, None, None]
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    eigenvectors[np.linalg.det(eigenvectors) < 0, :, 2] *= -1  # proper rotation
+    merged_scale = np.sqrt(np.maximum(eigenvalues, 1e-18))
+
+    # Keep opacity × projected area: the merged splat covers what its parts covered
+    merged_area = np.prod(merged_scale, axis=1) ** (2.0 / 3.0)
+    merged_alpha = np.clip(np.add.reduceat(alpha * area, starts) / merged_area, 0.0, MAX_ALPHA)
+
+    n = len(starts)
+    return Splat(
+        xyz.astype(np.float32),
+        (wsum(splat.f_dc.astype(np.float64)) / norm).astype(np.float32),
+        (wsum(splat.f_rest.astype(np.float64)) / total[:, None, None]).astype(np.float32).reshape(n, 3, -1),
+        logit(merged_alpha).astype(np.float32),
+        np.log(merged_scale).astype(np.float32),
+        matrix_to_quaternion(eigenvectors).astype(np.float32),
+    )
+
+
+def coarsen(splat, codes, first_shift, target):
+    """Merge splats in the smallest octree cells (from first_shift up) that leave at most `target` of them.
+
+    Returns (merged splat, its sorted codes, shift used).
+    """
+    for shift in range(first_shift, OCTREE_DEPTH + 1):
+        keys = codes >> np.uint64(3 * shift)
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        if len(starts) <= target or shift == OCTREE_DEPTH:
+            break
+    # Merge in batches of whole groups so the (N, 3, 3) covariances stay small
+    parts = []
+    bounds = np.append(starts, len(splat))
+    batch_starts = np.searchsorted(starts, np.arange(0, len(splat), MERGE_BATCH_ROWS))
+    for first, last in zip(batch_starts, np.append(batch_starts[1:], len(starts))):
+        if first < last:
+            rows = slice(bounds[first], bounds[last])
+            parts.append(merge_groups(splat.take(rows), starts[first:last] - bounds[first]))
+    merged = Splat(*(np.concatenate([getattr(p, name) for p in parts]) for name in Splat.FIELDS))
+    keep = sigmoid(merged.opacity) >= MIN_ALPHA
+    merged = merged.take(keep)
+    return merged, codes[starts][keep], shift
+
+
+# ------------------------------------------
+# Build
+# ------------------------------------------
+def build_lod(input_path, output_dir, levels=4, lod_ratio=0.25, min_points=20000, tile_points=65536,
+              fmt="compressed-ply", sh_degree=None):
+    """Write the tiles of every level and index.json; returns the index."""
+    started = time.perf_counter()
+    splat = read_splat(input_path)
+    if not len(splat):
+        raise PlyError(f"{input_path}: no splats")
+    if sh_degree is not None:
+        splat = splat.with_sh_degree(sh_degree)
+    print(f"[LOD] {input_path}: {len(splat):,} splats, SH degree {splat.sh_degree}")
+
+    octree = Octree(splat.xyz)
+    codes = octree.codes(splat.xyz)
+    order = np.argsort(codes, kind="stable")
+    splat, codes = splat.take(order), codes[order]
+
+    encode, suffix = ENCODERS[fmt]
+    index = {"version": 1, "source": os.path.basename(input_path), "format": fmt, "sh_degree": splat.sh_degree,
+             "octree": {"origin": octree.origin.tolist(), "size": octree.size}, "levels": []}
+    shift = 0
+    for level in range(levels):
+        if level:
+            if len(splat) <= min_points:
+                break
+            t0 = time.perf_counter()
+            splat, codes, shift = coarsen(splat, codes, shift + 1, int(len(splat) * lod_ratio))
+            print(f"[LOD] Level {level}: merged to {len(splat):,} splats "
+                  f"(voxel {octree.cell_size(OCTREE_DEPTH - shift):.4g}) in {time.perf_counter() - t0:.1f}s")
+
+        level_dir = os.path.join(output_dir, f"lod{level}")
+        os.makedirs(level_dir, exist_ok=True)
+        tiles = []
+        for depth, prefix, start, stop in tile_ranges(codes, tile_points):
+            part = splat.take(slice(start, stop))
+            name = node_name(depth, prefix) + suffix
+            encode(os.path.join(level_dir, name), part)
+            tiles.append({
+                "node": node_name(depth, prefix), "depth": depth, "file": f"lod{level}/{name}",
+                "points": stop - start, "bytes": os.path.getsize(os.path.join(level_dir, name)),
+                "min": part.xyz.min(axis=0).tolist(), "max": part.xyz.max(axis=0).tolist(),
+            })
+        index["levels"].append({
+            "level": level, "points": len(splat),
+            "geometric_error": octree.cell_size(OCTREE_DEPTH - shift) if level else 0.0,
+            "bytes": sum(t["bytes"] for t in tiles), "tiles": tiles,
+        })
+        print(f"[LOD] Level {level}: {len(tiles)} tiles, {index['levels'][-1]['bytes'] / (1024 * 1024):.1f} MB")
+
+    with open(os.path.join(output_dir, "index.json"), "w") as f:
+        json.dump(index, f, indent=1)
+    print(f"[LOD] Done: {len(index['levels'])} levels → {output_dir}/index.json "
+          f"({time.perf_counter() - started:.1f}s)")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gaussian Splat LOD Builder")
+    parser.add_argument("--input", required=True, help="Gaussian splat PLY")
+    parser.add_argument("--output", help="Output directory (default: <input>_lod next to the input)")
+    parser.add_argument("--levels", type=int, default=4, help="Maximum number of levels incl. the full one")
+    parser.add_argument("--lod-ratio", type=float, default=0.25, help="Splat count of a level vs the previous one")
+    parser.add_argument("--min-points", type=int, default=20000, help="Stop coarsening below this many splats")
+    parser.add_argument("--tile-points", type=int, default=65536, help="Maximum splats per tile")
+    parser.add_argument("--format", choices=FORMATS, default="compressed-ply", help="Tile file format")
+    parser.add_argument("--sh-degree", type=int, choices=[0, 1, 2, 3],
+                        help="Keep spherical harmonics up to this degree (default: all)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"[ERROR] Input file not found: {args.input}")
+        sys.exit(1)
+    output_dir = args.output or os.path.splitext(args.input)[0] + "_lod"
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        build_lod(args.input, output_dir, args.levels, args.lod_ratio, args.min_points, args.tile_points,
+                  args.format, args.sh_degree)
+    except PlyError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Splatfacto → 3DGS Model Converter
+Turns a finished nerfstudio splatfacto run into the output directory of the
+original 3DGS train.py, so SuGaR can start from it instead of pre-training
+its own 3DGS model:
+
+  <model-dir>/
+    point_cloud/iteration_<N>/point_cloud.ply   Gaussians in the COLMAP frame
+    cameras.json                                training cameras (3DGS format)
+    cfg_args                                    3DGS training arguments
+
+ns-export gaussian-splat writes splats in nerfstudio's normalized frame:
+COLMAP world → transforms.json (applied_transform) → dataparser transform
+and scale (dataparser_transforms.json of the run). The converter inverts that
+similarity: centers and rotations are transformed, log-scales shifted, and
+the view-dependent SH coefficients rotated band by band. SH is padded to
+degree 3, which 3DGS / SuGaR load unconditionally.
+
+Usage:
+  python3 splatfacto_to_3dgs.py --input exports/<run>/splat.ply --transforms data/nerfstudio/<project>/transforms.json \\
+                                --dataparser-transforms outputs/<project>/splatfacto/<ts>/dataparser_transforms.json \\
+                                --model-dir outputs/<project>/sugar/gs_output [--iteration 7000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from ply_io import PlyError, Splat, read_splat, sh_coefficients, write_splat_ply
+from splat_lod import matrix_to_quaternion, quaternion_to_matrix
+
+# 3DGS / SuGaR build their GaussianModel with this SH degree
+SH_DEGREE = 3
+# Real SH constants of 3DGS's sh_utils.eval_sh (bands 1-3)
+SH_C1 = 0.4886025119029199
+SH_C2 = (1.0925484305920792, -1.0925484305920792, 0.31539156525252005, -1.0925484305920792, 0.5462742152960396)
+SH_C3 = (-0.5900435899266435, 2.890611442640554, -0.4570457994644658, 0.3731763325901154,
+         -0.4570457994644658, 1.445305721320277, -0.5900435899266435)
+# Directions used to fit the SH rotation matrices
+SH_FIT_SAMPLES = 256
+# colmap_to_json's world conversion, for transforms.json without applied_transform
+DEFAULT_APPLIED_TRANSFORM = [[1.0, 0.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, -1.0, 0.0, 0.0]]
+
+
+# ------------------------------------------
+# Frames
+# ------------------------------------------
+def nerfstudio_frame(transforms, dataparser_transforms=None):
+    """4x4 similarity from the COLMAP world frame to the frame ns-export writes splats in."""
+    applied = np.eye(4)
+    if "applied_transform" in transforms:
+        applied[:3, :] = np.asarray(transforms["applied_transform"])
+    else:
+        print("[Import] transforms.json has no applied_transform, assuming colmap_to_json's default")
+        applied[:3, :] = np.asarray(DEFAULT_APPLIED_TRANSFORM)
+    dataparser, scale = np.eye(4), 1.0
+    if dataparser_transforms:
+        with open(dataparser_transforms) as f:
+            data = json.load(f)
+        dataparser[:3, :] = np.asarray(data["transform"])
+        scale = float(data.get("scale", 1.0))
+    return np.diag([scale, scale, scale, 1.0]) @ dataparser @ applied
+
+
+def sh_basis(dirs):
+    """Real SH basis of bands 1-3 at unit directions (M, 3) → (M, 15), in 3DGS's coefficient order."""
+    x, y, z = dirs.T
+    xx, yy, zz = x * x, y * y, z * z
+    return np.stack([
+        -SH_C1 * y, SH_C1 * z, -SH_C1 * x,
+        SH_C2[0] * x * y, SH_C2[1] * y * z, SH_C2[2] * (2 * zz - xx - yy), SH_C2[3] * x * z, SH_C2[4] * (xx - yy),
+        SH_C3[0] * y * (3 * xx - yy), SH_C3[1] * x * y * z, SH_C3[2] * y * (4 * zz - xx - yy),
+        SH_C3[3] * z * (2 * zz - 3 * xx - 3 * yy), SH_C3[4] * x * (4 * zz - xx - yy),
+        SH_C3[5] * z * (xx - yy), SH_C3[6] * x * (xx - 3 * yy),
+    ], axis=1)
+
+
+def sh_rotation(rotation):
+    """(15, 15) block-diagonal matrix taking SH coefficients to a frame rotated by `rotation`.
+
+    Rotated coefficients c' must give color'(d) = color(R^T d) for every
+    direction; each band is closed under rotation, so the block is the
+    least-squares fit of that identity over sample directions.
+    """
+    rng = np.random.default_rng(0)
+    dirs = rng.normal(size=(SH_FIT_SAMPLES, 3))
+    dirs /= np.linalg.norm(dirs, axis=1, keepdims=True)
+    target, source = sh_basis(dirs), sh_basis(dirs @ rotation)  # rows of dirs @ R = R^T d
+    matrix = np.zeros((15, 15))
+    for lo, hi in ((0, 3), (3, 8), (8, 15)):
+        matrix[lo:hi, lo:hi] = np.linalg.lstsq(target[:, lo:hi], source[:, lo:hi], rcond=None)[0]
+    return matrix
+
+
+def transform_splat(splat, matrix):
+    """Apply a similarity (4x4, uniform scale) to every Gaussian; SH must be degree 3."""
+    linear = matrix[:3, :3]
+    scale = np.cbrt(np.linalg.det(linear))
+    rotation = linear / scale
+    xyz = splat.xyz.astype(np.float64) @ linear.T + matrix[:3, 3]
+    rot = matrix_to_quaternion(rotation @ quaternion_to_matrix(splat.rot.astype(np.float64)))
+    f_rest = splat.f_rest @ sh_rotation(rotation).T.astype(np.float32)
+    return Splat(xyz.astype(np.float32), splat.f_dc, f_rest, splat.opacity,
+                 (splat.scale + np.log(scale)).astype(np.float32), rot.astype(np.float32))
+
+
+def pad_sh(splat, degree=SH_DEGREE):
+    k = sh_coefficients(degree)
+    if splat.f_rest.shape[2] >= k:
+        return splat.with_sh_degree(degree)
+    f_rest = np.zeros((len(splat), 3, k), dtype=np.float32)
+    f_rest[:, :, :splat.f_rest.shape[2]] = splat.f_rest
+    return Splat(splat.xyz, splat.f_dc, f_rest, splat.opacity, splat.scale, splat.rot)
+
+
+def cameras_json(transforms, to_colmap):
+    """Training cameras of transforms.json in the 3DGS cameras.json format (COLMAP frame, OpenCV axes)."""
+    flip = np.diag([1.0, -1.0, -1.0, 1.0])
+    cameras = []
+    for i, frame in enumerate(sorted(transforms["frames"], key=lambda frame: frame["file_path"])):
+        c2w = to_colmap @ np.asarray(frame["transform_matrix"], dtype=np.float64) @ flip
+        # Intrinsics are per frame or shared at the top level
+        intrinsics = {key: frame.get(key, transforms.get(key)) for key in ("fl_x", "fl_y", "w", "h")}
+        cameras.append({
+            "id": i, "img_name": os.path.splitext(os.path.basename(frame["file_path"]))[0],
+            "width": int(intrinsics["w"]), "height": int(intrinsics["h"]),
+            "position": c2w[:3, 3].tolist(), "rotation": c2w[:3, :3].tolist(),
+            "fx": float(intrinsics["fl_x"]), "fy": float(intrinsics["fl_y"]),
+        })
+    return cameras
+
+
+# ------------------------------------------
+# Conversion
+# ------------------------------------------
+def convert(input_path, transforms_path, model_dir, dataparser_transforms=None, iteration=7000, source_path=""):
+    """Write the 3DGS model directory; returns the path of its point_cloud.ply."""
+    started = time.perf_counter()
+    with open(transforms_path) as f:
+        transforms = json.load(f)
+    to_splat = nerfstudio_frame(transforms, dataparser_transforms)
+    to_colmap = np.linalg.inv(to_splat)
+
+    splat = read_splat(input_path)
+    if not len(splat):
+        raise PlyError(f"{input_path}: no splats")
+    print(f"[Import] {input_path}: {len(splat):,} splats, SH degree {splat.sh_degree}")
+    splat = transform_splat(pad_sh(splat), to_colmap)
+
+    ply_dir = os.path.join(model_dir, "point_cloud", f"iteration_{iteration}")
+    os.makedirs(ply_dir, exist_ok=True)
+    ply_path = os.path.join(ply_dir, "point_cloud.ply")
+    write_splat_ply(ply_path, splat)
+    # Camera poses in transforms.json are in the applied_transform frame, before the dataparser
+    applied = np.linalg.inv(nerfstudio_frame(transforms))
+    with open(os.path.join(model_dir, "cameras.json"), "w") as f:
+        json.dump(cameras_json(transforms, applied), f)
+    with open(os.path.join(model_dir, "cfg_args"), "w") as f:
+        f.write(f"Namespace(data_device='cuda', eval=False, images='images', model_path='{model_dir}', "
+                f"resolution=-1, sh_degree={SH_DEGREE}, source_path='{source_path}', white_background=False)")
+    print(f"[Import] 3DGS model (iteration {iteration}) in {time.perf_counter() - started:.1f}s → {model_dir}")
+    return ply_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Splatfacto → 3DGS Model Converter")
+    parser.add_argument("--input", required=True, help="Gaussian splat PLY from ns-export gaussian-splat")
+    parser.add_argument("--transforms", required=True, help="transforms.json of the nerfstudio dataset")
+    parser.add_argument("--dataparser-transforms", help="dataparser_transforms.json of the splatfacto run")
+    parser.add_argument("--model-dir", required=True, help="3DGS output directory to write")
+    parser.add_argument("--iteration", type=int, default=7000, help="Iteration the model is saved as")
+    parser.add_argument("--source-path", default="", help="COLMAP scene recorded in cfg_args")
+    args = parser.parse_args()
+
+    for path in (args.input, args.transforms, args.dataparser_transforms):
+        if path and not os.path.exists(path):
+            print(f"[ERROR] File not found: {path}")
+            sys.exit(1)
+    try:
+        convert(args.input, args.transforms, args.model_dir, args.dataparser_transforms, args.iteration,
+                args.source_path)
+    except (PlyError, KeyError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
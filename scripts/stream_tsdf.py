@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Streaming TSDF Fusion
+Meshes a trained 2DGS model without the two passes of render.py, which
+first renders every view of the training set into memory (and writes the
+renders to disk) and only then integrates them into Open3D's TSDF volume,
+so peak RAM grows with views × resolution:
+
+  1. a producer thread renders one training view at a time on the GPU
+     (color + surface depth, like render.py) into a queue of --queue views
+  2. the fusion consumes the queue and integrates each view into a sparse
+     voxel-block hash: only 8³ blocks within the truncation band of an
+     observed surface are allocated. Integration is vectorized NumPy,
+     split over --workers threads by block (NumPy releases the GIL)
+  3. marching cubes runs per block (each block plus a one-voxel border
+     from its neighbors), seam vertices are welded, and like render.py
+     fuse_post.ply keeps only the --num-cluster largest connected pieces
+
+Memory is bounded by the queue and the allocated blocks (proportional to
+the surface area, not the number of views). Volume parameters follow
+render.py: depth_trunc = 2 × scene radius, voxel = depth_trunc / --mesh-res,
+sdf_trunc = 5 voxels. Writes fuse.ply, fuse_post.ply and fusion.json
+(timings, blocks, memory) to --output-dir; bench_tsdf.py compares it with
+the two-pass approach.
+
+Usage:
+  python3 stream_tsdf.py --model-dir /workspace/outputs/<project>/2dgs/model --output-dir .../2dgs/mesh
+                         [--depth-ratio 0] [--mesh-res 1024] [--workers 8]
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ply_io import write_mesh_ply
+
+BLOCK = 8
+# Blocks integrated per vectorized batch (BLOCK³ voxels each)
+BATCH_BLOCKS = 1024
+# Pixel stride of the allocation pass (blocks are much larger than a pixel footprint)
+ALLOCATION_STRIDE = 2
+# Block coordinates are packed into one int64 key, 21 bits per axis
+KEY_BITS = 21
+KEY_OFFSET = 1 << (KEY_BITS - 1)
+DGS_DIR = "/opt/2dgs"
+
+# rgb (H, W, 3) uint8 or None, depth (H, W) float32 (0 = no surface), K (3, 3), world_to_camera (4, 4)
+View = namedtuple("View", ["rgb", "depth", "K", "world_to_camera"])
+
+
+def block_keys(coords):
+    shifted = coords.astype(np.int64) + KEY_OFFSET
+    return (shifted[:, 0] << (2 * KEY_BITS)) | (shifted[:, 1] << KEY_BITS) | shifted[:, 2]
+
+
+# ------------------------------------------
+# Sparse TSDF volume
+# ------------------------------------------
+class BlockTSDF:
+    """Truncated signed distance field stored in BLOCK³ voxel blocks allocated on demand."""
+
+    def __init__(self, voxel_size, sdf_trunc, depth_trunc, workers=None, colors=True):
+        self.voxel_size = voxel_size
+        self.sdf_trunc = sdf_trunc
+        self.depth_trunc = depth_trunc
+        self.workers = workers or os.cpu_count() or 1
+        self.colors = colors
+        self.slots = {}  # block key -> row in the arrays below
+        self.coords = np.zeros((0, 3), dtype=np.int32)
+        self.tsdf = np.ones((0, BLOCK, BLOCK, BLOCK), dtype=np.float32)
+        self.weight = np.zeros((0, BLOCK, BLOCK, BLOCK), dtype=np.float32)
+        self.color = np.zeros((0, BLOCK, BLOCK, BLOCK, 3), dtype=np.uint8)
+        grid = np.stack(np.meshgrid(*[np.arange(BLOCK)] * 3, indexing="ij"), axis=-1).reshape(-1, 3)
+        self._voxel_offsets = ((grid + 0.5) * voxel_size).astype(np.float32)  # voxel centers in a block
+        self._pool = ThreadPoolExecutor(self.workers)
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def nbytes(self):
+        return self.tsdf.nbytes + self.weight.nbytes + self.color.nbytes + self.coords.nbytes
+
+    def _grow(self, count):
+        """Make room for `count` more blocks (capacity doubles)."""
+        needed = len(self.slots) + count
+        if needed <= len(self.tsdf):
+            return
+        capacity = max(needed, 2 * len(self.tsdf), 1024)
+        extra = capacity - len(self.tsdf)
+        self.coords = np.concatenate([self.coords, np.zeros((extra, 3), dtype=np.int32)])
+        self.tsdf = np.concatenate([self.tsdf, np.ones((extra, BLOCK, BLOCK, BLOCK), dtype=np.float32)])
+        self.weight = np.concatenate([self.weight, np.zeros((extra, BLOCK, BLOCK, BLOCK), dtype=np.float32)])
+        if self.colors:
+            self.color = np.concatenate([self.color, np.zeros((extra, BLOCK, BLOCK, BLOCK, 3), dtype=np.uint8)])
+
+    def allocate(self, coords):
+        """Rows of the given blocks (unique coords), allocating the new ones."""
+        keys = block_keys(coords).tolist()
+        rows = np.fromiter((self.slots.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+        new = np.flatnonzero(rows < 0)
+        if len(new):
+            self._grow(len(new))
+            start = len(self.slots)
+            rows[new] = np.arange(start, start + len(new))
+            self.coords[start:start + len(new)] = coords[new]
+            self.slots.update(zip((keys[i] for i in new), rows[new].tolist()))
+        return rows
+
+    def _surface_blocks(self, view):
+        """Blocks crossed by the truncation band around the observed depth."""
+        depth = view.depth[::ALLOCATION_STRIDE, ::ALLOCATION_STRIDE]
+        v, u = np.nonzero((depth > 0) & (depth < self.depth_trunc))
+        z = depth[v, u]
+        K = view.K
+        rays = np.stack([(u * ALLOCATION_STRIDE - K[0, 2]) / K[0, 0],
+                         (v * ALLOCATION_STRIDE - K[1, 2]) / K[1, 1], np.ones_like(z)], axis=1)
+        camera_to_world = np.linalg.inv(view.world_to_camera)
+        block_size = BLOCK * self.voxel_size
+        coords = []
+        # Samples across the band are closer than a block, so every crossed block is hit
+        for offset in np.arange(-self.sdf_trunc, self.sdf_trunc + 1e-9, min(self.sdf_trunc, block_size / 2)):
+            points = rays * np.maximum(z + offset, 1e-6)[:, None]
+            world = points @ camera_to_world[:3, :3].T + camera_to_world[:3, 3]
+            coords.append(np.floor(world / block_size).astype(np.int32))
+        return np.unique(np.concatenate(coords), axis=0)
+
+    def _integrate_rows(self, rows, view):
+        origins = self.coords[rows].astype(np.float32) * (BLOCK * self.voxel_size)
+        points = (origins[:, None, :] + self._voxel_offsets[None]).reshape(-1, 3)
+        R = view.world_to_camera[:3, :3].astype(np.float32)
+        local = points @ R.T + view.world_to_camera[:3, 3].astype(np.float32)
+        z = local[:, 2]
+        in_front = z > 1e-6
+        z_safe = np.where(in_front, z, 1.0)
+        K = view.K
+        u = np.rint(local[:, 0] / z_safe * K[0, 0] + K[0, 2]).astype(np.int64)
+        v = np.rint(local[:, 1] / z_safe * K[1, 1] + K[1, 2]).astype(np.int64)
+        height, width = view.depth.shape
+        valid = in_front & (u >= 0) & (u < width) & (v >= 0) & (v < height)
+        pixel = np.where(valid, v * width + u, 0)
+        depth = view.depth.reshape(-1)[pixel]
+        sdf = depth - z
+        valid &= (depth > 0) & (depth < self.depth_trunc) & (sdf >= -self.sdf_trunc)
+        observed = np.minimum(sdf / self.sdf_trunc, 1.0)
+
+        shape = (len(rows), BLOCK ** 3)
+        valid, observed = valid.reshape(shape), observed.reshape(shape)
+        tsdf = self.tsdf[rows].reshape(shape)
+        weight = self.weight[rows].reshape(shape)
+        new_weight = weight + valid
+        blended = (tsdf * weight + observed) / np.maximum(new_weight, 1.0)
+        self.tsdf[rows] = np.where(valid, blended, tsdf).reshape(-1, BLOCK, BLOCK, BLOCK)
+        if self.colors and view.rgb is not None:
+            rgb = view.rgb.reshape(-1, 3)[pixel].reshape(*shape, 3).astype(np.float32)
+            color = self.color[rows].reshape(*shape, 3).astype(np.float32)
+            mixed = (color * weight[..., None] + rgb) / np.maximum(new_weight, 1.0)[..., None]
+            self.color[rows] = np.where(valid[..., None], np.rint(mixed), color).astype(np.uint8).reshape(
+                -1, BLOCK, BLOCK, BLOCK, 3)
+        self.weight[rows] = new_weight.reshape(-1, BLOCK, BLOCK, BLOCK)
+
+    def integrate(self, view):
+        """Fuse one view; returns the number of blocks it touched."""
+        rows = self.allocate(self._surface_blocks(view))
+        # Rows are unique, so the batches write disjoint blocks
+        batches = [rows[i:i + BATCH_BLOCKS] for i in range(0, len(rows), BATCH_BLOCKS)]
+        for _ in self._pool.map(lambda batch: self._integrate_rows(batch, view), batches):
+            pass
+        return len(rows)
+
+    # ------------------------------------------
+    # Mesh extraction
+    # ------------------------------------------
+    def _padded(self, rows):
+        """(tsdf, weight, color) of blocks with a one-voxel border from their +x/+y/+z neighbors."""
+        size = BLOCK + 1
+        tsdf = np.ones((len(rows), size, size, size), dtype=np.float32)
+        weight = np.zeros((len(rows), size, size, size), dtype=np.float32)
+        color = np.zeros((len(rows), size, size, size, 3), dtype=np.uint8) if self.colors else None
+        for dx in (0, 1):
+            for dy in (0, 1):
+                for dz in (0, 1):
+                    if (dx, dy, dz) == (0, 0, 0):
+                        source, target = rows, np.arange(len(rows))
+                    else:
+                        keys = block_keys(self.coords[rows] + np.array([dx, dy, dz], dtype=np.int32)).tolist()
+                        neighbors = np.fromiter((self.slots.get(k, -1) for k in keys), dtype=np.int64,
+                                                count=len(keys))
+                        target = np.flatnonzero(neighbors >= 0)
+                        source = neighbors[target]
+                    # Along a shifted axis, the border layer of the padded block = first layer of the neighbor
+                    src = tuple(slice(0, 1) if d else slice(None) for d in (dx, dy, dz))
+                    dst = tuple(slice(BLOCK, BLOCK + 1) if d else slice(0, BLOCK) for d in (dx, dy, dz))
+                    tsdf[(target, *dst)] = self.tsdf[(source, *src)]
+                    weight[(target, *dst)] = self.weight[(source, *src)]
+                    if color is not None:
+                        color[(target, *dst)] = self.color[(source, *src)]
+        return tsdf, weight, color
+
+    def _mesh_batch(self, rows):
+        from skimage.measure import marching_cubes
+
+        tsdf, weight, color = self._padded(rows)
+        observed = weight > 0
+        # A cube is meshed only if all 8 corners were observed (like Open3D); skimage indexes the
+        # mask by the upper corner of each cube
+        cubes = np.zeros_like(observed)
+        cubes[:, 1:, 1:, 1:] = np.logical_and.reduce([
+            observed[:, dx:dx + BLOCK, dy:dy + BLOCK, dz:dz + BLOCK]
+            for dx in (0, 1) for dy in (0, 1) for dz in (0, 1)])
+        values = np.where(observed, tsdf, 1.0)
+        crossing = ((values < 0) & observed).any(axis=(1, 2, 3)) & ((values > 0) & observed).any(axis=(1, 2, 3))
+        parts = []
+        for i in np.flatnonzero(crossing & cubes.any(axis=(1, 2, 3))):
+            try:
+                vertices, faces, _, _ = marching_cubes(values[i], level=0.0, mask=cubes[i],
+                                                       gradient_direction="descent")
+            except (ValueError, RuntimeError):
+                continue  # no surface inside the masked cubes
+            if not len(faces):
+                continue
+            vertex_colors = None
+            if color is not None:
+                nearest = np.clip(np.rint(vertices).astype(np.int64), 0, BLOCK)
+                vertex_colors = color[i][nearest[:, 0], nearest[:, 1], nearest[:, 2]]
+            origin = self.coords[rows[i]].astype(np.float64) * BLOCK
+            parts.append(((vertices + origin + 0.5) * self.voxel_size, faces, vertex_colors))
+        return parts
+
+    def extract_mesh(self):
+        """(vertices, faces, colors or None) of the zero level set, with seams between blocks welded."""
+        rows = np.arange(len(self.slots))
+        batches = [rows[i:i + BATCH_BLOCKS] for i in range(0, len(rows), BATCH_BLOCKS)]
+        parts = [part for batch in self._pool.map(self._mesh_batch, batches) for part in batch]
+        if not parts:
+            return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.int64), None
+        offsets = np.cumsum([0] + [len(vertices) for vertices, _, _ in parts])
+        vertices = np.concatenate([vertices for vertices, _, _ in parts])
+        faces = np.concatenate([faces + offset for (_, faces, _), offset in zip(parts, offsets)])
+        colors = np.concatenate([colors for _, _, colors in parts]) if self.colors else None
+        # Blocks interpolate shared border edges from the same two voxels, so seam vertices coincide
+        grid = np.rint(vertices / (self.voxel_size * 1e-3)).astype(np.int64)
+        _, first, inverse = np.unique(grid, axis=0, return_index=True, return_inverse=True)
+        faces = inverse.reshape(-1)[faces]
+        faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+        return (vertices[first].astype(np.float32), faces, colors[first] if colors is not None else None)
+
+    def close(self):
+        self._pool.shutdown()
+
+
+def keep_largest_clusters(vertices, faces, colors, clusters=50, min_faces=50):
+    """Drop connected pieces smaller than the `clusters`-th largest one (and than min_faces), like 2DGS's
+    post_process_mesh."""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    if not len(faces):
+        return vertices, faces, colors
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]]])
+    graph = coo_matrix((np.ones(len(edges), dtype=np.int8), (edges[:, 0], edges[:, 1])),
+                       shape=(len(vertices), len(vertices)))
+    _, labels = connected_components(graph, directed=False)
+    face_labels = labels[faces[:, 0]]
+    sizes = np.bincount(face_labels)
+    threshold = max(np.sort(sizes)[-min(clusters, len(sizes))], min_faces)
+    faces = faces[sizes[face_labels] >= threshold]
+    used = np.unique(faces)
+    remap = np.full(len(vertices), -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return vertices[used], remap[faces], colors[used] if colors is not None else None
+
+
+# ------------------------------------------
+# Streaming
+# ------------------------------------------
+def fuse_stream(views, volume, count=None, queue_size=4):
+    """Integrate views from an iterator that a producer thread drains into a bounded queue."""
+    pending = queue.Queue(maxsize=queue_size)
+    done = object()
+
+    def produce():
+        try:
+            for view in views:
+                pending.put(view)
+            pending.put(done)
+        except BaseException as e:  # re-raised in the consumer
+            pending.put(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    started = time.perf_counter()
+    fused = 0
+    while True:
+        item = pending.get()
+        if item is done:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        volume.integrate(item)
+        fused += 1
+        elapsed = time.perf_counter() - started
+        # "n/N [" lines are picked up as progress by progress_events.stream_output
+        print(f"[TSDF] Fused {fused}/{count or '?'} [{elapsed:.0f}s, {fused / elapsed:.1f} views/s, "
+              f"{len(volume):,} blocks, {volume.nbytes / (1024 * 1024):.0f} MB]", flush=True)
+    producer.join()
+    return fused
+
+
+def scene_radius(world_to_cameras):
+    """(center, radius) of the cameras' focus like 2DGS: the point nearest to all optical axes, and the
+    distance of the closest camera to it."""
+    camera_to_world = np.linalg.inv(np.asarray(world_to_cameras))
+    directions, origins = camera_to_world[:, :3, 2:3], camera_to_world[:, :3, 3:4]
+    m = np.eye(3) - directions * np.transpose(directions, [0, 2, 1])
+    mt_m = np.transpose(m, [0, 2, 1]) @ m
+    center = np.linalg.inv(mt_m.mean(0)) @ (mt_m @ origins).mean(0)[:, 0]
+    return center, float(np.linalg.norm(origins[:, :, 0] - center, axis=1).min())
+
+
+class DgsRenderer:
+    """Renders the training views of a trained 2DGS model one at a time (needs the 2DGS checkout)."""
+
+    def __init__(self, model_dir, iteration=-1, depth_ratio=0.0, dgs_dir=DGS_DIR):
+        sys.path.insert(0, dgs_dir)
+        from argparse import Namespace
+
+        import torch
+        from arguments import ModelParams, PipelineParams
+        from gaussian_renderer import GaussianModel, render
+        from scene import Scene
+
+        parser = argparse.ArgumentParser()
+        model_params, pipeline_params = ModelParams(parser, sentinel=True), PipelineParams(parser)
+        # render.py merges the command line with cfg_args; build the same arguments without argv
+        with open(os.path.join(model_dir, "cfg_args")) as f:
+            saved = vars(eval(f.read(), {"Namespace": Namespace}))
+        args = Namespace(**{**vars(parser.parse_args([])), **saved, "model_path": model_dir,
+                            "depth_ratio": depth_ratio})
+        dataset, self.pipe = model_params.extract(args), pipeline_params.extract(args)
+        self.gaussians = GaussianModel(dataset.sh_degree)
+        scene = Scene(dataset, self.gaussians, load_iteration=iteration, shuffle=False)
+        self.gaussians.active_sh_degree = 0  # render.py meshes with view-independent color
+        self.cameras = scene.getTrainCameras()
+        self.background = torch.tensor([1, 1, 1] if dataset.white_background else [0, 0, 0],
+                                       dtype=torch.float32, device="cuda")
+        self._torch, self._render = torch, render
+
+    def world_to_cameras(self):
+        return [camera.world_view_transform.T.cpu().numpy() for camera in self.cameras]
+
+    def intrinsics(self, camera):
+        width, height = camera.image_width, camera.image_height
+        ndc2pix = self._torch.tensor([[width / 2, 0, 0, (width - 1) / 2], [0, height / 2, 0, (height - 1) / 2],
+                                      [0, 0, 0, 1]]).float().cuda().T
+        return (camera.projection_matrix @ ndc2pix)[:3, :3].T.cpu().numpy().astype(np.float64)
+
+    def views(self):
+        with self._torch.no_grad():
+            for camera in self.cameras:
+                package = self._render(camera, self.gaussians, self.pipe, self.background)
+                rgb = (package["render"].clamp(0, 1).permute(1, 2, 0) * 255).byte().cpu().numpy()
+                depth = package["surf_depth"][0].float().cpu().numpy()
+                mask = getattr(camera, "gt_alpha_mask", None)
+                if mask is not None:
+                    depth[mask[0].cpu().numpy() < 0.5] = 0
+                yield View(rgb, depth, self.intrinsics(camera),
+                           camera.world_view_transform.T.cpu().numpy().astype(np.float64))
+
+
+# ------------------------------------------
+# Main
+# ------------------------------------------
+def fuse_model(model_dir, output_dir, iteration=-1, depth_ratio=0.0, mesh_res=1024, voxel_size=-1.0,
+               depth_trunc=-1.0, sdf_trunc=-1.0, workers=None, queue_size=4, num_cluster=50):
+    started = time.perf_counter()
+    renderer = DgsRenderer(model_dir, iteration, depth_ratio)
+    _, radius = scene_radius(renderer.world_to_cameras())
+    depth_trunc = radius * 2.0 if depth_trunc < 0 else depth_trunc
+    voxel_size = depth_trunc / mesh_res if voxel_size < 0 else voxel_size
+    sdf_trunc = 5.0 * voxel_size if sdf_trunc < 0 else sdf_trunc
+    print(f"[TSDF] {len(renderer.cameras)} views, voxel {voxel_size:.5f}, sdf_trunc {sdf_trunc:.5f}, "
+          f"depth_trunc {depth_trunc:.3f}")
+    return fuse_views(renderer.views(), output_dir, voxel_size, sdf_trunc, depth_trunc, len(renderer.cameras),
+                      workers, queue_size, num_cluster, started)
+
+
+def fuse_views(views, output_dir, voxel_size, sdf_trunc, depth_trunc, count=None, workers=None, queue_size=4,
+               num_cluster=50, started=None):
+    """Stream views into a BlockTSDF and write fuse.ply / fuse_post.ply / fusion.json; returns the report."""
+    started = started or time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    volume = BlockTSDF(voxel_size, sdf_trunc, depth_trunc, workers)
+    t0 = time.perf_counter()
+    fused = fuse_stream(views, volume, count, queue_size)
+    fusion_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vertices, faces, colors = volume.extract_mesh()
+    volume_mb = volume.nbytes / (1024 * 1024)
+    blocks = len(volume)
+    volume.close()
+    extract_seconds = time.perf_counter() - t0
+    write_mesh_ply(os.path.join(output_dir, "fuse.ply"), vertices, faces, colors)
+    post_vertices, post_faces, post_colors = keep_largest_clusters(vertices, faces, colors, num_cluster)
+    write_mesh_ply(os.path.join(output_dir, "fuse_post.ply"), post_vertices, post_faces, post_colors)
+
+    report = {
+        "views": fused, "voxel_size": voxel_size, "sdf_trunc": sdf_trunc, "depth_trunc": depth_trunc,
+        "blocks": blocks, "voxels": blocks * BLOCK ** 3, "volume_mb": round(volume_mb, 1),
+        "faces": len(faces), "faces_post": len(post_faces), "workers": volume.workers,
+        "fusion_seconds": round(fusion_seconds, 2), "extract_seconds": round(extract_seconds, 2),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    with open(os.path.join(output_dir, "fusion.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[TSDF] {fused} views → {blocks:,} blocks ({volume_mb:.0f} MB), {len(faces):,} faces "
+          f"({len(post_faces):,} after cleanup) in {report['seconds']:.1f}s → {output_dir}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming TSDF Fusion")
+    parser.add_argument("--model-dir", required=True, help="Trained 2DGS model directory (train.py -m)")
+    parser.add_argument("--output-dir", required=True, help="Directory for fuse.ply / fuse_post.ply")
+    parser.add_argument("--iteration", type=int, default=-1, help="Checkpoint iteration (default: latest)")
+    parser.add_argument("--depth-ratio", type=float, default=0.0, help="0: mean depth, 1: median depth")
+    parser.add_argument("--mesh-res", type=int, default=1024, help="Voxels across depth_trunc")
+    parser.add_argument("--voxel-size", type=float, default=-1.0, help="Voxel size (default: from --mesh-res)")
+    parser.add_argument("--depth-trunc", type=float, default=-1.0, help="Max depth (default: 2 × scene radius)")
+    parser.add_argument("--sdf-trunc", type=float, default=-1.0, help="Truncation (default: 5 voxels)")
+    parser.add_argument("--workers", type=int, help="Integration threads (default: CPU count)")
+    parser.add_argument("--queue", type=int, default=4, help="Rendered views buffered ahead of the fusion")
+    parser.add_argument("--num-cluster", type=int, default=50, help="Connected pieces kept in fuse_post.ply")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.model_dir, "cfg_args")):
+        print(f"[ERROR] Not a trained 2DGS model (no cfg_args): {args.model_dir}")
+        sys.exit(1)
+    fuse_model(args.model_dir, args.output_dir, args.iteration, args.depth_ratio, args.mesh_res,
+               args.voxel_size, args.depth_trunc, args.sdf_trunc, args.workers, args.queue, args.num_cluster)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,36 +4,65 @@ SuGaR Training Pipeline Script
 Runs inside the SuGaR Docker container.
 Pipeline: 3DGS pre-training (7k iter) → SuGaR coarse → SuGaR refined mesh
 
+Stages are resumable: <output>/stages.json records each finished stage with
+the parameters it ran with, and a rerun skips stages that are done with the
+same parameters (a changed parameter reruns that stage and the ones after
+it). Outputs of runs from before the manifest are detected on disk
+(point_cloud/iteration_N/point_cloud.ply, the coarse mesh, the refined
+mesh). 3DGS pre-training saves checkpoints every --gs-checkpoint-every
+iterations and continues from the latest one after a crash; SuGaR's own
+stages can't resume mid-stage and restart from their beginning.
+--from-stage reruns a stage (and everything after it) regardless.
+
+--init-ply skips 3DGS pre-training: a splat exported from a finished
+splatfacto run (ns-export gaussian-splat) is converted into gs_output by
+splatfacto_to_3dgs.py, mapped back to the COLMAP frame with the run's
+--init-dataparser-transforms.
+
 Usage:
   python3 sugar_train.py --data /workspace/data/nerfstudio/<project> \
-                         --output /workspace/outputs/<project>/sugar
+                         --output /workspace/outputs/<project>/sugar [--from-stage coarse]
+                         [--init-ply splat.ply --init-dataparser-transforms dataparser_transforms.json]
 """
 
 import argparse
+import glob
+import hashlib
 import os
 import sys
 import subprocess
 import json
+import re
 import shutil
+import time
+
+from progress_events import ProgressReporter, stream_output
+
+# SuGaR prints "Iteration: N" every few hundred iterations instead of a progress bar
+SUGAR_ITERATION_PATTERN = re.compile(r"Iteration:\s*(\d+)")
+# Iterations of SuGaR's coarse regularization (fixed in SuGaR's train.py)
+SUGAR_COARSE_ITERATIONS = 15000
 
+STAGES = ("gs", "coarse", "refine")
+MANIFEST_NAME = "stages.json"
+GS_CHECKPOINT_PATTERN = re.compile(r"chkpnt(\d+)\.pth$")
 
-def run_cmd(cmd, desc=""):
-    """Run a command and stream output."""
+
+def run_cmd(cmd, desc="", reporter=None, iteration_pattern=None, total=None):
+    """Run a command and stream output (progress bars become progress events)."""
     print(f"\n{'='*60}")
     print(f"[SuGaR] {desc}")
     print(f"Command: {' '.join(cmd)}")
-    print(f"{'='*60}\n")
+    print(f"{'='*60}\n", flush=True)
 
     process = subprocess.Popen(
         cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-        text=True, bufsize=1
+        env=dict(os.environ, PYTHONUNBUFFERED="1"),
     )
-    for line in process.stdout:
-        print(line, end='')
-    process.wait()
+    returncode = stream_output(process, reporter, iteration_pattern, total)
 
-    if process.returncode != 0:
-        print(f"\n[ERROR] Command failed with return code {process.returncode}")
+    if returncode != 0:
+        print(f"\n[ERROR] Command failed with return code {returncode}")
         return False
     return True
 
@@ -65,6 +94,82 @@ def convert_nerfstudio_to_colmap(data_path, output_path):
     return False
 
 
+class StageManifest:
+    """Finished stages of an output directory with the parameters they ran with (stages.json)."""
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        try:
+            with open(self.path) as f:
+                self.stages = json.load(f).get("stages", {})
+        except (OSError, ValueError):
+            self.stages = {}
+
+    def done_params(self, stage):
+        entry = self.stages.get(stage)
+        return entry["params"] if entry and entry.get("status") == "done" else None
+
+    def record(self, stage, status, params, started, outputs=()):
+        self.stages[stage] = {"status": status, "params": params, "outputs": list(outputs),
+                              "finished_at": round(time.time(), 3), "seconds": round(time.time() - started, 1)}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": 1, "stages": self.stages}, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def file_sha1(path, block=1 << 24):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def gs_point_cloud(gs_output, iterations):
+    return os.path.join(gs_output, "point_cloud", f"iteration_{iterations}", "point_cloud.ply")
+
+
+def latest_gs_checkpoint(gs_output, iterations):
+    """Newest 3DGS training checkpoint (chkpnt<N>.pth) before `iterations`, or None."""
+    checkpoints = []
+    for path in glob.glob(os.path.join(gs_output, "chkpnt*.pth")):
+        m = GS_CHECKPOINT_PATTERN.search(path)
+        if m and int(m.group(1)) < iterations:
+            checkpoints.append((int(m.group(1)), path))
+    return max(checkpoints)[1] if checkpoints else None
+
+
+def stage_outputs(stage, output_dir, gs_iterations, since=None):
+    """Files showing that a stage has finished (empty if it hasn't); with `since`, only files written after it."""
+    if stage == "gs":
+        paths = [gs_point_cloud(os.path.join(output_dir, "gs_output"), gs_iterations)]
+    elif stage == "coarse":
+        paths = glob.glob(os.path.join(output_dir, "**", "coarse_mesh", "**", "*.ply"), recursive=True)
+    else:
+        paths = glob.glob(os.path.join(output_dir, "**", "refined_mesh", "**", "*.obj"), recursive=True)
+    # 1 s slack: file times come from a coarser clock than time.time()
+    return sorted(p for p in paths if os.path.exists(p) and (since is None or os.path.getmtime(p) >= since - 1))
+
+
+def plan_stages(manifest, params, output_dir, gs_iterations, from_stage=None):
+    """Stages to run: the first stage that is not done with the same parameters and all after it."""
+    first = STAGES.index(from_stage) if from_stage else len(STAGES)
+    for i, stage in enumerate(STAGES[:first]):
+        recorded = manifest.done_params(stage)
+        if recorded is not None:
+            if recorded != params[stage]:
+                print(f"[SuGaR Pipeline] {stage}: parameters changed {recorded} → {params[stage]}")
+                first = i
+                break
+        elif not stage_outputs(stage, output_dir, gs_iterations):
+            first = i
+            break
+        else:
+            print(f"[SuGaR Pipeline] {stage}: found outputs of an earlier run")
+    return set(STAGES[first:])
+
+
 def main():
     parser = argparse.ArgumentParser(description="SuGaR Training Pipeline")
     parser.add_argument("--data", required=True, help="Path to nerfstudio processed data")
@@ -77,6 +182,14 @@ def main():
                         help="Export OBJ mesh")
     parser.add_argument("--export-ply", action="store_true", default=True,
                         help="Export PLY mesh")
+    parser.add_argument("--gs-checkpoint-every", type=int, default=2000,
+                        help="3DGS checkpoint interval for resuming (default: 2000, 0: off)")
+    parser.add_argument("--from-stage", choices=STAGES,
+                        help="Rerun from this stage even if it is done (default: resume)")
+    parser.add_argument("--init-ply",
+                        help="Gaussian splat PLY of a splatfacto run to start from instead of 3DGS pre-training")
+    parser.add_argument("--init-dataparser-transforms",
+                        help="dataparser_transforms.json of that splatfacto run")
     args = parser.parse_args()
 
     sugar_dir = "/opt/SuGaR"
@@ -90,55 +203,113 @@ def main():
         sys.exit(1)
 
     os.makedirs(args.output, exist_ok=True)
+    transforms = os.path.join(args.data, "transforms.json")
+    for path in (args.init_ply, args.init_dataparser_transforms, args.init_ply and transforms):
+        if path and not os.path.exists(path):
+            print(f"[ERROR] File not found: {path}")
+            sys.exit(1)
     gs_output = os.path.join(args.output, "gs_output")
+    gs_ply = gs_point_cloud(gs_output, args.gs_iterations)
+    reporter = ProgressReporter([
+        ("3DGS Import", 1) if args.init_ply else ("3DGS Pre-training", args.gs_iterations),
+        ("SuGaR Coarse", SUGAR_COARSE_ITERATIONS),
+        ("SuGaR Refinement", args.refinement_iterations),
+    ])
 
-    # Step 1: 3DGS Pre-training (required by SuGaR)
-    print("\n" + "="*60)
-    print("[SuGaR Pipeline] Step 1/3: 3DGS Pre-training")
-    print("="*60)
+    # Parameters that decide each stage's result (a stage also depends on the ones before it)
+    params = {
+        "gs": {"gs_iterations": args.gs_iterations},
+        "coarse": {"low_poly": True},
+        "refine": {"refinement_iterations": args.refinement_iterations, "n_gaussians_per_surface_triangle": 6},
+    }
+    if args.init_ply:
+        # By content: the splat is re-exported on every job, identically for the same checkpoint
+        params["gs"].update(init_ply=args.init_ply, init_sha1=file_sha1(args.init_ply))
+    manifest = StageManifest(args.output)
+    to_run = plan_stages(manifest, params, args.output, args.gs_iterations, args.from_stage)
+    print(f"[SuGaR Pipeline] Stages to run: {', '.join(s for s in STAGES if s in to_run) or 'none'}")
 
-    gs_train_cmd = [
-        "python3", os.path.join(gs_dir, "train.py"),
-        "-s", scene_path,
-        "-m", gs_output,
-        "--iterations", str(args.gs_iterations),
-    ]
-    if not run_cmd(gs_train_cmd, "3DGS Pre-training"):
-        sys.exit(1)
+    def run_stage(index, stage, title, cmd, desc, pattern=None, total=None):
+        print("\n" + "="*60)
+        print(f"[SuGaR Pipeline] Step {index + 1}/3: {title}")
+        print("="*60)
+        reporter.start_stage(index)
+        if stage not in to_run:
+            print("[SuGaR Pipeline] Already done, skipping")
+            return
+        started = time.time()
+        ok = run_cmd(cmd, desc, reporter, pattern, total)
+        # Outputs of an earlier run don't count: a failed command would otherwise be recorded as done
+        outputs = stage_outputs(stage, args.output, args.gs_iterations, since=started)
+        if not outputs:
+            if ok:
+                print(f"[ERROR] {desc} finished without writing its outputs")
+            manifest.record(stage, "failed", params[stage], started)
+            reporter.finish(ok=False)
+            sys.exit(1)
+        if not ok:
+            print(f"[WARNING] {desc} had issues, but its outputs exist. Continuing.")
+        manifest.record(stage, "done", params[stage], started, outputs)
 
-    # Step 2: SuGaR Coarse (extract mesh from 3DGS)
-    print("\n" + "="*60)
-    print("[SuGaR Pipeline] Step 2/3: SuGaR Coarse Mesh Extraction")
-    print("="*60)
+    # Step 1: 3DGS model (required by SuGaR): pre-trained here or imported from splatfacto
+    if args.init_ply:
+        import_cmd = [
+            "python3", os.path.join(os.path.dirname(os.path.abspath(__file__)), "splatfacto_to_3dgs.py"),
+            "--input", args.init_ply,
+            "--transforms", transforms,
+            "--model-dir", gs_output,
+            "--iteration", str(args.gs_iterations),
+            "--source-path", scene_path,
+        ]
+        if args.init_dataparser_transforms:
+            import_cmd += ["--dataparser-transforms", args.init_dataparser_transforms]
+        run_stage(0, "gs", "3DGS Import (splatfacto)", import_cmd, "3DGS Import")
+    else:
+        gs_train_cmd = [
+            "python3", os.path.join(gs_dir, "train.py"),
+            "-s", scene_path,
+            "-m", gs_output,
+            "--iterations", str(args.gs_iterations),
+            "--save_iterations", str(args.gs_iterations),
+        ]
+        if args.gs_checkpoint_every > 0:
+            gs_train_cmd += ["--checkpoint_iterations",
+                             *map(str, range(args.gs_checkpoint_every, args.gs_iterations, args.gs_checkpoint_every))]
+        checkpoint = latest_gs_checkpoint(gs_output, args.gs_iterations) if "gs" in to_run else None
+        if checkpoint and args.from_stage != "gs":
+            print(f"[SuGaR Pipeline] Resuming 3DGS pre-training from {checkpoint}")
+            gs_train_cmd += ["--start_checkpoint", checkpoint]
+        run_stage(0, "gs", "3DGS Pre-training", gs_train_cmd, "3DGS Pre-training")
+    for path in glob.glob(os.path.join(gs_output, "chkpnt*.pth")):
+        os.remove(path)  # only needed until point_cloud.ply is written
 
+    # Step 2: SuGaR Coarse (extract mesh from 3DGS)
     sugar_coarse_cmd = [
         "python3", os.path.join(sugar_dir, "train.py"),
         "-s", scene_path,
-        "-c", os.path.join(gs_output, "point_cloud", f"iteration_{args.gs_iterations}", "point_cloud.ply"),
+        "-c", gs_ply,
         "-o", args.output,
         "--low_poly", "True",
         "--export_ply", "True" if args.export_ply else "False",
         "--export_obj", "True" if args.export_obj else "False",
     ]
-    if not run_cmd(sugar_coarse_cmd, "SuGaR Coarse"):
-        print("[WARNING] SuGaR coarse training had issues. Checking outputs...")
+    run_stage(1, "coarse", "SuGaR Coarse Mesh Extraction", sugar_coarse_cmd, "SuGaR Coarse",
+              SUGAR_ITERATION_PATTERN, SUGAR_COARSE_ITERATIONS)
 
     # Step 3: SuGaR Refinement
-    print("\n" + "="*60)
-    print("[SuGaR Pipeline] Step 3/3: SuGaR Mesh Refinement")
-    print("="*60)
-
     sugar_refine_cmd = [
         "python3", os.path.join(sugar_dir, "refine.py"),
         "-s", scene_path,
-        "-c", os.path.join(gs_output, "point_cloud", f"iteration_{args.gs_iterations}", "point_cloud.ply"),
+        "-c", gs_ply,
         "-o", args.output,
         "--n_gaussians_per_surface_triangle", "6",
         "--refinement_iterations", str(args.refinement_iterations),
         "--export_ply", "True",
         "--export_obj", "True",
     ]
-    run_cmd(sugar_refine_cmd, "SuGaR Refinement")
+    run_stage(2, "refine", "SuGaR Mesh Refinement", sugar_refine_cmd, "SuGaR Refinement",
+              SUGAR_ITERATION_PATTERN, args.refinement_iterations)
+    reporter.finish()
 
     # Summary
     print("\n" + "="*60)
@@ -0,0 +1,6 @@
+"""
+3DGS Studio services shared by the Web UI (app.py) and headless tools.
+
+Run inside the nerfstudio container; the worker is started with
+`python3 -m studio.worker` (app.py spawns it automatically if needed).
+"""
@@ -0,0 +1,204 @@
+"""
+Catalog of produced artifacts (PLY/.splat/OBJ/GLB files, nerfstudio
+configs and checkpoints) under OUTPUT_DIR and EXPORT_DIR.
+
+The export page used to walk both trees with recursive globs on every
+rerun. Instead, the worker indexes a job's output directory when the job
+ends (index_job; cancelled and failed runs keep their checkpoints too),
+and app.py queries the catalog. rescan() walks the roots once to pick up
+files produced outside of jobs (and runs by itself while the catalog is
+still empty); rows whose files are gone are dropped when they are queried.
+
+Each row records path, root ('outputs' / 'exports'), project, framework
+(model / 'sugar' / '2dgs' under outputs, 'export' under exports), kind,
+size, mtime, and lineage: the job that produced it and the input it was
+made from (the config of an ns-export, the PLY of a GLB conversion).
+
+Usage:
+  python3 -m studio.artifacts [--rescan] [--project P] [--kind ply]
+"""
+
+import argparse
+import contextlib
+import os
+import sqlite3
+import time
+
+from studio.config import EXPORT_DIR, JOBS_DIR, OUTPUT_DIR
+
+ROOTS = {"outputs": OUTPUT_DIR, "exports": EXPORT_DIR}
+
+# File name → kind
+EXTENSION_KINDS = {".ply": "ply", ".splat": "splat", ".obj": "obj", ".glb": "glb", ".ckpt": "checkpoint", ".pth": "checkpoint"}
+CONFIG_NAME = "config.yml"
+
+# Command-line flags of job steps that name the input of the step
+SOURCE_FLAGS = ("--load-config", "--input")
+
+
+def artifact_kind(name):
+    if name == CONFIG_NAME:
+        return "config"
+    return EXTENSION_KINDS.get(os.path.splitext(name)[1].lower())
+
+
+def classify(path):
+    """(root, project, framework) of a path under one of the ROOTS, or None."""
+    path = os.path.abspath(path)
+    for root, root_dir in ROOTS.items():
+        rel = os.path.relpath(path, os.path.abspath(root_dir))
+        if rel.startswith(os.pardir) or rel == os.curdir:
+            continue
+        parts = rel.split(os.sep)
+        if root == "outputs":
+            project = parts[0]
+            framework = parts[1] if len(parts) > 2 else ""
+        else:
+            # Export directories are named <project>_ns_<timestamp>
+            project = parts[0].split("_ns_")[0] if len(parts) > 1 else ""
+            framework = "export"
+        return root, project, framework
+    return None
+
+
+def job_source(job):
+    """Input artifact of a job (lineage), taken from its step commands."""
+    for step in job.get("steps") or []:
+        cmd = step.get("cmd", [])
+        for flag in SOURCE_FLAGS:
+            if flag in cmd[:-1]:
+                return cmd[cmd.index(flag) + 1]
+    return None
+
+
+class ArtifactCatalog:
+    """SQLite index of artifacts. Safe to use from several processes."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(JOBS_DIR, "artifacts.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                "path TEXT PRIMARY KEY, root TEXT, project TEXT, framework TEXT, kind TEXT, "
+                "size INTEGER, mtime REAL, job_id TEXT, source TEXT, indexed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_lookup ON artifacts(project, kind, framework)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def index_dir(self, directory, job_id=None, source=None):
+        """Record all artifacts under `directory` and forget the ones that are gone.
+
+        Returns the number of artifacts found. Rows of files that were
+        already indexed keep their lineage unless job_id/source are given.
+        """
+        directory = os.path.abspath(directory)
+        rows = []
+        for dirpath, _, files in os.walk(directory):
+            for name in files:
+                kind = artifact_kind(name)
+                if kind is None:
+                    continue
+                path = os.path.join(dirpath, name)
+                where = classify(path)
+                if where is None:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                rows.append((path, *where, kind, st.st_size, st.st_mtime, job_id, source, time.time()))
+        with self._connect() as conn:
+            existing = {row[0] for row in conn.execute(
+                "SELECT path FROM artifacts WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                (directory, _like_prefix(directory)))}
+            found = {row[0] for row in rows}
+            conn.executemany("DELETE FROM artifacts WHERE path = ?", [(p,) for p in existing - found])
+            conn.executemany(
+                "INSERT INTO artifacts (path, root, project, framework, kind, size, mtime, job_id, source, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime, "
+                "indexed_at = excluded.indexed_at, "
+                "job_id = COALESCE(excluded.job_id, job_id), source = COALESCE(excluded.source, source)",
+                rows,
+            )
+        return len(rows)
+
+    def index_job(self, job):
+        """Completion hook: index the output directory of a finished job."""
+        output_dir = job.get("output_dir")
+        if not output_dir or not os.path.isdir(output_dir) or classify(output_dir) is None:
+            return 0
+        return self.index_dir(output_dir, job_id=job["id"], source=job_source(job))
+
+    def rescan(self):
+        """Walk all ROOTS (e.g. for files copied in by hand)."""
+        return sum(self.index_dir(root_dir) for root_dir in ROOTS.values() if os.path.isdir(root_dir))
+
+    def is_empty(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM artifacts LIMIT 1").fetchone() is None
+
+    def find(self, kinds=None, project=None, framework=None, root=None, under=None):
+        """Artifacts matching all given filters, newest first. Missing files are dropped."""
+        clauses, params = [], []
+        if kinds:
+            kinds = [kinds] if isinstance(kinds, str) else list(kinds)
+            clauses.append(f"kind IN ({', '.join('?' * len(kinds))})")
+            params.extend(kinds)
+        for column, value in (("project", project), ("framework", framework), ("root", root)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if under:
+            clauses.append("path LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(os.path.abspath(under)))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute(
+                f"SELECT * FROM artifacts {where} ORDER BY mtime DESC", params)]
+            gone = {row["path"] for row in rows if not os.path.exists(row["path"])}
+            if gone:
+                conn.executemany("DELETE FROM artifacts WHERE path = ?", [(p,) for p in gone])
+        return [row for row in rows if row["path"] not in gone]
+
+    def paths(self, **filters):
+        return [row["path"] for row in self.find(**filters)]
+
+
+def _like_prefix(directory):
+    escaped = directory.rstrip(os.sep).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + os.sep + "%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3DGS Studio Artifact Catalog")
+    parser.add_argument("--rescan", action="store_true", help="Walk outputs/ and exports/ before listing")
+    parser.add_argument("--project", help="Only artifacts of this project")
+    parser.add_argument("--kind", choices=sorted(set(EXTENSION_KINDS.values()) | {"config"}),
+                        help="Only artifacts of this kind")
+    args = parser.parse_args()
+
+    catalog = ArtifactCatalog()
+    if args.rescan:
+        started = time.monotonic()
+        count = catalog.rescan()
+        print(f"[Artifacts] Indexed {count} artifacts in {time.monotonic() - started:.1f}s")
+    for row in catalog.find(kinds=args.kind, project=args.project):
+        size_mb = row["size"] / (1024 * 1024)
+        lineage = f" ← {row['source']}" if row["source"] else ""
+        print(f"{row['kind']:>10}  {size_mb:9.1f} MB  {row['project']}/{row['framework']}  {row['path']}{lineage}")
+
+
+if __name__ == "__main__":
+    main()
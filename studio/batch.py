@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Headless batch runner for 3DGS Studio.
+Runs upload → preprocess → train → export for every project in a manifest,
+using the same command builders and job queue as the Web UI.
+
+Usage:
+  python3 -m studio.batch manifest.yaml [--concurrency preprocess=2 train=2 export=4]
+
+Manifest (YAML or JSON):
+  defaults:                  # optional, applied to every project
+    sfm: glomap              # glomap | colmap
+    matcher: auto            # auto | sequential | vocab_tree | exhaustive | spatial (glomap only)
+    sharp_frames: true       # glomap + video: sharpest frame per window instead of uniform
+    framework: nerfstudio    # nerfstudio | sugar | 2dgs
+    model: splatfacto
+    iterations: 30000
+    export: [gaussian-splat]  # several formats share one job and one checkpoint load
+    export_glb: false        # also convert every exported PLY to GLB
+    splat_formats: []        # compact copies of gaussian-splat: compressed-ply | splat | ply
+    splat_sh_degree: 3
+    splat_lod: false         # octree LOD tiles of gaussian-splat (<export>/lod/index.json)
+  projects:
+    - name: garden
+      input: /workspace/data/raw/garden.mp4     # video file, image directory or zip of images
+      num_frames: 300
+    - name: room
+      input: /workspace/data/raw/room/
+      framework: sugar
+      gs_iterations: 7000
+      refinement_iterations: 15000
+      mesh_lod: meshopt        # meshopt | draco | none | false: compressed GLB LODs after training
+
+Export formats are nerfstudio export formats and only apply to the
+nerfstudio framework; SuGaR / 2DGS write their meshes during training.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from studio import commands, uploads
+from studio.config import DATA_DIR, OUTPUT_DIR, EXPORT_DIR
+from studio.jobs import JobStore, STATE_EMOJI, SUCCEEDED, TERMINAL_STATES
+from studio.worker import ensure_worker, parse_stage_limits
+
+DEFAULTS = {
+    "sfm": "glomap",
+    "matcher": "auto",
+    "sharp_frames": True,
+    "num_frames": 300,
+    "framework": "nerfstudio",
+    "model": "splatfacto",
+    "iterations": 30000,
+    "export": ["gaussian-splat"],
+    "export_glb": False,
+    "splat_formats": [],
+    "splat_sh_degree": 3,
+    "splat_lod": False,
+    # SuGaR
+    "gs_iterations": 7000,
+    "refinement_iterations": 15000,
+    # SuGaR / 2DGS mesh LODs (compression of scripts/mesh_lod.py, or False)
+    "mesh_lod": "meshopt",
+    # 2DGS
+    "depth_ratio": 0.0,
+    "lambda_normal": 0.05,
+}
+
+DEFAULT_STAGE_LIMITS = {"preprocess": 2, "train": 2, "export": 2}
+
+
+def load_manifest(path):
+    """Read a YAML/JSON manifest and return the list of fully populated project dicts."""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    defaults = dict(DEFAULTS, **(manifest.get("defaults") or {}))
+    projects = []
+    for entry in manifest.get("projects", []):
+        project = dict(defaults, **entry)
+        for key in ("name", "input"):
+            if not project.get(key):
+                raise ValueError(f"Project entry is missing '{key}': {entry}")
+        if " " in project["name"]:
+            raise ValueError(f"Project name must not contain spaces: {project['name']!r}")
+        if project["sfm"] not in ("glomap", "colmap"):
+            raise ValueError(f"{project['name']}: unknown sfm '{project['sfm']}'")
+        matchers = commands.MATCHERS if project["sfm"] == "glomap" else ("auto", *commands.NS_MATCHING_METHODS)
+        if project["matcher"] not in matchers:
+            raise ValueError(f"{project['name']}: matcher '{project['matcher']}' is not available "
+                             f"for {project['sfm']}")
+        if project["framework"] not in ("nerfstudio", "sugar", "2dgs"):
+            raise ValueError(f"{project['name']}: unknown framework '{project['framework']}'")
+        if isinstance(project["export"], str):
+            project["export"] = [project["export"]]
+        unknown = [f for f in project["export"] if f not in commands.EXPORT_FORMATS]
+        if unknown:
+            raise ValueError(f"{project['name']}: unknown export format(s) {unknown}")
+        if project["mesh_lod"] and project["mesh_lod"] not in commands.MESH_COMPRESSIONS:
+            raise ValueError(f"{project['name']}: unknown mesh_lod compression '{project['mesh_lod']}'")
+        unknown = [f for f in project["splat_formats"] if f not in commands.SPLAT_FORMATS]
+        if unknown:
+            raise ValueError(f"{project['name']}: unknown splat format(s) {unknown}")
+        projects.append(project)
+
+    names = [p["name"] for p in projects]
+    if len(names) != len(set(names)):
+        raise ValueError("Project names in the manifest must be unique")
+    return projects
+
+
+def import_input(project, copy=False):
+    """Upload stage: put the input where the preprocess page expects it.
+
+    Videos become UPLOAD_DIR/<name>.mp4 and image directories or zips
+    UPLOAD_DIR/<name> (see studio.uploads.import_input). An existing upload
+    of the project is kept. Returns (input_path, data_type).
+    """
+    src = os.path.abspath(project["input"])
+    for dst, data_type in ((uploads.video_path(project["name"]), "video"),
+                           (uploads.images_dir(project["name"]), "images")):
+        if os.path.lexists(dst):
+            if os.path.realpath(dst) != os.path.realpath(src):
+                print(f"[Batch] {project['name']}: {dst} already exists, using it instead of {src}")
+            return dst, data_type
+    return uploads.import_input(src, project["name"], copy=copy)
+
+
+def submit_project(store, project, batch_id, timestamp, force=False, copy=False, use_cache=True):
+    """Submit the job DAG of one project. Returns the list of job IDs."""
+    name = project["name"]
+    input_path, data_type = import_input(project, copy=copy)
+    data_path = os.path.join(DATA_DIR, name)
+    job_ids = []
+
+    # Preprocess (skipped if already processed)
+    preprocess_deps = []
+    if force or not os.path.exists(os.path.join(data_path, "transforms.json")):
+        if project["sfm"] == "glomap":
+            steps = commands.glomap_preprocess_steps(input_path, data_type, data_path, project["num_frames"],
+                                                     use_cache=use_cache, matcher=project["matcher"],
+                                                     sharp_frames=project["sharp_frames"])
+        else:
+            steps = commands.colmap_preprocess_steps(input_path, data_type, data_path, project["num_frames"],
+                                                     use_cache=use_cache, matcher=project["matcher"])
+        job_id = store.submit("preprocess", steps, project=name, title=f"{project['sfm'].upper()}前処理",
+                              output_dir=data_path, resource="colmap", batch=batch_id)
+        preprocess_deps = [job_id]
+        job_ids.append(job_id)
+    else:
+        print(f"[Batch] {name}: transforms.json exists, skipping preprocess (use --force to redo)")
+
+    # Train
+    framework = project["framework"]
+    if framework == "nerfstudio":
+        model = project["model"]
+        steps = commands.ns_train_steps(model, data_path, name, project["iterations"], False, timestamp)
+        run_dir = commands.ns_run_dir(name, model, timestamp)
+        train_id = store.submit("train", steps, project=name, title=f"Nerfstudio {model}", output_dir=run_dir,
+                                resource=model, depends_on=preprocess_deps, batch=batch_id)
+    elif framework == "sugar":
+        output_path = os.path.join(OUTPUT_DIR, name, "sugar")
+        steps = commands.sugar_train_steps(data_path, output_path, project["gs_iterations"],
+                                           project["refinement_iterations"])
+        if project["mesh_lod"]:
+            steps += commands.mesh_lod_steps(output_path, compression=project["mesh_lod"])
+        train_id = store.submit("train", steps, project=name, title="SuGaR", output_dir=output_path,
+                                resource="sugar", depends_on=preprocess_deps, batch=batch_id)
+    else:
+        output_path = os.path.join(OUTPUT_DIR, name, "2dgs")
+        steps = commands.dgs_train_steps(data_path, output_path, project["iterations"],
+                                         project["depth_ratio"], project["lambda_normal"])
+        if project["mesh_lod"]:
+            steps += commands.mesh_lod_steps(output_path, compression=project["mesh_lod"])
+        train_id = store.submit("train", steps, project=name, title="2DGS", output_dir=output_path,
+                                resource="2dgs", depends_on=preprocess_deps, batch=batch_id)
+    job_ids.append(train_id)
+
+    # Export (nerfstudio only)
+    if framework == "nerfstudio" and project["export"]:
+        # All formats in one job: the checkpoint is loaded once
+        config_path = os.path.join(run_dir, "config.yml")
+        export_dir = os.path.join(EXPORT_DIR, f"{name}_ns_{timestamp}")
+        steps = commands.ns_export_steps(project["export"], config_path, export_dir, project["export_glb"])
+        if "gaussian-splat" in project["export"] and project["splat_formats"]:
+            steps += commands.splat_compress_steps(os.path.join(export_dir, commands.NS_SPLAT_NAME), export_dir,
+                                                   project["splat_formats"], project["splat_sh_degree"])
+        if "gaussian-splat" in project["export"] and project["splat_lod"]:
+            steps += commands.splat_lod_steps(os.path.join(export_dir, commands.NS_SPLAT_NAME),
+                                              os.path.join(export_dir, "lod"), sh_degree=project["splat_sh_degree"])
+        job_ids.append(store.submit("export", steps, project=name, title=f"Nerfstudio {', '.join(project['export'])}",
+                                    output_dir=export_dir, resource="ns-export",
+                                    depends_on=[train_id], batch=batch_id))
+    return job_ids
+
+
+def print_summary(store, batch_id):
+    jobs = sorted(store.list(limit=100000, batch=batch_id), key=lambda j: j["created_at"])
+    print(f"\n{'='*60}")
+    print(f"[Batch] Summary: {batch_id}")
+    print(f"{'='*60}")
+    for job in jobs:
+        duration = ""
+        if job["started_at"] and job["finished_at"]:
+            duration = f"{(job['finished_at'] - job['started_at']) / 60:.1f} min"
+        print(f"  {STATE_EMOJI.get(job['state'], '')} {job['project']:<20} {job['kind']:<11} "
+              f"{job['title']:<28} {job['state']:<10} {duration}")
+        if job["error"]:
+            print(f"      {job['error']}  (log: {job['log_path']})")
+    return all(job["state"] == SUCCEEDED for job in jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3DGS Studio Batch Runner")
+    parser.add_argument("manifest", help="Path to a YAML/JSON manifest of projects")
+    parser.add_argument("--concurrency", nargs="*", default=[], metavar="STAGE=N",
+                        help="Jobs per stage running at once "
+                             "(default: preprocess=2 train=2 export=2; GPU jobs are also limited by free VRAM)")
+    parser.add_argument("--max-concurrent", type=int, default=8,
+                        help="Maximum number of jobs running at once (default: 8)")
+    parser.add_argument("--slots-per-device", type=int, default=2,
+                        help="Maximum number of jobs sharing one GPU (default: 2)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-run preprocessing even if transforms.json exists")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't reuse preprocessing stages from the stage cache")
+    parser.add_argument("--copy", action="store_true",
+                        help="Copy inputs into the upload directory instead of symlinking")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Only submit the jobs; leave them to the running worker")
+    args = parser.parse_args()
+
+    try:
+        projects = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Invalid manifest: {e}")
+        sys.exit(1)
+
+    store = JobStore()
+    batch_id = f"batch-{time.strftime('%Y%m%d-%H%M%S')}"
+    timestamp = time.strftime("%Y-%m-%d_%H%M%S")
+    print(f"[Batch] {batch_id}: {len(projects)} project(s)")
+
+    batch_jobs = []
+    for project in projects:
+        try:
+            ids = submit_project(store, project, batch_id, timestamp, force=args.force, copy=args.copy,
+                                 use_cache=not args.no_cache)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] {project['name']}: {e}")
+            continue
+        batch_jobs.extend(ids)
+        print(f"[Batch] {project['name']}: submitted {len(ids)} job(s)")
+
+    if not batch_jobs:
+        print("[ERROR] Nothing was submitted.")
+        sys.exit(1)
+    if args.no_wait:
+        print("[Batch] Submitted. Follow progress in the Web UI or data/jobs/.")
+        return
+
+    def batch_done():
+        return all(state in TERMINAL_STATES for state in store.states(batch_jobs).values())
+
+    # The detached worker also runs jobs queued from the Web UI meanwhile, and outlives the batch
+    stage_limits = dict(DEFAULT_STAGE_LIMITS, **parse_stage_limits(args.concurrency))
+    if ensure_worker(args.max_concurrent, args.slots_per_device, stage_limits):
+        print("[Batch] Started a job worker with the requested limits")
+    else:
+        print("[Batch] A worker is already running; it executes the batch with its own limits "
+              "(--concurrency is not applied).")
+    try:
+        while not batch_done():
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print("\n[Batch] Interrupted, cancelling the batch's jobs...")
+        for job_id, state in store.states(batch_jobs).items():
+            if state not in TERMINAL_STATES:
+                store.request_cancel(job_id)
+        deadline = time.monotonic() + 30
+        while not batch_done() and time.monotonic() < deadline:
+            time.sleep(1)
+
+    ok = print_summary(store, batch_id)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
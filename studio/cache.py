@@ -0,0 +1,285 @@
+"""
+Content-addressed cache for preprocessing stage outputs.
+
+A job step can carry a `cache` spec:
+    - 'stage': str, stage name (also the stamp file name)
+    - 'root': str, directory the outputs live in (the project data dir)
+    - 'outputs': list of paths relative to root (files or directories)
+    - 'inputs': optional list of input paths (video file / image directory)
+    - 'params': optional dict of parameters that change the result
+    - 'mutates': optional list of outputs of the previous cached stage that
+      this stage modifies in place (e.g. the matcher writes into database.db)
+
+The key of a stage hashes its inputs, params and the key of the previous
+cached stage, so a change early in the pipeline invalidates everything after
+it. After a stage runs, its outputs are snapshotted under CACHE_DIR and a
+stamp file (<root>/.stage_cache/<stage>.key) records which key is in place.
+Snapshots are evicted least-recently-used once CACHE_BUDGET_GB is exceeded.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+from studio.config import CACHE_DIR
+
+CACHE_BUDGET_GB = float(os.environ.get("STUDIO_CACHE_BUDGET_GB", "50"))
+
+STAMP_DIR = ".stage_cache"
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def _copy_tree(src, dst, link):
+    """Copy a file or directory, hardlinking files when `link` is set."""
+    def copy_file(s, d):
+        if link:
+            try:
+                os.link(s, d)
+                return d
+            except OSError:
+                pass
+        return shutil.copy2(s, d)
+
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, copy_function=copy_file)
+    else:
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        copy_file(src, dst)
+
+
+def _tree_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class StageCache:
+    """Snapshot store + index of preprocessing stage outputs."""
+
+    def __init__(self, root=None, budget_bytes=None):
+        self.root = root or CACHE_DIR
+        self.budget_bytes = budget_bytes if budget_bytes is not None else int(CACHE_BUDGET_GB * 1024 ** 3)
+        os.makedirs(os.path.join(self.root, "entries"), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, stage TEXT, outputs TEXT, "
+                "size INTEGER, created_at REAL, last_used REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS digests (path TEXT PRIMARY KEY, size INTEGER, "
+                "mtime_ns INTEGER, digest TEXT)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(os.path.join(self.root, "cache.db"), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------
+    # Keys
+    # ------------------------------------------
+    def file_digest(self, path):
+        """BLAKE2 digest of a file, memoized by (path, size, mtime)."""
+        st = os.stat(path)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT digest FROM digests WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, st.st_size, st.st_mtime_ns),
+            ).fetchone()
+        if row:
+            return row[0]
+        h = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)",
+                         (path, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def input_digest(self, path):
+        """Digest of an input: file contents, or name/size/mtime listing of a directory."""
+        path = os.path.realpath(path)
+        if os.path.isfile(path):
+            return self.file_digest(path)
+        h = hashlib.blake2b(digest_size=20)
+        for name in sorted(os.listdir(path)):
+            st = os.stat(os.path.join(path, name))
+            h.update(f"{name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        return h.hexdigest()
+
+    def stage_key(self, spec, previous_key=""):
+        payload = {
+            "stage": spec["stage"],
+            "previous": previous_key,
+            "inputs": [self.input_digest(p) for p in spec.get("inputs", [])],
+            "params": spec.get("params", {}),
+        }
+        return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode(), digest_size=20).hexdigest()
+
+    # ------------------------------------------
+    # Stamps (what is currently in place)
+    # ------------------------------------------
+    @staticmethod
+    def _stamp_path(spec):
+        return os.path.join(spec["root"], STAMP_DIR, f"{spec['stage']}.key")
+
+    def is_current(self, key, spec):
+        """True if the outputs in place were produced with this key."""
+        try:
+            with open(self._stamp_path(spec)) as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return stamp.get("key") == key and all(
+            os.path.exists(os.path.join(spec["root"], p)) for p in stamp.get("outputs", []))
+
+    def write_stamp(self, key, spec, outputs):
+        path = self._stamp_path(spec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"key": key, "outputs": outputs, "time": time.time()}, f)
+
+    def clear_stamp(self, spec):
+        with contextlib.suppress(OSError):
+            os.remove(self._stamp_path(spec))
+
+    # ------------------------------------------
+    # Snapshots
+    # ------------------------------------------
+    def _entry(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT outputs FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or not os.path.isdir(os.path.join(self.root, "entries", key)):
+            return None
+        return json.loads(row[0])
+
+    def has(self, key):
+        return self._entry(key) is not None
+
+    def restore(self, key, spec, only=None, copy=False):
+        """Put a snapshot's outputs in place. Returns False on a cache miss.
+
+        `only` restricts to some outputs; `copy` avoids hardlinks for files
+        that will be modified in place.
+        """
+        outputs = self._entry(key)
+        if outputs is None:
+            return False
+        entry_dir = os.path.join(self.root, "entries", key)
+        for rel in outputs:
+            if only is not None and rel not in only:
+                continue
+            dst = os.path.join(spec["root"], rel)
+            _remove(dst)
+            _copy_tree(os.path.join(entry_dir, rel), dst, link=not copy)
+        with self._connect() as conn:
+            conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        if only is None:
+            self.write_stamp(key, spec, outputs)
+        return True
+
+    def store(self, key, spec):
+        """Snapshot a stage's outputs after it ran, then enforce the disk budget."""
+        outputs = [p for p in spec["outputs"] if os.path.exists(os.path.join(spec["root"], p))]
+        entry_dir = os.path.join(self.root, "entries", key)
+        _remove(entry_dir)
+        os.makedirs(entry_dir)
+        for rel in outputs:
+            # Hardlinks are safe: a stage's outputs are removed (not edited)
+            # before the stage runs again, and `mutates` restores use copies.
+            _copy_tree(os.path.join(spec["root"], rel), os.path.join(entry_dir, rel), link=True)
+        size = sum(_tree_size(os.path.join(entry_dir, rel)) for rel in outputs)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, spec["stage"], json.dumps(outputs), size, now, now))
+        self.write_stamp(key, spec, outputs)
+        self.evict()
+
+    def evict(self):
+        """Drop least-recently-used snapshots until the cache fits the budget."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall()
+        total = sum(size for _, size in rows)
+        evicted = []
+        for key, size in rows:
+            if total <= self.budget_bytes:
+                break
+            _remove(os.path.join(self.root, "entries", key))
+            total -= size
+            evicted.append(key)
+        if evicted:
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in evicted])
+        return evicted
+
+    def prepare(self, spec):
+        """Remove stale outputs before a stage runs so tools start from scratch."""
+        self.clear_stamp(spec)
+        for rel in spec["outputs"]:
+            if rel in spec.get("mutates", []):
+                continue
+            path = os.path.join(spec["root"], rel)
+            was_dir = os.path.isdir(path)
+            _remove(path)
+            if was_dir:
+                os.makedirs(path)  # e.g. images/ for ffmpeg, sparse/ for the mapper
+
+    # ------------------------------------------
+    # Planning
+    # ------------------------------------------
+    def plan(self, steps):
+        """Compute stage keys and how many leading steps can be skipped.
+
+        Returns (keys, first_to_run). keys[i] is None for steps without a
+        cache spec; those are left out of the key chain and always run.
+        """
+        keys = [None] * len(steps)
+        previous_key = ""
+        for i, step in enumerate(steps):
+            if step.get("cache"):
+                keys[i] = previous_key = self.stage_key(step["cache"], previous_key)
+
+        first_to_run = 0
+        for i, key in enumerate(keys):
+            if key is not None and not (self.is_current(key, steps[i]["cache"]) or self.has(key)):
+                break
+            first_to_run = i + 1
+        # A stage that edits the previous stage's outputs needs a pristine
+        # snapshot of them; without one, the previous stage runs again too.
+        while first_to_run < len(steps) and keys[first_to_run] and steps[first_to_run]["cache"].get("mutates"):
+            previous = previous_stage(keys, first_to_run)
+            if previous is None or self.has(keys[previous]):
+                break
+            first_to_run = previous
+        return keys, first_to_run
+
+
+def previous_stage(keys, index):
+    """Index of the cached step before `index`, or None."""
+    for i in range(index - 1, -1, -1):
+        if keys[i] is not None:
+            return i
+    return None
@@ -0,0 +1,479 @@
+"""
+Command builders for the pipeline stages.
+
+Each builder returns the list of job steps (see studio.jobs) for one stage,
+so the Web UI and the batch runner submit exactly the same commands.
+"""
+
+import glob
+import json
+import os
+
+from studio.config import WORKSPACE, OUTPUT_DIR, SCRIPTS_DIR
+
+# Checkout of this repository (studio.* modules run as job steps from here)
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scripts directory as mounted inside the sugar / 2dgs containers
+CONTAINER_SCRIPTS_DIR = "/workspace/scripts"
+
+# Export formats
+EXPORT_FORMATS = {
+    "gaussian-splat": "Gaussian Splat (.ply) - SuperSplat対応",
+    "pointcloud": "点群 (.ply)",
+    "poisson": "Poissonメッシュ (.ply)",
+    "marching-cubes": "Marching Cubesメッシュ (.ply)",
+    "tsdf": "TSDFメッシュ (.ply)",
+}
+# Written by studio.export_server next to the exported files
+EXPORT_MANIFEST_NAME = "manifest.json"
+# File ns-export gaussian-splat writes into its output directory, and its pruned copy
+NS_SPLAT_NAME = "splat.ply"
+PRUNED_SPLAT_NAME = "splat.pruned.ply"
+
+# Output directory of scripts/mesh_lod.py inside a SuGaR / 2DGS output directory
+MESH_LOD_DIR = "mesh_lod"
+MESH_COMPRESSIONS = {
+    "meshopt": "meshopt (EXT_meshopt_compression・高速デコード)",
+    "draco": "Draco (KHR_draco_mesh_compression・gltf-transformが必要)",
+    "none": "圧縮なし (量子化のみ)",
+}
+
+# Compact formats for Gaussian splat PLYs (scripts/compress_splat.py)
+SPLAT_FORMATS = {
+    "compressed-ply": "圧縮PLY (.compressed.ply) - SuperSplat/PlayCanvas対応・約1/4〜1/6",
+    "splat": ".splat (32バイト/点・SHなし)",
+    "ply": "PLY (SH次数の削減のみ)",
+}
+
+# Feature matching methods for the GLOMAP branch
+MATCHERS = {
+    "auto": "自動 (動画→シーケンシャル / 画像→枚数で選択)",
+    "sequential": "シーケンシャル + ループ検出 (動画向け)",
+    "vocab_tree": "Vocab Tree (順不同の大量画像向け)",
+    "exhaustive": "全ペア (少数画像向け・O(N²))",
+    "spatial": "空間 (GPS付き画像向け)",
+}
+# ns-process-data --matching-method only knows these
+NS_MATCHING_METHODS = ("exhaustive", "sequential", "vocab_tree")
+
+# Image sets up to this size are matched exhaustively by "auto"
+EXHAUSTIVE_MAX_IMAGES = 150
+SEQUENTIAL_OVERLAP = 10
+
+# COLMAP vocabulary tree for loop detection / vocab tree matching
+VOCAB_TREE_URL = "https://demuc.de/colmap/vocab_tree_flickr100K_words32K.bin"
+VOCAB_TREE_PATH = os.environ.get(
+    "STUDIO_VOCAB_TREE", os.path.join(WORKSPACE, "data", "vocab_tree_flickr100K_words32K.bin"))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Progress configs (see studio.progress)
+COLMAP_PROGRESS = {
+    'type': 'steps',
+    'total_steps': 4,
+    'step_patterns': [
+        r'(?:extracting|feature)',
+        r'(?:matching|exhaustive)',
+        r'(?:mapper|triangulat|reconstruct)',
+        r'(?:undistort|export|transform)',
+    ]
+}
+
+FRAMES_PROGRESS = {
+    'type': 'pattern',
+    'pattern': r'\[Frames\] (\d+)/(\d+) frames',
+}
+
+# sugar_train.py / 2dgs_train.py write progress events (scripts/progress_events.py)
+EVENTS_PROGRESS = {'type': 'events'}
+
+
+def count_images(image_dir):
+    try:
+        return sum(name.lower().endswith(IMAGE_EXTENSIONS) for name in os.listdir(image_dir))
+    except OSError:
+        return 0
+
+
+def choose_matcher(data_type, num_images):
+    """Matcher for "auto": video frames are ordered, image sets are not."""
+    if data_type == "video":
+        return "sequential"
+    if num_images <= EXHAUSTIVE_MAX_IMAGES:
+        return "exhaustive"
+    return "vocab_tree"
+
+
+def vocab_tree_steps():
+    """Download step for the vocab tree, if it isn't there yet."""
+    if os.path.exists(VOCAB_TREE_PATH):
+        return []
+    cmd = ["curl", "-fL", "--create-dirs", "-o", VOCAB_TREE_PATH, VOCAB_TREE_URL]
+    return [{"label": "Vocab Tree ダウンロード", "cmd": cmd, "expects": [VOCAB_TREE_PATH]}]
+
+
+def matcher_command(matcher, db_path):
+    cmd = ["colmap", f"{matcher}_matcher", "--database_path", db_path]
+    if matcher == "sequential":
+        cmd.extend([
+            "--SequentialMatching.overlap", str(SEQUENTIAL_OVERLAP),
+            "--SequentialMatching.loop_detection", "1",
+            "--SequentialMatching.vocab_tree_path", VOCAB_TREE_PATH,
+        ])
+    elif matcher == "vocab_tree":
+        cmd.extend(["--VocabTreeMatching.vocab_tree_path", VOCAB_TREE_PATH])
+    return cmd
+
+
+def glomap_preprocess_steps(input_path, data_type, output_path, num_frames, use_cache=True, matcher="auto",
+                            sharp_frames=True):
+    """Frame extraction → COLMAP features → matching → GLOMAP mapper → nerfstudio format.
+
+    `matcher` is a key of MATCHERS; "auto" picks one from the data type and
+    image count (see choose_matcher). Video frames are extracted by
+    scripts/extract_frames.py, which keeps the sharpest frame per window
+    (or every n-th with `sharp_frames=False`) and writes the images_2/4/8
+    pyramid itself. With `use_cache`, each stage carries a studio.cache
+    spec so unchanged stages are skipped or restored from the stage cache.
+    """
+    if matcher == "auto":
+        matcher = choose_matcher(data_type, num_frames if data_type == "video" else count_images(input_path))
+    # The vocab tree download (first run only) goes first so the cached stages stay together
+    steps = vocab_tree_steps() if matcher in ("sequential", "vocab_tree") else []
+
+    def cache(stage, outputs, params=None, inputs=(), mutates=()):
+        if not use_cache:
+            return {}
+        return {"cache": {"stage": stage, "root": output_path, "outputs": list(outputs),
+                          "inputs": list(inputs), "params": params or {}, "mutates": list(mutates)}}
+
+    # Step 1: Extract frames from video (if video)
+    if data_type == "video":
+        cmd_frames = [
+            "python3", os.path.join(SCRIPTS_DIR, "extract_frames.py"),
+            "--input", input_path,
+            "--output", output_path,
+            "--num-frames", str(num_frames),
+            "--downscales", "3",
+        ]
+        if not sharp_frames:
+            cmd_frames.append("--uniform")
+        steps.append({"label": "フレーム抽出", "cmd": cmd_frames, "progress": FRAMES_PROGRESS,
+                      **cache("frames", ["images", "images_2", "images_4", "images_8"],
+                              {"num_frames": num_frames, "select": "sharpest" if sharp_frames else "uniform",
+                               "downscales": 3, "quality": 95}, inputs=[input_path])})
+
+    images_dir = os.path.join(output_path, "images") if data_type == "video" else input_path
+    db_path = os.path.join(output_path, "database.db")
+    sparse_path = os.path.join(output_path, "sparse")
+    os.makedirs(sparse_path, exist_ok=True)
+
+    # Step 2: Feature extraction
+    cmd_feat = [
+        "colmap", "feature_extractor",
+        "--image_path", images_dir,
+        "--database_path", db_path
+    ]
+    steps.append({"label": "COLMAP特徴抽出", "cmd": cmd_feat,
+                  **cache("features", ["database.db"], inputs=[input_path] if data_type == "images" else [])})
+
+    # Step 3: Matching
+    cmd_match = matcher_command(matcher, db_path)
+    match_params = {"matcher": matcher}
+    if matcher == "sequential":
+        match_params["overlap"] = SEQUENTIAL_OVERLAP
+    steps.append({"label": f"COLMAPマッチング ({matcher})", "cmd": cmd_match,
+                  **cache("matches", ["database.db"], match_params, mutates=["database.db"])})
+
+    # Step 4: GLOMAP Mapper
+    cmd_glomap = [
+        "glomap", "mapper",
+        "--database_path", db_path,
+        "--image_path", images_dir,
+        "--output_path", sparse_path
+    ]
+    steps.append({"label": "GLOMAP Mapper (グローバルSfM)", "cmd": cmd_glomap, **cache("mapper", ["sparse"])})
+
+    # Step 5: Convert to nerfstudio format
+    cmd_convert = [
+        "ns-process-data", "images",
+        "--data", images_dir,
+        "--output-dir", output_path,
+        "--skip-colmap",
+        "--colmap-model-path", os.path.join(sparse_path, "0"),
+    ]
+    convert_outputs = ["transforms.json", "sparse_pc.ply"]
+    if data_type == "video":
+        cmd_convert.extend(["--num-downscales", "0"])  # the pyramid comes from frame extraction
+    else:
+        convert_outputs.extend(["images", "images_2", "images_4", "images_8"])
+    steps.append({"label": "Nerfstudio形式に変換", "cmd": cmd_convert,
+                  "expects": [os.path.join(output_path, "transforms.json")],
+                  **cache("convert", convert_outputs)})
+    return steps
+
+
+def colmap_preprocess_steps(input_path, data_type, output_path, num_frames, use_cache=True, matcher="auto"):
+    """Standard COLMAP via ns-process-data (cached as a single stage)."""
+    if matcher == "auto":
+        matcher = choose_matcher(data_type, num_frames if data_type == "video" else count_images(input_path))
+    if matcher not in NS_MATCHING_METHODS:
+        raise ValueError(f"ns-process-data does not support the {matcher} matcher")
+    cmd = ["ns-process-data", data_type, "--data", input_path, "--output-dir", output_path,
+           "--matching-method", matcher]
+    params = {"data_type": data_type, "matcher": matcher}
+    if data_type == "video":
+        cmd.extend(["--num-frames-target", str(num_frames)])
+        params["num_frames"] = num_frames
+    step = {"label": "COLMAP (ns-process-data)", "cmd": cmd, "progress": COLMAP_PROGRESS,
+            "expects": [os.path.join(output_path, "transforms.json")]}
+    if use_cache:
+        step["cache"] = {
+            "stage": "ns-process-data", "root": output_path, "inputs": [input_path], "params": params,
+            "outputs": ["images", "images_2", "images_4", "images_8", "colmap",
+                        "transforms.json", "sparse_pc.ply"],
+            "mutates": [],
+        }
+    return [step]
+
+
+def ns_train_steps(model_type, data_path, project_name, max_iterations, viewer_enabled, timestamp, load_dir=None,
+                   start_step=0, extra_args=(), record_data=True):
+    """ns-train for one nerfstudio model. The run ends up in ns_run_dir(...).
+
+    With load_dir (a checkpoint directory) training resumes from its latest
+    checkpoint; nerfstudio then runs max_iterations more steps after start_step.
+    extra_args are further ns-train flags (e.g. --pipeline.model.sh-degree 2).
+    With record_data (all but continued runs), transforms.json is first copied
+    into the run directory, so a later fine-tune knows which images the run
+    trained on even after the data was updated in place (scripts/ns_warmstart.py),
+    and extra_args are saved there right away for ns_continue_steps to replay.
+    """
+    cmd = [
+        "ns-train", model_type,
+        "--data", data_path,
+        "--output-dir", OUTPUT_DIR,
+        "--experiment-name", project_name,
+        "--viewer.quit-on-train-completion", "False" if viewer_enabled else "True",
+        "--viewer.websocket-port", "7007",
+        "--viewer.websocket-host", "0.0.0.0",
+        "--project-name", project_name,
+        "--timestamp", timestamp,
+        "--max-num-iterations", str(max_iterations),
+    ]
+    if viewer_enabled:
+        cmd.extend(["--vis", "viewer"])
+    else:
+        cmd.extend(["--vis", "tensorboard"])
+    if load_dir:
+        cmd.extend(["--load-dir", load_dir])
+    cmd.extend(str(arg) for arg in extra_args)
+
+    progress_config = {
+        'type': 'iterations',
+        'iteration_pattern': r'(?:Step|step|Iter).*?(\d+).*?/.*?(\d+)',
+        'total_iterations': max_iterations,
+        'start_iteration': start_step,
+    }
+    steps = [{"label": f"ns-train {model_type}", "cmd": cmd, "progress": progress_config}]
+    if record_data:
+        run_dir = ns_run_dir(project_name, model_type, timestamp)
+        if extra_args:
+            os.makedirs(run_dir, exist_ok=True)
+            with open(os.path.join(run_dir, NS_TRAIN_ARGS), "w") as f:
+                json.dump([str(arg) for arg in extra_args], f)
+        snapshot = os.path.join(run_dir, NS_DATA_SNAPSHOT)
+        steps.insert(0, {"label": "学習データの記録", "expects": [snapshot],
+                         "cmd": ["install", "-D", "-m", "644", os.path.join(data_path, "transforms.json"), snapshot]})
+    return steps
+
+
+def ns_run_dir(project_name, model_type, timestamp):
+    """Output directory of an ns-train run started by ns_train_steps."""
+    return os.path.join(OUTPUT_DIR, project_name, model_type, timestamp)
+
+
+NS_CHECKPOINT_DIR = "nerfstudio_models"
+# Written by scripts/ns_warmstart.py; step 0, so the run's first saved checkpoint replaces it
+NS_WARMSTART_CKPT = "step-000000000.ckpt"
+# Copy of the transforms.json a run was started on, next to its config.yml
+NS_DATA_SNAPSHOT = "transforms.json"
+# Extra ns-train flags a run was started with (e.g. by a sweep), replayed when it is continued
+NS_TRAIN_ARGS = "train_args.json"
+
+
+def ns_train_args(run_dir):
+    """Extra ns-train flags a run was started with ([] if none were recorded)."""
+    try:
+        with open(os.path.join(run_dir, NS_TRAIN_ARGS)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def ns_checkpoint_step(run_dir):
+    """Step of the latest checkpoint of a run (the one ns-train --load-dir resumes from), or None."""
+    try:
+        names = os.listdir(os.path.join(run_dir, NS_CHECKPOINT_DIR))
+    except OSError:
+        return None
+    steps = [int(name[len("step-"):-len(".ckpt")]) for name in names
+             if name.startswith("step-") and name.endswith(".ckpt") and name[len("step-"):-len(".ckpt")].isdigit()]
+    return max(steps, default=None)
+
+
+def ns_runs(project_name):
+    """config.yml of the project's runs that have a checkpoint, newest first.
+
+    Read from disk rather than the artifact catalog, which misses runs made
+    outside the job queue and only learns of a run when its job ends.
+    """
+    configs = glob.glob(os.path.join(glob.escape(os.path.join(OUTPUT_DIR, project_name)), "*", "*", "config.yml"))
+    runs = [path for path in configs if ns_checkpoint_step(os.path.dirname(path)) is not None]
+    return sorted(runs, key=os.path.getmtime, reverse=True)
+
+
+def ns_continue_steps(config_path, data_path, extra_iterations, viewer_enabled, extra_args=None):
+    """Continue a run in place (same run directory) for extra_iterations more steps.
+
+    extra_args must repeat the flags the run was started with, or the model
+    is rebuilt with defaults that may not match the checkpoint; by default
+    the flags recorded in the run directory are used.
+    """
+    run_dir = os.path.dirname(config_path)
+    model_dir = os.path.dirname(run_dir)
+    if extra_args is None:
+        extra_args = ns_train_args(run_dir)
+    return ns_train_steps(os.path.basename(model_dir), data_path, os.path.basename(os.path.dirname(model_dir)),
+                          extra_iterations, viewer_enabled, os.path.basename(run_dir),
+                          load_dir=os.path.join(run_dir, NS_CHECKPOINT_DIR),
+                          start_step=ns_checkpoint_step(run_dir) or 0, extra_args=extra_args, record_data=False)
+
+
+def ns_finetune_steps(config_path, data_path, project_name, max_iterations, viewer_enabled, timestamp):
+    """New run on an updated dataset, warm-started from the latest checkpoint of config_path's run.
+
+    scripts/ns_warmstart.py adapts the checkpoint (per-image parameters, the
+    dataparser frame) and puts it into the new run's checkpoint directory.
+    The new run uses the same recorded ns-train flags as the old one.
+    """
+    model_type = os.path.basename(os.path.dirname(os.path.dirname(config_path)))
+    load_dir = os.path.join(ns_run_dir(project_name, model_type, timestamp), NS_CHECKPOINT_DIR)
+    cmd = ["python3", os.path.join(SCRIPTS_DIR, "ns_warmstart.py"),
+           "--load-config", config_path, "--data", data_path, "--output-dir", load_dir]
+    return [{"label": "ウォームスタート準備", "cmd": cmd, "expects": [os.path.join(load_dir, NS_WARMSTART_CKPT)]},
+            *ns_train_steps(model_type, data_path, project_name, max_iterations, viewer_enabled, timestamp,
+                            load_dir=load_dir, extra_args=ns_train_args(os.path.dirname(config_path)))]
+
+
+def ns_eval_steps(config_path, output_path):
+    """ns-eval of a run's latest checkpoint: PSNR / SSIM / LPIPS over the eval images, as JSON."""
+    cmd = ["ns-eval", "--load-config", config_path, "--output-path", output_path]
+    return [{"label": "ns-eval", "cmd": cmd, "expects": [output_path]}]
+
+
+SUGAR_STAGES = ("gs", "coarse", "refine")
+
+
+SPLATFACTO_INIT_DIR = "splatfacto_init"
+
+
+def sugar_train_steps(data_path, output_path, gs_iterations, refine_iterations, from_stage=None, init_config=None):
+    """Finished stages in output_path are skipped unless from_stage forces a rerun from there.
+
+    With init_config (config.yml of a splatfacto run) its Gaussians are exported
+    and imported as SuGaR's 3DGS model instead of pre-training one.
+    """
+    steps = []
+    cmd = [
+        "docker", "exec", "sugar",
+        "python3", f"{CONTAINER_SCRIPTS_DIR}/sugar_train.py",
+        "--data", data_path,
+        "--output", output_path,
+        "--gs-iterations", str(gs_iterations),
+        "--refinement-iterations", str(refine_iterations),
+    ]
+    if from_stage:
+        cmd += ["--from-stage", from_stage]
+    if init_config:
+        init_dir = os.path.join(output_path, SPLATFACTO_INIT_DIR)
+        steps += ns_export_steps("gaussian-splat", init_config, init_dir)
+        cmd += ["--init-ply", os.path.join(init_dir, NS_SPLAT_NAME),
+                "--init-dataparser-transforms", os.path.join(os.path.dirname(init_config), "dataparser_transforms.json")]
+    return steps + [{"label": "SuGaRパイプライン", "cmd": cmd, "progress": EVENTS_PROGRESS}]
+
+
+def dgs_train_steps(data_path, output_path, iterations, depth_ratio, lambda_normal, fusion="stream"):
+    cmd = [
+        "docker", "exec", "2dgs",
+        "python3", f"{CONTAINER_SCRIPTS_DIR}/2dgs_train.py",
+        "--data", data_path,
+        "--output", output_path,
+        "--iterations", str(iterations),
+        "--depth-ratio", str(depth_ratio),
+        "--lambda-normal", str(lambda_normal),
+        "--fusion", fusion,
+    ]
+    return [{"label": "2DGSパイプライン", "cmd": cmd, "progress": EVENTS_PROGRESS}]
+
+
+def ns_export_steps(export_formats, config_path, output_dir, glb=False):
+    """ns-export of one or more formats through the warm export service of the job's GPU
+    (studio.export_server), which loads the checkpoint once for all of them. With glb, every PLY is
+    also converted to GLB; all outputs are listed in <output_dir>/manifest.json."""
+    if isinstance(export_formats, str):
+        export_formats = [export_formats]
+    cmd = ["python3", "-m", "studio.export_server", "export", "--load-config", config_path,
+           "--output-dir", output_dir, "--formats", *export_formats]
+    if glb:
+        cmd.append("--glb")
+    return [{"label": f"ns-export {' '.join(export_formats)}", "cmd": cmd, "cwd": REPO_DIR,
+             "expects": [os.path.join(output_dir, EXPORT_MANIFEST_NAME)]}]
+
+
+def splat_prune_steps(ply_path, output_path, cameras=None, dataparser_transforms=None, min_opacity=0.005,
+                      min_views=1, dedupe_voxel=None):
+    """Drop transparent / tiny / unseen splats and merge duplicates (report: <output>.json)."""
+    cmd = ["python3", os.path.join(SCRIPTS_DIR, "prune_splat.py"),
+           "--input", ply_path, "--output", output_path, "--min-opacity", str(min_opacity)]
+    if cameras:
+        cmd.extend(["--cameras", cameras, "--min-views", str(min_views)])
+        if dataparser_transforms:
+            cmd.extend(["--dataparser-transforms", dataparser_transforms])
+    if dedupe_voxel:
+        cmd.extend(["--dedupe-voxel", str(dedupe_voxel)])
+    return [{"label": "Splat削減", "cmd": cmd, "expects": [output_path]}]
+
+
+def splat_compress_steps(ply_path, output_dir, formats, sh_degree=None, order="morton"):
+    """Compact splat formats plus <name>.compress.json (sizes and quality per format)."""
+    cmd = ["python3", os.path.join(SCRIPTS_DIR, "compress_splat.py"),
+           "--input", ply_path, "--output-dir", output_dir, "--order", order, "--formats", *formats]
+    if sh_degree is not None:
+        cmd.extend(["--sh-degree", str(sh_degree)])
+    report = os.path.join(output_dir, os.path.splitext(os.path.basename(ply_path))[0] + ".compress.json")
+    return [{"label": "Splat圧縮", "cmd": cmd, "expects": [report]}]
+
+
+def splat_lod_steps(ply_path, output_dir, tile_format="compressed-ply", sh_degree=None):
+    """Octree tiles at several levels of detail plus index.json for streaming viewers."""
+    cmd = ["python3", os.path.join(SCRIPTS_DIR, "splat_lod.py"),
+           "--input", ply_path, "--output", output_dir, "--format", tile_format]
+    if sh_degree is not None:
+        cmd.extend(["--sh-degree", str(sh_degree)])
+    return [{"label": "LODタイル生成", "cmd": cmd, "expects": [os.path.join(output_dir, "index.json")]}]
+
+
+def mesh_lod_steps(mesh_dir, targets=(1000000, 200000, 50000), compression="meshopt"):
+    """Compressed GLB LODs of the newest SuGaR / 2DGS mesh under mesh_dir (runs in this container)."""
+    cmd = ["python3", os.path.join(SCRIPTS_DIR, "mesh_lod.py"), "--input", mesh_dir,
+           "--compression", compression, "--targets", *[str(t) for t in targets]]
+    return [{"label": "メッシュLOD (GLB)", "cmd": cmd,
+             "expects": [os.path.join(mesh_dir, MESH_LOD_DIR, "report.json")]}]
+
+
+def glb_convert_steps(ply_path, glb_path):
+    cmd = ["python3", os.path.join(SCRIPTS_DIR, "convert_ply_to_glb.py"),
+           "--input", ply_path, "--output", glb_path]
+    return [{"label": "PLY→GLB変換", "cmd": cmd, "expects": [glb_path]}]
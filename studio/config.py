@@ -0,0 +1,24 @@
+"""
+Shared paths for the Web UI, the job worker and the CLI tools.
+
+All paths live under the `/workspace` mount of the nerfstudio container.
+`STUDIO_WORKSPACE` can point them somewhere else (e.g. for local dry runs).
+"""
+
+import os
+
+WORKSPACE = os.environ.get("STUDIO_WORKSPACE", "/workspace")
+
+UPLOAD_DIR = os.path.join(WORKSPACE, "data", "uploads")
+DATA_DIR = os.path.join(WORKSPACE, "data", "nerfstudio")
+OUTPUT_DIR = os.path.join(WORKSPACE, "outputs")
+EXPORT_DIR = os.path.join(WORKSPACE, "exports")
+
+# Job queue database, per-job log files and worker lock/log
+JOBS_DIR = os.path.join(WORKSPACE, "data", "jobs")
+
+# Snapshots of preprocessing stage outputs (see studio.cache)
+CACHE_DIR = os.path.join(WORKSPACE, "data", "cache")
+
+# Helper scripts (same path inside every container via the ./scripts mount)
+SCRIPTS_DIR = os.path.join(WORKSPACE, "scripts")
@@ -0,0 +1,163 @@
+"""
+Container state for the Web UI sidebar and pre-flight checks.
+
+One Docker Engine API call (GET /containers/json?all=1 over the mounted
+socket) returns the state of every container at once, instead of a
+`docker inspect` process per container and question. Results are cached
+for CACHE_TTL seconds; a stale cache is refreshed in a background thread
+while the old value is returned, so a Streamlit rerun never waits on the
+daemon. Without the socket (e.g. on a host with a remote DOCKER_HOST), a
+single `docker ps -a` is used instead.
+
+container_stats() reads the CPU / memory / block I/O counters of one
+container for job telemetry (studio.telemetry).
+"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+
+DOCKER_SOCKET = os.environ.get("STUDIO_DOCKER_SOCKET", "/var/run/docker.sock")
+# Seconds a listing stays fresh
+CACHE_TTL = 5.0
+# Timeout of one listing; the first one (nothing cached yet) is waited for this long at most
+QUERY_TIMEOUT = 3.0
+
+RUNNING = "running"
+STOPPED = "stopped"  # created, but not running
+MISSING = "missing"  # never created (image not built / compose service not up)
+
+STATUS_EMOJI = {RUNNING: "🟢", STOPPED: "🟡", MISSING: "🔴"}
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+def _api_get(path, url, timeout):
+    conn = _UnixHTTPConnection(path, timeout)
+    try:
+        conn.request("GET", url)
+        response = conn.getresponse()
+        if response.status != 200:
+            raise OSError(f"Docker API returned {response.status}")
+        return json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def _list_from_socket(path, timeout):
+    containers = _api_get(path, "/containers/json?all=1", timeout)
+    states = {}
+    for container in containers:
+        for name in container.get("Names", []):
+            states[name.lstrip("/")] = container.get("State", "")
+    return states
+
+
+def _list_from_cli(timeout):
+    result = subprocess.run(
+        ["docker", "ps", "-a", "--format", "{{.Names}}\t{{.State}}"],
+        capture_output=True, text=True, timeout=timeout
+    )
+    if result.returncode != 0:
+        raise OSError(result.stderr.strip() or "docker ps failed")
+    states = {}
+    for line in result.stdout.splitlines():
+        name, _, state = line.partition("\t")
+        if name:
+            states[name] = state.strip()
+    return states
+
+
+def list_containers(timeout=QUERY_TIMEOUT):
+    """{container name: Docker state ('running', 'exited', 'created', ...)} for all containers."""
+    if os.path.exists(DOCKER_SOCKET):
+        try:
+            return _list_from_socket(DOCKER_SOCKET, timeout)
+        except (OSError, ValueError, http.client.HTTPException):
+            pass
+    try:
+        return _list_from_cli(timeout)
+    except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+        return {}
+
+
+def container_stats(name, timeout=QUERY_TIMEOUT):
+    """One resource snapshot of a running container (Docker stats API), or None without the socket.
+
+    Only the socket is used: `docker stats --no-stream` takes about two
+    seconds per call and formats the numbers for humans.
+    """
+    if not os.path.exists(DOCKER_SOCKET):
+        return None
+    try:
+        return _api_get(DOCKER_SOCKET, f"/containers/{name}/stats?stream=false&one-shot=true", timeout)
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+
+
+class ContainerStatus:
+    """TTL cache over list_containers() with non-blocking background refresh. Thread-safe."""
+
+    def __init__(self, ttl=CACHE_TTL, timeout=QUERY_TIMEOUT):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._states = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = None
+
+    def _refresh(self):
+        states = list_containers(self.timeout)
+        with self._lock:
+            self._states = states
+            self._fetched_at = time.monotonic()
+            self._refreshing = None
+
+    def states(self):
+        """Latest known states; starts a refresh if they are older than the TTL."""
+        with self._lock:
+            stale = time.monotonic() - self._fetched_at > self.ttl
+            if stale and self._refreshing is None:
+                self._refreshing = threading.Thread(target=self._refresh, daemon=True)
+                self._refreshing.start()
+            refreshing = self._refreshing
+            states = self._states
+        if states is None and refreshing is not None:
+            refreshing.join(self.timeout + 1)  # nothing to show yet
+            with self._lock:
+                states = self._states
+        return states or {}
+
+    def invalidate(self):
+        """Make the next states() call fetch again (e.g. after starting a container)."""
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def status(self, name):
+        state = self.states().get(name)
+        if state is None:
+            return MISSING
+        return RUNNING if state == "running" else STOPPED
+
+    def running(self, name):
+        return self.status(name) == RUNNING
+
+    def emoji(self, name):
+        return STATUS_EMOJI[self.status(name)]
+
+
+# Shared by all sessions of the Streamlit process
+container_status = ContainerStatus()
@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""
+Warm export service for nerfstudio checkpoints.
+Every `ns-export` call pays the Python + torch + nerfstudio imports and the
+checkpoint load (often 10-30 s) before any work, and exporting three formats
+loads the same model three times. This service stays up in the nerfstudio
+container with the imports done. One request exports a batch of formats
+from a single load (pipelines are cached by config path while the request
+runs): GPU exporters run in turn while the CPU-bound rest (Poisson
+reconstruction of the point cloud, which is sampled once for pointcloud and
+poisson, and GLB encoding) runs in a process pool alongside them. Every
+output is listed in <output_dir>/manifest.json.
+
+There is one service per GPU: the client talks to the service of the device
+the scheduler pinned its job to (CUDA_VISIBLE_DEVICES, see
+export_server_port), and the request names that device. The cache is
+emptied when a request ends, since the job's VRAM reservation ends with
+it; only the CUDA context stays until the service exits after
+EXPORT_IDLE_SECONDS without requests.
+
+Endpoints (localhost only):
+  GET  /health      → {"ok": true, "pid": ..., "device": ..., "exporting": output dir or null,
+                       "cache": [{"config", "mb", "step", "hits"}], "budget_mb": ...}
+  POST /export      body {"config": path, "formats": [...], "output_dir": path, "glb": bool, "device": str|null}
+                    → exporter output streamed as text, then a last line
+                      "RESULT {"ok": ..., "outputs": {...}, "seconds": ...}";
+                    409 when the service runs on another device
+
+Job steps call the client, which starts the service on first use and falls
+back to plain ns-export when it cannot (or with STUDIO_EXPORT_SERVER=0):
+  python3 -m studio.export_server export --load-config <config.yml> --output-dir <dir> \
+                                         --formats gaussian-splat tsdf [--glb]
+  python3 -m studio.export_server serve [--port 8503]   (GPU from CUDA_VISIBLE_DEVICES)
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from studio.commands import EXPORT_MANIFEST_NAME
+from studio.config import JOBS_DIR, SCRIPTS_DIR
+from studio.scheduler import VRAM_PROFILES
+
+# Port of the unpinned service; the service of GPU N listens on EXPORT_SERVER_PORT + 1 + N
+EXPORT_SERVER_PORT = int(os.environ.get("STUDIO_EXPORT_SERVER_PORT", "8503"))
+# "0" makes the client run ns-export directly
+EXPORT_SERVER_ENABLED = os.environ.get("STUDIO_EXPORT_SERVER", "1") != "0"
+# Pipelines cached during a request stay within what the scheduler reserves for an ns-export job
+EXPORT_CACHE_MB = int(os.environ.get("STUDIO_EXPORT_CACHE_MB", str(VRAM_PROFILES["ns-export"])))
+EXPORT_IDLE_SECONDS = int(os.environ.get("STUDIO_EXPORT_IDLE_SECONDS", "900"))
+# Imports + CUDA init of a cold service
+STARTUP_TIMEOUT = 120
+
+# ns-export subcommand → exporter class in nerfstudio.scripts.exporter
+EXPORTERS = {
+    "gaussian-splat": "ExportGaussianSplat",
+    "pointcloud": "ExportPointCloud",
+    "poisson": "ExportPoissonMesh",
+    "marching-cubes": "ExportMarchingCubesMesh",
+    "tsdf": "ExportTSDFMesh",
+}
+# Files ns-export writes into the output directory
+EXPORT_FILES = {
+    "gaussian-splat": "splat.ply",
+    "pointcloud": "point_cloud.ply",
+    "poisson": "poisson_mesh.ply",
+    "marching-cubes": "sdf_marching_cubes_mesh.ply",
+    "tsdf": "tsdf_mesh.ply",
+}
+# ns-export poisson's octree depth
+POISSON_DEPTH = 9
+# Processes for CPU post-processing (Poisson, GLB) next to the GPU exporters
+POSTPROCESS_WORKERS = int(os.environ.get("STUDIO_EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+RESULT_PREFIX = "RESULT "
+
+
+def checkpoint_version(config_path):
+    """(name, mtime) of the newest checkpoint of a run; changes when training continues."""
+    ckpt_dir = os.path.join(os.path.dirname(config_path), "nerfstudio_models")
+    try:
+        paths = [os.path.join(ckpt_dir, name) for name in os.listdir(ckpt_dir) if name.endswith(".ckpt")]
+    except OSError:
+        return None
+    newest = max(paths, key=os.path.getmtime, default=None)
+    return (os.path.basename(newest), os.path.getmtime(newest)) if newest else None
+
+
+# ------------------------------------------
+# Pipeline cache (service side)
+# ------------------------------------------
+class PipelineCache:
+    """eval_setup results by config path, least recently used first."""
+
+    def __init__(self, budget_mb=EXPORT_CACHE_MB):
+        self.budget_mb = budget_mb
+        self.entries = OrderedDict()  # config path -> dict(result, mode, version, mb, hits)
+        self.lock = threading.Lock()
+
+    def eval_setup(self, eval_setup, config_path, eval_num_rays_per_chunk=None, test_mode="test", **options):
+        """Drop-in for nerfstudio's eval_setup that returns the cached pipeline when it fits."""
+        import torch
+
+        key = os.path.realpath(str(config_path))
+        version = checkpoint_version(key)
+        with self.lock:
+            entry = self.entries.get(key)
+            usable = (entry is not None and entry["version"] == version
+                      and (entry["mode"] != "inference" or test_mode == "inference")
+                      and eval_num_rays_per_chunk is None and not options)
+            if usable:
+                self.entries.move_to_end(key)
+                entry["hits"] += 1
+                print(f"[ExportServer] Pipeline cache hit: {key} (step {entry['result'][3]})", flush=True)
+                return entry["result"]
+            if entry is not None:
+                self._drop(key)
+
+        cuda = torch.cuda.is_available()
+        before = torch.cuda.memory_allocated() if cuda else 0
+        started = time.perf_counter()
+        result = eval_setup(config_path, eval_num_rays_per_chunk, test_mode, **options)
+        if cuda:
+            mb = (torch.cuda.memory_allocated() - before) / (1024 * 1024)
+        else:
+            mb = sum(p.numel() * p.element_size() for p in result[1].parameters()) / (1024 * 1024)
+        print(f"[ExportServer] Loaded {key} ({test_mode}, step {result[3]}, {mb:.0f} MB) "
+              f"in {time.perf_counter() - started:.1f}s", flush=True)
+        if eval_num_rays_per_chunk is not None or options:
+            return result  # non-default setups are not shared
+        with self.lock:
+            self.entries[key] = {"result": result, "mode": test_mode, "version": version, "mb": mb, "hits": 0}
+            # Evict older pipelines until the cache fits (the newest always stays)
+            while len(self.entries) > 1 and self.total_mb() > self.budget_mb:
+                self._drop(next(iter(self.entries)))
+        return result
+
+    def clear(self):
+        """Drop every pipeline (the GPU memory goes back to the device)."""
+        with self.lock:
+            for key in list(self.entries):
+                self._drop(key)
+
+    def total_mb(self):
+        return sum(entry["mb"] for entry in self.entries.values())
+
+    def _drop(self, key):
+        import torch
+
+        print(f"[ExportServer] Evicting {key}", flush=True)
+        del self.entries[key]
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def step(self, config_path):
+        """Training step of the cached pipeline of a config, or None."""
+        entry = self.entries.get(os.path.realpath(str(config_path)))
+        return entry["result"][3] if entry else None
+
+    def stats(self):
+        with self.lock:
+            return [{"config": key, "mb": round(entry["mb"]), "step": entry["result"][3], "mode": entry["mode"],
+                     "hits": entry["hits"]} for key, entry in self.entries.items()]
+
+
+class StreamWriter:
+    """File-like object forwarding exporter output to the HTTP client; raises once the client is gone,
+    which aborts the export (the job was cancelled)."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        try:
+            self.wfile.write(text.encode(errors="replace"))
+            self.wfile.flush()
+        except OSError as e:
+            raise ConnectionAbortedError("export client disconnected") from e
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def poisson_mesh(point_cloud_path, mesh_path, glb=False, depth=POISSON_DEPTH):
+    """Poisson surface of a sampled point cloud like ns-export poisson (CPU only, runs in the pool)."""
+    import numpy as np
+    import open3d as o3d
+
+    started = time.perf_counter()
+    pcd = o3d.io.read_point_cloud(point_cloud_path)
+    if not pcd.has_normals():
+        pcd.estimate_normals()
+    mesh, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pcd, depth=depth)
+    densities = np.asarray(densities)
+    mesh.remove_vertices_by_mask(densities < np.quantile(densities, 0.1))
+    o3d.io.write_triangle_mesh(mesh_path, mesh)
+    files = [mesh_path] + (glb_file(mesh_path)[0] if glb else [])
+    return files, time.perf_counter() - started
+
+
+def glb_file(ply_path):
+    """GLB next to a PLY with convert_ply_to_glb.py's native engine (runs in the pool)."""
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    from convert_ply_to_glb import convert_ply_to_glb
+
+    started = time.perf_counter()
+    glb_path = os.path.splitext(ply_path)[0] + ".glb"
+    convert_ply_to_glb(ply_path, glb_path)
+    return [glb_path], time.perf_counter() - started
+
+
+def write_manifest(output_dir, config_path, step, outputs, seconds):
+    """manifest.json: every output file of the export with its size, plus per-format timings / errors."""
+    files = [{"format": export_format, "path": path, "mb": round(os.path.getsize(path) / (1024 * 1024), 2)}
+             for export_format, result in outputs.items() for path in result.get("files", [])
+             if os.path.exists(path)]
+    manifest = {"config": os.path.abspath(config_path), "step": step, "created_at": time.time(),
+                "seconds": round(seconds, 1), "ok": all("error" not in result for result in outputs.values()),
+                "formats": outputs, "files": files}
+    with open(os.path.join(output_dir, EXPORT_MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def run_exports(cache, config_path, formats, output_dir, glb=False, pool=None):
+    """Export every format from one (cached) pipeline; returns {format: output files or error}.
+
+    GPU exporters run one after another in this process. The CPU-only work
+    they leave behind (Poisson reconstruction of the sampled point cloud, GLB
+    encoding) goes to `pool` and overlaps with the next GPU exporter.
+    """
+    from pathlib import Path
+
+    import nerfstudio.scripts.exporter as exporter
+    from nerfstudio.utils import eval_utils
+
+    # Exporters call the module-level name imported from eval_utils
+    exporter.eval_setup = lambda *args, **kwargs: cache.eval_setup(eval_utils.eval_setup, *args, **kwargs)
+    os.makedirs(output_dir, exist_ok=True)
+    outputs, pending = {}, []  # pending: (format, future) of pool tasks
+    # Files the pool writes, so they are not attributed to the GPU exporter running meanwhile
+    pool_files = {EXPORT_FILES["poisson"]} | {os.path.splitext(name)[0] + ".glb" for name in EXPORT_FILES.values()}
+
+    def submit(export_format, fn, *args):
+        if pool is None:
+            pending.append((export_format, None, fn(*args)))
+        else:
+            pending.append((export_format, pool.submit(fn, *args), None))
+
+    if set(formats) - {"gaussian-splat"}:
+        # Load with images once up front; an "inference" load for gaussian-splat couldn't serve the others
+        try:
+            exporter.eval_setup(Path(config_path))
+        except ConnectionAbortedError:
+            raise
+        except Exception as e:  # reported by each exporter below
+            print(f"[ERROR] Loading {config_path} failed: {e}", flush=True)
+    # The point cloud is sampled once for both pointcloud and poisson
+    gpu_formats = [f for f in EXPORTERS if f in formats and f != "poisson"]
+    if "poisson" in formats and "pointcloud" not in gpu_formats:
+        gpu_formats.insert(1 if "gaussian-splat" in gpu_formats else 0, "pointcloud")
+    for export_format in gpu_formats:
+        cls = getattr(exporter, EXPORTERS[export_format], None)
+        if cls is None:
+            outputs[export_format] = {"error": f"unsupported by this nerfstudio: {export_format}"}
+            continue
+        before = set(os.listdir(output_dir))
+        started = time.perf_counter()
+        print(f"\n[ExportServer] ns-export {export_format} → {output_dir}", flush=True)
+        try:
+            cls(load_config=Path(config_path), output_dir=Path(output_dir)).main()
+        except ConnectionAbortedError:
+            raise
+        except Exception as e:  # one failing format must not lose the others
+            outputs[export_format] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"[ERROR] ns-export {export_format} failed: {e}", flush=True)
+            continue
+        written = sorted(set(os.listdir(output_dir)) - before - pool_files)
+        outputs[export_format] = {"files": [os.path.join(output_dir, name) for name in written],
+                                  "seconds": round(time.perf_counter() - started, 1)}
+        print(f"[ExportServer] {export_format} done in {outputs[export_format]['seconds']:.1f}s", flush=True)
+        if export_format == "pointcloud" and "poisson" in formats:
+            submit("poisson", poisson_mesh, os.path.join(output_dir, EXPORT_FILES["pointcloud"]),
+                   os.path.join(output_dir, EXPORT_FILES["poisson"]), glb)
+            print("[ExportServer] poisson: reconstructing on the CPU in parallel", flush=True)
+        if glb and export_format in formats:
+            for path in outputs[export_format]["files"]:
+                if path.endswith(".ply"):
+                    submit(export_format, glb_file, path)
+    if "poisson" in formats and "poisson" not in [f for f, _, _ in pending]:
+        outputs["poisson"] = {"error": "no point cloud to reconstruct from"}
+    if "pointcloud" in outputs and "pointcloud" not in formats:
+        del outputs["pointcloud"]  # sampled for poisson only; the PLY stays as its input
+
+    for export_format, future, result in pending:
+        try:
+            files, seconds = future.result() if future is not None else result
+        except Exception as e:
+            outputs.setdefault(export_format, {})["error"] = f"{type(e).__name__}: {e}"
+            print(f"[ERROR] {export_format} post-processing failed: {e}", flush=True)
+            continue
+        entry = outputs.setdefault(export_format, {"files": [], "seconds": 0.0})
+        entry["files"] = entry.get("files", []) + files
+        entry["cpu_seconds"] = round(entry.get("cpu_seconds", 0.0) + seconds, 1)
+        print(f"[ExportServer] {export_format}: {', '.join(os.path.basename(f) for f in files)} "
+              f"({seconds:.1f}s on the CPU pool)", flush=True)
+    return outputs
+
+
+class ExportRequestHandler(BaseHTTPRequestHandler):
+    server_version = "3DGSStudioExport/1.0"
+    protocol_version = "HTTP/1.0"  # the export stream ends when the connection closes
+    cache = None  # PipelineCache, set in serve()
+    pool = None  # ProcessPoolExecutor for CPU post-processing
+    device = None  # CUDA_VISIBLE_DEVICES of the service, set in serve()
+    export_lock = threading.Lock()  # one export at a time on the GPU
+    exporting = None  # output directory of the running export (telemetry of the job's step)
+    last_active = time.monotonic()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @classmethod
+    def postprocess_pool(cls):
+        # Spawned, not forked: the service has CUDA initialized. A worker killed by the
+        # OOM killer breaks the whole pool, so a broken one is replaced
+        if cls.pool is None or cls.pool._broken:
+            cls.pool = ProcessPoolExecutor(POSTPROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return cls.pool
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            return self._send_json(404, {"error": "not found"})
+        self._send_json(200, {"ok": True, "pid": os.getpid(), "device": self.device, "exporting": self.exporting,
+                              "cache": self.cache.stats(), "budget_mb": self.cache.budget_mb})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/export":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            config_path, formats, output_dir = request["config"], list(request["formats"]), request["output_dir"]
+            glb = bool(request.get("glb", False))
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send_json(400, {"error": f"bad request: {e}"})
+        if request.get("device") != self.device:
+            return self._send_json(409, {"error": f"this service runs on GPU {self.device}, "
+                                                  f"the job was placed on {request.get('device')}"})
+        if not os.path.isfile(config_path):
+            return self._send_json(404, {"error": f"config not found: {config_path}"})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.end_headers()
+        stream = StreamWriter(self.wfile)
+        started = time.perf_counter()
+        with ExportRequestHandler.export_lock:
+            ExportRequestHandler.last_active = time.monotonic()
+            ExportRequestHandler.exporting = os.path.abspath(output_dir)
+            try:
+                with redirect_stdout(stream), redirect_stderr(stream):
+                    outputs = run_exports(self.cache, config_path, formats, output_dir, glb, self.postprocess_pool())
+                    manifest = write_manifest(output_dir, config_path, self.cache.step(config_path), outputs,
+                                              time.perf_counter() - started)
+                    stream.write(RESULT_PREFIX + json.dumps({
+                        "ok": manifest["ok"], "outputs": outputs, "seconds": manifest["seconds"]}) + "\n")
+            except ConnectionAbortedError:
+                print(f"[ExportServer] Client gone, export of {config_path} aborted", flush=True)
+            finally:
+                # The job's VRAM reservation ends with the request; the next job on this GPU gets it back
+                self.cache.clear()
+                ExportRequestHandler.exporting = None
+                ExportRequestHandler.last_active = time.monotonic()
+
+    def log_request(self, code="-", size="-"):
+        if str(code).isdigit() and int(code) >= 400:
+            super().log_request(code, size)
+
+
+def serve(port=EXPORT_SERVER_PORT, host="127.0.0.1", idle_seconds=EXPORT_IDLE_SECONDS):
+    started = time.perf_counter()
+    # The point of the service: pay these imports once
+    import torch  # noqa: F401
+    import nerfstudio.scripts.exporter  # noqa: F401
+
+    ExportRequestHandler.cache = PipelineCache()
+    ExportRequestHandler.device = export_server_device()
+    server = ThreadingHTTPServer((host, port), ExportRequestHandler)
+    server.daemon_threads = True
+    print(f"[ExportServer] Listening on {host}:{port} for GPU {ExportRequestHandler.device} "
+          f"(imports {time.perf_counter() - started:.1f}s, cache {EXPORT_CACHE_MB} MB, idle exit {idle_seconds}s)",
+          flush=True)
+
+    def watch_idle():
+        while True:
+            time.sleep(30)
+            idle = time.monotonic() - ExportRequestHandler.last_active
+            if idle > idle_seconds and not ExportRequestHandler.export_lock.locked():
+                print(f"[ExportServer] Idle for {idle:.0f}s, exiting", flush=True)
+                server.shutdown()
+                return
+
+    if idle_seconds > 0:
+        threading.Thread(target=watch_idle, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if ExportRequestHandler.pool is not None:
+            ExportRequestHandler.pool.shutdown(cancel_futures=True)
+
+
+# ------------------------------------------
+# Client (job step side)
+# ------------------------------------------
+def export_server_device():
+    """GPU of this process as pinned by the worker (CUDA_VISIBLE_DEVICES), or None when unpinned."""
+    return os.environ.get("CUDA_VISIBLE_DEVICES", "").strip() or None
+
+
+def export_server_port(device=None):
+    """Port of the service of a device: EXPORT_SERVER_PORT + 1 + N for GPU N, else EXPORT_SERVER_PORT."""
+    if device is not None and device.isdigit():
+        return EXPORT_SERVER_PORT + 1 + int(device)
+    return EXPORT_SERVER_PORT
+
+
+def export_server_running(port=EXPORT_SERVER_PORT):
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def export_server_health(device=None):
+    """/health of the service of a device, or None when it is not running."""
+    connection = HTTPConnection("127.0.0.1", export_server_port(device), timeout=1)
+    try:
+        connection.request("GET", "/health")
+        response = connection.getresponse()
+        return json.loads(response.read()) if response.status == 200 else None
+    except (OSError, ValueError):
+        return None
+    finally:
+        connection.close()
+
+
+def ensure_export_server(device=None, timeout=STARTUP_TIMEOUT):
+    """Start a detached service for a device unless one listens on its port; True once it accepts connections."""
+    port = export_server_port(device)
+    if export_server_running(port):
+        return True
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key != "CUDA_VISIBLE_DEVICES"}
+    if device is not None:
+        env["CUDA_VISIBLE_DEVICES"] = device
+    with open(os.path.join(JOBS_DIR, f"export_server-{port}.log"), "a") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "studio.export_server", "serve", "--port", str(port)],
+            cwd=repo_root, env=env, stdout=log, stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL, start_new_session=True,
+        )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if export_server_running(port):
+            return True
+        if process.poll() is not None:
+            return export_server_running(port)  # lost the race against another client, or failed
+        time.sleep(0.5)
+    return False
+
+
+def export_via_server(config_path, formats, output_dir, glb=False, device=None):
+    """Stream the service's output to stdout; returns the RESULT payload (None if the service failed)."""
+    connection = HTTPConnection("127.0.0.1", export_server_port(device), timeout=None)
+    body = json.dumps({"config": os.path.abspath(config_path), "formats": formats,
+                       "output_dir": os.path.abspath(output_dir), "glb": glb, "device": device})
+    connection.request("POST", "/export", body, {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    if response.status != 200:
+        print(f"[ERROR] Export service: {response.read().decode(errors='replace')}")
+        return None
+    result = None
+    for raw in response:
+        line = raw.decode(errors="replace")
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+        else:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+    connection.close()
+    return result
+
+
+def export_direct(config_path, formats, output_dir, glb=False):
+    """Fallback: one ns-export process per format (each loads the checkpoint), then GLBs; True if all worked."""
+    started = time.perf_counter()
+    outputs = {}
+    for export_format in formats:
+        cmd = ["ns-export", export_format, "--load-config", config_path, "--output-dir", output_dir]
+        print(f"[Export] {' '.join(cmd)}", flush=True)
+        t0 = time.perf_counter()
+        path = os.path.join(output_dir, EXPORT_FILES[export_format])
+        try:
+            code = subprocess.call(cmd)
+        except OSError as e:
+            print(f"[ERROR] {e}")
+            code = 1
+        if code != 0 or not os.path.exists(path):
+            outputs[export_format] = {"error": f"ns-export {export_format} failed"}
+            continue
+        files = [path] + (glb_file(path)[0] if glb else [])
+        outputs[export_format] = {"files": files, "seconds": round(time.perf_counter() - t0, 1)}
+    return write_manifest(output_dir, config_path, None, outputs, time.perf_counter() - started)["ok"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3DGS Studio Export Service")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="Run the service")
+    serve_parser.add_argument("--port", type=int, default=EXPORT_SERVER_PORT)
+    serve_parser.add_argument("--idle", type=int, default=EXPORT_IDLE_SECONDS,
+                              help="Exit after this many idle seconds (0: never)")
+    export_parser = sub.add_parser("export", help="Export formats of one checkpoint through the service")
+    export_parser.add_argument("--load-config", required=True, help="config.yml of the run")
+    export_parser.add_argument("--output-dir", required=True)
+    export_parser.add_argument("--formats", nargs="+", required=True, choices=list(EXPORTERS))
+    export_parser.add_argument("--glb", action="store_true", help="Also convert every exported PLY to GLB")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            serve(args.port, idle_seconds=args.idle)
+        except OSError as e:
+            print(f"[ExportServer] Could not listen on port {args.port}: {e}")
+            sys.exit(1)
+        return
+
+    if not os.path.isfile(args.load_config):
+        print(f"[ERROR] Config not found: {args.load_config}")
+        sys.exit(1)
+    os.makedirs(args.output_dir, exist_ok=True)
+    device = export_server_device()
+    if EXPORT_SERVER_ENABLED and ensure_export_server(device):
+        try:
+            result = export_via_server(args.load_config, args.formats, args.output_dir, args.glb, device)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Export service failed: {e}")
+            result = None
+        if result is not None:
+            print(f"[Export] {len(args.formats)} format(s) in {result['seconds']:.1f}s via the export service "
+                  f"→ {os.path.join(args.output_dir, EXPORT_MANIFEST_NAME)}")
+            sys.exit(0 if result["ok"] else 1)
+        print("[Export] Falling back to ns-export")
+    else:
+        print("[Export] Export service unavailable, running ns-export")
+    sys.exit(0 if export_direct(args.load_config, args.formats, args.output_dir, args.glb) else 1)
+
+
+if __name__ == "__main__":
+    main()
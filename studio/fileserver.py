@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+File server for 3DGS Studio.
+Moves large files in and out of the Web UI without going through
+Streamlit, which keeps whole files in memory: uploads arrive as resumable
+chunked PUTs streamed to disk, and artifacts are downloaded straight from
+outputs/ and exports/ with sendfile, range requests (resumable downloads)
+and ETag / Last-Modified validation. A project's files can be downloaded
+as one zip that is written while it is sent.
+
+Everything but /health needs the access token, either as a /t/<token> path
+prefix (download links; relative URLs in a downloaded tileset index keep
+it) or in an X-Studio-Token header (the uploader). It is kept in
+data/jobs/fileserver.token, renewed whenever app.py starts the server, and
+embedded by app.py in the links and the upload widget it renders. CORS is
+only allowed for the Web UI origin (any host on port STUDIO_UI_PORT, 8501).
+
+Endpoints:
+  GET  /health
+  GET  /uploads/<upload_id>                → {"offset": bytes already received}
+  PUT  /uploads/<upload_id>?offset=N       body: chunk, header X-Chunk-SHA256 (the uploader always sends it)
+                                           → {"offset": new offset}; 409 + current offset on mismatch
+  POST /uploads/<upload_id>/complete?project=P&filename=F&sha256=S
+                                           → {"path": ..., "sha256": ...}
+  GET  /files/<outputs|exports>/<path>     file download (HEAD, Range, If-None-Match, If-Range)
+  GET  /zip/<project>[?root=outputs|exports]
+                                           streamed zip of the project's directory
+
+app.py starts it automatically; it can also be run by hand:
+  python3 -m studio.fileserver [--port 8502]
+"""
+
+import argparse
+import email.utils
+import hmac
+import json
+import mimetypes
+import os
+import re
+import secrets
+import socket
+import subprocess
+import sys
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+from studio.config import EXPORT_DIR, JOBS_DIR, OUTPUT_DIR
+from studio.uploads import CHUNK_SIZE, ChecksumError, OffsetMismatch, ResumableUploads, check_name
+
+FILESERVER_PORT = int(os.environ.get("STUDIO_FILESERVER_PORT", "8502"))
+FILESERVER_LOG = os.path.join(JOBS_DIR, "fileserver.log")
+FILESERVER_TOKEN_FILE = os.path.join(JOBS_DIR, "fileserver.token")
+# Port of the Streamlit Web UI: the only origin allowed to call the server from a browser
+UI_PORT = int(os.environ.get("STUDIO_UI_PORT", "8501"))
+
+# Directories served under /files/<name>/ and /zip/
+DOWNLOAD_ROOTS = {"outputs": OUTPUT_DIR, "exports": EXPORT_DIR}
+# Artifacts don't change once written, but may be overwritten by a rerun: revalidate
+CACHE_CONTROL = "no-cache"
+# Text files are deflated in project zips; binary PLY/GLB/checkpoints barely shrink and are stored
+DEFLATE_EXTENSIONS = (".obj", ".mtl", ".yml", ".yaml", ".json", ".txt", ".csv", ".log")
+
+mimetypes.add_type("model/gltf-binary", ".glb")
+mimetypes.add_type("application/octet-stream", ".ply")
+mimetypes.add_type("application/octet-stream", ".splat")
+mimetypes.add_type("model/obj", ".obj")
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def resolve_download(root, rel_path):
+    """Absolute path of a file under a DOWNLOAD_ROOTS entry, or None (also for ../ escapes)."""
+    base = DOWNLOAD_ROOTS.get(root)
+    if base is None:
+        return None
+    base = os.path.realpath(base)
+    path = os.path.realpath(os.path.join(base, rel_path))
+    if not path.startswith(base + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def fileserver_token(renew=False):
+    """Access token of the file server, created (readable by this user only) when missing or renewed."""
+    if not renew:
+        try:
+            with open(FILESERVER_TOKEN_FILE) as f:
+                token = f.read().strip()
+            if token:
+                return token
+        except OSError:
+            pass
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    tmp_path = f"{FILESERVER_TOKEN_FILE}.{os.getpid()}.tmp"
+    with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+        f.write(token)
+    os.replace(tmp_path, FILESERVER_TOKEN_FILE)
+    return token
+
+
+def allowed_origin(origin):
+    """True for the Web UI origin (http(s) on UI_PORT, any host name the browser used)."""
+    try:
+        url = urlparse(origin or "")
+        return url.scheme in ("http", "https") and url.port == UI_PORT
+    except ValueError:
+        return False
+
+
+def download_url(path, host="localhost", port=FILESERVER_PORT):
+    """URL (with the access token) of a file under outputs/ or exports/ on the file server, or None."""
+    path = os.path.realpath(path)
+    for root, base in DOWNLOAD_ROOTS.items():
+        base = os.path.realpath(base)
+        if path.startswith(base + os.sep):
+            rel_path = quote(os.path.relpath(path, base))
+            return f"http://{host}:{port}/t/{fileserver_token()}/files/{root}/{rel_path}"
+    return None
+
+
+def project_zip_url(project, host="localhost", port=FILESERVER_PORT, root="outputs"):
+    return f"http://{host}:{port}/t/{fileserver_token()}/zip/{quote(project)}?root={root}"
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single "bytes=a-b" range; None = whole file; ValueError = unsatisfiable."""
+    m = RANGE_PATTERN.match(header.strip()) if header else None
+    if not m or m.group(1) == m.group(2) == "":
+        return None  # multiple ranges / other units: send the whole file
+    if m.group(1) == "":
+        start, end = max(0, size - int(m.group(2))), size - 1
+    else:
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+def file_etag(st):
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+class FileRequestHandler(BaseHTTPRequestHandler):
+    server_version = "3DGSStudioFiles/1.0"
+    uploads = None  # ResumableUploads, set in serve()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self._cors_headers()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _cors_headers(self):
+        self.send_header("Vary", "Origin")
+        origin = self.headers.get("Origin")
+        if not allowed_origin(origin):
+            return  # other sites' scripts can't read the responses (the token stops their requests)
+        self.send_header("Access-Control-Allow-Origin", origin)
+        self.send_header("Access-Control-Expose-Headers", "Content-Range, ETag, Content-Length")
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, PUT, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers",
+                         "Content-Type, X-Chunk-SHA256, X-Studio-Token, Range, If-None-Match, If-Range")
+
+    def _authorized(self, query):
+        """Check the access token; answers 403 and returns False when it is missing or wrong."""
+        token = self.headers.get("X-Studio-Token") or query.get("token", "")
+        if hmac.compare_digest(token.encode(), fileserver_token().encode()):
+            return True
+        self._send_json(403, {"error": "invalid or missing token (reload the Web UI page)"})
+        return False
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if len(parts) >= 2 and parts[0] == "t":
+            query["token"], parts = parts[1], parts[2:]
+        return parts, query
+
+    def _discard(self, length):
+        while length > 0:
+            chunk = self.rfile.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._cors_headers()
+        self.end_headers()
+
+    def do_HEAD(self):
+        parts, query = self._route()
+        if not self._authorized(query):
+            return
+        if len(parts) >= 3 and parts[0] == "files":
+            return self._send_file(parts[1], "/".join(parts[2:]), head=True)
+        self._send_json(404, {"error": "not found"})
+
+    def do_GET(self):
+        parts, query = self._route()
+        if parts == ["health"]:
+            return self._send_json(200, {"ok": True})
+        if not self._authorized(query):
+            return
+        if len(parts) >= 3 and parts[0] == "files":
+            return self._send_file(parts[1], "/".join(parts[2:]))
+        if len(parts) == 2 and parts[0] == "zip":
+            return self._send_zip(unquote(parts[1]), query.get("root", "outputs"))
+        if len(parts) == 2 and parts[0] == "uploads":
+            try:
+                return self._send_json(200, {"offset": self.uploads.offset(parts[1])})
+            except ValueError as e:
+                return self._send_json(400, {"error": str(e)})
+        self._send_json(404, {"error": "not found"})
+
+    def _send_file(self, root, rel_path, head=False):
+        path = resolve_download(root, unquote(rel_path))
+        if path is None:
+            return self._send_json(404, {"error": "not found"})
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            etag = file_etag(st)
+            last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self._cors_headers()
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            try:
+                byte_range = parse_range(self.headers.get("Range"), st.st_size)
+            except ValueError:
+                self.send_response(416)
+                self._cors_headers()
+                self.send_header("Content-Range", f"bytes */{st.st_size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if_range = self.headers.get("If-Range")
+            if byte_range and if_range and if_range not in (etag, last_modified):
+                byte_range = None  # file changed since the partial download: start over
+            start, end = byte_range or (0, st.st_size - 1)
+            length = max(0, end - start + 1)
+
+            self.send_response(206 if byte_range else 200)
+            self._cors_headers()
+            self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.send_header("Cache-Control", CACHE_CONTROL)
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(os.path.basename(path))}")
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{st.st_size}")
+            self.end_headers()
+            if head or not length:
+                return
+            self.wfile.flush()
+            try:
+                self.connection.sendfile(f, offset=start, count=length)  # zero-copy where the OS supports it
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+    def _send_zip(self, project, root):
+        try:
+            check_name(project)
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        base = DOWNLOAD_ROOTS.get(root)
+        directory = os.path.join(base, project) if base else None
+        if not directory or not os.path.isdir(directory):
+            return self._send_json(404, {"error": "not found"})
+        self.send_response(200)
+        self._cors_headers()
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(project)}.zip")
+        self.end_headers()  # no Content-Length: the zip is written while it is sent, then the connection closes
+        self.close_connection = True
+        try:
+            # The socket isn't seekable, so zipfile writes data descriptors after each entry
+            with zipfile.ZipFile(self.wfile, "w", allowZip64=True) as zf:
+                for dirpath, _, files in os.walk(directory):
+                    for name in sorted(files):
+                        path = os.path.join(dirpath, name)
+                        arcname = os.path.join(project, os.path.relpath(path, directory))
+                        info = zipfile.ZipInfo.from_file(path, arcname)
+                        if name.lower().endswith(DEFLATE_EXTENSIONS):
+                            info.compress_type = zipfile.ZIP_DEFLATED
+                        with open(path, "rb") as src, zf.open(info, "w", force_zip64=True) as dst:
+                            while True:
+                                chunk = src.read(CHUNK_SIZE)
+                                if not chunk:
+                                    break
+                                dst.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_PUT(self):
+        parts, query = self._route()
+        if not self._authorized(query):
+            self.close_connection = True  # the chunk body is not read
+            return
+        if len(parts) != 2 or parts[0] != "uploads":
+            return self._send_json(404, {"error": "not found"})
+        upload_id = parts[1]
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+            offset = int(query.get("offset", "0"))
+            new_offset = self.uploads.append(upload_id, offset, self.rfile, length,
+                                             self.headers.get("X-Chunk-SHA256"))
+        except OffsetMismatch as e:
+            self._discard(length)  # read the unused body so the client gets the answer
+            return self._send_json(409, {"error": str(e), "offset": e.current})
+        except ChecksumError as e:
+            return self._send_json(422, {"error": str(e), "offset": self.uploads.offset(upload_id)})
+        except ValueError as e:
+            self.close_connection = True  # the body ended early
+            return self._send_json(400, {"error": str(e), "offset": self.uploads.offset(upload_id)})
+        self._send_json(200, {"offset": new_offset})
+
+    def do_POST(self):
+        parts, query = self._route()
+        if not self._authorized(query):
+            return
+        if len(parts) != 3 or parts[0] != "uploads" or parts[2] != "complete":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            path, digest = self.uploads.complete(parts[1], query.get("project", ""), query.get("filename", ""),
+                                                 query.get("sha256"))
+        except ChecksumError as e:
+            return self._send_json(422, {"error": str(e)})
+        except (ValueError, OSError) as e:
+            return self._send_json(400, {"error": str(e)})
+        print(f"[FileServer] Upload {parts[1]} complete: {path} (sha256 {digest})", flush=True)
+        self._send_json(200, {"path": path, "sha256": digest})
+
+    def log_request(self, code="-", size="-"):
+        # Chunk PUTs would flood the log; keep errors only
+        if str(code).isdigit() and int(code) >= 400:
+            super().log_request(code, size)
+
+
+def serve(port=FILESERVER_PORT, host="0.0.0.0"):
+    FileRequestHandler.uploads = ResumableUploads()
+    server = ThreadingHTTPServer((host, port), FileRequestHandler)
+    server.daemon_threads = True
+    print(f"[FileServer] Listening on {host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def fileserver_running(port=FILESERVER_PORT):
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def ensure_fileserver(port=FILESERVER_PORT):
+    """Start a detached file server unless something already listens on the port."""
+    if fileserver_running(port):
+        return False
+    fileserver_token(renew=True)  # links rendered for a previous server stop working
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(FILESERVER_LOG, "a") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "studio.fileserver", "--port", str(port)],
+            cwd=repo_root, stdout=log, stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL, start_new_session=True,
+        )
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3DGS Studio File Server")
+    parser.add_argument("--port", type=int, default=FILESERVER_PORT,
+                        help=f"Port to listen on (default: {FILESERVER_PORT})")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to bind (default: 0.0.0.0)")
+    args = parser.parse_args()
+    try:
+        serve(args.port, args.host)
+    except OSError as e:
+        print(f"[FileServer] Could not listen on port {args.port}: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
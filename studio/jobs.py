@@ -0,0 +1,241 @@
+"""
+SQLite-backed job queue shared by the Web UI and the background worker.
+
+A job is an ordered list of steps that run one after another until the
+first failure. Each step is a dict:
+    - 'label': str shown in the UI
+    - 'cmd': list of str (the command to run)
+    - 'progress': optional progress config (see studio.progress)
+    - 'expects': optional list of paths that must exist after the step
+    - 'allow_failure': optional bool, keep going if the command fails
+
+The UI only submits and polls; `studio.worker` claims and executes jobs.
+Logs are written to JOBS_DIR/<job_id>/job.log (see studio.logs); the wall time of every step
+ends up in `step_times` as [{'label', 'seconds', 'cached'}, ...]. Steps
+reporting progress events keep the latest event in `metrics` (it/s, ETA,
+GPU memory; see scripts/progress_events.py).
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+from studio.config import JOBS_DIR
+from studio.scheduler import vram_for
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+STATE_EMOJI = {
+    QUEUED: "⏳",
+    RUNNING: "🔄",
+    SUCCEEDED: "✅",
+    FAILED: "❌",
+    CANCELLED: "⏹️",
+}
+
+# column name -> SQL type; new columns are added to existing databases on open
+COLUMNS = {
+    "id": "TEXT PRIMARY KEY",
+    "kind": "TEXT NOT NULL",
+    "project": "TEXT",
+    "title": "TEXT",
+    "steps": "TEXT NOT NULL",
+    "state": "TEXT NOT NULL",
+    "exit_code": "INTEGER",
+    "error": "TEXT",
+    "current_step": "INTEGER DEFAULT 0",
+    "progress": "REAL DEFAULT 0",
+    "progress_text": "TEXT DEFAULT ''",
+    "cancel_requested": "INTEGER DEFAULT 0",
+    "pid": "INTEGER",
+    "resource": "TEXT",
+    "vram_mb": "INTEGER DEFAULT 0",
+    "gpu": "INTEGER",
+    "locks": "TEXT",
+    "depends_on": "TEXT",
+    "batch": "TEXT",
+    "output_dir": "TEXT",
+    "log_path": "TEXT",
+    "step_times": "TEXT",
+    "metrics": "TEXT",
+    "created_at": "REAL",
+    "started_at": "REAL",
+    "finished_at": "REAL",
+}
+
+JSON_COLUMNS = ("steps", "locks", "depends_on", "step_times", "metrics")
+
+
+def _new_job_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class JobStore:
+    """Thin wrapper around the jobs table. Safe to use from several processes."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(JOBS_DIR, "jobs.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            cols = ", ".join(f"{name} {sql}" for name, sql in COLUMNS.items())
+            conn.execute(f"CREATE TABLE IF NOT EXISTS jobs ({cols})")
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, sql in COLUMNS.items():
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {sql}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, created_at)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # commit on success, rollback on error
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for name in JSON_COLUMNS:
+            if job.get(name):
+                job[name] = json.loads(job[name])
+        return job
+
+    def submit(self, kind, steps, project="", title="", output_dir=None, resource="cpu", vram_mb=None,
+               locks=(), depends_on=(), batch=None):
+        """Queue a new job and return its ID.
+
+        `resource` names a profile in studio.scheduler.VRAM_PROFILES; `vram_mb`
+        overrides the VRAM declared by that profile. `locks` are names of
+        exclusive resources (e.g. a fixed port) the job must hold alone.
+        The job starts only after all `depends_on` jobs have succeeded.
+        """
+        job_id = _new_job_id()
+        log_path = os.path.join(JOBS_DIR, job_id, "job.log")
+        if vram_mb is None:
+            vram_mb = vram_for(resource)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, project, title, steps, state, output_dir, log_path, "
+                "resource, vram_mb, locks, depends_on, batch, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, project, title or kind, json.dumps(steps), QUEUED,
+                 output_dir, log_path, resource, vram_mb, json.dumps(list(locks)),
+                 json.dumps(list(depends_on)), batch, time.time()),
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, limit=20, project=None, states=None, kind=None, batch=None):
+        """Most recent jobs first, optionally filtered by project, state, kind and batch."""
+        query = "SELECT * FROM jobs"
+        clauses, params = [], []
+        if batch:
+            clauses.append("batch = ?")
+            params.append(batch)
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if project:
+            clauses.append("project = ?")
+            params.append(project)
+        if states:
+            clauses.append(f"state IN ({', '.join('?' * len(states))})")
+            params.extend(states)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def states(self, job_ids):
+        """Map of job ID -> state for the given IDs."""
+        if not job_ids:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, state FROM jobs WHERE id IN ({', '.join('?' * len(job_ids))})", list(job_ids)
+            ).fetchall()
+        return {job_id: state for job_id, state in rows}
+
+    def counts(self):
+        """Number of jobs per state."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: n for state, n in rows}
+
+    def queued(self):
+        """Queued jobs, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE state = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def claim(self, job_id, gpu=None):
+        """Atomically move a queued job to RUNNING. False if it is no longer queued."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET state = ?, started_at = ?, gpu = ? WHERE id = ? AND state = ?",
+                (RUNNING, time.time(), gpu, job_id, QUEUED),
+            )
+        return cur.rowcount == 1
+
+    def update(self, job_id, **fields):
+        if not fields:
+            return
+        for name in JSON_COLUMNS:
+            if name in fields:
+                fields[name] = json.dumps(fields[name])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def finish(self, job_id, state, exit_code=None, error=None):
+        self.update(job_id, state=state, exit_code=exit_code, error=error,
+                    finished_at=time.time(), pid=None)
+
+    def request_cancel(self, job_id):
+        """Cancel a queued job immediately; ask the worker to stop a running one."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, finished_at = ? WHERE id = ? AND state = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND state = ?",
+                (job_id, RUNNING),
+            )
+
+    def cancel_requested(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def fail_orphans(self):
+        """Mark RUNNING jobs as failed; called by a worker on startup."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, finished_at = ?, pid = NULL WHERE state = ?",
+                (FAILED, "worker restarted while job was running", time.time(), RUNNING),
+            )
+
@@ -0,0 +1,99 @@
+"""
+Job log files.
+
+JobLog is what the worker writes a job's output to: a size-rotated file
+(job.log, job.log.1, ...) with time-based flushing instead of a flush per
+line, plus an in-memory ring buffer of the latest lines. read_log_tail()
+is what the UI polls; it only reads the end of the file(s).
+"""
+
+import os
+import threading
+from collections import deque
+
+# Rotate a job log once it reaches this size; keep this many old files
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_BACKUPS = 3
+# Lines kept in memory (JobLog.tail)
+TAIL_LINES = 500
+
+
+class JobLog:
+    """Append-only job log with rotation and a tail ring buffer. Thread-safe."""
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS, tail_lines=TAIL_LINES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.tail = deque(maxlen=tail_lines)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def write(self, text):
+        with self._lock:
+            if self._size and self._size + len(text) > self.max_bytes:
+                self._rotate()
+            self._file.write(text)
+            self._size += len(text)
+            self.tail.extend(text.splitlines())
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def last_line(self):
+        """Latest non-empty line, e.g. the error message of a failed command."""
+        for line in reversed(self.tail):
+            if line.strip():
+                return line.strip()
+        return ""
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+
+
+def _read_end(path, max_bytes):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        data = f.read().decode("utf-8", errors="replace")
+    lines = data.splitlines()
+    if size > max_bytes:
+        lines = lines[1:]  # first line is probably partial
+    return lines
+
+
+def read_log_tail(log_path, max_lines=50, max_bytes=64 * 1024):
+    """Return the last lines of a job log without reading the whole file.
+
+    Right after a rotation the current file is nearly empty, so the rest
+    comes from the previous file.
+    """
+    if not log_path or not os.path.exists(log_path):
+        return []
+    lines = _read_end(log_path, max_bytes)
+    if len(lines) < max_lines and os.path.exists(f"{log_path}.1"):
+        lines = _read_end(f"{log_path}.1", max_bytes) + lines
+    return lines[-max_lines:]
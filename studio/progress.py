@@ -0,0 +1,139 @@
+"""
+Progress parsing for job steps.
+
+A step may carry a `progress` config (the same dict app.py used to pass to
+`run_command`):
+    - 'type': 'steps' | 'iterations' | 'pattern' | 'events'
+    - 'total_steps': int (for 'steps' type)
+    - 'step_patterns': list of str (for 'steps' type - regex patterns that advance the step)
+    - 'total_iterations': int (for 'iterations' type)
+    - 'start_iteration': int (for 'iterations' type - resumed runs count on from here)
+    - 'iteration_pattern': str (regex with group(1) as current iteration)
+    - 'pattern': str (regex with group(1) as numerator, group(2) as denominator)
+
+'events' steps don't parse their log at all: the command writes JSON-lines
+progress events (scripts/progress_events.py) to the file the worker names
+in STUDIO_PROGRESS_FILE, and the worker feeds them in with feed_event().
+"""
+
+import json
+import os
+import re
+
+from studio.config import JOBS_DIR
+
+
+def _clock(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def events_path(job_id, index):
+    """Progress events file of a job step (JOBS_DIR is under data/, mounted in the training containers)."""
+    return os.path.join(JOBS_DIR, job_id, f"progress-{index}.jsonl")
+
+
+class EventReader:
+    """Follows a progress events file, returning only what was appended since the last poll."""
+
+    def __init__(self, path):
+        self.path = path
+        self._offset = 0
+        self._partial = b""
+
+    def poll(self):
+        """New events (dicts) written since the last call."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return []
+        self._offset += len(data)
+        *lines, self._partial = (self._partial + data).split(b"\n")
+        events = []
+        for line in lines:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+        return events
+
+
+class ProgressTracker:
+    """Turns log lines into a (fraction, text) progress value for one step."""
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.type = config.get("type", "")
+        self.fraction = 0.0
+        self.text = ""
+        self.metrics = {}
+        self._step = 0
+
+        if self.type == "steps":
+            step_patterns = config.get("step_patterns", [])
+            self._patterns = [re.compile(p, re.IGNORECASE) for p in step_patterns]
+            # One search rejects the (vast majority of) lines that match no step
+            self._any = re.compile("|".join(f"(?:{p})" for p in step_patterns) or "(?!)", re.IGNORECASE)
+            self._total = config.get("total_steps", len(self._patterns)) or 1
+        elif self.type == "iterations":
+            self._pattern = re.compile(config.get("iteration_pattern", ""))
+            self._total = config.get("total_iterations", 30000) or 1
+            self._start = config.get("start_iteration", 0)
+        elif self.type == "pattern":
+            self._pattern = re.compile(config.get("pattern", ""))
+
+    def feed_event(self, event):
+        """Update progress from one progress event ('events' type)."""
+        self.fraction = min(max(float(event.get("progress") or 0.0), self.fraction), 1.0)
+        self.metrics = event
+        if event.get("event") == "done":
+            return
+        parts = [event.get("stage", "")]
+        if event.get("stages"):
+            parts[0] += f" ({event.get('stage_index', 0) + 1}/{event['stages']})"
+        if event.get("total"):
+            parts.append(f"{event.get('iteration', 0):,}/{event['total']:,}")
+        if event.get("it_per_s") is not None:
+            parts.append(f"{event['it_per_s']:.1f} it/s")
+        if event.get("eta") is not None:
+            parts.append(f"残り {_clock(event['eta'])}")
+        if event.get("gpu_mem_mb") is not None:
+            parts.append(f"GPU {event['gpu_mem_mb']:,} MB")
+        self.text = " · ".join(p for p in parts if p)
+
+    def feed(self, line):
+        """Update progress from one log line. Returns True if progress changed."""
+        try:
+            if self.type == "steps":
+                if not self._any.search(line):
+                    return False
+                for i, pat in enumerate(self._patterns):
+                    if pat.search(line):
+                        self._step = max(self._step, i + 1)
+                        self.fraction = min(self._step / self._total, 1.0)
+                        self.text = f"ステップ {self._step}/{self._total}: {line[:80]}"
+                        return True
+
+            elif self.type == "iterations":
+                m = self._pattern.search(line)
+                if m:
+                    current_iter = int(m.group(1))
+                    self.fraction = min(max(current_iter - self._start, 0) / self._total, 1.0)
+                    self.text = f"イテレーション {current_iter:,}/{self._start + self._total:,}"
+                    return True
+
+            elif self.type == "pattern":
+                m = self._pattern.search(line)
+                if m:
+                    num = int(m.group(1))
+                    den = int(m.group(2))
+                    if den > 0:
+                        self.fraction = min(num / den, 1.0)
+                        self.text = f"{num}/{den}"
+                        return True
+        except (ValueError, IndexError):
+            pass
+        return False
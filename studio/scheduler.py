@@ -0,0 +1,187 @@
+"""
+GPU-aware scheduling for jobs across the nerfstudio, sugar and 2dgs containers.
+
+Each job declares a resource profile (see VRAM_PROFILES). The scheduler keeps
+track of which jobs hold which device, places a job on a GPU with enough
+free declared VRAM and a free slot, and pins it there with
+CUDA_VISIBLE_DEVICES. Jobs that don't fit stay queued. Jobs can also hold
+named exclusive locks (e.g. "viewer:7007" for the one exposed viewer port).
+
+The device inventory comes from nvidia-smi, or from STUDIO_FAKE_GPUS
+(comma-separated VRAM in MB, e.g. "24576,12288") so scheduling can be
+exercised on a CPU-only machine.
+"""
+
+import os
+import subprocess
+
+# Declared peak VRAM (MB) per job profile
+VRAM_PROFILES = {
+    # Nerfstudio models
+    "splatfacto": 8000,
+    "splatfacto-big": 16000,
+    "splatfacto-w": 12000,
+    "nerfacto": 6000,
+    "nerfacto-big": 10000,
+    "nerfacto-huge": 16000,
+    "instant-ngp": 6000,
+    "neus-facto": 10000,
+    "neus": 10000,
+    "dnerf": 8000,
+    "nerfplayer-nerfacto": 10000,
+    "tensorf": 8000,
+    "zipnerf": 16000,
+    "volinga": 8000,
+    # Other frameworks (sized for their heaviest stage)
+    "sugar": 20000,  # SuGaR refinement
+    "2dgs": 12000,
+    # Pipeline stages
+    "colmap": 2000,  # SIFT feature extraction / matching on GPU
+    "ns-export": 6000,
+    "cpu": 0,
+}
+DEFAULT_VRAM_MB = 8000
+
+
+def vram_for(resource):
+    """Declared VRAM (MB) for a resource profile; unknown profiles get a default."""
+    if not resource:
+        return 0
+    return VRAM_PROFILES.get(resource, DEFAULT_VRAM_MB)
+
+
+class GpuDevice:
+    def __init__(self, index, total_mb, name=""):
+        self.index = index
+        self.total_mb = total_mb
+        self.name = name
+
+    def __repr__(self):
+        return f"GpuDevice({self.index}, {self.total_mb} MB, {self.name!r})"
+
+
+def detect_devices():
+    """List GPUs from STUDIO_FAKE_GPUS or nvidia-smi. Empty list if none found."""
+    fake = os.environ.get("STUDIO_FAKE_GPUS")
+    if fake is not None:
+        return [GpuDevice(i, int(mb), "fake") for i, mb in enumerate(fake.split(",")) if mb.strip()]
+    try:
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=index,memory.total,name", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, timeout=10
+        )
+    except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+        return []
+    devices = []
+    for line in result.stdout.strip().splitlines():
+        parts = [p.strip() for p in line.split(",")]
+        try:
+            devices.append(GpuDevice(int(parts[0]), int(float(parts[1])), parts[2] if len(parts) > 2 else ""))
+        except (ValueError, IndexError):
+            continue
+    return devices
+
+
+class Allocation:
+    """Placement of one job: `device` is a GPU index, or None for unpinned/CPU jobs."""
+
+    def __init__(self, job_id, device, vram_mb, locks=()):
+        self.job_id = job_id
+        self.device = device
+        self.vram_mb = vram_mb
+        self.locks = tuple(locks)
+
+    def env(self):
+        if self.device is None:
+            return {}
+        return {"CUDA_VISIBLE_DEVICES": str(self.device)}
+
+
+class GpuScheduler:
+    """Tracks declared VRAM and job slots per device.
+
+    - CPU jobs (0 MB) are always placed, unpinned.
+    - A GPU job goes to the device with the least free VRAM that still fits
+      it and has a free slot (best fit, keeps big gaps for big jobs).
+    - A job declaring more than any device has gets an idle device to itself.
+    - Without any detected GPU, GPU jobs run unpinned one at a time.
+    """
+
+    def __init__(self, devices=None, slots_per_device=2):
+        self.devices = detect_devices() if devices is None else list(devices)
+        self.slots_per_device = slots_per_device
+        self.allocations = {}
+
+    def _jobs_on(self, index):
+        return [a for a in self.allocations.values() if a.device == index]
+
+    def free_mb(self, device):
+        return device.total_mb - sum(a.vram_mb for a in self._jobs_on(device.index))
+
+    def acquire(self, job_id, vram_mb, locks=()):
+        """Reserve a device for a job. Returns an Allocation, or None if it must wait."""
+        held = {name for a in self.allocations.values() for name in a.locks}
+        if held.intersection(locks):
+            return None
+        if vram_mb <= 0:
+            alloc = Allocation(job_id, None, 0)
+        elif not self.devices:
+            if any(a.vram_mb > 0 for a in self.allocations.values()):
+                return None
+            alloc = Allocation(job_id, None, vram_mb)
+        else:
+            candidates = [
+                d for d in self.devices
+                if len(self._jobs_on(d.index)) < self.slots_per_device and self.free_mb(d) >= vram_mb
+            ]
+            if candidates:
+                device = min(candidates, key=self.free_mb)
+                alloc = Allocation(job_id, device.index, vram_mb)
+            elif vram_mb > max(d.total_mb for d in self.devices):
+                idle = [d for d in self.devices if not self._jobs_on(d.index)]
+                if not idle:
+                    return None
+                device = max(idle, key=lambda d: d.total_mb)
+                alloc = Allocation(job_id, device.index, device.total_mb)
+            else:
+                return None
+        alloc.locks = tuple(locks)
+        self.allocations[job_id] = alloc
+        return alloc
+
+    def release(self, job_id):
+        self.allocations.pop(job_id, None)
+
+    def status(self):
+        """Per-device usage summary."""
+        return [
+            {
+                "index": d.index,
+                "name": d.name,
+                "total_mb": d.total_mb,
+                "reserved_mb": d.total_mb - self.free_mb(d),
+                "jobs": [a.job_id for a in self._jobs_on(d.index)],
+            }
+            for d in self.devices
+        ]
+
+
+def pin_command(cmd, env):
+    """Apply pinning env vars to a command.
+
+    Commands run through `docker exec` / `docker compose exec` need the
+    variables passed with `-e`, since the container doesn't inherit the
+    worker's environment.
+    """
+    if not env or len(cmd) < 2 or cmd[0] != "docker":
+        return cmd
+    if cmd[1] == "exec":
+        at = 2
+    elif cmd[1] == "compose" and len(cmd) > 2 and cmd[2] == "exec":
+        at = 3
+    else:
+        return cmd
+    flags = []
+    for key, value in env.items():
+        flags.extend(["-e", f"{key}={value}"])
+    return cmd[:at] + flags + cmd[at:]
@@ -0,0 +1,507 @@
+"""
+Hyperparameter sweeps of nerfstudio training with successive halving.
+
+Instead of training every configuration for the full number of iterations,
+a sweep moves trials up a ladder of iteration budgets (rungs): each trial
+first trains to the lowest rung and is evaluated with ns-eval; only the best
+1/eta of the trials evaluated at a rung are continued (ns-train --load-dir in
+the same run directory, so the schedules match an uninterrupted run) to the
+next rung, up to `iterations`. The rest stop there.
+
+Promotions are asynchronous (ASHA): a trial moves up as soon as it ranks in
+the top 1/eta of the trials evaluated at its rung so far, so queued GPU time
+is not spent waiting for a rung to fill up. Once no more trials can reach a
+rung, its best remaining trial is promoted as in plain successive halving and
+the others are stopped.
+
+Trials are ordinary jobs (kind 'sweep', batch = sweep id) built with
+commands.ns_train_steps / ns_continue_steps / ns_eval_steps, so the worker
+schedules them with everything else. The controller keeps `parallel` of them
+in the queue and records the state in
+OUTPUT_DIR/<project>/sweeps/<sweep id>/sweep.json, which the training page
+shows as a results table. Trial runs are regular runs
+(outputs/<project>/<model>/<sweep id>-tNN) and can be continued from there:
+their ns-train flags are recorded in the run directory and replayed.
+
+Usage:
+  python3 -m studio.sweep run sweep.yaml [--max-concurrent 2]
+  python3 -m studio.sweep resume outputs/<project>/sweeps/<sweep id>
+  python3 -m studio.sweep stop outputs/<project>/sweeps/<sweep id>
+  python3 -m studio.sweep show outputs/<project>/sweeps/<sweep id>
+
+Spec (YAML or JSON):
+  project: garden
+  search: random           # grid (every combination) | random (`trials` samples)
+  trials: 16
+  seed: 0
+  iterations: 30000        # budget of the last rung (a full run)
+  min_iterations: 3000     # budget of the first rung, at most
+  eta: 3                   # keep the best 1/eta per rung
+  metric: psnr             # psnr | ssim | lpips (ns-eval)
+  parallel: 2              # trial jobs in the queue at once
+  space:
+    model: [splatfacto, splatfacto-big]
+    densify_grad_thresh: {min: 0.0001, max: 0.001, log: true}
+    sh_degree: [1, 2, 3]
+    downscale: [1, 2]
+    --pipeline.model.num-random: [50000, 100000]   # any other ns-train flag
+
+Grid spaces are lists only; random spaces also take {min, max, log, int}
+ranges. Densification thresholds and sh_degree exist for splatfacto models.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+
+from studio import commands
+from studio.config import DATA_DIR, OUTPUT_DIR
+from studio.jobs import JobStore, SUCCEEDED, TERMINAL_STATES
+from studio.worker import ensure_worker
+
+SWEEP_DEFAULTS = {
+    "search": "grid",
+    "trials": 16,
+    "seed": 0,
+    "iterations": 30000,
+    "min_iterations": 3000,
+    "eta": 3,
+    "metric": "psnr",
+    "parallel": 2,
+    "space": {},
+}
+
+# Space keys → ns-train flags (keys starting with "--" are passed through as flags)
+PARAM_FLAGS = {
+    "densify_grad_thresh": "--pipeline.model.densify-grad-thresh",
+    "densify_size_thresh": "--pipeline.model.densify-size-thresh",
+    "cull_alpha_thresh": "--pipeline.model.cull-alpha-thresh",
+    "sh_degree": "--pipeline.model.sh-degree",
+}
+# Image downscale factor, applied by the datamanager of every model
+DOWNSCALE_FLAG = "--pipeline.datamanager.camera-res-scale-factor"
+DEFAULT_MODEL = "splatfacto"
+
+# ns-eval metrics and whether higher is better
+METRICS = {"psnr": True, "ssim": True, "lpips": False}
+
+SWEEP_STATE = "sweep.json"
+STOP_FILE = "stop"
+POLL_SECONDS = 5
+
+# Trial status
+PENDING = "pending"    # not started
+TRAINING = "training"  # a rung job is queued or running
+WAITING = "waiting"    # evaluated at a rung, promotion not decided yet
+STOPPED = "stopped"    # not promoted (early stopped), or the sweep was stopped
+DONE = "done"          # trained the full budget
+FAILED = "failed"
+FINISHED_STATUSES = (STOPPED, DONE, FAILED)
+
+STATUS_EMOJI = {PENDING: "⏳", TRAINING: "🔄", WAITING: "⏸️", STOPPED: "✂️", DONE: "✅", FAILED: "❌"}
+
+
+def sweeps_dir(project):
+    return os.path.join(OUTPUT_DIR, project, "sweeps")
+
+
+def list_sweeps(project):
+    """Sweep directories of a project, newest first."""
+    root = sweeps_dir(project)
+    if not os.path.isdir(root):
+        return []
+    dirs = [os.path.join(root, name) for name in os.listdir(root)
+            if os.path.exists(os.path.join(root, name, SWEEP_STATE))]
+    return sorted(dirs, reverse=True)
+
+
+# ------------------------------------------
+# Spec and search space
+# ------------------------------------------
+def load_spec(path):
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return validate_spec(yaml.safe_load(f))
+        return validate_spec(json.load(f))
+
+
+def validate_spec(spec):
+    """Spec with defaults filled in. Raises ValueError."""
+    spec = dict(SWEEP_DEFAULTS, **(spec or {}))
+    if not spec.get("project"):
+        raise ValueError("Sweep spec is missing 'project'")
+    if spec["search"] not in ("grid", "random"):
+        raise ValueError(f"Unknown search '{spec['search']}' (grid | random)")
+    if spec["metric"] not in METRICS:
+        raise ValueError(f"Unknown metric '{spec['metric']}' ({' | '.join(METRICS)})")
+    if spec["eta"] < 2:
+        raise ValueError("eta must be at least 2")
+    if not 0 < spec["min_iterations"] <= spec["iterations"]:
+        raise ValueError("min_iterations must be between 1 and iterations")
+    if "iterations" in spec["space"]:
+        raise ValueError("'iterations' is the budget of the sweep (top level), not a space parameter")
+    for key, values in spec["space"].items():
+        if key not in PARAM_FLAGS and key not in ("model", "downscale") and not key.startswith("--"):
+            raise ValueError(f"Unknown space parameter '{key}' (known: model, downscale, "
+                             f"{', '.join(PARAM_FLAGS)}, or an ns-train flag)")
+        if isinstance(values, dict):
+            if spec["search"] == "grid":
+                raise ValueError(f"{key}: ranges need search: random; grid spaces take lists")
+            if "min" not in values or "max" not in values:
+                raise ValueError(f"{key}: a range needs min and max")
+        elif not isinstance(values, list) or not values:
+            raise ValueError(f"{key}: expected a non-empty list of values")
+    return spec
+
+
+def sample_value(rng, values):
+    if isinstance(values, list):
+        return rng.choice(values)
+    low, high = values["min"], values["max"]
+    if values.get("log"):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    return int(round(value)) if values.get("int") else float(f"{value:.4g}")
+
+
+def trial_params(spec):
+    """Parameter dicts of all trials of a spec."""
+    space = spec["space"]
+    if spec["search"] == "grid":
+        keys = list(space)
+        return [dict(zip(keys, combo)) for combo in itertools.product(*(space[k] for k in keys))]
+    rng = random.Random(spec["seed"])
+    return [{key: sample_value(rng, values) for key, values in space.items()} for _ in range(spec["trials"])]
+
+
+def train_args(params):
+    """(model, extra ns-train flags) of a trial's parameters."""
+    args = []
+    for key, value in params.items():
+        if key == "model":
+            continue
+        if key == "downscale":
+            args += [DOWNSCALE_FLAG, f"{1 / float(value):g}"]
+        else:
+            args += [PARAM_FLAGS.get(key, key), str(value)]
+    return params.get("model", DEFAULT_MODEL), args
+
+
+def rung_budgets(min_iterations, iterations, eta):
+    """Iteration budgets of the rungs: iterations / eta^k, the lowest at most min_iterations."""
+    # ceil: as many rungs as it takes to get the lowest one down to min_iterations
+    rungs = int(math.ceil(math.log(iterations / min_iterations, eta) - 1e-9))
+    return [int(round(iterations / eta ** k)) for k in range(rungs, -1, -1)]
+
+
+# ------------------------------------------
+# Controller
+# ------------------------------------------
+class Sweep:
+    """State of one sweep (sweep.json) and the successive-halving decisions."""
+
+    def __init__(self, sweep_dir, store=None):
+        self.dir = sweep_dir
+        self.store = store or JobStore()
+        with open(self.state_path) as f:
+            self.state = json.load(f)
+
+    @property
+    def state_path(self):
+        return os.path.join(self.dir, SWEEP_STATE)
+
+    @classmethod
+    def create(cls, spec, store=None):
+        """New sweep directory for a validated spec."""
+        sweep_id = f"sweep-{time.strftime('%Y%m%d-%H%M%S')}"
+        sweep_dir = os.path.join(sweeps_dir(spec["project"]), sweep_id)
+        os.makedirs(sweep_dir, exist_ok=True)
+        trials = []
+        for i, params in enumerate(trial_params(spec)):
+            model, _ = train_args(params)
+            timestamp = f"{sweep_id}-t{i:02d}"
+            trials.append({"id": f"t{i:02d}", "params": params, "model": model,
+                           "run_dir": commands.ns_run_dir(spec["project"], model, timestamp),
+                           "status": PENDING, "job_id": None, "metrics": [], "gpu_seconds": 0.0})
+        state = {"id": sweep_id, "spec": spec, "state": "running", "created_at": time.time(),
+                 "rungs": rung_budgets(spec["min_iterations"], spec["iterations"], spec["eta"]), "trials": trials}
+        _write_json(os.path.join(sweep_dir, SWEEP_STATE), state)
+        return cls(sweep_dir, store)
+
+    def save(self):
+        _write_json(self.state_path, self.state)
+
+    @property
+    def spec(self):
+        return self.state["spec"]
+
+    @property
+    def rungs(self):
+        return self.state["rungs"]
+
+    @property
+    def trials(self):
+        return self.state["trials"]
+
+    def score(self, trial, rung):
+        """Metric of a trial at a rung, oriented so that higher is better."""
+        value = trial["metrics"][rung][self.spec["metric"]]
+        return value if METRICS[self.spec["metric"]] else -value
+
+    # --- one controller tick ---------------------------------------------
+    def poll(self):
+        """Collect finished jobs, decide promotions and fill the queue. Returns True while the sweep runs."""
+        if self.state["state"] != "running":
+            return False
+        self._collect()
+        if os.path.exists(os.path.join(self.dir, STOP_FILE)):
+            self.stop()
+            return False
+        self._close_rungs()
+        in_flight = sum(trial["status"] == TRAINING for trial in self.trials)
+        while in_flight < self.spec["parallel"]:
+            trial = self._next_trial()
+            if trial is None:
+                break
+            self._submit(trial)
+            in_flight += 1
+        if not in_flight and all(trial["status"] in FINISHED_STATUSES for trial in self.trials):
+            self.state["state"] = "finished"
+            self.state["finished_at"] = time.time()
+        self.save()
+        return self.state["state"] == "running"
+
+    def _collect(self):
+        for trial in self.trials:
+            if trial["status"] != TRAINING:
+                continue
+            job = self.store.get(trial["job_id"])
+            if job is None:
+                trial.update(status=FAILED, job_id=None, error="job is gone")
+                continue
+            if job["state"] not in TERMINAL_STATES:
+                continue
+            if job["started_at"] and job["finished_at"]:
+                trial["gpu_seconds"] += job["finished_at"] - job["started_at"]
+            trial["job_id"] = None
+            rung = len(trial["metrics"])
+            if job["state"] != SUCCEEDED:
+                trial["status"] = FAILED
+                trial["error"] = job["error"] or job["state"]
+                continue
+            try:
+                with open(self._eval_path(trial, rung)) as f:
+                    results = json.load(f)["results"]
+            except (OSError, ValueError, KeyError) as e:
+                trial["status"] = FAILED
+                trial["error"] = f"ns-eval result: {e}"
+                continue
+            trial["metrics"].append({"iterations": self.rungs[rung],
+                                     **{name: results.get(name) for name in METRICS}})
+            if results.get(self.spec["metric"]) is None:
+                trial["status"] = FAILED
+                trial["error"] = f"ns-eval result has no {self.spec['metric']}"
+            else:
+                trial["status"] = DONE if rung == len(self.rungs) - 1 else WAITING
+
+    def _ranked(self, rung):
+        """Trials evaluated at a rung, best first."""
+        evaluated = [t for t in self.trials if len(t["metrics"]) > rung and t["status"] != FAILED]
+        return sorted(evaluated, key=lambda t: self.score(t, rung), reverse=True)
+
+    def _can_still_reach(self, rung):
+        """Whether an unfinished trial may still be evaluated at this rung."""
+        return any(t["status"] not in FINISHED_STATUSES and len(t["metrics"]) <= rung for t in self.trials)
+
+    def _promotable(self, rung):
+        """Waiting trials of a rung in the top 1/eta there (ASHA), best first."""
+        ranked = self._ranked(rung)
+        top = len(ranked) // self.spec["eta"]
+        if not self._can_still_reach(rung):
+            top = max(top, 1)
+        return [t for t in ranked[:top] if t["status"] == WAITING and len(t["metrics"]) == rung + 1]
+
+    def _close_rungs(self):
+        """Stop the waiting trials of rungs no other trial can reach any more and that missed the top."""
+        for rung in range(len(self.rungs) - 1):
+            if self._can_still_reach(rung):
+                break
+            promotable = self._promotable(rung)
+            for trial in self.trials:
+                if trial["status"] == WAITING and len(trial["metrics"]) == rung + 1 and trial not in promotable:
+                    trial["status"] = STOPPED
+
+    def _next_trial(self):
+        # Promotions first, highest rung first: the best trials finish soonest
+        for rung in reversed(range(len(self.rungs) - 1)):
+            promotable = self._promotable(rung)
+            if promotable:
+                return promotable[0]
+        return next((t for t in self.trials if t["status"] == PENDING), None)
+
+    def _eval_path(self, trial, rung):
+        return os.path.join(trial["run_dir"], f"eval-{self.rungs[rung]}.json")
+
+    def _submit(self, trial):
+        project = self.spec["project"]
+        data_path = os.path.join(DATA_DIR, project)
+        rung = len(trial["metrics"])
+        model, args = train_args(trial["params"])
+        config_path = os.path.join(trial["run_dir"], "config.yml")
+        if rung == 0:
+            steps = commands.ns_train_steps(model, data_path, project, self.rungs[0], False,
+                                            os.path.basename(trial["run_dir"]), extra_args=args)
+        else:
+            steps = commands.ns_continue_steps(config_path, data_path, self.rungs[rung] - self.rungs[rung - 1], False,
+                                               extra_args=args)
+        steps += commands.ns_eval_steps(config_path, self._eval_path(trial, rung))
+        trial["job_id"] = self.store.submit(
+            "sweep", steps, project=project, title=f"Sweep {trial['id']} {model} → {self.rungs[rung]:,} it",
+            output_dir=trial["run_dir"], resource=model, batch=self.state["id"])
+        trial["status"] = TRAINING
+        print(f"[Sweep] {trial['id']}: rung {rung} ({self.rungs[rung]:,} iterations) → job {trial['job_id']}",
+              flush=True)
+
+    def stop(self):
+        """Cancel the trial jobs in flight and end the sweep."""
+        for trial in self.trials:
+            if trial["status"] == TRAINING and trial["job_id"]:
+                self.store.request_cancel(trial["job_id"])
+                trial["job_id"] = None
+            if trial["status"] not in FINISHED_STATUSES:
+                trial["status"] = STOPPED
+        self.state["state"] = "stopped"
+        self.state["finished_at"] = time.time()
+        self.save()
+
+    # --- reporting ------------------------------------------------------
+    def results(self):
+        """Rows of the results table, ranked by highest rung reached, then metric."""
+        rows = []
+        for trial in self.trials:
+            last = trial["metrics"][-1] if trial["metrics"] else {}
+            rows.append({"trial": trial["id"], "status": f"{STATUS_EMOJI[trial['status']]} {trial['status']}",
+                         "iterations": last.get("iterations"),
+                         **{name: last.get(name) for name in METRICS},
+                         "gpu_min": round(trial["gpu_seconds"] / 60, 1),
+                         **trial["params"],
+                         "run": os.path.basename(trial["run_dir"])})
+        metric, higher_is_better = self.spec["metric"], METRICS[self.spec["metric"]]
+
+        def rank(row):
+            if row[metric] is None:
+                return -(row["iterations"] or 0), math.inf
+            return -row["iterations"], -row[metric] if higher_is_better else row[metric]
+        return sorted(rows, key=rank)
+
+    def summary(self):
+        """Iterations trained vs. running every trial to the full budget."""
+        used = sum(self.rungs[len(t["metrics"]) - 1] for t in self.trials if t["metrics"])
+        full = len(self.trials) * self.rungs[-1]
+        return {"trials": len(self.trials), "iterations": used, "full_iterations": full,
+                "fraction": used / full if full else 0.0,
+                "gpu_hours": sum(t["gpu_seconds"] for t in self.trials) / 3600}
+
+
+def _write_json(path, data):
+    """Replace the file atomically, the Web UI reads it while the controller runs."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def start_sweep(spec):
+    """Create a sweep and run its controller as a detached process (for the Web UI). Returns the sweep dir."""
+    sweep = Sweep.create(validate_spec(spec))
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(sweep.dir, "sweep.log"), "a") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "studio.sweep", "resume", sweep.dir],
+            cwd=repo_root, stdout=log, stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL, start_new_session=True,
+        )
+    return sweep.dir
+
+
+def request_stop(sweep_dir):
+    """Ask the controller of a sweep to stop (it cancels the trial jobs in flight)."""
+    open(os.path.join(sweep_dir, STOP_FILE), "a").close()
+
+
+def print_results(sweep):
+    metric = sweep.spec["metric"]
+    summary = sweep.summary()
+    print(f"\n[Sweep] {sweep.state['id']} ({sweep.state['state']}): {summary['trials']} trials, rungs "
+          f"{', '.join(f'{r:,}' for r in sweep.rungs)}, metric {metric}")
+    print(f"[Sweep] {summary['iterations']:,} of {summary['full_iterations']:,} iterations of full runs "
+          f"({summary['fraction']:.0%}), {summary['gpu_hours']:.2f} GPU hours")
+    print(f"\n{'trial':<6}{'status':<12}{'iters':>8}{'psnr':>8}{'ssim':>8}{'lpips':>8}  params")
+    for row in sweep.results():
+        values = [f"{row[name]:>8.3f}" if row[name] is not None else f"{'-':>8}" for name in METRICS]
+        params = " ".join(f"{key}={row[key]}" for key in sweep.trials[0]["params"])
+        iterations = f"{row['iterations']:,}" if row["iterations"] else "-"
+        print(f"{row['trial']:<6}{row['status'].split()[-1]:<12}{iterations:>8}{''.join(values)}  {params}")
+
+
+def run_controller(sweep, max_concurrent):
+    """Poll the sweep until it ends; trials run in the job worker, started (detached) if none is running.
+
+    The worker is not tied to the sweep: jobs queued from the UI meanwhile keep running after it ends.
+    """
+    if ensure_worker(max_concurrent):
+        print(f"[Sweep] Started a job worker ({max_concurrent} jobs at once)")
+    else:
+        print("[Sweep] Trials run in the worker that is already running")
+    try:
+        while sweep.poll():
+            time.sleep(POLL_SECONDS)
+    except KeyboardInterrupt:
+        print("\n[Sweep] Interrupted, stopping the sweep...")
+        sweep.stop()
+    print_results(sweep)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3DGS Studio Hyperparameter Sweep")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Start a sweep from a spec file")
+    run.add_argument("spec", help="YAML/JSON sweep spec")
+    resume = sub.add_parser("resume", help="Keep controlling an existing sweep")
+    resume.add_argument("sweep_dir")
+    for command in (run, resume):
+        command.add_argument("--max-concurrent", type=int, default=2,
+                             help="Jobs at once when no worker is running (default: 2)")
+    sub.add_parser("stop", help="Stop a running sweep").add_argument("sweep_dir")
+    sub.add_parser("show", help="Print the results table").add_argument("sweep_dir")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        try:
+            spec = load_spec(args.spec)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Invalid sweep spec: {e}")
+            sys.exit(1)
+        sweep = Sweep.create(spec)
+        print(f"[Sweep] {sweep.state['id']}: {len(sweep.trials)} trials, rungs "
+              f"{', '.join(f'{r:,}' for r in sweep.rungs)} → {sweep.dir}")
+        run_controller(sweep, args.max_concurrent)
+    elif args.command == "resume":
+        run_controller(Sweep(args.sweep_dir), args.max_concurrent)
+    elif args.command == "stop":
+        request_stop(args.sweep_dir)
+        print(f"[Sweep] Stop requested: {args.sweep_dir}")
+    else:
+        print_results(Sweep(args.sweep_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Resource telemetry of jobs.
+
+While a job runs, a TelemetrySampler thread samples its running step every
+SAMPLE_INTERVAL seconds:
+    - 'cpu': CPU use in % of one core
+    - 'rss_mb': resident memory
+    - 'read_mb' / 'write_mb': disk I/O since the step started
+    - 'gpu_util' / 'gpu_mem_mb' / 'gpu_power_w': the job's GPU, through NVML
+      (pynvml, if installed) or nvidia-smi; only for jobs placed on a GPU
+
+Commands run by the worker are measured over their process tree (/proc).
+`docker exec <container> ...` steps do their work in another container whose
+processes aren't visible here; they're measured with the Docker stats API of
+that container instead (the whole container). Export steps are thin clients
+of the export service of their GPU (studio.export_server); the service's
+process tree (found through its /health) is added while it exports for the
+step.
+
+Samples are appended as JSON lines {'t', 'step', 'cpu', ...} to
+<output_dir>/telemetry/<job_id>.jsonl (JOBS_DIR/<job_id>/ for jobs without an
+output directory). When the job ends, write_report() condenses them into
+<job_id>.json next to it: per step the wall time and mean / peak of every
+metric, plus the stages the step reported through progress events
+(scripts/progress_events.py) with their iterations per second.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import threading
+import time
+
+from studio.config import JOBS_DIR
+from studio.containers import container_stats
+from studio.export_server import export_server_health
+from studio.progress import EventReader, events_path
+
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+SAMPLE_INTERVAL = float(os.environ.get("STUDIO_TELEMETRY_INTERVAL", "2"))
+TELEMETRY_DIR = "telemetry"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+MB = 1024 * 1024
+
+# Options of `docker exec` that take a value (the container name is the first other argument)
+DOCKER_EXEC_VALUE_OPTIONS = {"-e", "--env", "--env-file", "-u", "--user", "-w", "--workdir", "--detach-keys"}
+
+
+def telemetry_paths(job):
+    """(samples .jsonl, report .json) of a job."""
+    if job.get("output_dir"):
+        directory = os.path.join(job["output_dir"], TELEMETRY_DIR)
+    else:
+        directory = os.path.join(JOBS_DIR, job["id"])
+    return os.path.join(directory, f"{job['id']}.jsonl"), os.path.join(directory, f"{job['id']}.json")
+
+
+def exec_container(cmd):
+    """Container a `docker exec` command runs in, or None for other commands."""
+    if cmd[:2] != ["docker", "exec"]:
+        return None
+    args = iter(cmd[2:])
+    for arg in args:
+        if arg in DOCKER_EXEC_VALUE_OPTIONS:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def export_output_dir(cmd):
+    """Output directory of an export service client command (studio.export_server export), else None."""
+    try:
+        module = cmd.index("studio.export_server")
+        if cmd[module + 1] == "export":
+            return os.path.abspath(cmd[cmd.index("--output-dir") + 1])
+    except (ValueError, IndexError):
+        pass
+    return None
+
+
+# ------------------------------------------
+# Probes
+# ------------------------------------------
+def _proc_stat(pid):
+    """(parent pid, CPU ticks, RSS bytes) of a process."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rpartition(")")[2].split()  # the command name may contain spaces
+    return int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[21]) * PAGE_SIZE
+
+
+def _proc_io(pid):
+    """(read bytes, written bytes) of a process; zeros when /proc/<pid>/io is not readable."""
+    counters = {}
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                counters[key] = int(value)
+    except (OSError, ValueError):
+        pass
+    return counters.get("read_bytes", 0), counters.get("write_bytes", 0)
+
+
+class ProcessTreeProbe:
+    """CPU / memory / disk I/O of a process and all of its descendants."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._counters = {}  # pid -> (CPU ticks, read bytes, written bytes) at the last sample
+        self._totals = [0, 0, 0]
+        self._time = time.monotonic()
+
+    def _tree(self):
+        stats = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    stats[int(entry)] = _proc_stat(entry)
+                except (OSError, ValueError, IndexError):
+                    continue  # exited while listing
+        children = {}
+        for pid, (parent, _, _) in stats.items():
+            children.setdefault(parent, []).append(pid)
+        tree, todo = {}, [self.pid]
+        while todo:
+            pid = todo.pop()
+            if pid in stats:
+                tree[pid] = stats[pid]
+                todo.extend(children.get(pid, ()))
+        return tree
+
+    def sample(self):
+        now = time.monotonic()
+        rss = 0
+        ticks_before = self._totals[0]
+        for pid, (_, ticks, resident) in self._tree().items():
+            counters = (ticks, *_proc_io(pid))
+            # Processes seen for the first time started during the step: count from zero
+            previous = self._counters.get(pid, (0, 0, 0))
+            for i, (value, last) in enumerate(zip(counters, previous)):
+                self._totals[i] += max(value - last, 0)
+            self._counters[pid] = counters
+            rss += resident
+        seconds = max(now - self._time, 1e-6)
+        self._time = now
+        return {"cpu": round((self._totals[0] - ticks_before) / CLOCK_TICKS / seconds * 100, 1),
+                "rss_mb": round(rss / MB, 1), "read_mb": round(self._totals[1] / MB, 1),
+                "write_mb": round(self._totals[2] / MB, 1)}
+
+
+class ContainerProbe:
+    """CPU / memory / block I/O of a whole container (Docker stats API)."""
+
+    def __init__(self, name):
+        self.name = name
+        self._io_start = None
+        self._cpu = None  # (monotonic time, CPU nanoseconds) at the last sample
+
+    def sample(self):
+        stats = container_stats(self.name)
+        if not stats:
+            return {}
+        now = time.monotonic()
+        memory = stats.get("memory_stats") or {}
+        # Page cache doesn't count, like `docker stats` (cgroup v2: inactive_file, v1: cache)
+        cache = (memory.get("stats") or {}).get("inactive_file", (memory.get("stats") or {}).get("cache", 0))
+        io = {"read": 0, "write": 0}
+        for entry in (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []:
+            op = entry.get("op", "").lower()
+            if op in io:
+                io[op] += entry.get("value", 0)
+        if self._io_start is None:
+            self._io_start = dict(io)
+        sample = {"rss_mb": round(max(memory.get("usage", 0) - cache, 0) / MB, 1),
+                  "read_mb": round((io["read"] - self._io_start["read"]) / MB, 1),
+                  "write_mb": round((io["write"] - self._io_start["write"]) / MB, 1)}
+        cpu = ((stats.get("cpu_stats") or {}).get("cpu_usage") or {}).get("total_usage")
+        if cpu is not None:
+            if self._cpu is not None and now > self._cpu[0]:
+                sample["cpu"] = round((cpu - self._cpu[1]) / 1e9 / (now - self._cpu[0]) * 100, 1)
+            self._cpu = (now, cpu)
+        return sample
+
+
+class ExportServiceProbe:
+    """An export client's process tree plus the export service while it works on the client's export."""
+
+    def __init__(self, pid, output_dir, device=None):
+        self.client = ProcessTreeProbe(pid)
+        self.output_dir = output_dir
+        self.device = None if device is None else str(device)
+        self.service = None
+        self.service_io = {}  # disk I/O of the service for this export, kept once it is done
+
+    def sample(self):
+        sample = self.client.sample()
+        health = export_server_health(self.device)
+        # A service started by this client is already part of its process tree
+        if health and health["pid"] not in self.client._counters:
+            if health.get("exporting") == self.output_dir and self.service and self.service.pid == health["pid"]:
+                service = self.service.sample()
+                for key in ("cpu", "rss_mb"):
+                    sample[key] = round(sample[key] + service[key], 1)
+                self.service_io = {key: service[key] for key in ("read_mb", "write_mb")}
+            else:
+                # Count the service from now on: it predates the export, is idle, or works for another job
+                self.service = ProcessTreeProbe(health["pid"])
+                self.service.sample()
+        for key, value in self.service_io.items():
+            sample[key] = round(sample[key] + value, 1)
+        return sample
+
+
+class GpuProbe:
+    """Utilization, memory and power draw of one GPU."""
+
+    def __init__(self, device):
+        self.device = device
+        self._handle = None
+        if pynvml is not None:
+            try:
+                pynvml.nvmlInit()
+                self._handle = pynvml.nvmlDeviceGetHandleByIndex(device)
+            except pynvml.NVMLError:
+                self._handle = None
+
+    def sample(self):
+        if self._handle is not None:
+            try:
+                return {"gpu_util": float(pynvml.nvmlDeviceGetUtilizationRates(self._handle).gpu),
+                        "gpu_mem_mb": round(pynvml.nvmlDeviceGetMemoryInfo(self._handle).used / MB, 1),
+                        "gpu_power_w": round(pynvml.nvmlDeviceGetPowerUsage(self._handle) / 1000, 1)}
+            except pynvml.NVMLError:
+                return {}
+        cmd = ["nvidia-smi", "--query-gpu=utilization.gpu,memory.used,power.draw",
+               "--format=csv,noheader,nounits", "-i", str(self.device)]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+            values = result.stdout.strip().splitlines()[0].split(",")
+        except (OSError, subprocess.TimeoutExpired, IndexError):
+            return {}
+        sample = {}
+        for key, value in zip(("gpu_util", "gpu_mem_mb", "gpu_power_w"), values):
+            try:
+                sample[key] = float(value)
+            except ValueError:
+                pass  # "[N/A]" (e.g. no power sensor)
+        return sample
+
+
+# ------------------------------------------
+# Sampling
+# ------------------------------------------
+class TelemetrySampler(threading.Thread):
+    """Samples the step the job is running into a JSON lines file until stop()."""
+
+    def __init__(self, path, gpu=None, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.device = gpu
+        self.gpu = GpuProbe(gpu) if gpu is not None else None
+        self.steps = []
+        self._probe = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def start_step(self, index, label, cmd, pid):
+        container = exec_container(cmd)
+        output_dir = export_output_dir(cmd)
+        with self._lock:
+            if container:
+                self._probe = ContainerProbe(container)
+            elif output_dir:
+                self._probe = ExportServiceProbe(pid, output_dir, self.device)
+            else:
+                self._probe = ProcessTreeProbe(pid)
+            self.steps.append({"index": index, "label": label, "container": container,
+                               "start": round(time.time(), 2), "end": None})
+
+    def end_step(self):
+        with self._lock:
+            self._probe = None
+            if self.steps:
+                self.steps[-1]["end"] = round(time.time(), 2)
+
+    def stop(self):
+        self._stopped.set()
+        self.join(timeout=self.interval + 10)
+
+    def run(self):
+        with open(self.path, "a") as f:
+            while not self._stopped.wait(self.interval):
+                with self._lock:
+                    probe = self._probe
+                    step = self.steps[-1]["index"] if probe is not None else None
+                if probe is None:
+                    continue
+                sample = {"t": round(time.time(), 2), "step": step}
+                try:
+                    sample.update(probe.sample())
+                except OSError:
+                    pass
+                if self.gpu is not None:
+                    sample.update(self.gpu.sample())
+                f.write(json.dumps(sample) + "\n")
+                f.flush()
+
+
+# ------------------------------------------
+# Report
+# ------------------------------------------
+def read_samples(path):
+    samples = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    samples.append(json.loads(line))
+                except ValueError:
+                    continue  # cut off by a crash
+    except OSError:
+        pass
+    return samples
+
+
+def stage_spans(path, step_end):
+    """Stages of a step from its progress events: name, start, end, iterations, it/s, peak GPU memory."""
+    stages = []
+    for event in EventReader(path).poll():
+        kind = event.get("event")
+        if kind == "stage":
+            if stages and stages[-1]["end"] is None:
+                stages[-1]["end"] = event["t"]
+            stages.append({"name": event.get("stage"), "start": event["t"], "end": None, "iterations": 0,
+                           "rates": [], "gpu_mem_peak_mb": event.get("gpu_mem_mb")})
+        elif stages and kind == "progress":
+            stage = stages[-1]
+            stage["iterations"] = max(stage["iterations"], event.get("iteration") or 0)
+            if event.get("it_per_s") is not None:
+                stage["rates"].append(event["it_per_s"])
+            if event.get("gpu_mem_mb") is not None:
+                stage["gpu_mem_peak_mb"] = max(stage["gpu_mem_peak_mb"] or 0, event["gpu_mem_mb"])
+        elif stages and kind == "done" and stages[-1]["end"] is None:
+            stages[-1]["end"] = event["t"]
+    for stage in stages:
+        stage["end"] = stage["end"] or step_end
+        stage["seconds"] = round(stage["end"] - stage["start"], 1)
+        rates = stage.pop("rates")
+        stage["it_per_s"] = round(statistics.median(rates), 2) if rates else None
+    return stages
+
+
+def build_report(job, steps, samples):
+    by_step = {}
+    for sample in samples:
+        by_step.setdefault(sample.get("step"), []).append(sample)
+    entries = []
+    for step in steps:
+        end = step["end"] or time.time()
+        rows = by_step.get(step["index"], [])
+        entry = dict(step, end=end, seconds=round(end - step["start"], 1), samples=len(rows))
+        for key in ("cpu", "gpu_util", "gpu_power_w"):
+            values = [row[key] for row in rows if row.get(key) is not None]
+            if values:
+                entry[f"{key}_mean"] = round(statistics.fmean(values), 1)
+                entry[f"{key}_peak"] = max(values)
+        for key in ("rss_mb", "gpu_mem_mb"):
+            values = [row[key] for row in rows if row.get(key) is not None]
+            entry[f"{key}_peak"] = max(values) if values else None
+        for key in ("read_mb", "write_mb"):
+            values = [row[key] for row in rows if row.get(key) is not None]
+            entry[key] = values[-1] if values else None
+        entry["stages"] = stage_spans(events_path(job["id"], step["index"]), end)
+        entries.append(entry)
+
+    def peak(key):
+        values = [entry[key] for entry in entries if entry.get(key) is not None]
+        return max(values) if values else None
+
+    return {"job": job["id"], "title": job.get("title"), "interval": SAMPLE_INTERVAL, "steps": entries,
+            "seconds": round(sum(entry["seconds"] for entry in entries), 1),
+            "rss_mb_peak": peak("rss_mb_peak"), "gpu_mem_mb_peak": peak("gpu_mem_mb_peak")}
+
+
+def write_report(job, sampler):
+    """Condense a job's samples into its report (<job_id>.json next to them) and return it."""
+    samples_path, report_path = telemetry_paths(job)
+    report = build_report(job, sampler.steps, read_samples(samples_path))
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def load_report(job):
+    try:
+        with open(telemetry_paths(job)[1]) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,295 @@
+"""
+Upload and import of input data with bounded memory.
+
+- save_stream(): copy a file-like object to disk in chunks, hashing as it goes
+- save_files(): write many uploaded images concurrently
+- ResumableUploads: chunked uploads that survive dropped connections
+  (used by studio.fileserver; partial files live in UPLOAD_DIR/.partial)
+- import_input(): take a video, image directory or zip that already is on the
+  server, symlinking instead of copying where possible
+
+Every path ends up where the preprocess page expects it:
+UPLOAD_DIR/<project>.mp4 for videos, UPLOAD_DIR/<project>/ for images.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from studio.config import UPLOAD_DIR
+
+CHUNK_SIZE = 8 * 1024 * 1024
+MAX_WRITERS = 8
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+PARTIAL_DIR = os.path.join(UPLOAD_DIR, ".partial")
+
+# Project and file names: letters, digits, spaces, '_', '-' and '.', no path separators
+_SAFE_NAME = re.compile(r"^[\w.\- ]+$")
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+class OffsetMismatch(ValueError):
+    """A chunk was sent for an offset other than the end of the partial upload."""
+
+    def __init__(self, offset, current):
+        super().__init__(f"offset {offset} does not match the uploaded size {current}")
+        self.current = current
+
+
+def check_name(name):
+    """Reject project / file names that could escape UPLOAD_DIR (or clash with .partial)."""
+    if not name or not _SAFE_NAME.match(name) or name.startswith(".") or name != name.strip():
+        raise ValueError(f"Invalid name: {name!r} (letters, digits, spaces, '_', '-' and '.'; "
+                         "no leading '.' or surrounding spaces)")
+    return name
+
+
+def video_path(project):
+    return os.path.join(UPLOAD_DIR, f"{check_name(project)}.mp4")
+
+
+def images_dir(project):
+    return os.path.join(UPLOAD_DIR, check_name(project))
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def save_stream(src, dst_path, expected_sha256=None):
+    """Stream `src` to `dst_path` through a temp file next to it.
+
+    The destination is replaced atomically only after the SHA-256 matches
+    `expected_sha256` (if given). Returns the SHA-256.
+    """
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    h = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst_path), prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+                f.write(chunk)
+        digest = h.hexdigest()
+        if expected_sha256 and digest != expected_sha256.lower():
+            raise ChecksumError(f"SHA-256 mismatch for {os.path.basename(dst_path)}: {digest}")
+        if os.path.islink(dst_path):
+            os.remove(dst_path)
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest
+
+
+def writable_dir(dst_dir):
+    """Make dst_dir a real directory before files are written into it.
+
+    import_input() may have symlinked a server-side image directory there;
+    writing through that link would change (or overwrite) the user's source
+    files, so the link is replaced by an empty directory instead.
+    """
+    if os.path.islink(dst_dir):
+        try:
+            os.remove(dst_dir)
+        except FileNotFoundError:
+            pass  # another writer replaced it first
+    os.makedirs(dst_dir, exist_ok=True)
+    return dst_dir
+
+
+def save_files(files, dst_dir, max_workers=MAX_WRITERS):
+    """Write (name, file-like or source path) pairs into dst_dir concurrently.
+
+    Returns the number of files written.
+    """
+    writable_dir(dst_dir)
+
+    def save(item):
+        name, src = item
+        dst = os.path.join(dst_dir, check_name(os.path.basename(name)))
+        if isinstance(src, str):
+            with open(src, "rb") as f:
+                save_stream(f, dst)
+        else:
+            save_stream(src, dst)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return sum(1 for _ in pool.map(save, files))
+
+
+def _link_into_place(src, dst):
+    if os.path.isdir(dst) and not os.path.islink(dst):
+        shutil.rmtree(dst)
+    elif os.path.lexists(dst):
+        os.remove(dst)
+    os.symlink(src, dst)
+
+
+def extract_zip(zip_path, dst_dir, max_workers=MAX_WRITERS):
+    """Extract the images of a zip (flattened) into dst_dir, several members at a time."""
+    with zipfile.ZipFile(zip_path) as zf:
+        members = [m for m in zf.infolist()
+                   if not m.is_dir() and m.filename.lower().endswith(IMAGE_EXTENSIONS)
+                   and not os.path.basename(m.filename).startswith(".")]
+    if not members:
+        raise ValueError(f"No images found in {zip_path}")
+    names = [os.path.basename(m.filename) for m in members]
+    if len(set(names)) != len(names):
+        raise ValueError(f"{zip_path} contains images with the same name in different folders")
+    writable_dir(dst_dir)
+    local = threading.local()
+
+    def extract(member):
+        # ZipFile handles are not safe to share between threads
+        if not hasattr(local, "zf"):
+            local.zf = zipfile.ZipFile(zip_path)
+        with local.zf.open(member) as src:
+            save_stream(src, os.path.join(dst_dir, os.path.basename(member.filename)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(extract, members))
+    return len(members)
+
+
+def import_input(src, project, copy=False):
+    """Put a server-side video, image directory or zip where preprocessing expects it.
+
+    Videos and directories are symlinked (copied with `copy`); zips are
+    extracted. Returns (input_path, data_type).
+    """
+    src = os.path.abspath(src)
+    if os.path.isdir(src):
+        data_type, dst = "images", images_dir(project)
+    elif src.lower().endswith(VIDEO_EXTENSIONS):
+        data_type, dst = "video", video_path(project)
+    elif zipfile.is_zipfile(src):
+        dst = images_dir(project)
+        extract_zip(src, dst)
+        return dst, "images"
+    else:
+        raise ValueError(f"Input must be a video file, image directory or zip: {src}")
+
+    if os.path.realpath(dst) == os.path.realpath(src):
+        return dst, data_type
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    if copy:
+        if data_type == "images":
+            save_files([(name, os.path.join(src, name)) for name in sorted(os.listdir(src))
+                        if name.lower().endswith(IMAGE_EXTENSIONS)], dst)
+        else:
+            with open(src, "rb") as f:
+                save_stream(f, dst)
+    else:
+        _link_into_place(src, dst)
+    return dst, data_type
+
+
+class ResumableUploads:
+    """Chunked uploads to UPLOAD_DIR/.partial/<upload_id>.part.
+
+    A client asks for the current offset, sends chunks at that offset
+    (each with its own SHA-256), and completes the upload with the
+    SHA-256 of the whole file, which is required. Reconnecting clients
+    resume at offset().
+    """
+
+    def __init__(self, root=None):
+        self.root = root or PARTIAL_DIR
+        os.makedirs(self.root, exist_ok=True)
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, upload_id):
+        with self._guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _part(self, upload_id):
+        return os.path.join(self.root, f"{check_name(upload_id)}.part")
+
+    def offset(self, upload_id):
+        path = self._part(upload_id)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def append(self, upload_id, offset, src, length, chunk_sha256=None):
+        """Append `length` bytes from `src` at `offset`. Returns the new offset.
+
+        Raises OffsetMismatch if `offset` isn't the current end of the upload
+        (nothing is read; the client resumes from `.current`), ChecksumError
+        if the chunk doesn't match `chunk_sha256` and ValueError if the body
+        ends early.
+        """
+        with self._lock(upload_id):
+            current = self.offset(upload_id)
+            if offset != current:
+                raise OffsetMismatch(offset, current)
+            h = hashlib.sha256()
+            path = self._part(upload_id)
+            with open(path, "ab") as f:
+                remaining = length
+                while remaining > 0:
+                    chunk = src.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    f.write(chunk)
+                    remaining -= len(chunk)
+                if remaining or (chunk_sha256 and h.hexdigest() != chunk_sha256.lower()):
+                    # Drop the bad chunk so the client can resend it
+                    f.truncate(current)
+                    if remaining:
+                        raise ValueError(f"connection closed {remaining} bytes before the end of the chunk")
+                    raise ChecksumError(f"chunk at offset {offset} failed its SHA-256 check")
+            return current + length
+
+    def complete(self, upload_id, project, filename, sha256):
+        """Verify the whole upload against sha256 and move it into place. Returns (path, sha256)."""
+        with self._lock(upload_id):
+            part = self._part(upload_id)
+            if not os.path.exists(part):
+                raise ValueError(f"Unknown upload: {upload_id}")
+            if not sha256:
+                # Keep the data: the client can complete again with the digest
+                raise ChecksumError("the SHA-256 of the whole file is required to complete an upload")
+            digest = file_sha256(part)
+            if digest != sha256.lower():
+                os.remove(part)
+                raise ChecksumError(f"SHA-256 mismatch: expected {sha256}, got {digest}")
+
+            lower = filename.lower()
+            if lower.endswith(VIDEO_EXTENSIONS):
+                dst = video_path(project)
+                if os.path.islink(dst):
+                    os.remove(dst)
+                os.replace(part, dst)
+            elif lower.endswith(".zip"):
+                dst = images_dir(project)
+                try:
+                    extract_zip(part, dst)
+                finally:
+                    os.remove(part)
+            elif lower.endswith(IMAGE_EXTENSIONS):
+                dst = os.path.join(writable_dir(images_dir(project)), check_name(os.path.basename(filename)))
+                os.replace(part, dst)
+            else:
+                os.remove(part)
+                raise ValueError(f"Unsupported file type: {filename}")
+        with self._guard:
+            self._locks.pop(upload_id, None)
+        return dst, digest
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Background job worker for 3DGS Studio.
+Claims queued jobs from the SQLite queue and runs their steps as
+subprocesses, writing logs, progress and exit codes back to the queue.
+
+GPU jobs are placed by studio.scheduler.GpuScheduler and pinned with
+CUDA_VISIBLE_DEVICES; jobs that don't fit on any GPU wait in the queue.
+
+CPU, memory, disk I/O and GPU use of every step are sampled by
+studio.telemetry and summarized in a report when the job ends.
+
+Only one worker runs per JOBS_DIR (guarded by a lock file). app.py starts
+one automatically; it can also be run by hand:
+  python3 -m studio.worker [--max-concurrent 4] [--slots-per-device 2]
+"""
+
+import argparse
+import fcntl
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+from studio.artifacts import ArtifactCatalog
+from studio.cache import StageCache, previous_stage
+from studio.config import JOBS_DIR, WORKSPACE
+from studio.jobs import JobStore, SUCCEEDED, FAILED, CANCELLED, TERMINAL_STATES
+from studio.logs import JobLog
+from studio.progress import EventReader, ProgressTracker, events_path
+from studio.scheduler import GpuScheduler, pin_command
+from studio.telemetry import TelemetrySampler, telemetry_paths, write_report
+
+LOCK_PATH = os.path.join(JOBS_DIR, "worker.lock")
+WORKER_LOG = os.path.join(JOBS_DIR, "worker.log")
+
+# Minimum seconds between progress writes to the database
+PROGRESS_INTERVAL = 1.0
+
+
+def format_seconds(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{seconds:02d}s"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+class JobRunner(threading.Thread):
+    """Runs the steps of one job in a background thread."""
+
+    def __init__(self, store, job, allocation=None):
+        super().__init__(daemon=True)
+        self.store = store
+        self.job = job
+        self.allocation = allocation
+        self.process = None
+        self.cancelled = False
+        self.step_times = []
+        self.telemetry = None
+
+    def cancel(self):
+        """Terminate the running step (and its children)."""
+        self.cancelled = True
+        self._kill_process()
+
+    def _kill_process(self):
+        if self.process and self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGTERM)
+            except (ProcessLookupError, OSError):
+                pass
+
+    def run(self):
+        job = self.job
+        with JobLog(job["log_path"]) as log:
+            try:
+                exit_code, error = self._run_steps(log)
+            except Exception as e:  # the job must not stay RUNNING when the runner itself breaks
+                exit_code, error = 1, f"Worker error: {type(e).__name__}: {e}"
+                log.write(f"\n[Job] {error}\n")
+                self._kill_process()
+            finally:
+                if self.step_times:
+                    log.write("\n[Job] Stage timings:\n")
+                    for entry in self.step_times:
+                        note = " (cached)" if entry["cached"] else ""
+                        log.write(f"  {format_seconds(entry['seconds']):>9}  {entry['label']}{note}\n")
+                self._finish_telemetry(log)
+
+            # Stopped and failed runs keep their checkpoints (e.g. an ns-train with the viewer
+            # open only ends when it is cancelled), so they are indexed as well
+            self._index_artifacts(log)
+            if self.cancelled:
+                log.write("\n[Job] Cancelled\n")
+                self.store.finish(job["id"], CANCELLED, exit_code=exit_code)
+            elif error:
+                log.write(f"\n[Job] Failed - {error}\n")
+                self.store.finish(job["id"], FAILED, exit_code=exit_code, error=error)
+            else:
+                log.write("\n[Job] Complete\n")
+                self.store.update(job["id"], progress=1.0, progress_text="✅ 完了")
+                self.store.finish(job["id"], SUCCEEDED, exit_code=0)
+
+    def _run_steps(self, log):
+        """Run the steps until the first failure. Returns (exit code, error or None)."""
+        job = self.job
+        steps = job["steps"]
+        exit_code = 0
+        error = None
+
+        cache, keys, first_to_run = self._plan_cache(steps, log)
+        self._start_telemetry(log)
+        for i, step in enumerate(steps):
+            if self.cancelled:
+                break
+            label = step.get("label", f"step {i + 1}")
+            self.store.update(job["id"], current_step=i, progress=i / len(steps),
+                              progress_text=f"Step {i + 1}/{len(steps)}: {label}")
+            started = time.monotonic()
+            spec = step.get("cache")
+            if i < first_to_run and keys[i]:
+                if cache.is_current(keys[i], spec):
+                    log.write(f"\n[Cache] {label}: up to date ({keys[i][:12]}), skipped\n")
+                    self._record_time(label, started, cached=True)
+                    continue
+                if cache.restore(keys[i], spec):
+                    log.write(f"\n[Cache] {label}: restored from cache ({keys[i][:12]}), skipped\n")
+                    self._record_time(label, started, cached=True)
+                    continue
+                log.write(f"\n[Cache] {label}: cache entry evicted, running again\n")
+                first_to_run = i
+            if keys[i]:
+                cache.prepare(spec)
+                previous = previous_stage(keys, i)
+                if spec.get("mutates") and previous is not None:
+                    cache.restore(keys[previous], steps[previous]["cache"], only=spec["mutates"], copy=True)
+            log.write(f"\n{'='*60}\n[Job] Step {i + 1}/{len(steps)}: {label}\n")
+            if self.allocation and self.allocation.device is not None:
+                log.write(f"GPU: {self.allocation.device} ({self.allocation.vram_mb} MB reserved)\n")
+            log.write(f"Command: {' '.join(step['cmd'])}\n{'='*60}\n")
+
+            exit_code = self._run_step(step, i, len(steps), log)
+            last_output = log.last_line()
+            seconds = self._record_time(label, started)
+            log.write(f"[Job] {label}: {format_seconds(seconds)}\n")
+
+            if self.cancelled:
+                break
+            if exit_code != 0 and not step.get("allow_failure"):
+                error = f"{label}: exit code {exit_code}"
+                if last_output:
+                    error += f" — {last_output[:200]}"
+                break
+            missing = [p for p in step.get("expects", []) if not os.path.exists(p)]
+            if missing:
+                exit_code = exit_code or 1
+                error = f"{label}: missing output {missing[0]}"
+                break
+            exit_code = 0
+            if keys[i]:
+                try:
+                    cache.store(keys[i], spec)
+                except OSError as e:
+                    log.write(f"[Cache] Could not store {label}: {e}\n")
+        return exit_code, error
+
+    def _record_time(self, label, started, cached=False):
+        seconds = time.monotonic() - started
+        self.step_times.append({"label": label, "seconds": round(seconds, 2), "cached": cached})
+        self.store.update(self.job["id"], step_times=self.step_times)
+        return seconds
+
+    def _start_telemetry(self, log):
+        device = self.allocation.device if self.allocation else None
+        try:
+            self.telemetry = TelemetrySampler(telemetry_paths(self.job)[0], gpu=device)
+        except OSError as e:
+            log.write(f"[Telemetry] Disabled for this job: {e}\n")
+            return
+        self.telemetry.start()
+
+    def _finish_telemetry(self, log):
+        if self.telemetry is None:
+            return
+        self.telemetry.stop()
+        try:
+            report = write_report(self.job, self.telemetry)
+        except OSError as e:
+            log.write(f"[Telemetry] Could not write the report: {e}\n")
+            return
+
+        def mb(value):
+            return f"{value:,.0f} MB" if value is not None else "-"
+
+        log.write(f"[Telemetry] Peak RAM {mb(report['rss_mb_peak'])}, GPU {mb(report['gpu_mem_mb_peak'])} "
+                  f"→ {telemetry_paths(self.job)[1]}\n")
+
+    def _index_artifacts(self, log):
+        """Add the job's outputs to the artifact catalog (before the UI sees it finished)."""
+        try:
+            count = ArtifactCatalog().index_job(self.job)
+        except (OSError, sqlite3.Error) as e:
+            log.write(f"[Artifacts] Could not index outputs: {e}\n")
+            return
+        if count:
+            log.write(f"[Artifacts] Indexed {count} file(s) under {self.job['output_dir']}\n")
+
+    def _plan_cache(self, steps, log):
+        """Stage keys and the first step to run; leading steps with matching outputs are skipped."""
+        if not any(step.get("cache") for step in steps):
+            return None, [None] * len(steps), 0
+        try:
+            cache = StageCache()
+            keys, first_to_run = cache.plan(steps)
+        except (OSError, sqlite3.Error) as e:
+            log.write(f"[Cache] Disabled for this job: {e}\n")
+            return None, [None] * len(steps), 0
+        if first_to_run:
+            log.write(f"[Cache] Reusing {first_to_run}/{len(steps)} step(s) from the stage cache\n")
+        return cache, keys, first_to_run
+
+    def _run_step(self, step, index, total, log):
+        """Run one step. Output is read by a separate thread, so slow
+        database writes never stall the pipe; progress goes to the database
+        every PROGRESS_INTERVAL seconds at most, however fast lines arrive.
+        """
+        tracker = ProgressTracker(step.get("progress"))
+        pin_env = self.allocation.env() if self.allocation else {}
+        events = None
+        if tracker.type == "events":
+            # JOBS_DIR is under data/, which the training containers mount at the same path
+            path = events_path(self.job["id"], index)
+            if os.path.exists(path):
+                os.remove(path)
+            events = EventReader(path)
+            pin_env = dict(pin_env, STUDIO_PROGRESS_FILE=path)
+        env = dict(os.environ, **step.get("env", {}), **pin_env)
+        cmd = pin_command(step["cmd"], pin_env)
+        try:
+            self.process = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, errors="replace", bufsize=1, cwd=step.get("cwd", WORKSPACE), env=env,
+                start_new_session=True,  # own process group so cancel kills children too
+            )
+        except OSError as e:
+            log.write(f"[ERROR] Could not start command: {e}\n")
+            return 127
+        if self.cancelled:
+            # cancel() ran between the check in _run_steps and Popen, when there was nothing to kill yet
+            self._kill_process()
+        self.store.update(self.job["id"], pid=self.process.pid)
+        if self.telemetry is not None:
+            self.telemetry.start_step(index, step.get("label", f"step {index + 1}"), cmd, self.process.pid)
+
+        reader = threading.Thread(target=self._read_output, args=(self.process.stdout, log, tracker),
+                                  daemon=True)
+        reader.start()
+        reported = tracker.text
+        exit_code = None
+        while exit_code is None:
+            try:
+                exit_code = self.process.wait(timeout=PROGRESS_INTERVAL)
+            except subprocess.TimeoutExpired:
+                pass
+            if exit_code is not None:
+                reader.join()  # rest of the output
+            log.flush()
+            if events is not None:
+                for event in events.poll():
+                    tracker.feed_event(event)
+            if tracker.text != reported:
+                reported = tracker.text
+                fields = {"progress": (index + tracker.fraction) / total, "progress_text": tracker.text}
+                if events is not None:
+                    fields["metrics"] = tracker.metrics
+                self.store.update(self.job["id"], **fields)
+        if self.telemetry is not None:
+            self.telemetry.end_step()
+        return exit_code
+
+    @staticmethod
+    def _read_output(stdout, log, tracker):
+        for line in stdout:
+            log.write(line)
+            tracker.feed(line.strip())
+
+
+class Worker:
+    """Polls the queue and keeps up to `max_concurrent` jobs running.
+
+    Queued jobs are considered oldest first; a job that doesn't fit on any
+    GPU right now, whose dependencies haven't finished, or whose stage
+    (job kind) is at its `stage_limits` entry is skipped so jobs behind it
+    can start.
+    """
+
+    def __init__(self, store=None, scheduler=None, max_concurrent=4, poll_interval=1.0, stage_limits=None):
+        self.store = store or JobStore()
+        self.scheduler = scheduler or GpuScheduler()
+        self.max_concurrent = max_concurrent
+        self.stage_limits = stage_limits or {}
+        self.poll_interval = poll_interval
+        self.running = {}
+        self._waiting = set()
+        self._stop = threading.Event()
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def run_forever(self, until=None):
+        """Poll the queue until stopped, or until `until()` is true and no job is running."""
+        self.store.fail_orphans()
+        print(f"[Worker] Started (pid {os.getpid()}, max concurrent jobs: {self.max_concurrent})", flush=True)
+        for device in self.scheduler.devices:
+            print(f"[Worker] GPU {device.index}: {device.name} ({device.total_mb} MB)", flush=True)
+        if not self.scheduler.devices:
+            print("[Worker] No GPU detected; GPU jobs run one at a time", flush=True)
+        while not self._stop.is_set():
+            self.poll_once()
+            if until is not None and not self.running and until():
+                break
+            self._stop.wait(self.poll_interval)
+        for runner in self.running.values():
+            runner.cancel()
+        for runner in self.running.values():
+            runner.join(timeout=10)
+        print("[Worker] Stopped", flush=True)
+
+    def poll_once(self):
+        # Reap finished jobs and forward cancel requests
+        for job_id, runner in list(self.running.items()):
+            if not runner.is_alive():
+                del self.running[job_id]
+                self.scheduler.release(job_id)
+                job = self.store.get(job_id)
+                print(f"[Worker] Finished {job_id}: {job['state'] if job else 'unknown'}", flush=True)
+            elif not runner.cancelled and self.store.cancel_requested(job_id):
+                print(f"[Worker] Cancelling {job_id}", flush=True)
+                runner.cancel()
+
+        if len(self.running) >= self.max_concurrent:
+            return
+        queued = self.store.queued()
+        self._waiting.intersection_update(job["id"] for job in queued)
+        for job in queued:
+            if len(self.running) >= self.max_concurrent:
+                break
+            if not self._dependencies_done(job):
+                continue
+            limit = self.stage_limits.get(job["kind"])
+            if limit is not None and sum(r.job["kind"] == job["kind"] for r in self.running.values()) >= limit:
+                continue
+            allocation = self.scheduler.acquire(job["id"], job["vram_mb"] or 0, job["locks"] or ())
+            if allocation is None:
+                if job["id"] not in self._waiting:
+                    self._waiting.add(job["id"])
+                    self.store.update(job["id"], progress_text=f"リソース待ち (VRAM {job['vram_mb']} MB)")
+                continue
+            if not self.store.claim(job["id"], gpu=allocation.device):
+                self.scheduler.release(job["id"])  # cancelled meanwhile
+                continue
+            self._waiting.discard(job["id"])
+            job["gpu"] = allocation.device
+            where = f"GPU {allocation.device}" if allocation.device is not None else "unpinned"
+            print(f"[Worker] Starting {job['id']} ({job['kind']}: {job['title']}) on {where}", flush=True)
+            runner = JobRunner(self.store, job, allocation)
+            self.running[job["id"]] = runner
+            runner.start()
+
+    def _dependencies_done(self, job):
+        """True if all dependencies succeeded; cancels the job if one of them didn't."""
+        deps = job["depends_on"] or []
+        states = self.store.states(deps)
+        for dep in deps:
+            state = states.get(dep)
+            if state in TERMINAL_STATES and state != SUCCEEDED:
+                self.store.finish(job["id"], CANCELLED, error=f"dependency {dep} {state}")
+                return False
+            if state != SUCCEEDED:
+                return False
+        return True
+
+
+def acquire_lock():
+    """Take the single-worker lock. Returns the open lock file, or None if held."""
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    lock_file = open(LOCK_PATH, "a+")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def worker_running():
+    lock_file = acquire_lock()
+    if lock_file is None:
+        return True
+    lock_file.close()
+    return False
+
+
+def parse_stage_limits(items):
+    """Parse ["train=1", "export=4"] into {"train": 1, "export": 4}."""
+    limits = {}
+    for item in items:
+        kind, _, value = item.partition("=")
+        try:
+            limits[kind.strip()] = int(value)
+        except ValueError:
+            raise SystemExit(f"[ERROR] Invalid stage limit: {item!r} (expected KIND=N)")
+    return limits
+
+
+def ensure_worker(max_concurrent=None, slots_per_device=None, stage_limits=None):
+    """Start a detached worker process unless one is already running.
+
+    The options are passed on to the new worker; a running one keeps its own.
+    """
+    if worker_running():
+        return False
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cmd = [sys.executable, "-m", "studio.worker"]
+    if max_concurrent is not None:
+        cmd.extend(["--max-concurrent", str(max_concurrent)])
+    if slots_per_device is not None:
+        cmd.extend(["--slots-per-device", str(slots_per_device)])
+    if stage_limits:
+        cmd.extend(["--stage-limit", *(f"{kind}={limit}" for kind, limit in stage_limits.items())])
+    with open(WORKER_LOG, "a") as log:
+        subprocess.Popen(
+            cmd,
+            cwd=repo_root, stdout=log, stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL, start_new_session=True,
+        )
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3DGS Studio Job Worker")
+    parser.add_argument("--max-concurrent", type=int, default=4,
+                        help="Maximum number of jobs running at once (default: 4)")
+    parser.add_argument("--slots-per-device", type=int, default=2,
+                        help="Maximum number of jobs sharing one GPU (default: 2)")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="Seconds between queue polls (default: 1.0)")
+    parser.add_argument("--stage-limit", nargs="*", default=[], metavar="KIND=N",
+                        help="Per-stage concurrency, e.g. preprocess=2 train=1 export=4")
+    args = parser.parse_args()
+
+    lock_file = acquire_lock()
+    if lock_file is None:
+        print("[Worker] Another worker is already running.")
+        sys.exit(0)
+
+    worker = Worker(scheduler=GpuScheduler(slots_per_device=args.slots_per_device),
+                    max_concurrent=args.max_concurrent, poll_interval=args.poll_interval,
+                    stage_limits=parse_stage_limits(args.stage_limit))
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run_forever()
+
+
+if __name__ == "__main__":
+    main()
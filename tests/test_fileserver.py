@@ -0,0 +1,46 @@
+"""
+Range header parsing of the file server.
+
+  python3 -m unittest discover tests
+"""
+
+import unittest
+
+from studio.fileserver import parse_range
+
+
+class ParseRangeTest(unittest.TestCase):
+    def test_no_range(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range("", 100))
+
+    def test_closed_range(self):
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        # The end is clamped to the file
+        self.assertEqual(parse_range("bytes=90-199", 100), (90, 99))
+
+    def test_open_range(self):
+        self.assertEqual(parse_range("bytes=40-", 100), (40, 99))
+        self.assertEqual(parse_range("bytes=99-", 100), (99, 99))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        # Longer than the file: the whole file
+        self.assertEqual(parse_range("bytes=-500", 100), (0, 99))
+
+    def test_unsatisfiable(self):
+        for header in ("bytes=100-", "bytes=150-200", "bytes=20-10", "bytes=-0"):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                parse_range(header, 100)
+        with self.assertRaises(ValueError):
+            parse_range("bytes=0-", 0)
+
+    def test_whole_file_for_other_forms(self):
+        # Multiple ranges and other units are answered with the whole file
+        for header in ("bytes=0-9,20-29", "bytes=-", "items=0-9", "bytes=a-b"):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
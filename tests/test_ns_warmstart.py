@@ -0,0 +1,81 @@
+"""
+Per-image parameter re-indexing of scripts/ns_warmstart.py.
+
+Needs torch, so it only runs where nerfstudio is installed (e.g. inside the
+nerfstudio container); elsewhere it is skipped.
+
+  python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+if torch is not None:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+    from ns_warmstart import remap_per_image
+
+APPEARANCE = "_model.field.embedding_appearance.embedding.weight"
+POSES = "_model.camera_optimizer.pose_adjustment"
+MEANS = "_model.gauss_params.means"
+
+
+def pipeline_state(images):
+    """Appearance codes and pose adjustments with row i = i + 1, plus a parameter that isn't per image."""
+    rows = torch.arange(1, images + 1, dtype=torch.float32)[:, None]
+    return {APPEARANCE: rows.repeat(1, 4), POSES: rows.repeat(1, 6), MEANS: torch.ones(5, 3)}
+
+
+@unittest.skipUnless(torch, "needs torch")
+class RemapPerImageTest(unittest.TestCase):
+    def assertRows(self, tensor, values):
+        self.assertEqual(tensor[:, 0].tolist(), values)
+
+    def test_same_images_unchanged(self):
+        state = pipeline_state(3)
+        appearance = state[APPEARANCE]
+        self.assertEqual(remap_per_image(state, ["a", "b", "c"], ["a", "b", "c"]), {})
+        self.assertIs(state[APPEARANCE], appearance)
+
+    def test_added_images(self):
+        state = pipeline_state(2)
+        remapped = remap_per_image(state, ["a.jpg", "b.jpg"], ["a.jpg", "c.jpg", "b.jpg"])
+        self.assertEqual(remapped, {APPEARANCE: (2, 3, 2), POSES: (2, 3, 2)})
+        # New appearance codes start at the mean, new cameras without a pose correction
+        self.assertRows(state[APPEARANCE], [1.0, 1.5, 2.0])
+        self.assertRows(state[POSES], [1.0, 0.0, 2.0])
+        self.assertEqual(state[MEANS].shape, (5, 3))
+
+    def test_reordered_images(self):
+        state = pipeline_state(3)
+        remapped = remap_per_image(state, ["a", "b", "c"], ["c", "a", "b"])
+        self.assertEqual(remapped[APPEARANCE], (3, 3, 3))
+        self.assertRows(state[APPEARANCE], [3.0, 1.0, 2.0])
+        self.assertRows(state[POSES], [3.0, 1.0, 2.0])
+
+    def test_removed_images(self):
+        state = pipeline_state(3)
+        self.assertEqual(remap_per_image(state, ["a", "b", "c"], ["c"])[POSES], (3, 1, 1))
+        self.assertRows(state[APPEARANCE], [3.0])
+
+    def test_row_count_mismatch_reuses_nothing(self):
+        # Old names that don't fit the parameters can't say which row is which: every image starts over
+        state = pipeline_state(2)
+        remapped = remap_per_image(state, ["a", "b", "c"], ["a", "b"])
+        self.assertEqual(remapped, {APPEARANCE: (2, 2, 0), POSES: (2, 2, 0)})
+        self.assertRows(state[APPEARANCE], [1.5, 1.5])
+        self.assertRows(state[POSES], [0.0, 0.0])
+
+    def test_unknown_old_images(self):
+        state = pipeline_state(2)
+        self.assertEqual(remap_per_image(state, None, ["a", "b", "c"]), {APPEARANCE: (2, 3, 0), POSES: (2, 3, 0)})
+        self.assertRows(state[APPEARANCE], [1.5, 1.5, 1.5])
+
+
+if __name__ == "__main__":
+    unittest.main()
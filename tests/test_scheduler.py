@@ -0,0 +1,95 @@
+"""
+GpuScheduler placement on fake device inventories (no GPU needed).
+
+  python3 -m unittest discover tests
+"""
+
+import os
+import unittest
+from unittest import mock
+
+from studio.scheduler import GpuDevice, GpuScheduler, detect_devices, pin_command
+
+
+def scheduler(*total_mb, slots_per_device=2):
+    return GpuScheduler(devices=[GpuDevice(i, mb, "fake") for i, mb in enumerate(total_mb)],
+                        slots_per_device=slots_per_device)
+
+
+class FakeInventoryTest(unittest.TestCase):
+    def test_devices_from_environment(self):
+        with mock.patch.dict(os.environ, {"STUDIO_FAKE_GPUS": "24576,12288"}):
+            devices = detect_devices()
+        self.assertEqual([(d.index, d.total_mb) for d in devices], [(0, 24576), (1, 12288)])
+
+    def test_empty_inventory(self):
+        with mock.patch.dict(os.environ, {"STUDIO_FAKE_GPUS": ""}):
+            self.assertEqual(detect_devices(), [])
+
+
+class PlacementTest(unittest.TestCase):
+    def test_best_fit(self):
+        gpus = scheduler(24000, 12000)
+        # The smallest device that fits, keeping the big one free for big jobs
+        self.assertEqual(gpus.acquire("small", 8000).device, 1)
+        self.assertEqual(gpus.acquire("big", 16000).device, 0)
+        # Device 1 has 4000 MB left, device 0 8000 MB
+        self.assertEqual(gpus.acquire("medium", 6000).device, 0)
+
+    def test_pinning_env(self):
+        alloc = scheduler(24000).acquire("job", 8000)
+        self.assertEqual(alloc.env(), {"CUDA_VISIBLE_DEVICES": "0"})
+        self.assertEqual(pin_command(["docker", "exec", "sugar", "python3"], alloc.env()),
+                         ["docker", "exec", "-e", "CUDA_VISIBLE_DEVICES=0", "sugar", "python3"])
+
+    def test_slots_per_device(self):
+        gpus = scheduler(24000, slots_per_device=2)
+        self.assertIsNotNone(gpus.acquire("a", 2000))
+        self.assertIsNotNone(gpus.acquire("b", 2000))
+        # VRAM is left, but both slots are taken
+        self.assertIsNone(gpus.acquire("c", 2000))
+        gpus.release("a")
+        self.assertIsNotNone(gpus.acquire("c", 2000))
+
+    def test_waits_when_nothing_fits(self):
+        gpus = scheduler(12000, 12000)
+        self.assertIsNotNone(gpus.acquire("a", 8000))
+        self.assertIsNotNone(gpus.acquire("b", 8000))
+        self.assertIsNone(gpus.acquire("c", 8000))
+        self.assertEqual([d["reserved_mb"] for d in gpus.status()], [8000, 8000])
+        gpus.release("b")
+        self.assertEqual(gpus.acquire("c", 8000).device, 1)
+
+    def test_oversized_job_gets_an_idle_device(self):
+        gpus = scheduler(12000, 16000)
+        self.assertIsNotNone(gpus.acquire("a", 4000))
+        alloc = gpus.acquire("huge", 20000)
+        self.assertEqual((alloc.device, alloc.vram_mb), (1, 16000))
+        self.assertIsNone(gpus.acquire("huge2", 20000))
+
+    def test_exclusive_locks(self):
+        gpus = scheduler(24000, 24000)
+        self.assertIsNotNone(gpus.acquire("viewer1", 8000, locks=["viewer:7007"]))
+        # Free VRAM and slots, but the viewer port is held
+        self.assertIsNone(gpus.acquire("viewer2", 8000, locks=["viewer:7007"]))
+        self.assertIsNotNone(gpus.acquire("headless", 8000))
+        gpus.release("viewer1")
+        self.assertIsNotNone(gpus.acquire("viewer2", 8000, locks=["viewer:7007"]))
+
+    def test_cpu_jobs_are_unpinned(self):
+        gpus = scheduler(8000, slots_per_device=1)
+        self.assertIsNotNone(gpus.acquire("gpu", 8000))
+        alloc = gpus.acquire("cpu", 0)
+        self.assertEqual((alloc.device, alloc.env()), (None, {}))
+
+    def test_no_gpu_runs_gpu_jobs_one_at_a_time(self):
+        gpus = scheduler()
+        self.assertIsNone(gpus.acquire("a", 8000).device)
+        self.assertIsNone(gpus.acquire("b", 8000))
+        self.assertIsNotNone(gpus.acquire("cpu", 0))
+        gpus.release("a")
+        self.assertIsNotNone(gpus.acquire("b", 8000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Successive-halving rungs and promotions of studio.sweep (no jobs are run).
+
+  python3 -m unittest discover tests
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from studio.sweep import (DONE, FAILED, PENDING, STOPPED, SWEEP_STATE, TRAINING, WAITING, Sweep, rung_budgets,
+                          validate_spec)
+
+
+def make_sweep(directory, trials, rungs=(1000, 3000, 9000), eta=3, metric="psnr"):
+    """Sweep over (status, [metric per rung]) trials, stored in `directory`."""
+    spec = validate_spec({"project": "p", "eta": eta, "metric": metric,
+                          "min_iterations": rungs[0], "iterations": rungs[-1]})
+    state = {"id": "sweep-test", "spec": spec, "state": "running", "rungs": list(rungs), "trials": [
+        {"id": f"t{i:02d}", "params": {}, "model": "splatfacto", "run_dir": directory, "status": status,
+         "job_id": None, "metrics": [{metric: value} for value in values], "gpu_seconds": 0.0}
+        for i, (status, values) in enumerate(trials)
+    ]}
+    with open(os.path.join(directory, SWEEP_STATE), "w") as f:
+        json.dump(state, f)
+    return Sweep(directory, store=object())  # the decisions below never touch the job store
+
+
+def ids(trials):
+    return [t["id"] for t in trials]
+
+
+class RungBudgetsTest(unittest.TestCase):
+    def test_defaults(self):
+        self.assertEqual(rung_budgets(3000, 30000, 3), [1111, 3333, 10000, 30000])
+
+    def test_exact_powers(self):
+        self.assertEqual(rung_budgets(3000, 27000, 3), [3000, 9000, 27000])
+
+    def test_first_rung_at_most_min_iterations(self):
+        for min_iterations, iterations, eta in [(3000, 30000, 3), (1000, 30000, 2), (5000, 7000, 4), (1, 100, 10)]:
+            rungs = rung_budgets(min_iterations, iterations, eta)
+            self.assertLessEqual(rungs[0], min_iterations)
+            self.assertEqual(rungs[-1], iterations)
+            # Only the first rung may be at or below min_iterations
+            self.assertTrue(all(r > min_iterations for r in rungs[1:]))
+
+    def test_single_rung(self):
+        self.assertEqual(rung_budgets(30000, 30000, 3), [30000])
+
+
+class PromotionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def sweep(self, trials, **kwargs):
+        return make_sweep(self.tmp.name, trials, **kwargs)
+
+    def test_top_fraction_while_rung_fills(self):
+        # 6 of 9 trials evaluated at rung 0: the best 6 // 3 = 2 move up without waiting for the rest
+        sweep = self.sweep([(WAITING, [v]) for v in (20, 25, 22, 28, 21, 23)] + [(PENDING, [])] * 3)
+        self.assertEqual(ids(sweep._promotable(0)), ["t03", "t01"])
+        self.assertEqual(sweep._next_trial()["id"], "t03")
+
+    def test_nothing_promoted_before_eta_results(self):
+        sweep = self.sweep([(WAITING, [25]), (WAITING, [20]), (PENDING, [])])
+        self.assertEqual(sweep._promotable(0), [])
+        self.assertEqual(sweep._next_trial()["id"], "t02")
+
+    def test_promoted_trials_keep_their_rank(self):
+        # t03 already moved up: it still holds one of the two top places
+        sweep = self.sweep([(WAITING, [v]) for v in (20, 25, 22)] + [(TRAINING, [28])]
+                           + [(WAITING, [v]) for v in (21, 23)] + [(PENDING, [])])
+        self.assertEqual(ids(sweep._promotable(0)), ["t01"])
+
+    def test_closed_rung_promotes_best_and_stops_rest(self):
+        # No trial can reach rung 0 any more: the best one moves up even below 1/eta, the others stop
+        sweep = self.sweep([(WAITING, [20]), (WAITING, [25]), (FAILED, [])])
+        self.assertEqual(ids(sweep._promotable(0)), ["t01"])
+        sweep._close_rungs()
+        self.assertEqual([t["status"] for t in sweep.trials], [STOPPED, WAITING, FAILED])
+
+    def test_open_rung_is_not_closed(self):
+        sweep = self.sweep([(WAITING, [20]), (WAITING, [25]), (TRAINING, [])])
+        sweep._close_rungs()
+        self.assertEqual([t["status"] for t in sweep.trials], [WAITING, WAITING, TRAINING])
+
+    def test_failed_trials_are_not_ranked(self):
+        sweep = self.sweep([(FAILED, [30]), (WAITING, [20]), (WAITING, [25]), (WAITING, [22])])
+        self.assertEqual(ids(sweep._ranked(0)), ["t02", "t03", "t01"])
+
+    def test_lower_is_better_metric(self):
+        sweep = self.sweep([(WAITING, [v]) for v in (0.3, 0.1, 0.2)], metric="lpips")
+        self.assertEqual(ids(sweep._ranked(0)), ["t01", "t02", "t00"])
+        self.assertEqual(ids(sweep._promotable(0)), ["t01"])
+
+    def test_higher_rungs_first(self):
+        # Promotions come before new trials, and the highest rung goes first
+        sweep = self.sweep([(WAITING, [v]) for v in (20, 28, 22)]
+                           + [(WAITING, [26, 30]), (DONE, [27, 29, 31]), (STOPPED, [21, 24])] + [(PENDING, [])])
+        self.assertEqual(sweep._next_trial()["id"], "t03")
+        sweep.trials[3]["status"] = TRAINING
+        self.assertEqual(sweep._next_trial()["id"], "t01")
+
+
+if __name__ == "__main__":
+    unittest.main()
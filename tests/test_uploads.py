@@ -0,0 +1,101 @@
+"""
+Resumable chunked uploads and name checks of studio.uploads (in a temporary directory).
+
+  python3 -m unittest discover tests
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from studio.uploads import ChecksumError, OffsetMismatch, ResumableUploads, check_name
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class CheckNameTest(unittest.TestCase):
+    def test_accepts_project_names(self):
+        for name in ("garden", "garden_01", "my project", "v1.2-final", "庭園"):
+            with self.subTest(name=name):
+                self.assertEqual(check_name(name), name)
+
+    def test_rejects_traversal(self):
+        for name in ("", ".", "..", "../garden", "a/b", "/etc", "a\\b", ".partial", " garden", "garden\n"):
+            with self.subTest(name=name), self.assertRaises(ValueError):
+                check_name(name)
+
+
+class ResumableUploadsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.upload_dir = tmp.name
+        patcher = mock.patch("studio.uploads.UPLOAD_DIR", self.upload_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.uploads = ResumableUploads(os.path.join(self.upload_dir, ".partial"))
+
+    def append(self, data, offset, chunk_sha256=None):
+        return self.uploads.append("up", offset, io.BytesIO(data), len(data), chunk_sha256 or sha256(data))
+
+    def test_resume_after_reconnect(self):
+        self.assertEqual(self.append(b"hello ", 0), 6)
+        # A resent chunk is refused with the offset to continue from
+        with self.assertRaises(OffsetMismatch) as cm:
+            self.append(b"hello ", 0)
+        self.assertEqual(cm.exception.current, 6)
+        # A restarted server picks the partial upload up again
+        self.uploads = ResumableUploads(self.uploads.root)
+        self.assertEqual(self.uploads.offset("up"), 6)
+        self.assertEqual(self.append(b"world", 6), 11)
+
+    def test_bad_chunk_is_dropped(self):
+        self.append(b"hello ", 0)
+        with self.assertRaises(ChecksumError):
+            self.append(b"world", 6, chunk_sha256=sha256(b"other"))
+        self.assertEqual(self.uploads.offset("up"), 6)
+
+    def test_short_body_is_dropped(self):
+        with self.assertRaises(ValueError):
+            self.uploads.append("up", 0, io.BytesIO(b"hel"), 5, sha256(b"hello"))
+        self.assertEqual(self.uploads.offset("up"), 0)
+
+    def test_complete_requires_sha256(self):
+        self.append(b"video", 0)
+        with self.assertRaises(ChecksumError):
+            self.uploads.complete("up", "garden", "clip.mp4", None)
+        # The data is kept: completing again with the digest succeeds
+        self.assertEqual(self.uploads.offset("up"), 5)
+        path, digest = self.uploads.complete("up", "garden", "clip.mp4", sha256(b"video").upper())
+        self.assertEqual(path, os.path.join(self.upload_dir, "garden.mp4"))
+        self.assertEqual(digest, sha256(b"video"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"video")
+
+    def test_complete_rejects_wrong_sha256(self):
+        self.append(b"video", 0)
+        with self.assertRaises(ChecksumError):
+            self.uploads.complete("up", "garden", "clip.mp4", sha256(b"other"))
+        self.assertEqual(self.uploads.offset("up"), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.upload_dir, "garden.mp4")))
+
+    def test_complete_image_into_project_with_spaces(self):
+        self.append(b"jpeg", 0)
+        path, _ = self.uploads.complete("up", "my garden", "../../IMG 0001.jpg", sha256(b"jpeg"))
+        self.assertEqual(path, os.path.join(self.upload_dir, "my garden", "IMG 0001.jpg"))
+
+    def test_complete_rejects_traversal(self):
+        self.append(b"video", 0)
+        with self.assertRaises(ValueError):
+            self.uploads.complete("up", "../garden", "clip.mp4", sha256(b"video"))
+        with self.assertRaises(ValueError):
+            self.uploads.offset("../up")
+
+
+if __name__ == "__main__":
+    unittest.main()